@@ -10,8 +10,15 @@ from dash import html, dcc, Input, Output, State
 
 from database.history_manager import SQLiteHistoryManager
 from backend.session_manager import SessionManager
+from backend.job_scheduler import JobScheduler
+from backend.memory_manager import MemoryReaper
 from ui.callbacks import register_callbacks
 from utils.logger import Logger
+from utils.constants import (
+    DEFAULT_MEMORY_BUDGET_MB,
+    MEMORY_REAPER_INTERVAL_SECONDS,
+    SESSION_INACTIVE_THRESHOLD_SECONDS,
+)
 
 logger = Logger.get_logger()
 
@@ -19,6 +26,8 @@ logger = Logger.get_logger()
 HOST = '0.0.0.0'
 PORT = 10000
 DEBUG = True
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', '2'))  # 后台分析任务并发数
+MEMORY_BUDGET_MB = int(os.environ.get('MEMORY_BUDGET_MB', str(DEFAULT_MEMORY_BUDGET_MB)))  # 全局内存预算
 
 
 class ApplicationManager:
@@ -27,6 +36,8 @@ class ApplicationManager:
     _instance: Optional['ApplicationManager'] = None
     _history_manager: Optional[SQLiteHistoryManager] = None
     _session_manager: Optional[SessionManager] = None
+    _job_scheduler: Optional[JobScheduler] = None
+    _memory_reaper: Optional[MemoryReaper] = None
     _app: Optional[dash.Dash] = None
 
     def __new__(cls) -> 'ApplicationManager':
@@ -45,9 +56,24 @@ class ApplicationManager:
     def session_manager(self) -> SessionManager:
         """获取会话管理器单例"""
         if self._session_manager is None:
-            self._session_manager = SessionManager(self.history_manager)
+            self._session_manager = SessionManager(self.history_manager, self.job_scheduler)
+            # 启动内存回收线程（清理未活动会话 + 按预算溢出数据集）
+            self._memory_reaper = MemoryReaper(
+                self._session_manager,
+                budget_bytes=MEMORY_BUDGET_MB * 1024 * 1024,
+                interval_seconds=MEMORY_REAPER_INTERVAL_SECONDS,
+                inactive_threshold_seconds=SESSION_INACTIVE_THRESHOLD_SECONDS,
+            )
+            self._memory_reaper.start()
         return self._session_manager
 
+    @property
+    def job_scheduler(self) -> JobScheduler:
+        """获取后台任务调度器单例"""
+        if self._job_scheduler is None:
+            self._job_scheduler = JobScheduler(max_workers=JOB_WORKERS)
+        return self._job_scheduler
+
     @property
     def app(self) -> dash.Dash:
         """获取 Dash 应用单例"""
@@ -139,9 +165,22 @@ class ApplicationManager:
         self._register_page_routing(app)
         self._register_global_file_management_callbacks(app)
         self._register_page_callbacks(app)
-        register_callbacks(app, self.session_manager, self.history_manager)
+        register_callbacks(app, self.session_manager, self.history_manager, self.job_scheduler)
+        self._schedule_summary_backfill()
         return app
 
+    def _schedule_summary_backfill(self) -> None:
+        """后台为尚无摘要指标的历史记录补算摘要（不阻塞启动，不占用用户任务的工作线程）"""
+        from backend.record_summary import start_summary_backfill
+
+        try:
+            if not self.history_manager.get_records_without_summary(limit=1):
+                return
+        except Exception as e:
+            logger.warning(f"⚠️ 检查历史记录摘要失败: {e}")
+            return
+        start_summary_backfill(self.history_manager, self.job_scheduler)
+
     def _create_global_file_management(self):
         """创建全局文件管理区域（可折叠）"""
         from ui.layout_components import create_multi_algorithm_upload_area, create_multi_algorithm_management_area
@@ -213,13 +252,15 @@ class ApplicationManager:
         from ui.consistency_callbacks import register_callbacks as register_consistency_callbacks
         from ui.waterfall_consistency_callbacks import register_callbacks as register_waterfall_consistency_callbacks
         from ui.history_callbacks import register_history_callbacks
+        from ui.trend_callbacks import register_trend_callbacks
 
         register_report_callbacks(app, self.session_manager)
         register_waterfall_callbacks(app, self.session_manager)
         register_scatter_callbacks(app, self.session_manager)
         register_consistency_callbacks(app, self.session_manager)
         register_waterfall_consistency_callbacks(app, self.session_manager)
-        register_history_callbacks(app, self.session_manager)
+        register_history_callbacks(app, self.session_manager, self.job_scheduler)
+        register_trend_callbacks(app, self.history_manager)
         logger.debug("[DEBUG] History and Waterfall Consistency callbacks registered")
 
     def _handle_page_routing(self, pathname: str):
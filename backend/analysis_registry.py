@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+共享分析结果注册表
+
+多个会话打开同一文件（相同 MD5、相同处理流程）时共用同一份不可变的分析结果，
+避免重复解析、匹配与内存占用：
+- 进程级注册表，按 (文件MD5, 处理配置) 作为键
+- 会话中的 AlgorithmDataset 只持有引用（句柄），颜色、显示状态等 UI 选择仍属于会话
+- 引用计数归零时释放分析结果
+- 同一键的并发构建只执行一次，其他请求等待构建结果
+"""
+
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from backend.job_scheduler import JobCancelledError
+from utils.logger import Logger
+
+logger = Logger.get_logger()
+
+# 注册表键：(文件MD5, 处理配置)
+AnalysisKey = Tuple[str, str]
+
+# 处理配置：与数据加载时使用的过滤流程一一对应
+ANALYSIS_CONFIG_UPLOAD = "upload"    # 上传流程：SPMIDLoader 过滤（保留过滤信息）
+ANALYSIS_CONFIG_HISTORY = "history"  # 历史加载流程：DataFilter 过滤
+
+
+def make_analysis_key(file_md5: str, config: str) -> AnalysisKey:
+    """生成注册表键"""
+    return (file_md5, config)
+
+
+@dataclass
+class SharedAnalysis:
+    """
+    共享的分析结果（构建完成后视为只读）
+
+    持有者不得修改 record_data / replay_data / analyzer 的内容。
+    """
+    key: AnalysisKey
+    record_data: List[Any]
+    replay_data: List[Any]
+    analyzer: Any
+    ref_count: int = 0
+    created_at: float = field(default_factory=time.time)
+    _memory_bytes: Optional[int] = field(default=None, repr=False)
+
+    def estimate_memory_bytes(self) -> int:
+        """估算分析结果占用的内存字节数（结果缓存）"""
+        if self._memory_bytes is None:
+            from backend.memory_manager import estimate_dataset_bytes
+            self._memory_bytes = estimate_dataset_bytes(self.record_data, self.replay_data, self.analyzer)
+        return self._memory_bytes
+
+
+class AnalysisRegistry:
+    """
+    共享分析结果注册表类
+
+    builder 约定：无参函数，返回 (record_data, replay_data, analyzer)。
+    """
+
+    def __init__(self):
+        self._entries: Dict[AnalysisKey, SharedAnalysis] = {}
+        self._building: Dict[AnalysisKey, Future] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, key: AnalysisKey,
+                builder: Callable[[], Tuple[List[Any], List[Any], Any]]) -> SharedAnalysis:
+        """
+        获取共享分析结果并增加引用计数（不存在时调用 builder 构建）
+
+        Args:
+            key: 注册表键
+            builder: 构建函数（仅在注册表中不存在该键时调用）
+
+        Returns:
+            SharedAnalysis: 共享分析结果，使用完毕后必须调用 release(key)
+
+        Raises:
+            builder 抛出的异常（构建失败时不会写入注册表）
+        """
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry.ref_count += 1
+                    logger.info(f"🔗 复用共享分析结果: {key[0][:8]}.../{key[1]} (引用数: {entry.ref_count})")
+                    return entry
+                future = self._building.get(key)
+                is_owner = future is None
+                if is_owner:
+                    future = Future()
+                    self._building[key] = future
+
+            if not is_owner:
+                # 其他会话正在构建同一结果：等待后重新查找
+                try:
+                    future.result()
+                except JobCancelledError:
+                    # 构建方的任务被取消，由当前请求重新构建
+                    pass
+                continue
+
+            try:
+                record_data, replay_data, analyzer = builder()
+            except BaseException as e:
+                with self._lock:
+                    self._building.pop(key, None)
+                future.set_exception(e)
+                raise
+
+            with self._lock:
+                entry = SharedAnalysis(key, record_data, replay_data, analyzer, ref_count=1)
+                self._entries[key] = entry
+                self._building.pop(key, None)
+            future.set_result(None)
+            logger.info(f"📌 已注册共享分析结果: {key[0][:8]}.../{key[1]}")
+            return entry
+
+    def release(self, key: AnalysisKey) -> None:
+        """减少引用计数，归零时释放分析结果"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry.ref_count -= 1
+            if entry.ref_count > 0:
+                return
+            del self._entries[key]
+        logger.info(f"🗑️ 共享分析结果已释放: {key[0][:8]}.../{key[1]}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取注册表统计信息"""
+        with self._lock:
+            entries = list(self._entries.values())
+            building = len(self._building)
+        return {
+            'entry_count': len(entries),
+            'building_count': building,
+            'total_refs': sum(e.ref_count for e in entries),
+            'memory_bytes': sum(e.estimate_memory_bytes() for e in entries),
+        }
+
+
+_registry: Optional[AnalysisRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_analysis_registry() -> AnalysisRegistry:
+    """获取进程级共享分析结果注册表"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = AnalysisRegistry()
+        return _registry
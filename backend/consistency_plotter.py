@@ -1,19 +1,19 @@
+import numpy as np
 import plotly.graph_objects as go
-from typing import List, Tuple, Any
+from typing import List, Optional, Tuple
+from backend.figure_encoding import encode_array
+from backend.key_waveforms import KeyWaveforms
 from utils.colors import ALGORITHM_COLOR_PALETTE
 
-class ConsistencyPlotter:
-    @staticmethod
-    def _has_valid_data(note, data_type):
-        if note is None:
-            return False
-        data = getattr(note, data_type, None)
-        return data is not None and not data.empty
+# 一条音轨的绘制数据：(按键波形缓存, 要显示的行号)
+WaveformSelection = Tuple[KeyWaveforms, np.ndarray]
 
+
+class ConsistencyPlotter:
     @staticmethod
     def _add_note_traces(
         fig: go.Figure,
-        notes: List[Any],
+        selection: Optional[WaveformSelection],
         label: str,
         color: str,
         hammer_symbol: str = 'circle',
@@ -21,69 +21,39 @@ class ConsistencyPlotter:
         hammer_opacity: float = 1.0,
         max_display_count: int = 100  # 限制显示数量，防止卡死
     ):
-        """通用逻辑：处理音符并添加波形与锤速 Trace (带数量限制)"""
-        if not notes:
+        """通用逻辑：从按键波形缓存切片并添加波形与锤速 Trace (带数量限制)"""
+        if selection is None:
+            return
+        waveforms, rows = selection
+        if not len(rows):
             return
 
-        # 数量限制检查
-        total_count = len(notes)
+        # 数量限制检查（行号按时间排序，保留前N条）
+        total_count = len(rows)
         if total_count > max_display_count:
-            notes = notes[:max_display_count]
+            rows = rows[:max_display_count]
             # 更新图例名称以提示用户
             label = f"{label} (前{max_display_count}/{total_count}条)"
-        
-        wave_x, wave_y, wave_text = [], [], []
-        ham_x, ham_y, ham_text = [], [], []
-
-        def append_waveform(x_list, y_list, text_list, x_data, y_data, text_data):
-            x_list.extend(x_data)
-            x_list.append(None)
-            y_list.extend(y_data)
-            y_list.append(None)
-            text_list.extend(text_data)
-            text_list.append("")
-
-        # 确保按时间排序，方便查看前N条
-        notes.sort(key=lambda n: n.offset)
-        
-        for i, note in enumerate(notes):
-            idx = getattr(note, 'global_sequence', i + 1)
-            uuid_str = getattr(note, 'uuid', 'N/A')
-            
-            # 处理触后波形
-            if ConsistencyPlotter._has_valid_data(note, 'after_touch'):
-                data = note.after_touch.sort_index()
-                times = ((data.index + note.offset) / 10.0).tolist()
-                vals = data.values.tolist()
-                texts = [f"序号: {idx}<br>UUID: {uuid_str}" for _ in times]
-                append_waveform(wave_x, wave_y, wave_text, times, vals, texts)
-
-            # 处理锤子速度点
-            if ConsistencyPlotter._has_valid_data(note, 'hammers'):
-                hammers = note.hammers.sort_index()
-                h_times = ((hammers.index + note.offset) / 10.0).tolist()
-                h_vals = hammers.values.tolist()
-                h_texts = [f"序号: {idx}<br>UUID: {uuid_str}<br>Vel: {v}" for v in h_vals]
-                ham_x.extend(h_times)
-                ham_y.extend(h_vals)
-                ham_text.extend(h_texts)
-
-        # 添加波形 Trace (使用 Scattergl 加速渲染)
-        if wave_x:
+
+        wave_x, wave_y, wave_sequence = waveforms.waveform(rows)
+        ham_x, ham_y, ham_text = waveforms.hammers(rows)
+
+        # 添加波形 Trace (使用 Scattergl 加速渲染；序号放在数值 customdata 中，曲线之间以 NaN 断开)
+        if wave_x.size:
             fig.add_trace(go.Scattergl(
-                x=wave_x, y=wave_y,
+                x=encode_array(wave_x), y=encode_array(wave_y),
                 mode='lines+markers',
                 line=dict(color=color, width=1.5),
                 marker=dict(size=4, color=color),
                 name=label,
-                text=wave_text,
-                hovertemplate=f"<b>{label}</b><br>时间: %{{x:.1f}} ms<br>压力: %{{y}}<br>%{{text}}<extra></extra>"
+                customdata=encode_array(wave_sequence),
+                hovertemplate=f"<b>{label}</b><br>时间: %{{x:.1f}} ms<br>压力: %{{y}}<br>序号: %{{customdata}}<extra></extra>"
             ))
 
         # 添加锤子 Trace
-        if ham_x:
+        if ham_x.size:
             fig.add_trace(go.Scattergl(
-                x=ham_x, y=ham_y,
+                x=encode_array(ham_x), y=encode_array(ham_y),
                 mode='markers',
                 marker=dict(color=color, symbol=hammer_symbol, size=hammer_size),
                 opacity=hammer_opacity,
@@ -94,7 +64,7 @@ class ConsistencyPlotter:
 
     @staticmethod
     def generate_key_waveform_consistency_plot(
-        data_sources: List[dict], # List of {'name': str, 'record_notes': list, 'replay_notes': list}
+        data_sources: List[dict], # List of {'name': str, 'record': WaveformSelection, 'replay': WaveformSelection}
         key_id: int,
         title_suffix: str = ""
     ) -> go.Figure:
@@ -105,56 +75,57 @@ class ConsistencyPlotter:
             fig = go.Figure()
             fig.update_layout(
                 title=f"Key {key_id} 没有数据",
-                xaxis={"visible": False}, 
+                xaxis={"visible": False},
                 yaxis={"visible": False},
                 annotations=[{"text": "没有数据", "showarrow": False, "font": {"size": 20}}]
             )
             return fig
-            
+
         fig = go.Figure()
-        
+
         # 使用全局统一色盘
         colors = ALGORITHM_COLOR_PALETTE
-        
-        all_notes = []
+
+        all_starts = []
         total_rec_count = 0
         total_rep_count = 0
         record_plotted = False
 
         for idx, source in enumerate(data_sources):
             name = source.get('name', f"Algo {idx+1}")
-            
+
             # 颜色分配策略优化：
             # Record (录制) 使用统一的深灰色，作为基准
             # Replay (回放) 使用 Plotly 默认色盘循环，确保对比度高 (Blue, Orange, Green, Red...)
             record_color = 'rgba(50, 50, 50, 1.0)'
             replay_color = colors[idx % len(colors)]
-            
+
             # Record (只绘制一次)
-            rec_notes = source.get('record_notes', [])
-            if rec_notes and not record_plotted:
+            record = source.get('record')
+            if record is not None and len(record[1]) and not record_plotted:
                 ConsistencyPlotter._add_note_traces(
-                    fig, rec_notes, "Record", record_color, hammer_symbol='circle', hammer_size=8
+                    fig, record, "Record", record_color, hammer_symbol='circle', hammer_size=8
                 )
-                all_notes.extend(rec_notes)
-                total_rec_count += len(rec_notes)
+                all_starts.append(record[0].offset_ms[record[1]])
+                total_rec_count += len(record[1])
                 record_plotted = True
-            
+
             # Replay
-            rep_notes = source.get('replay_notes', [])
-            total_rep_count += len(rep_notes)
-            ConsistencyPlotter._add_note_traces(
-                fig, rep_notes, f"{name} Replay", replay_color, hammer_symbol='star', hammer_size=10, hammer_opacity=0.9
-            )
-            all_notes.extend(rep_notes)
+            replay = source.get('replay')
+            if replay is not None:
+                total_rep_count += len(replay[1])
+                ConsistencyPlotter._add_note_traces(
+                    fig, replay, f"{name} Replay", replay_color, hammer_symbol='star', hammer_size=10, hammer_opacity=0.9
+                )
+                all_starts.append(replay[0].offset_ms[replay[1]])
 
         # 3. 布局与标题
         title = f'Key {key_id} 波形一致性{title_suffix} (Rec: {total_rec_count}, Rep: {total_rep_count})'
 
-        # 范围计算
-        all_starts = sorted([n.offset/10.0 for n in all_notes if hasattr(n, 'offset')])
-        start_ms = all_starts[0] - 50 if all_starts else 0
-        end_ms = all_starts[min(len(all_starts)-1, 15)] + 500 if all_starts else 5000
+        # 范围计算：从最早的音符开始，显示到第16个音符之后
+        starts = np.sort(np.concatenate(all_starts)) if all_starts else np.empty(0)
+        start_ms = float(starts[0]) - 50 if starts.size else 0
+        end_ms = float(starts[min(starts.size - 1, 15)]) + 500 if starts.size else 5000
 
         fig.update_layout(
             title=title,
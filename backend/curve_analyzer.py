@@ -7,9 +7,6 @@
 import traceback
 from typing import List, Tuple, Dict, Any, Optional, Callable
 import numpy as np
-from scipy.interpolate import interp1d
-from scipy.ndimage import gaussian_filter1d
-from dtw import dtw
 from utils.logger import Logger
 
 logger = Logger.get_logger()
@@ -287,6 +284,7 @@ class DTWCurveAligner:
         Returns:
             np.ndarray: 平滑后的曲线值
         """
+        from scipy.ndimage import gaussian_filter1d
         if len(values) < 3 or self.smooth_sigma <= 0:
             return values
         
@@ -322,6 +320,7 @@ class DTWCurveAligner:
                 - dtw_distance: DTW距离
             如果对齐失败则返回None
         """
+        from dtw import dtw
         try:
             # 根据距离度量类型准备数据
             if self.distance_metric == 'gradient':
@@ -549,6 +548,7 @@ class DTWCurveAligner:
         Returns:
             np.ndarray: 插值后的值数组
         """
+        from scipy.interpolate import interp1d
         try:
             # 处理重复时间点：取平均值
             unique_times = []
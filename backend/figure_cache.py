@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+图表缓存
+
+在散点图、报告和瀑布图页面之间切换时，相同条件下的 Plotly 图表会被反复从头生成。
+图表缓存按以下内容组成键：
+- 图表类型与生成参数
+- 激活算法集合（名称、显示名、颜色）及每个算法的数据版本（重新分析/重新匹配后变化）
+- 按键过滤条件
+切换算法、应用按键过滤会得到新的键（切换回原状态时仍可命中）；
+数据版本变化时，引用旧版本的条目永远不会再命中，直接丢弃。
+条目按估算的内存大小计入预算，超出后淘汰最久未使用的图表。
+
+缓存的图表对象由所有调用方共享，调用方不得原地修改。
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+import numpy as np
+
+from utils.constants import FIGURE_CACHE_MB
+from utils.logger import Logger
+
+logger = Logger.get_logger()
+
+# 算法数据版本：(算法名称, 数据版本)
+DatasetVersion = Tuple[str, int]
+
+
+def estimate_figure_bytes(value: Any) -> int:
+    """
+    估算图表（或包含图表的 dict/list）占用的内存字节数
+
+    NumPy 数组按 nbytes，字符串按长度，其余标量按固定开销计算。
+    """
+    if hasattr(value, 'to_plotly_json'):
+        value = value.to_plotly_json()
+    stack = [value]
+    total = 0
+    while stack:
+        item = stack.pop()
+        if isinstance(item, np.ndarray):
+            total += item.nbytes if item.dtype != object else 8 * item.size
+            if item.dtype == object:
+                stack.extend(item.ravel().tolist())
+        elif isinstance(item, dict):
+            total += 64
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple)):
+            total += 8 * len(item) + 56
+            stack.extend(item)
+        elif isinstance(item, (str, bytes)):
+            total += len(item) + 49
+        elif hasattr(item, 'to_plotly_json'):
+            stack.append(item.to_plotly_json())
+        else:
+            total += 24
+    return total
+
+
+class FigureCache:
+    """按内存预算淘汰的图表 LRU 缓存"""
+
+    def __init__(self, max_bytes: int = FIGURE_CACHE_MB * 1024 * 1024):
+        """
+        Args:
+            max_bytes: 缓存的内存预算（字节）
+        """
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, Tuple[Any, int, Tuple[DatasetVersion, ...]]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def total_bytes(self) -> int:
+        return self._bytes
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """查找图表（命中时移到最近使用）"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, figure: Any, versions: Iterable[DatasetVersion] = ()) -> None:
+        """
+        缓存图表
+
+        Args:
+            key: 缓存键
+            figure: 图表对象（或包含图表的 dict/list）
+            versions: 图表所依赖的算法数据版本（版本过期时条目被丢弃）
+        """
+        size = estimate_figure_bytes(figure)
+        if size > self.max_bytes:
+            logger.info(f"🖼️ 图表过大（{size / 1024 / 1024:.1f}MB），不缓存")
+            return
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (figure, size, tuple(versions))
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], Any],
+                      versions: Iterable[DatasetVersion] = ()) -> Any:
+        """查找图表，未命中时调用 factory 生成并缓存（生成结果为 None 时不缓存）"""
+        figure = self.get(key)
+        if figure is not None:
+            return figure
+        figure = factory()
+        if figure is not None:
+            self.put(key, figure, versions)
+        return figure
+
+    def discard_versions(self, stale_versions: Iterable[DatasetVersion]) -> int:
+        """
+        丢弃依赖指定数据版本的全部条目
+
+        Returns:
+            int: 丢弃的条目数
+        """
+        stale = set(stale_versions)
+        if not stale:
+            return 0
+        with self._lock:
+            keys = [key for key, (_, _, versions) in self._entries.items() if stale.intersection(versions)]
+            for key in keys:
+                self._remove(key)
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存统计（条目数、占用内存、命中/未命中次数）"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+图表数据编码
+
+长录音的散点图、时间序列图和瀑布图包含上万个坐标，按 JSON 浮点数列表发送时响应达到数 MB。
+Plotly ≥ 6 会把 trace 中的 NumPy 数值数组序列化为 base64 二进制数组（{"dtype": "f4", "bdata": "..."}），
+浏览器端直接解码为 TypedArray。每个值的编码长度：
+- 整数：Plotly 自动选用能容纳全部值的最小整数类型（i1/u1 每值约1.3个字符）
+- float32：每值约5.3个字符（往返误差不超过 FIGURE_FLOAT32_TOLERANCE 时才降精度）；float64：每值约10.7个字符
+- JSON 列表：短小数（"523456.7,"）和缺失值（"null,"）比二进制更短；完整精度的计算结果
+  （如 "12.299999999999272,"）约19个字符，先按 FIGURE_FLOAT32_TOLERANCE 舍入到显示精度（"12.3,"）
+因此整数直接使用整数数组；一维浮点数（列表或 NumPy 数组）按抽样估算舍入后的 JSON 长度与二进制长度比较，
+选择更短的形式。例如超过约65秒的录音，毫秒时间戳在默认容差下不能降为 float32，float64 每值约10.7个字符，
+而 0.1ms 精度的时间戳写成列表只需约8个字符；调用方可以按显示精度放宽容差（FIGURE_TIME_FLOAT32_TOLERANCE）。
+二维 NumPy 数组（如瀑布图 customdata）始终保留为数组：Plotly 对嵌套列表逐个元素递归校验并深拷贝，
+瀑布图的构建耗时会增加数倍；一维列表的校验开销与节省的传输量相比可以忽略。
+已安装的 Plotly 不支持二进制数组时原样返回，序列化结果与以前一致。
+
+字符串、混合类型（如包含UUID的 customdata）不做编码。
+"""
+
+import json
+from typing import Any
+
+import numpy as np
+import plotly
+
+from utils.constants import FIGURE_FLOAT32_TOLERANCE
+
+# Plotly 6 起支持 base64 二进制数组（typed array spec）
+TYPED_ARRAYS_SUPPORTED = int(plotly.__version__.split('.')[0]) >= 6
+
+# 估算 JSON 列表长度时的抽样数量
+_JSON_SIZE_SAMPLE = 1000
+
+
+def encode_array(values: Any, tolerance: float = FIGURE_FLOAT32_TOLERANCE) -> Any:
+    """
+    将数值序列转换为序列化后最紧凑的形式
+
+    Args:
+        values: 数值列表 / 元组 / NumPy 数组（可包含 NaN，可为二维）
+        tolerance: 降为 float32 的最大允许绝对误差
+
+    Returns:
+        整数 / float32 / float64 数组，或 JSON 更短时按容差舍入后的列表（二维 NumPy 数组除外）；
+        不支持二进制数组、或数据不是数值时原样返回
+    """
+    if not TYPED_ARRAYS_SUPPORTED:
+        return values
+    try:
+        array = np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        return values
+    if not array.size:
+        return array
+
+    if np.isfinite(array).all() and np.array_equal(np.round(array), array) and np.abs(array).max() < 2 ** 31:
+        return array.astype(np.int64)
+
+    encoded = array
+    downcast = array.astype(np.float32)
+    with np.errstate(invalid='ignore'):
+        error = np.abs(downcast.astype(np.float64) - array)
+    # NaN（以及相同的 ±inf）的差为 NaN，不计入误差；超出 float32 范围的值误差为 inf
+    if np.nanmax(error, initial=0.0) <= tolerance:
+        encoded = downcast
+
+    if isinstance(values, np.ndarray) and array.ndim > 1:
+        return encoded
+    rounded = _round_to_tolerance(array, tolerance)
+    binary_chars = encoded.nbytes * 4 / 3
+    if binary_chars < _estimate_json_chars(rounded):
+        return encoded
+    return rounded.tolist()
+
+
+def _round_to_tolerance(array: np.ndarray, tolerance: float) -> np.ndarray:
+    """舍入到舍入误差不超过 tolerance 的最少小数位（0.005 → 两位小数），去掉浮点运算产生的长尾数"""
+    if tolerance <= 0:
+        return array
+    decimals = int(np.ceil(-np.log10(2 * tolerance)))
+    return np.round(array, decimals)
+
+
+def _estimate_json_chars(array: np.ndarray) -> float:
+    """按等间隔抽样估算数组序列化为 JSON 列表的字符数"""
+    flat = array.ravel()
+    sample = flat[::max(1, flat.size // _JSON_SIZE_SAMPLE)]
+    return len(json.dumps(sample.tolist())) * flat.size / sample.size
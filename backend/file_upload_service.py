@@ -11,15 +11,29 @@
 import traceback
 import asyncio
 import base64
+import hashlib
 import time
 import datetime
+from concurrent.futures import ThreadPoolExecutor, Future
 from backend.spmid_loader import SPMIDLoader
-from typing import Tuple, Optional
+from backend.job_scheduler import JobCancelledError
+from backend.memory_manager import ParquetReloadSource
+from backend.analysis_registry import ANALYSIS_CONFIG_UPLOAD, make_analysis_key
+from backend.record_summary import compute_record_summary, save_summary_for_md5
+from database.history_manager import HistorySaveRequest
+from database.history_writer import get_history_writer
+from spmid.spmid_reader import OptimizedSPMidReader
+from typing import Tuple, Optional, List, Callable
 from utils.logger import Logger
 
 
 logger = Logger.get_logger()
 
+# 进程级线程池：
+# - 哈希线程：MD5 与 SPMID 解析并行执行（hashlib 在大数据块上会释放 GIL）
+# 历史记录与摘要由 database.history_writer 的有界后台队列按提交顺序写入
+_hash_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="upload-hash")
+
 
 class FileUploadService:
     """
@@ -52,7 +66,8 @@ class FileUploadService:
         motor_type: str = "D3",
         algorithm_type: str = "PID",
         piano_type: str = "Grand",
-        creation_time: Optional[int] = None
+        creation_time: Optional[int] = None,
+        progress_callback: Optional[Callable[[str, float], None]] = None
     ) -> Tuple[bool, str]:
         """
         将文件添加为算法（统一入口）
@@ -64,6 +79,9 @@ class FileUploadService:
             motor_type: 电机类型
             algorithm_type: 算法类型
             piano_type: 钢琴型号
+            creation_time: 文件最后修改时间（秒或毫秒时间戳）
+            progress_callback: 可选的进度回调 progress_callback(stage, fraction)，
+                由 JobScheduler 注入，同时作为取消检查点
 
         Returns:
             Tuple[bool, str]: (是否成功, 错误信息)
@@ -84,60 +102,39 @@ class FileUploadService:
                 logger.error(error_msg)
                 return False, error_msg
 
-            # 1. 计算文件 MD5
-            import hashlib
-            file_md5 = hashlib.md5(file_content_bytes).hexdigest()
+            # 1. 单次解析：MD5 计算与 SPMID 解析并行进行
+            logger.debug("解析 SPMID 文件（同时计算 MD5）...")
+            if progress_callback:
+                progress_callback('parse', 0.0)
+            perf_parse_start = time.time()
+            md5_future = _hash_executor.submit(self._compute_md5, file_content_bytes)
+            reader = OptimizedSPMidReader(file_content_bytes)
+            file_md5 = md5_future.result()
+            logger.info(f"        ⏱️  [性能] 解析+MD5: {(time.time() - perf_parse_start)*1000:.2f}ms")
             logger.debug(f"[DEBUG] 文件 MD5: {file_md5}")
 
-            # 2. 检查数据库中是否存在 (如果是新上传，我们通常还是重新解析以确保最新，或者从DB读)
-            # 这里我们选择解析 SPMID 获得 OptimizedNote，然后存入数据库
-            
-            # 加载 SPMID 数据
-            logger.debug("解析 SPMID 文件...")
-            
-            # 我们需要获取原始的 OptimizedNote 列表以便存入 Parquet
-            from spmid.spmid_reader import OptimizedSPMidReader
-            reader = OptimizedSPMidReader(file_content_bytes)
             if reader.track_count < 2:
                 return False, f"SPMID 文件音轨不足: {reader.track_count}"
-            
-            # 获取所有音轨 (List[List[OptimizedNote]])
-            all_tracks = [reader.get_track(i) for i in range(reader.track_count)]
-            
-            # 3. 保存到历史记录 (如果不存在)
+
+            # 2. 保存到历史记录（后台线程写入 Parquet，不计入上传延迟）
             if self.history_manager:
-                # 获取文件最后修改时间 (User Request: 仅使用此时间)
-                if creation_time:
-                    try:
-                        ts = creation_time / 1000.0 if creation_time > 2e11 else creation_time
-                        file_date = datetime.datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S")
-                    except Exception as e:
-                        logger.warning(f"解析文件修改时间失败: {e}")
-                        file_date = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                else:
-                    file_date = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                
-                logger.debug(f"💾 使用文件日期: {file_date}")
-                
-                # save_record 会自动处理去重和 Parquet 存储
-                record_id = self.history_manager.save_record(
+                # 浅拷贝音轨列表：后续过滤只生成新列表，不修改 OptimizedNote
+                all_tracks = [list(reader.get_track(i)) for i in range(reader.track_count)]
+                self._submit_history_save(
                     filename=algorithm_name,
                     file_md5=file_md5,
                     motor_type=motor_type,
                     algorithm=algorithm_type,
                     piano_type=piano_type,
-                    file_date=file_date,
+                    file_date=self._resolve_file_date(creation_time),
                     track_data=all_tracks
                 )
-                if record_id:
-                    logger.debug(f"✅ 记录已同步到数据库: ID={record_id}")
-                else:
-                    logger.debug(f"ℹ️ 数据库中已存在相同文件，记录已更新或跳过")
 
-            # 4. 继续原来的内存分析流程 (使用 SPMIDLoader 将 OptimizedNote 转换为 Note)
+            # 3. 复用同一个 Reader 进入分析流程（过滤 + 转换为 Note）
+            if progress_callback:
+                progress_callback('filter', 0.0)
             loader = SPMIDLoader()
-            # 注意：SPMIDLoader.load_spmid_data 内部会重新创建 reader，虽然有点冗余但保证了兼容性逻辑（如过滤）
-            load_success = loader.load_spmid_data(file_content_bytes)
+            load_success = loader.load_from_reader(reader)
 
             if not load_success:
                 error_msg = "SPMID 文件解析失败（加载阶段）"
@@ -156,13 +153,15 @@ class FileUploadService:
 
             logger.info(f"   音符数量: 录制={len(record_data)}, 播放={len(replay_data)}")
 
-            # 添加算法到管理器
+            # 添加算法到管理器（其他会话已分析过同一文件时直接复用分析结果）
             success, result = await self.multi_algorithm_manager.add_algorithm_async(
                 algorithm_name,
                 filename,
                 record_data,   # List[Note]
                 replay_data,   # List[Note]
-                filter_collector  # FilterCollector (包含加载阶段的过滤信息)
+                filter_collector,  # FilterCollector (包含加载阶段的过滤信息)
+                progress_callback=progress_callback,
+                analysis_key=make_analysis_key(file_md5, ANALYSIS_CONFIG_UPLOAD)
             )
 
             if not success:
@@ -177,17 +176,106 @@ class FileUploadService:
             if algorithm:
                 algorithm.is_active = True
                 logger.info(f"算法 '{algorithm_name}' 已自动激活")
+                # 内存回收溢出后，从历史 Parquet 透明重载（与上传相同的过滤流程）
+                if self.history_manager:
+                    algorithm.reload_source = ParquetReloadSource(self.history_manager, file_md5, apply_loader_filters=True)
+                    self._submit_summary_save(file_md5, algorithm.analyzer, algorithm.record_data)
             else:
                 logger.warning(f"算法 '{algorithm_name}' 添加成功，但无法激活")
 
             return True, ""
 
+        except JobCancelledError:
+            raise
         except Exception as e:
             error_msg = f"文件上传处理异常: {str(e)}"
             logger.error(error_msg)
             logger.error(traceback.format_exc())
             return False, error_msg
     
+    @staticmethod
+    def _compute_md5(file_content_bytes: bytes) -> str:
+        """计算文件内容的 MD5"""
+        return hashlib.md5(file_content_bytes).hexdigest()
+
+    @staticmethod
+    def _resolve_file_date(creation_time: Optional[int]) -> str:
+        """
+        解析文件日期（仅使用文件最后修改时间，缺失时使用当前时间）
+
+        Args:
+            creation_time: 文件最后修改时间（秒或毫秒时间戳）
+
+        Returns:
+            str: 格式化日期 "%Y-%m-%d %H:%M:%S"
+        """
+        if creation_time:
+            try:
+                ts = creation_time / 1000.0 if creation_time > 2e11 else creation_time
+                return datetime.datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S")
+            except Exception as e:
+                logger.warning(f"解析文件修改时间失败: {e}")
+        return datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    def _submit_history_save(self, filename: str, file_md5: str, motor_type: str,
+                             algorithm: str, piano_type: str, file_date: str,
+                             track_data: List[list]) -> Future:
+        """
+        提交历史记录保存任务到后台写入队列
+
+        写入队列会合并连续的保存请求并处理去重和 Parquet 存储（队列满时阻塞）；
+        异常只记录日志，不影响分析流程。
+
+        Returns:
+            Future: 保存任务（结果为 record_id）
+        """
+        logger.debug(f"💾 使用文件日期: {file_date}")
+        future = get_history_writer(self.history_manager).submit_save(HistorySaveRequest(
+            filename=filename,
+            file_md5=file_md5,
+            motor_type=motor_type,
+            algorithm=algorithm,
+            piano_type=piano_type,
+            file_date=file_date,
+            track_data=track_data
+        ))
+
+        def _on_done(f: Future) -> None:
+            try:
+                record_id = f.result()
+                if record_id:
+                    logger.debug(f"✅ 记录已同步到数据库: ID={record_id}")
+                else:
+                    logger.debug("ℹ️ 数据库中已存在相同文件，记录已更新或跳过")
+            except Exception as e:
+                logger.error(f"❌ 后台保存历史记录失败 (MD5={file_md5}): {e}")
+
+        future.add_done_callback(_on_done)
+        return future
+
+    def _submit_summary_save(self, file_md5: str, analyzer, record_data: list) -> Optional[Future]:
+        """
+        计算记录摘要指标并提交到历史写入队列保存
+
+        与记录写入使用同一写入队列（按提交顺序执行），保存时记录行已存在；异常只记录日志。
+        """
+        try:
+            summary = compute_record_summary(analyzer, record_data)
+        except Exception as e:
+            logger.warning(f"⚠️ 计算记录摘要失败 (MD5={file_md5}): {e}")
+            return None
+
+        future = get_history_writer(self.history_manager).submit(save_summary_for_md5, self.history_manager, file_md5, summary)
+
+        def _on_done(f: Future) -> None:
+            try:
+                f.result()
+            except Exception as e:
+                logger.error(f"❌ 后台保存记录摘要失败 (MD5={file_md5}): {e}")
+
+        future.add_done_callback(_on_done)
+        return future
+
     def _validate_algorithm_name(self, algorithm_name: str) -> Tuple[bool, str]:
         """
         验证算法名称
@@ -8,9 +8,6 @@ import traceback
 import plotly.graph_objects as go
 from typing import List, Tuple, Dict, Any, Optional, Union
 import numpy as np
-from dtw import dtw
-from scipy.ndimage import gaussian_filter1d
-from scipy.signal import find_peaks
 from utils.logger import Logger
 
 logger = Logger.get_logger()
@@ -85,6 +82,7 @@ class ForceCurveAnalyzer:
 
     def compare_curves(self, note1, note2, record_note=None, replay_note=None, mean_delay: float = 0.0) -> Optional[Dict[str, Any]]:
         """对比两条力度曲线"""
+        from dtw import dtw
         try:
             if record_note is None: record_note = note1
             if replay_note is None: replay_note = note2
@@ -224,6 +222,8 @@ class ForceCurveAnalyzer:
         """
         分析单条曲线的物理特征 (增强版：支持多段分解)
         """
+        from scipy.ndimage import gaussian_filter1d
+        from scipy.signal import find_peaks
         try:
             if len(values) == 0:
                 return {}
@@ -284,6 +284,7 @@ class ForceCurveAnalyzer:
         """
         利用导数将曲线分解为上升段和下降段
         """
+        from scipy.ndimage import gaussian_filter1d
         try:
             if len(values) < 3: return []
             
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+后台任务调度器
+
+负责在有限大小的线程池中执行耗时的分析任务（文件上传解析、历史记录加载），
+让 Dash 回调立即返回，由前端通过 dcc.Interval 轮询任务进度。
+
+支持：
+- 任务状态管理（排队 / 运行 / 成功 / 失败 / 已取消）
+- 分阶段进度（解析 / 过滤 / 匹配 / 统计）
+- 协作式取消（在阶段边界检查取消标记）
+- 有界工作线程池，多个上传可同时排队
+"""
+
+import asyncio
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Callable, Dict, List, Optional
+
+from utils.logger import Logger
+
+logger = Logger.get_logger()
+
+
+# 分析流程的阶段（顺序即执行顺序）
+JOB_STAGES: List[str] = ['parse', 'filter', 'match', 'stats']
+
+# 阶段显示名称
+JOB_STAGE_NAMES: Dict[str, str] = {
+    'parse': '解析',
+    'filter': '过滤',
+    'match': '匹配',
+    'stats': '统计',
+}
+
+# 进度回调类型：progress_callback(stage, fraction)，fraction 取值 0.0 ~ 1.0
+ProgressCallback = Callable[[str, float], None]
+
+
+class JobStatus(Enum):
+    """任务状态枚举"""
+    PENDING = "pending"      # 排队中
+    RUNNING = "running"      # 执行中
+    SUCCEEDED = "succeeded"  # 已完成
+    FAILED = "failed"        # 失败
+    CANCELLED = "cancelled"  # 已取消
+
+
+class JobCancelledError(Exception):
+    """任务被取消时在阶段边界抛出"""
+    pass
+
+
+@dataclass
+class Job:
+    """后台任务"""
+    job_id: str
+    session_id: Optional[str]
+    description: str
+    status: JobStatus = JobStatus.PENDING
+    current_stage: Optional[str] = None
+    stage_progress: Dict[str, float] = field(default_factory=lambda: {stage: 0.0 for stage in JOB_STAGES})
+    result: Any = None
+    error_message: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    _cancel_event: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    @property
+    def is_finished(self) -> bool:
+        """任务是否已结束（成功、失败或取消）"""
+        return self.status in (JobStatus.SUCCEEDED, JobStatus.FAILED, JobStatus.CANCELLED)
+
+    @property
+    def cancel_requested(self) -> bool:
+        """是否已请求取消"""
+        return self._cancel_event.is_set()
+
+    @property
+    def progress(self) -> float:
+        """总体进度（0.0 ~ 1.0，各阶段等权）"""
+        if self.status == JobStatus.SUCCEEDED:
+            return 1.0
+        return sum(self.stage_progress.values()) / len(JOB_STAGES)
+
+    def report_progress(self, stage: str, fraction: float) -> None:
+        """
+        报告阶段进度（同时作为取消检查点）
+
+        进入某阶段时，之前的阶段视为已完成。
+
+        Args:
+            stage: 阶段名称（见 JOB_STAGES）
+            fraction: 阶段内进度 0.0 ~ 1.0
+
+        Raises:
+            JobCancelledError: 任务已被请求取消
+        """
+        self.check_cancelled()
+        if stage not in self.stage_progress:
+            return
+        stage_index = JOB_STAGES.index(stage)
+        for previous in JOB_STAGES[:stage_index]:
+            self.stage_progress[previous] = 1.0
+        self.stage_progress[stage] = max(0.0, min(1.0, float(fraction)))
+        self.current_stage = stage
+
+    def check_cancelled(self) -> None:
+        """检查取消标记，已取消则抛出 JobCancelledError"""
+        if self._cancel_event.is_set():
+            raise JobCancelledError(f"任务 {self.job_id} 已取消")
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可 JSON 序列化的字典（供 UI 层使用）"""
+        return {
+            'job_id': self.job_id,
+            'description': self.description,
+            'status': self.status.value,
+            'current_stage': self.current_stage,
+            'stage_name': JOB_STAGE_NAMES.get(self.current_stage, ''),
+            'stage_progress': dict(self.stage_progress),
+            'progress': self.progress,
+            'error_message': self.error_message,
+            'is_finished': self.is_finished,
+            'cancel_requested': self.cancel_requested,
+        }
+
+
+class JobScheduler:
+    """
+    后台任务调度器类
+
+    任务函数约定：
+    - 接收关键字参数 progress_callback（ProgressCallback）
+    - 返回 Tuple[bool, Any]：(是否成功, 结果或错误信息)，与项目中其他服务接口一致
+    - 可以是普通函数，也可以是 async 函数（在工作线程中通过 asyncio.run 执行）
+    """
+
+    def __init__(self, max_workers: int = 2, max_finished_jobs: int = 200):
+        """
+        初始化任务调度器
+
+        Args:
+            max_workers: 最大并发工作线程数
+            max_finished_jobs: 保留的已结束任务数量上限（超出后丢弃最早的）
+        """
+        self.max_workers = max_workers
+        self.max_finished_jobs = max_finished_jobs
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="analysis-job")
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()  # job_id -> Job
+        self._futures: Dict[str, Any] = {}  # job_id -> Future
+        self.lock = threading.Lock()
+        logger.info(f"JobScheduler初始化完成 (工作线程: {max_workers})")
+
+    def submit(self, session_id: Optional[str], description: str,
+               func: Callable[..., Any], *args, **kwargs) -> Job:
+        """
+        提交任务
+
+        Args:
+            session_id: 所属会话ID
+            description: 任务描述（用于UI显示）
+            func: 任务函数
+            *args, **kwargs: 传给任务函数的参数
+
+        Returns:
+            Job: 新建的任务对象
+        """
+        job = Job(job_id=str(uuid.uuid4()), session_id=session_id, description=description)
+        with self.lock:
+            self.jobs[job.job_id] = job
+            self._prune_finished_jobs()
+            self._futures[job.job_id] = self.executor.submit(self._run, job, func, args, kwargs)
+        logger.info(f"📥 任务已排队: {description} (ID: {job.job_id})")
+        return job
+
+    def get_job(self, job_id: str) -> Optional[Job]:
+        """获取任务"""
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def get_jobs(self, session_id: Optional[str] = None) -> List[Job]:
+        """获取任务列表（可按会话筛选）"""
+        with self.lock:
+            return [job for job in self.jobs.values() if session_id is None or job.session_id == session_id]
+
+    def has_unfinished_jobs(self) -> bool:
+        """是否有排队中或运行中的任务（低优先级的后台工作据此让出资源）"""
+        with self.lock:
+            return any(not job.is_finished for job in self.jobs.values())
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        取消任务
+
+        排队中的任务直接取消；运行中的任务在下一个阶段边界停止。
+
+        Returns:
+            bool: 是否成功发出取消请求
+        """
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if not job or job.is_finished:
+                return False
+            job._cancel_event.set()
+            future = self._futures.get(job_id)
+            if future is not None and future.cancel():
+                self._finish(job, JobStatus.CANCELLED, error_message="任务已取消")
+        logger.info(f"🛑 已请求取消任务: {job.description} (ID: {job_id})")
+        return True
+
+    def cancel_session_jobs(self, session_id: str) -> int:
+        """取消指定会话的所有未结束任务，返回取消数量"""
+        pending = [job.job_id for job in self.get_jobs(session_id) if not job.is_finished]
+        return sum(1 for job_id in pending if self.cancel(job_id))
+
+    def shutdown(self, wait: bool = False) -> None:
+        """关闭调度器"""
+        self.executor.shutdown(wait=wait, cancel_futures=True)
+
+    # ==================== 私有方法 ====================
+
+    def _run(self, job: Job, func: Callable[..., Any], args: tuple, kwargs: dict) -> None:
+        """在工作线程中执行任务"""
+        if job.cancel_requested:
+            self._finish(job, JobStatus.CANCELLED, error_message="任务已取消")
+            return
+
+        job.status = JobStatus.RUNNING
+        job.started_at = time.time()
+        kwargs = dict(kwargs, progress_callback=job.report_progress)
+
+        try:
+            if asyncio.iscoroutinefunction(func):
+                outcome = asyncio.run(func(*args, **kwargs))
+            else:
+                outcome = func(*args, **kwargs)
+        except JobCancelledError:
+            self._finish(job, JobStatus.CANCELLED, error_message="任务已取消")
+            return
+        except Exception as e:
+            logger.error(f"❌ 任务执行异常: {job.description}: {e}")
+            logger.error(traceback.format_exc())
+            status = JobStatus.CANCELLED if job.cancel_requested else JobStatus.FAILED
+            self._finish(job, status, error_message=str(e))
+            return
+
+        success, result = outcome if isinstance(outcome, tuple) else (bool(outcome), outcome)
+        if success:
+            self._finish(job, JobStatus.SUCCEEDED, result=result)
+        elif job.cancel_requested:
+            # 服务层会捕获 JobCancelledError 并以失败返回
+            self._finish(job, JobStatus.CANCELLED, error_message="任务已取消")
+        else:
+            self._finish(job, JobStatus.FAILED, error_message=str(result))
+
+    def _finish(self, job: Job, status: JobStatus, result: Any = None,
+                error_message: Optional[str] = None) -> None:
+        """标记任务结束"""
+        job.status = status
+        job.result = result
+        job.error_message = error_message
+        job.finished_at = time.time()
+        if status == JobStatus.SUCCEEDED:
+            job.stage_progress = {stage: 1.0 for stage in JOB_STAGES}
+        elapsed = (job.finished_at - (job.started_at or job.created_at)) * 1000
+        logger.info(f"🏁 任务结束: {job.description} -> {status.value} ({elapsed:.0f}ms)")
+
+    def _prune_finished_jobs(self) -> None:
+        """丢弃超出上限的最早已结束任务（调用方持有锁）"""
+        finished = [job_id for job_id, job in self.jobs.items() if job.is_finished]
+        for job_id in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+            self.jobs.pop(job_id, None)
+            self._futures.pop(job_id, None)
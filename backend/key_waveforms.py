@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+按键波形数据（波形一致性分析）
+
+一致性视图在拖动滑块、切换按键时反复绘制同一按键的几十到几百条触后曲线。以前每次绘制都逐个音符
+排序 Series、用 Python 列表拼接坐标并生成逐点悬停文本；现在每个算法的每个 (音轨, 按键) 只构建一次：
+- 音符按 offset 排序（行号即该按键的第几次按键）
+- 所有触后曲线拼接为一个 float 数组，每条曲线后跟一个 NaN 分隔点，按行记录边界
+- 锤击点同样拼接（不需要分隔点），悬停文本预先生成
+滑块和按键变化时只按行号切片数组。由 AlgorithmDataset.get_key_waveforms 缓存。
+"""
+
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+
+from utils.logger import Logger
+
+logger = Logger.get_logger()
+
+
+class KeyWaveforms:
+    """
+    单个算法单条音轨上一个按键的全部触后曲线与锤击点
+
+    时间单位均为 ms（offset 与采样时间戳为 0.1ms）。构建后只读。
+    """
+
+    def __init__(self, notes: List[Any]):
+        """
+        Args:
+            notes: 该按键的音符列表（任意顺序）
+        """
+        self.notes = sorted(notes, key=lambda n: n.offset)
+        size = len(self.notes)
+        self.offset_ms = np.fromiter((n.offset / 10.0 for n in self.notes), dtype=np.float64, count=size)
+        self.key_on_ms = np.fromiter(
+            (n.key_on_ms if n.key_on_ms is not None else np.nan for n in self.notes), dtype=np.float64, count=size
+        )
+
+        wave_x, wave_y = [], []
+        ham_x, ham_y = [], []
+        self.hammer_text: List[str] = []
+        wave_lengths = np.zeros(size, dtype=np.int64)
+        hammer_lengths = np.zeros(size, dtype=np.int64)
+        separator = np.array([np.nan])
+
+        for row, note in enumerate(self.notes):
+            after_touch = self._sorted_series(note, 'after_touch')
+            if after_touch is not None:
+                times, values = after_touch
+                wave_x.extend(((times + note.offset) / 10.0, separator))
+                wave_y.extend((values, separator))
+                wave_lengths[row] = len(times) + 1
+
+            hammers = self._sorted_series(note, 'hammers')
+            if hammers is not None:
+                times, values = hammers
+                ham_x.append((times + note.offset) / 10.0)
+                ham_y.append(values)
+                hammer_lengths[row] = len(times)
+                uuid_str = getattr(note, 'uuid', 'N/A')
+                self.hammer_text.extend(f"序号: {row + 1}<br>UUID: {uuid_str}<br>Vel: {v:g}" for v in values)
+
+        self.wave_x = np.concatenate(wave_x) if wave_x else np.empty(0)
+        self.wave_y = np.concatenate(wave_y) if wave_y else np.empty(0)
+        # 每个触后点所属按键的序号（悬停显示），分隔点为 NaN
+        self.wave_sequence = np.repeat(np.arange(1, size + 1, dtype=np.float64), wave_lengths)
+        self.wave_sequence[np.isnan(self.wave_x)] = np.nan
+        self.ham_x = np.concatenate(ham_x) if ham_x else np.empty(0)
+        self.ham_y = np.concatenate(ham_y) if ham_y else np.empty(0)
+        # 第 i 行的数据位于 [bounds[i], bounds[i + 1])
+        self.wave_bounds = np.concatenate(([0], np.cumsum(wave_lengths)))
+        self.hammer_bounds = np.concatenate(([0], np.cumsum(hammer_lengths)))
+
+    def __len__(self) -> int:
+        return len(self.notes)
+
+    @staticmethod
+    def _sorted_series(note, attr: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """按时间戳排序的 (时间戳, 数值) float 数组；没有数据时为 None"""
+        series = getattr(note, attr, None)
+        if series is None or series.empty:
+            return None
+        times = series.index.to_numpy(dtype=np.float64)
+        values = series.to_numpy(dtype=np.float64)
+        if not series.index.is_monotonic_increasing:
+            order = np.argsort(times, kind='stable')
+            times, values = times[order], values[order]
+        return times, values
+
+    # ==================== 切片 ====================
+
+    def rows_in_key_on_range(self, start_ms: float, end_ms: float) -> np.ndarray:
+        """按下时间在 [start_ms, end_ms] 内的行号（按 offset 顺序）"""
+        with np.errstate(invalid='ignore'):
+            return np.flatnonzero((self.key_on_ms >= start_ms) & (self.key_on_ms <= end_ms))
+
+    def waveform(self, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        指定行的触后曲线
+
+        Returns:
+            Tuple: (时间ms, 触后值, 按键序号)，曲线之间以 NaN 分隔
+        """
+        index = self._gather(self.wave_bounds, rows)
+        return self.wave_x[index], self.wave_y[index], self.wave_sequence[index]
+
+    def hammers(self, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+        """
+        指定行的锤击点
+
+        Returns:
+            Tuple: (时间ms, 锤速, 悬停文本)
+        """
+        index = self._gather(self.hammer_bounds, rows)
+        if isinstance(index, slice):
+            return self.ham_x[index], self.ham_y[index], self.hammer_text[index]
+        return self.ham_x[index], self.ham_y[index], [self.hammer_text[i] for i in index.tolist()]
+
+    @staticmethod
+    def _gather(bounds: np.ndarray, rows: np.ndarray):
+        """多行数据在拼接数组中的位置：连续行返回切片（不复制），否则返回下标数组"""
+        rows = np.asarray(rows, dtype=np.int64)
+        if not rows.size:
+            return slice(0, 0)
+        if rows[-1] - rows[0] + 1 == rows.size and (np.diff(rows) == 1).all():
+            return slice(int(bounds[rows[0]]), int(bounds[rows[-1] + 1]))
+        starts = bounds[rows]
+        lengths = bounds[rows + 1] - starts
+        ends = np.cumsum(lengths)
+        return np.repeat(starts - (ends - lengths), lengths) + np.arange(ends[-1] if ends.size else 0)
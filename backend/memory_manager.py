@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+内存管理模块
+
+负责会话与算法数据集的内存估算和按预算回收：
+- 内存估算：按会话、按 AlgorithmDataset 估算占用字节数
+- 磁盘数据源：基于历史 Parquet 的透明重载（ParquetReloadSource）
+- 后台回收线程：定期清理长时间未活动的会话，并在超出全局内存预算时
+  按最近最少使用（LRU）顺序将数据集溢出到磁盘
+"""
+
+import os
+import threading
+import time
+from typing import Any, Iterable, List, Optional, Tuple
+
+from utils.logger import Logger
+
+logger = Logger.get_logger()
+
+
+# ==================== 内存估算 ====================
+
+# Python 对象固定开销的经验估算值（字节）
+_NOTE_OVERHEAD_BYTES = 600          # Note dataclass 及其属性
+_SERIES_OVERHEAD_BYTES = 900        # 单个 pandas Series（含 Index 对象）
+_MATCHED_PAIR_OVERHEAD_BYTES = 200  # 匹配对元组及其在匹配器中的索引结构
+_ERROR_NOTE_OVERHEAD_BYTES = 150    # ErrorNote 包装对象
+
+
+def _series_bytes(series: Any) -> int:
+    """估算单个 pandas Series 的字节数（数据 + 索引 + 固定开销）"""
+    if series is None:
+        return 0
+    try:
+        return int(series.values.nbytes + series.index.nbytes) + _SERIES_OVERHEAD_BYTES
+    except AttributeError:
+        return _SERIES_OVERHEAD_BYTES
+
+
+def estimate_notes_bytes(notes: Iterable[Any], seen: Optional[set] = None) -> int:
+    """
+    估算 Note 列表占用的字节数
+
+    Args:
+        notes: Note 列表
+        seen: 已统计过的对象 id 集合（同一 Note 被多个列表引用时只统计一次）
+
+    Returns:
+        int: 估算字节数
+    """
+    if seen is None:
+        seen = set()
+    total = 0
+    for note in notes or []:
+        note_key = id(note)
+        if note_key in seen:
+            continue
+        seen.add(note_key)
+        total += _NOTE_OVERHEAD_BYTES
+        total += _series_bytes(getattr(note, 'hammers', None))
+        total += _series_bytes(getattr(note, 'after_touch', None))
+    return total
+
+
+def estimate_dataset_bytes(record_data: List[Any], replay_data: List[Any], analyzer: Any = None) -> int:
+    """
+    估算单个算法数据集的字节数
+
+    分析器中的有效数据列表与原始数据共享 Note 对象，只额外统计匹配对与错误记录的结构开销。
+    """
+    seen: set = set()
+    total = estimate_notes_bytes(record_data, seen) + estimate_notes_bytes(replay_data, seen)
+    if analyzer is not None:
+        matched_pairs = getattr(analyzer, 'matched_pairs', None) or []
+        total += len(matched_pairs) * _MATCHED_PAIR_OVERHEAD_BYTES
+        for attr in ('drop_hammers', 'multi_hammers', 'abnormal_matches'):
+            errors = getattr(analyzer, attr, None) or []
+            total += len(errors) * _ERROR_NOTE_OVERHEAD_BYTES
+            total += estimate_notes_bytes((e.note for e in errors if hasattr(e, 'note')), seen)
+    return total
+
+
+def estimate_backend_bytes(backend: Any) -> int:
+    """估算单个会话（PianoAnalysisBackend）的字节数：所有数据集 + 临时上传缓存"""
+    total = 0
+    manager = getattr(backend, 'multi_algorithm_manager', None)
+    if manager is not None:
+        for dataset in list(manager.algorithms.values()):
+            total += dataset.estimate_memory_bytes()
+    temp_cache = getattr(backend, 'temp_file_cache', None)
+    if temp_cache is not None:
+        # 只统计内存中的部分，溢出到磁盘的文件不占用内存
+        total += temp_cache.memory_bytes(getattr(backend, 'session_id', None))
+    return total
+
+
+# ==================== 磁盘数据源 ====================
+
+class ParquetReloadSource:
+    """
+    基于历史记录 Parquet 的数据集重载源
+
+    数据集溢出后，通过文件 MD5 找到历史 Parquet，重新执行与首次加载相同的过滤流程。
+    """
+
+    def __init__(self, history_manager, file_md5: str, apply_loader_filters: bool = True):
+        """
+        Args:
+            history_manager: 历史记录管理器
+            file_md5: 文件 MD5
+            apply_loader_filters: True 使用上传流程的 SPMIDLoader 过滤（保留过滤信息），
+                                  False 使用历史加载流程的 DataFilter 过滤
+        """
+        self.history_manager = history_manager
+        self.file_md5 = file_md5
+        self.apply_loader_filters = apply_loader_filters
+
+    def _get_record(self) -> Optional[dict]:
+        return self.history_manager.get_record_by_md5(self.file_md5)
+
+    def is_available(self) -> bool:
+        """磁盘数据是否可用（后台写入尚未完成时不可用）"""
+        try:
+            record = self._get_record()
+        except Exception:
+            return False
+        path = record.get('track_data_path') if record else None
+        return bool(path) and os.path.exists(path)
+
+    def load(self, progress_callback=None) -> Tuple[List[Any], List[Any], Any]:
+        """
+        重新加载数据
+
+        Args:
+            progress_callback: 可选的进度回调 progress_callback(stage, fraction)
+
+        Returns:
+            Tuple[List[Note], List[Note], Optional[FilterCollector]]: (录制数据, 播放数据, 过滤信息)
+        """
+        from database.history_manager import ParquetDataLoader
+
+        record = self._get_record()
+        if not record:
+            raise FileNotFoundError(f"历史记录不存在: MD5={self.file_md5}")
+        if progress_callback:
+            progress_callback('parse', 0.0)
+        tracks = ParquetDataLoader.load_from_record(record)
+        if len(tracks) < 2:
+            raise ValueError("历史数据音轨不足")
+
+        if progress_callback:
+            progress_callback('filter', 0.0)
+
+        if self.apply_loader_filters:
+            from backend.spmid_loader import SPMIDLoader
+            loader = SPMIDLoader()
+            if not loader.load_from_tracks(tracks):
+                raise ValueError(f"历史数据重新加载失败: MD5={self.file_md5}")
+            return loader.get_record_data(), loader.get_replay_data(), loader.get_filter_collector()
+
+        from spmid.data_filter import DataFilter
+        raw_record_notes = [note.to_standard_note() for note in tracks[0]]
+        raw_replay_notes = [note.to_standard_note() for note in tracks[1]]
+        record_notes, replay_notes, _ = DataFilter().filter_notes(raw_record_notes, raw_replay_notes)
+        logger.debug(f"[DEBUG] 从历史加载并重新过滤: 录制({len(raw_record_notes)}->{len(record_notes)}), 播放({len(raw_replay_notes)}->{len(replay_notes)})")
+        return record_notes, replay_notes, None
+
+    def load_track_notes(self, track_index: int, key_ids: Optional[Iterable[int]] = None,
+                         time_range: Optional[Tuple[float, float]] = None) -> List[Any]:
+        """
+        只加载单个音轨中指定按键 / 时间窗口的音符（谓词下推部分加载），不做匹配分析
+
+        过滤与 load() 相同且按单个音符判断，结果与完整加载后再筛选一致。
+        用于数据集已溢出时的按键级视图，避免为单个按键触发完整重载与重新分析。
+
+        Args:
+            track_index: 音轨索引（0 录制，1 播放）
+            key_ids: 只加载指定按键
+            time_range: 只加载与 (start_ms, end_ms) 重叠的音符
+
+        Returns:
+            List[Note]: 过滤后的音符（音轨内原始顺序）
+        """
+        from database.history_manager import ParquetDataLoader
+
+        record = self._get_record()
+        if not record:
+            raise FileNotFoundError(f"历史记录不存在: MD5={self.file_md5}")
+        tracks = ParquetDataLoader.load(record, tracks=[track_index], key_ids=key_ids, time_range=time_range)
+        notes = tracks[track_index] if track_index < len(tracks) else []
+
+        if self.apply_loader_filters:
+            from backend.spmid_loader import SPMIDLoader
+            return SPMIDLoader().load_single_track(notes, 'record' if track_index == 0 else 'replay')
+
+        from spmid.data_filter import DataFilter
+        raw_notes = [note.to_standard_note() for note in notes]
+        if track_index == 0:
+            return DataFilter().filter_notes(raw_notes, [])[0]
+        return DataFilter().filter_notes([], raw_notes)[1]
+
+
+# ==================== 后台回收 ====================
+
+class MemoryReaper:
+    """
+    内存回收线程
+
+    每个周期：
+    1. 移除超过未活动阈值的会话
+    2. 若全局估算内存超过预算，按（会话最近活动时间, 数据集最近访问时间）升序溢出数据集，
+       直到回到预算以内。最近 min_idle_seconds 内访问过的数据集不会被溢出，避免抖动。
+    """
+
+    def __init__(self, session_manager, budget_bytes: int, interval_seconds: float = 60.0,
+                 inactive_threshold_seconds: int = 30 * 60, min_idle_seconds: float = 60.0):
+        """
+        Args:
+            session_manager: SessionManager 实例
+            budget_bytes: 全局内存预算（字节）
+            interval_seconds: 回收周期（秒）
+            inactive_threshold_seconds: 会话未活动阈值（秒）
+            min_idle_seconds: 数据集最短空闲时间（秒）
+        """
+        self.session_manager = session_manager
+        self.budget_bytes = budget_bytes
+        self.interval_seconds = interval_seconds
+        self.inactive_threshold_seconds = inactive_threshold_seconds
+        self.min_idle_seconds = min_idle_seconds
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """启动后台回收线程"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="memory-reaper", daemon=True)
+        self._thread.start()
+        logger.info(f"MemoryReaper已启动 (预算: {self.budget_bytes / 1024 / 1024:.0f}MB, 周期: {self.interval_seconds:.0f}s)")
+
+    def stop(self) -> None:
+        """停止后台回收线程"""
+        self._stop_event.set()
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.interval_seconds):
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"内存回收周期执行失败: {e}")
+
+    def run_once(self) -> int:
+        """
+        执行一次回收
+
+        Returns:
+            int: 本次通过溢出释放的估算字节数
+        """
+        self.session_manager.cleanup_inactive_sessions(self.inactive_threshold_seconds)
+        return self.enforce_budget()
+
+    def enforce_budget(self) -> int:
+        """按 LRU 顺序溢出数据集直到全局内存回到预算以内，返回释放的估算字节数"""
+        sessions = self.session_manager.get_sessions_snapshot()
+        total_bytes = sum(estimate_backend_bytes(backend) for _, _, backend in sessions)
+        if total_bytes <= self.budget_bytes:
+            return 0
+
+        now = time.time()
+        candidates = []
+        for session_id, last_activity, backend in sessions:
+            for dataset in list(backend.multi_algorithm_manager.algorithms.values()):
+                if now - dataset.last_access < self.min_idle_seconds:
+                    continue
+                if dataset.can_spill():
+                    candidates.append((last_activity, dataset.last_access, session_id, dataset))
+        candidates.sort(key=lambda item: (item[0], item[1]))
+
+        freed_total = 0
+        for _, _, session_id, dataset in candidates:
+            if total_bytes - freed_total <= self.budget_bytes:
+                break
+            freed_total += dataset.spill()
+
+        logger.info(
+            f"🧹 内存预算回收: 估算 {total_bytes / 1024 / 1024:.1f}MB, "
+            f"释放 {freed_total / 1024 / 1024:.1f}MB, 预算 {self.budget_bytes / 1024 / 1024:.0f}MB"
+        )
+        return freed_total
@@ -16,11 +16,15 @@ from concurrent.futures import ThreadPoolExecutor
 import hashlib
 import os
 import json
+import threading
 import time
 from utils.logger import Logger
 from utils.colors import ALGORITHM_COLOR_PALETTE
 from spmid.spmid_analyzer import SPMIDAnalyzer
 from spmid.spmid_reader import Note
+from backend.analysis_registry import AnalysisKey, SharedAnalysis, get_analysis_registry
+from backend.plot_frame import AlgorithmPlotFrame
+from backend.key_waveforms import KeyWaveforms
 
 logger = Logger.get_logger()
 
@@ -49,7 +53,8 @@ class AlgorithmDataset:
     单个算法的数据集类
     
     封装单个算法的所有数据、分析结果和统计信息。
-    每个算法实例独立管理自己的分析器。
+    指定 analysis_key 时，分析结果来自进程级共享注册表（多个会话共用同一份只读结果），
+    数据集本身只保存会话级的显示状态。
     """
     
     def __init__(self, algorithm_name: str, display_name: str, filename: str, color_index: int = 0):
@@ -70,19 +75,214 @@ class AlgorithmDataset:
         )
         
         # 分析器实例
-        self.analyzer: SPMIDAnalyzer()
+        self._analyzer: Optional[SPMIDAnalyzer] = None
         
         # 显示控制
         self.color = ALGORITHM_COLOR_PALETTE[color_index % len(ALGORITHM_COLOR_PALETTE)]
         self.is_active: bool = True  # 是否在对比中显示
         
         # 原始数据（用于重新分析）
-        self.record_data: List[Note] = []
-        self.replay_data: List[Note] = []
+        self._record_data: List[Note] = []
+        self._replay_data: List[Note] = []
+
+        # 内存管理：溢出到磁盘后，访问数据时从 reload_source 透明重新加载
+        self.reload_source = None  # 具有 is_available() / load() 的数据源（见 backend.memory_manager）
+        self.last_access: float = time.time()
+        self._is_spilled: bool = False
+        self._memory_bytes: Optional[int] = None  # 内存估算缓存
+        self._spill_lock = threading.RLock()
+
+        # 共享分析结果句柄（见 backend.analysis_registry）
+        self.analysis_key: Optional[AnalysisKey] = None
+        self._shared: Optional[SharedAnalysis] = None
+
+        # 列式绘图数据缓存（见 plot_frame 属性）
+        self._plot_frame: Optional[AlgorithmPlotFrame] = None
+        # 按键波形缓存（见 get_key_waveforms）：(音轨, 按键ID) -> KeyWaveforms，属于 _key_waveforms_version 版本
+        self._key_waveforms: Dict[Tuple[str, int], KeyWaveforms] = {}
+        self._key_waveforms_version: int = 0
+        # 有效音符的按键ID（溢出后保留，一致性视图的按键列表无需重载数据）
+        self._valid_key_ids: Optional[List[int]] = None
         
         logger.debug(f"✅[DEBUG] AlgorithmDataset初始化: {algorithm_name} (文件: {filename})")
+
+    # ==================== 数据访问（支持溢出后透明重载） ====================
+
+    @property
+    def analyzer(self) -> Optional[SPMIDAnalyzer]:
+        """分析器实例（已溢出时自动重新加载）"""
+        self.last_access = time.time()
+        if self._is_spilled:
+            self._reload()
+        return self._analyzer
+
+    @analyzer.setter
+    def analyzer(self, value: Optional[SPMIDAnalyzer]) -> None:
+        self._analyzer = value
+        self._memory_bytes = None
+
+    @property
+    def record_data(self) -> List[Note]:
+        """录制数据（已溢出时自动重新加载）"""
+        self.last_access = time.time()
+        if self._is_spilled:
+            self._reload()
+        return self._record_data
+
+    @record_data.setter
+    def record_data(self, value: List[Note]) -> None:
+        self._record_data = value
+        self._memory_bytes = None
+
+    @property
+    def replay_data(self) -> List[Note]:
+        """播放数据（已溢出时自动重新加载）"""
+        self.last_access = time.time()
+        if self._is_spilled:
+            self._reload()
+        return self._replay_data
+
+    @replay_data.setter
+    def replay_data(self, value: List[Note]) -> None:
+        self._replay_data = value
+        self._memory_bytes = None
+
+    @property
+    def data_version(self) -> int:
+        """分析结果版本（重新分析后变化；已溢出时为0，不触发重载）"""
+        analyzer = self._analyzer
+        return analyzer.data_version if analyzer is not None else 0
+
+    @property
+    def plot_frame(self) -> Optional[AlgorithmPlotFrame]:
+        """列式绘图数据（首次访问时构建，分析结果版本变化后重建；没有分析器时为None）"""
+        analyzer = self.analyzer
+        if analyzer is None:
+            return None
+        frame = self._plot_frame
+        if frame is None or frame.data_version != analyzer.data_version:
+            perf_start = time.time()
+            frame = AlgorithmPlotFrame(analyzer)
+            self._plot_frame = frame
+            logger.debug(f"[DEBUG] 算法 '{self.metadata.algorithm_name}' 绘图数据已构建: "
+                         f"{len(frame)} 行, 耗时 {(time.time() - perf_start) * 1000:.1f}ms")
+        return frame
+
+    def get_key_waveforms(self, track: str, key_id: int) -> Optional[KeyWaveforms]:
+        """
+        按键的触后曲线与锤击点数组（首次访问时构建，分析结果版本变化后重建）
+
+        Args:
+            track: 'record' 或 'replay'（初始有效音符）
+            key_id: 按键ID
+
+        Returns:
+            Optional[KeyWaveforms]: 没有分析器时为None
+        """
+        cache_key = (track, int(key_id))
+        with self._spill_lock:
+            if self._is_spilled and hasattr(self.reload_source, 'load_track_notes'):
+                # 已溢出：只从磁盘部分加载该按键的音符，不触发完整重载与重新分析
+                self.last_access = time.time()
+                waveforms = self._key_waveforms.get(cache_key)
+                if waveforms is None:
+                    perf_start = time.time()
+                    track_index = 0 if track == 'record' else 1
+                    waveforms = KeyWaveforms(self.reload_source.load_track_notes(track_index, key_ids=[int(key_id)]))
+                    self._key_waveforms[cache_key] = waveforms
+                    logger.debug(f"[DEBUG] 算法 '{self.metadata.algorithm_name}' 按键 {key_id} ({track}) 波形已从磁盘部分加载: "
+                                 f"{len(waveforms)} 条, 耗时 {(time.time() - perf_start) * 1000:.1f}ms")
+                return waveforms
+
+        analyzer = self.analyzer
+        if analyzer is None:
+            return None
+        if self._key_waveforms_version != analyzer.data_version:
+            self._key_waveforms = {}
+            self._key_waveforms_version = analyzer.data_version
+        waveforms = self._key_waveforms.get(cache_key)
+        if waveforms is None:
+            perf_start = time.time()
+            waveforms = KeyWaveforms(analyzer.query_time_range(track, key_ids=[int(key_id)]))
+            self._key_waveforms[cache_key] = waveforms
+            logger.debug(f"[DEBUG] 算法 '{self.metadata.algorithm_name}' 按键 {key_id} ({track}) 波形已构建: "
+                         f"{len(waveforms)} 条, 耗时 {(time.time() - perf_start) * 1000:.1f}ms")
+        return waveforms
+
+    def get_valid_key_ids(self) -> List[int]:
+        """录制与播放有效音符中出现的按键ID（升序；首次访问后缓存，溢出后仍可用）"""
+        if self._valid_key_ids is None:
+            analyzer = self.analyzer
+            if analyzer is None:
+                return []
+            notes = (analyzer.get_initial_valid_record_data() or []) + (analyzer.get_initial_valid_replay_data() or [])
+            self._valid_key_ids = sorted({note.id for note in notes})
+        return self._valid_key_ids
+
+    @property
+    def is_spilled(self) -> bool:
+        """数据是否已溢出（内存中已释放）"""
+        return self._is_spilled
+
+    def estimate_memory_bytes(self) -> int:
+        """估算该数据集占用的内存字节数（结果缓存，数据变化时失效；共享结果按引用数均摊）"""
+        if self._is_spilled:
+            return 0
+        shared = self._shared
+        if shared is not None:
+            return shared.estimate_memory_bytes() // max(1, shared.ref_count)
+        if self._memory_bytes is None:
+            from backend.memory_manager import estimate_dataset_bytes
+            self._memory_bytes = estimate_dataset_bytes(self._record_data, self._replay_data, self._analyzer)
+        return self._memory_bytes
+
+    def can_spill(self) -> bool:
+        """是否可以溢出（必须有可用的磁盘数据源才能透明重载）"""
+        return (not self._is_spilled
+                and self.metadata.status == AlgorithmStatus.READY
+                and self.reload_source is not None
+                and self.reload_source.is_available())
+
+    def spill(self) -> int:
+        """
+        释放内存中的数据与分析结果（之后访问时从磁盘重新加载）
+
+        Returns:
+            int: 释放的估算字节数（无法溢出时为0）
+        """
+        with self._spill_lock:
+            if not self.can_spill():
+                return 0
+            freed = self.estimate_memory_bytes()
+            self._detach_shared()
+            self._plot_frame = None
+            self._key_waveforms = {}
+            self._memory_bytes = None
+            self._is_spilled = True
+        logger.info(f"💾 算法 '{self.metadata.algorithm_name}' 已溢出到磁盘，释放约 {freed / 1024 / 1024:.1f}MB")
+        return freed
+
+    def _reload(self) -> None:
+        """从磁盘数据源重新加载并重新分析（溢出后首次访问时调用）"""
+        with self._spill_lock:
+            if not self._is_spilled:
+                return
+            perf_start = time.time()
+            if self.analysis_key is not None:
+                # 其他会话仍持有时直接复用，无需重新分析
+                self._attach_shared(get_analysis_registry().acquire(
+                    self.analysis_key, lambda: self._build_analysis(self.reload_source.load)))
+            else:
+                record_data, replay_data, analyzer = self._build_analysis(self.reload_source.load)
+                self._record_data = record_data
+                self._replay_data = replay_data
+                self._analyzer = analyzer
+            self._memory_bytes = None
+            self._is_spilled = False
+        logger.info(f"♻️ 算法 '{self.metadata.algorithm_name}' 已从磁盘重新加载，耗时: {(time.time() - perf_start)*1000:.0f}ms")
     
-    def load_data(self, record_data: List[Note], replay_data: List[Note], filter_collector=None) -> bool:
+    def load_data(self, record_data: List[Note], replay_data: List[Note], filter_collector=None,
+                  progress_callback=None, analysis_key: Optional[AnalysisKey] = None) -> bool:
         """
         加载并分析数据
         
@@ -90,30 +290,46 @@ class AlgorithmDataset:
             record_data: 录制数据
             replay_data: 播放数据
             filter_collector: 可选的过滤信息收集器（包含加载阶段的过滤信息）
+            progress_callback: 可选的进度回调 progress_callback(stage, fraction)
+            analysis_key: 可选的共享注册表键（指定时与其他会话共用分析结果）
             
+        Returns:
+            bool: 是否成功
+        """
+        return self.load_from_loader(lambda: (record_data, replay_data, filter_collector),
+                                     progress_callback, analysis_key)
+
+    def load_from_loader(self, data_loader, progress_callback=None,
+                         analysis_key: Optional[AnalysisKey] = None) -> bool:
+        """
+        通过数据加载函数加载并分析数据
+
+        指定 analysis_key 且注册表中已有结果时，data_loader 不会被调用（跳过解析、过滤与匹配）。
+
+        Args:
+            data_loader: 无参函数，返回 (录制数据, 播放数据, 过滤信息)
+            progress_callback: 可选的进度回调 progress_callback(stage, fraction)
+            analysis_key: 可选的共享注册表键
+
         Returns:
             bool: 是否成功
         """
         try:
             perf_load_start = time.time()
             self.metadata.status = AlgorithmStatus.LOADING
+            self._valid_key_ids = None
             logger.debug(f"[DEBUG]                📊 [Dataset] 开始加载数据...")
 
-            # ============ 保存原始数据 ============
-            perf_save_start = time.time()
-            self.record_data = record_data
-            self.replay_data = replay_data
-            perf_save_end = time.time()
-            logger.debug(f"[DEBUG]                ⏱️  [性能] Dataset-保存数据: {(perf_save_end - perf_save_start)*1000:.2f}ms")
-
-            # ============ 创建分析器并执行分析 ============
-            perf_analyze_start = time.time()
-            logger.debug(f"[DEBUG]                🔬 开始执行SPMIDAnalyzer分析...")
-            self.analyzer = SPMIDAnalyzer()
-            self.analyzer.analyze(record_data, replay_data, filter_collector)
-            perf_analyze_end = time.time()
-            analyze_time_ms = (perf_analyze_end - perf_analyze_start) * 1000
-            logger.debug(f"[DEBUG]                ⏱️  [性能] Dataset-SPMIDAnalyzer分析: {analyze_time_ms:.2f}ms")
+            if analysis_key is not None:
+                shared = get_analysis_registry().acquire(
+                    analysis_key, lambda: self._build_analysis(data_loader, progress_callback))
+                self.analysis_key = analysis_key
+                self._attach_shared(shared)
+            else:
+                record_data, replay_data, analyzer = self._build_analysis(data_loader, progress_callback)
+                self.record_data = record_data
+                self.replay_data = replay_data
+                self.analyzer = analyzer
 
             self.metadata.status = AlgorithmStatus.READY
             
@@ -127,6 +343,41 @@ class AlgorithmDataset:
             self.metadata.error_message = str(e)
             logger.error(f"[ERROR]                ❌ 算法 {self.metadata.algorithm_name} 数据加载失败: {e}")
             return False
+
+    def release(self) -> None:
+        """释放数据集持有的分析结果（移除算法或会话结束时调用）"""
+        with self._spill_lock:
+            self._detach_shared()
+            self._memory_bytes = None
+
+    def _build_analysis(self, data_loader, progress_callback=None) -> Tuple[List[Note], List[Note], SPMIDAnalyzer]:
+        """加载数据并执行 SPMIDAnalyzer 分析，返回 (录制数据, 播放数据, 分析器)"""
+        record_data, replay_data, filter_collector = data_loader()
+
+        perf_analyze_start = time.time()
+        logger.debug(f"[DEBUG]                🔬 开始执行SPMIDAnalyzer分析...")
+        analyzer = SPMIDAnalyzer()
+        analyzer.analyze(record_data, replay_data, filter_collector, progress_callback)
+        analyze_time_ms = (time.time() - perf_analyze_start) * 1000
+        logger.debug(f"[DEBUG]                ⏱️  [性能] Dataset-SPMIDAnalyzer分析: {analyze_time_ms:.2f}ms")
+        return record_data, replay_data, analyzer
+
+    def _attach_shared(self, shared: SharedAnalysis) -> None:
+        """挂接共享分析结果（数据引用指向注册表中的同一对象）"""
+        self._detach_shared()
+        self._shared = shared
+        self._record_data = shared.record_data
+        self._replay_data = shared.replay_data
+        self._analyzer = shared.analyzer
+
+    def _detach_shared(self) -> None:
+        """释放共享句柄及数据引用"""
+        if self._shared is not None:
+            get_analysis_registry().release(self._shared.key)
+            self._shared = None
+        self._analyzer = None
+        self._record_data = []
+        self._replay_data = []
     
     def get_statistics(self) -> Dict[str, Any]:
         """
@@ -181,8 +432,8 @@ class AlgorithmDataset:
         return data
     
     def is_ready(self) -> bool:
-        """检查算法是否已就绪"""
-        return self.metadata.status == AlgorithmStatus.READY and self.analyzer is not None
+        """检查算法是否已就绪（已溢出的数据集视为就绪，访问时自动重载）"""
+        return self.metadata.status == AlgorithmStatus.READY and (self._analyzer is not None or self._is_spilled)
 
 
 
@@ -206,6 +457,10 @@ class MultiAlgorithmManager:
         """
         self.algorithms: Dict[str, AlgorithmDataset] = {}  # algorithm_name -> AlgorithmDataset
         self.max_algorithms = max_algorithms
+        # 后台任务在工作线程中并发添加算法：名称、颜色和数量名额在分析开始前预留，
+        # 分析结束后在锁内写入或回滚（_pending: 正在添加的算法名 -> 颜色索引）
+        self._lock = threading.Lock()
+        self._pending: Dict[str, int] = {}
         # 线程池用于并发处理，如果无限制则使用默认值10
         executor_workers = max_algorithms if max_algorithms is not None else 10
         self.executor = ThreadPoolExecutor(max_workers=executor_workers)
@@ -218,10 +473,10 @@ class MultiAlgorithmManager:
         return len(self.algorithms)
     
     def can_add_algorithm(self) -> bool:
-        """检查是否可以添加新算法"""
+        """检查是否可以添加新算法（正在添加的算法也占用名额）"""
         if self.max_algorithms is None:
             return True  # 无限制
-        return self.get_algorithm_count() < self.max_algorithms
+        return self.get_algorithm_count() + len(self._pending) < self.max_algorithms
     
     def validate_algorithm_name(self, algorithm_name: str) -> Tuple[bool, str]:
         """
@@ -240,9 +495,20 @@ class MultiAlgorithmManager:
         
         if algorithm_name in self.algorithms:
             return False, f"算法名称 '{algorithm_name}' 已存在"
+        if algorithm_name in self._pending:
+            return False, f"算法 '{algorithm_name}' 正在添加中"
         
         return True, ""
     
+    def _next_color_index(self) -> int:
+        """选择已有算法和正在添加的算法都未使用的颜色索引（调用方持有 _lock）"""
+        used_colors = {algorithm.color for algorithm in self.algorithms.values()}
+        used_indices = set(self._pending.values())
+        for index in range(len(ALGORITHM_COLOR_PALETTE)):
+            if index not in used_indices and ALGORITHM_COLOR_PALETTE[index] not in used_colors:
+                return index
+        return len(self.algorithms) + len(self._pending)
+    
     def _generate_unique_algorithm_name(self, algorithm_name: str, filename: str) -> str:
         """
         生成唯一的算法名称（算法名_文件名（无扩展名））
@@ -262,8 +528,10 @@ class MultiAlgorithmManager:
         return unique_name
     
     async def add_algorithm_async(self, algorithm_name: str, filename: str,
-                                  record_data: List[Note], replay_data: List[Note],
-                                  filter_collector=None) -> Tuple[bool, str]:
+                                  record_data: Optional[List[Note]], replay_data: Optional[List[Note]],
+                                  filter_collector=None, progress_callback=None,
+                                  analysis_key: Optional[AnalysisKey] = None,
+                                  data_loader=None) -> Tuple[bool, str]:
         """
         异步添加算法（支持并发处理）
         
@@ -276,6 +544,10 @@ class MultiAlgorithmManager:
             record_data: 录制数据
             replay_data: 播放数据
             filter_collector: 可选的过滤信息收集器（包含加载阶段的过滤信息）
+            progress_callback: 可选的进度回调 progress_callback(stage, fraction)
+            analysis_key: 可选的共享注册表键（相同文件与处理流程的会话共用分析结果）
+            data_loader: 可选的数据加载函数，返回 (录制数据, 播放数据, 过滤信息)；
+                提供时忽略 record_data/replay_data，仅在共享结果不存在时调用
             
         Returns:
             Tuple[bool, str]: (是否成功, 唯一算法名或错误信息)
@@ -291,19 +563,22 @@ class MultiAlgorithmManager:
         perf_name_end = time.time()
         logger.info(f"            ⏱️  [性能] Manager-生成唯一名: {(perf_name_end - perf_name_start)*1000:.2f}ms")
         
-        # ============ 验证算法名 ============
-        is_valid, error_msg = self.validate_algorithm_name(unique_algorithm_name)
-        if not is_valid:
-            return False, error_msg
-        
-        # 检查是否超过最大数量
-        if not self.can_add_algorithm():
-            limit_text = str(self.max_algorithms) if self.max_algorithms is not None else "无限制"
-            return False, f"已达到最大算法数量限制 ({limit_text})"
+        # ============ 验证算法名并预留名称、颜色和名额 ============
+        with self._lock:
+            is_valid, error_msg = self.validate_algorithm_name(unique_algorithm_name)
+            if not is_valid:
+                return False, error_msg
+            
+            # 检查是否超过最大数量
+            if not self.can_add_algorithm():
+                limit_text = str(self.max_algorithms) if self.max_algorithms is not None else "无限制"
+                return False, f"已达到最大算法数量限制 ({limit_text})"
+            
+            color_index = self._next_color_index()
+            self._pending[unique_algorithm_name] = color_index
         
         # ============ 创建算法数据集 ============
         perf_create_start = time.time()
-        color_index = len(self.algorithms)
         algorithm = AlgorithmDataset(unique_algorithm_name, algorithm_name, filename, color_index)
         perf_create_end = time.time()
         logger.info(f"            ⏱️  [性能] Manager-创建数据集: {(perf_create_end - perf_create_start)*1000:.2f}ms")
@@ -312,22 +587,34 @@ class MultiAlgorithmManager:
         perf_analysis_start = time.time()
         logger.info(f"            🔄 执行数据分析（线程池）...")
         
+        if data_loader is None:
+            data_loader = lambda: (record_data, replay_data, filter_collector)
         loop = asyncio.get_event_loop()
-        success = await loop.run_in_executor(
-            self.executor,
-            algorithm.load_data,
-            record_data,
-            replay_data,
-            filter_collector
-        )
+        try:
+            success = await loop.run_in_executor(
+                self.executor,
+                algorithm.load_from_loader,
+                data_loader,
+                progress_callback,
+                analysis_key
+            )
+        except BaseException:
+            # 分析失败或任务被取消：释放预留，不留下半加载的数据集
+            with self._lock:
+                self._pending.pop(unique_algorithm_name, None)
+            algorithm.release()
+            raise
         
         perf_analysis_end = time.time()
         analysis_time_ms = (perf_analysis_end - perf_analysis_start) * 1000
         logger.info(f"            ⏱️  [性能] Manager-数据分析: {analysis_time_ms:.2f}ms")
         
+        with self._lock:
+            self._pending.pop(unique_algorithm_name, None)
+            if success:
+                self.algorithms[unique_algorithm_name] = algorithm
+        
         if success:
-            self.algorithms[unique_algorithm_name] = algorithm
-            
             perf_manager_end = time.time()
             total_time_ms = (perf_manager_end - perf_manager_start) * 1000
             logger.debug(f"            🏁 [Manager] 算法添加完成，总耗时: {total_time_ms:.2f}ms")
@@ -338,6 +625,7 @@ class MultiAlgorithmManager:
             return True, unique_algorithm_name  # 返回唯一标识符
         else:
             error_msg = algorithm.metadata.error_message or "未知错误"
+            algorithm.release()
             logger.error(f"            ❌ 算法 '{algorithm_name}' (文件: {filename}) 添加失败: {error_msg}")
             return False, error_msg
     
@@ -351,10 +639,12 @@ class MultiAlgorithmManager:
         Returns:
             bool: 是否成功
         """
-        if algorithm_name not in self.algorithms:
+        with self._lock:
+            algorithm = self.algorithms.pop(algorithm_name, None)
+        if algorithm is None:
             return False
         
-        del self.algorithms[algorithm_name]
+        algorithm.release()
         logger.info(f"算法 '{algorithm_name}' 已移除")
         return True
     
@@ -365,13 +655,15 @@ class MultiAlgorithmManager:
     def get_all_algorithms(self) -> List[AlgorithmDataset]:
         """获取所有算法列表"""
         logger.debug(f"[DEBUG] get_all_algorithms被调用, MultiAlgorithmManager地址: {self}")
-        logger.debug(f"[DEBUG] self.algorithms: {list(self.algorithms.keys())}, 数量: {len(self.algorithms)}")
-        return list(self.algorithms.values())
+        with self._lock:
+            algorithms = list(self.algorithms.values())
+        logger.debug(f"[DEBUG] self.algorithms: {[a.metadata.algorithm_name for a in algorithms]}, 数量: {len(algorithms)}")
+        return algorithms
     
     def get_active_algorithms(self) -> List[AlgorithmDataset]:
         """获取激活的算法列表（用于对比显示）"""
         active_algorithms = []    
-        for algorithm in self.algorithms.values():
+        for algorithm in self.get_all_algorithms():
             if algorithm.is_active and algorithm.is_ready():
                 active_algorithms.append(algorithm)
         
@@ -397,7 +689,11 @@ class MultiAlgorithmManager:
     
     def clear_all(self) -> None:
         """清空所有算法"""
-        self.algorithms.clear()
+        with self._lock:
+            algorithms = list(self.algorithms.values())
+            self.algorithms.clear()
+        for algorithm in algorithms:
+            algorithm.release()
         logger.info("所有算法已清空")
     
     def get_comparison_statistics(self) -> Dict[str, Any]:
@@ -12,12 +12,25 @@ from typing import List, Optional, Any, Dict, Tuple
 import plotly.graph_objects as go
 import numpy as np
 from backend.multi_algorithm_manager import AlgorithmDataset
+from backend.figure_encoding import encode_array
+from backend.plot_frame import AlgorithmPlotFrame
 from utils.logger import Logger
-from utils.colors import ALGORITHM_COLOR_PALETTE
+from utils.colors import ALGORITHM_COLOR_PALETTE, VELOCITY_COLORSCALE_ANCHORS
+from utils.constants import FIGURE_TIME_FLOAT32_TOLERANCE
 from spmid.note_matcher import MatchType
 
 logger = Logger.get_logger()
 
+# 时间范围 (开始ms, 结束ms)，任一端为 None 表示不限制
+TimeRange = Optional[Tuple[Optional[float], Optional[float]]]
+
+# 瀑布图锤速颜色档位数（同一算法/类别/档位的bar合并为一条trace）
+WATERFALL_VELOCITY_COLOR_BINS = 16
+# 瀑布图特殊类别颜色（不按锤速着色）
+WATERFALL_DROP_HAMMER_COLOR = 'rgba(255, 0, 0, 0.9)'      # 丢锤使用明显的红色
+WATERFALL_MULTI_HAMMER_COLOR = 'rgba(255, 165, 0, 0.9)'   # 多锤使用明显的橙色
+WATERFALL_NA_COLOR = 'rgba(100, 100, 100, 0.95)'          # 没有锤速数据，使用更深的灰色
+
 
 class MultiAlgorithmPlotGenerator:
     """
@@ -49,7 +62,8 @@ class MultiAlgorithmPlotGenerator:
         algorithm_names: List[str],     # 算法名称列表
         key_filter=None,
         data_types: List[str] = None,   # 要显示的数据类型列表
-        key_ids: List[int] = None       # 要显示的按键ID列表
+        key_ids: List[int] = None,      # 要显示的按键ID列表
+        time_range: TimeRange = None    # 要显示的时间范围 (ms)
     ) -> Any:
         """
         生成统一的瀑布图（自动根据SPMID文件数量处理）
@@ -63,6 +77,7 @@ class MultiAlgorithmPlotGenerator:
             analyzers: 分析器列表
             algorithm_names: 算法名称列表
             key_filter: 按键过滤器
+            time_range: (开始ms, 结束ms)，任一端为 None 表示不限制；在构建bar之前按时间区间索引切片
             
         Returns:
             go.Figure: Plotly图表对象
@@ -72,98 +87,122 @@ class MultiAlgorithmPlotGenerator:
             return self._create_empty_plot("没有分析器")
 
         try:
-            # 自动判断是否为多文件模式
-            is_multi_file = len(analyzers) > 1
             logger.info(f"开始生成瀑布图，共 {len(analyzers)} 个SPMID文件")
+            all_bars_by_algorithm, is_multi_file = self.collect_waterfall_bars(
+                backend, analyzers, algorithm_names, data_types, key_ids, time_range
+            )
 
-            # 根据文件数量和筛选范围决定是否分配y_offset范围
-            if is_multi_file:
-                # 如果筛选了少量按键，减小偏移量以便在有限的视觉范围内对比不同算法/文件
-                if key_ids and len(key_ids) <= 5:
-                    algorithm_y_range = 10
-                else:
-                    algorithm_y_range = 100
+            if not all_bars_by_algorithm:
+                logger.warning("没有有效的数据点，无法生成瀑布图")
+                return self._create_empty_plot("没有有效的数据点")
+
+            return self.build_waterfall_figure(all_bars_by_algorithm, is_multi_file)
+
+        except Exception as e:
+            return self._handle_generation_error(e, "瀑布图")
+
+    def collect_waterfall_bars(self, backend, analyzers: List[Any], algorithm_names: List[str],
+                               data_types: List[str] = None,
+                               key_ids: List[int] = None,
+                               time_range: TimeRange = None) -> Tuple[List[Dict], bool]:
+        """
+        收集瀑布图的bar数据（按算法分组）
+
+        只有与 time_range 重叠的匹配结果会生成bar（通过分析器的时间区间索引查询，不遍历全部结果）。
+
+        Returns:
+            Tuple[List[Dict], bool]: (按算法分组的数据 [{'analyzer', 'bars', 'algorithm_name', 'y_offset'}], 是否多文件模式)
+        """
+        # 自动判断是否为多文件模式
+        is_multi_file = len(analyzers) > 1
+
+        # 根据文件数量和筛选范围决定是否分配y_offset范围
+        if is_multi_file:
+            # 如果筛选了少量按键，减小偏移量以便在有限的视觉范围内对比不同算法/文件
+            if key_ids and len(key_ids) <= 5:
+                algorithm_y_range = 10
             else:
-                algorithm_y_range = 0
+                algorithm_y_range = 100
+        else:
+            algorithm_y_range = 0
 
-            # 获取平均延时数据
-            avg_delay_ms = self._get_average_delay(backend, is_multi_file, algorithm_names)
-            
-            # 收集所有数据点用于全局归一化
-            all_bars_by_algorithm = []
+        # 获取平均延时数据
+        avg_delay_ms = self._get_average_delay(backend, is_multi_file, algorithm_names)
 
-            # 处理每个分析器
-            for alg_idx, (analyzer, algorithm_name) in enumerate(zip(analyzers, algorithm_names)):
-                if not analyzer:
-                    logger.warning(f"分析器 '{algorithm_name}' 为空，跳过")
-                    continue
+        all_bars_by_algorithm = []
 
-                # 计算当前算法的y_offset
-                current_y_offset = alg_idx * algorithm_y_range if is_multi_file else 0
+        # 处理每个分析器
+        for alg_idx, (analyzer, algorithm_name) in enumerate(zip(analyzers, algorithm_names)):
+            if not analyzer:
+                logger.warning(f"分析器 '{algorithm_name}' 为空，跳过")
+                continue
 
-                # 收集当前分析器的数据（根据用户选择的数据类型和按键）
-                algorithm_bars = self._collect_algorithm_data_by_types(
-                    analyzer, current_y_offset, algorithm_name, alg_idx, avg_delay_ms, data_types, key_ids
-                )
+            # 计算当前算法的y_offset
+            current_y_offset = alg_idx * algorithm_y_range if is_multi_file else 0
 
-                all_bars_by_algorithm.append({
-                    'analyzer': analyzer,
-                    'bars': algorithm_bars,
-                    'algorithm_name': algorithm_name,
-                    'y_offset': current_y_offset
-                })
+            # 收集当前分析器的数据（根据用户选择的数据类型和按键）
+            algorithm_bars = self._collect_algorithm_data_by_types(
+                analyzer, current_y_offset, algorithm_name, alg_idx, avg_delay_ms, data_types, key_ids, time_range
+            )
 
-            if not all_bars_by_algorithm:
-                logger.warning("没有有效的数据点，无法生成瀑布图")
-                return self._create_empty_plot("没有有效的数据点")
+            all_bars_by_algorithm.append({
+                'analyzer': analyzer,
+                'bars': algorithm_bars,
+                'algorithm_name': algorithm_name,
+                'y_offset': current_y_offset
+            })
 
-            # 收集所有有效的锤速值并计算全局范围（用于颜色归一化）
-            all_values = self._collect_velocity_values(all_bars_by_algorithm)
-            vmin, vmax = self._calculate_velocity_range(all_values)
+        return all_bars_by_algorithm, is_multi_file
 
-            # 创建图表
-            fig = go.Figure()
-            
-            # 为每个条形段添加trace
-            total_bars = 0
-            drop_hammer_bars = 0
-            multi_hammer_bars = 0
-            matched_bars = 0
-            
-            for alg_data in all_bars_by_algorithm:
-                bars = alg_data['bars']
-                algorithm_name = alg_data['algorithm_name']
-
-                for bar in bars:
-                    total_bars += 1
-                    data_type = bar.get('data_type', '')
-                    if data_type == 'drop_hammer':
-                        drop_hammer_bars += 1
-                    elif data_type == 'multi_hammer':
-                        multi_hammer_bars += 1
-                    else:
-                        matched_bars += 1
-
-                    # 添加bar的trace
-                    success = self._add_waterfall_bar_trace(fig, bar, algorithm_name, vmin, vmax)
-                    if not success:
-                        # 数据无效被跳过，统计需要调整
-                        total_bars -= 1
-                        if data_type == 'drop_hammer':
-                            drop_hammer_bars -= 1
-                        elif data_type == 'multi_hammer':
-                            multi_hammer_bars -= 1
-                        else:
-                            matched_bars -= 1
-            
-            # 配置图表布局
-            self._configure_unified_waterfall_layout(fig, all_bars_by_algorithm, is_multi_file)
-
-            logger.info(f"瀑布图生成成功: 总计 {total_bars} 个bars (匹配对: {matched_bars}, 丢锤: {drop_hammer_bars}, 多锤: {multi_hammer_bars})")
-            return fig
+    def get_velocity_range(self, all_bars_by_algorithm: List[Dict]) -> Tuple[float, float]:
+        """所有算法bars的全局锤速范围（用于颜色归一化）"""
+        return self._calculate_velocity_range(self._collect_velocity_values(all_bars_by_algorithm))
 
-        except Exception as e:
-            return self._handle_generation_error(e, "瀑布图")
+    def build_waterfall_figure(self, all_bars_by_algorithm: List[Dict], is_multi_file: bool,
+                               velocity_range: Optional[Tuple[float, float]] = None) -> go.Figure:
+        """
+        根据收集的bar数据构建瀑布图
+
+        Args:
+            all_bars_by_algorithm: collect_waterfall_bars 返回的按算法分组数据
+            is_multi_file: 是否多文件模式
+            velocity_range: 颜色归一化使用的锤速范围（默认按传入的bars计算）
+        """
+        # 收集所有有效的锤速值并计算全局范围（用于颜色归一化）
+        vmin, vmax = velocity_range or self.get_velocity_range(all_bars_by_algorithm)
+
+        # 创建图表
+        fig = go.Figure()
+        
+        # 按算法批量添加trace（每个算法/类别/颜色档一条trace，而不是每个bar一条）
+        velocity_palette = self._build_velocity_palette()
+        total_bars = 0
+        drop_hammer_bars = 0
+        multi_hammer_bars = 0
+        matched_bars = 0
+        
+        for alg_data in all_bars_by_algorithm:
+            bars = alg_data['bars']
+            algorithm_name = alg_data['algorithm_name']
+
+            for bar in bars:
+                data_type = bar.get('data_type', '')
+                if data_type == 'drop_hammer':
+                    drop_hammer_bars += 1
+                elif data_type == 'multi_hammer':
+                    multi_hammer_bars += 1
+                else:
+                    matched_bars += 1
+
+            total_bars += self._add_waterfall_batched_traces(
+                fig, bars, algorithm_name, vmin, vmax, velocity_palette
+            )
+        
+        # 配置图表布局
+        self._configure_unified_waterfall_layout(fig, all_bars_by_algorithm, is_multi_file)
+
+        logger.info(f"瀑布图生成成功: 总计 {total_bars} 个bars (匹配对: {matched_bars}, 丢锤: {drop_hammer_bars}, 多锤: {multi_hammer_bars})")
+        return fig
 
     def _collect_algorithm_comprehensive_data(self, analyzer, y_offset: float, algorithm_name: str, alg_idx: int, avg_delay_ms: float = 0.0) -> List[Dict]:
         """
@@ -197,7 +236,7 @@ class MultiAlgorithmPlotGenerator:
 
         return algorithm_bars
 
-    def _collect_algorithm_data_by_types(self, analyzer, y_offset: float, algorithm_name: str, alg_idx: int, avg_delay_ms: float, data_types: List[str] = None, key_ids: List[int] = None) -> List[Dict]:
+    def _collect_algorithm_data_by_types(self, analyzer, y_offset: float, algorithm_name: str, alg_idx: int, avg_delay_ms: float, data_types: List[str] = None, key_ids: List[int] = None, time_range: TimeRange = None) -> List[Dict]:
         """
         根据用户选择的数据类型收集算法数据
 
@@ -209,9 +248,10 @@ class MultiAlgorithmPlotGenerator:
             avg_delay_ms: 平均延时
             data_types: 用户选择的数据类型列表
             key_ids: 用户选择的按键ID列表
+            time_range: 用户选择的时间范围 (ms)
 
         Returns:
-            List[Dict]: 该算法的瀑布图数据（只包含选择的数据类型和按键）
+            List[Dict]: 该算法的瀑布图数据（只包含选择的数据类型、按键和时间范围）
         """
         algorithm_bars = []
 
@@ -231,8 +271,6 @@ class MultiAlgorithmPlotGenerator:
 
             return bars
 
-        display_data = note_matcher.get_all_display_data()
-
         # 根据选择的数据类型收集相应数据
         if not data_types:
             # 如果没有指定数据类型，默认显示匹配对
@@ -246,11 +284,23 @@ class MultiAlgorithmPlotGenerator:
             'abnormal_matches': 'abnormal_matches'
         }
 
+        start_ms, end_ms = time_range or (None, None)
+        use_time_index = hasattr(analyzer, 'query_time_range')
+        display_data = None if use_time_index else note_matcher.get_all_display_data()
+
         # 遍历选择的类型，统一通过 _collect_matched_pair_data 收集
         for ui_type in data_types:
             internal_key = type_mapping.get(ui_type)
-            if internal_key and internal_key in display_data:
+            if not internal_key:
+                continue
+            if use_time_index:
+                # 按时间区间和按键从索引中取出结果，只为窗口内的结果构建bar
+                results = analyzer.query_time_range(internal_key, start_ms, end_ms, key_ids or None)
+            elif internal_key in display_data:
                 results = display_data[internal_key]
+            else:
+                continue
+            if results:
                 # 注意：新的 _collect_matched_pair_data 已经内置了 key_ids 过滤
                 bars = self._collect_matched_pair_data(
                     analyzer, y_offset, algorithm_name, avg_delay_ms, results, key_ids
@@ -344,9 +394,13 @@ class MultiAlgorithmPlotGenerator:
                     )
                     bars.extend(replay_bars)
 
-                # 3. 如果两边都有数据，合并悬停提示信息，并写入 record_uuid/replay_uuid 供点击弹窗查找匹配对
+                # 3. 如果两边都有数据，录制bar带上播放数据（悬停显示），并写入 record_uuid/replay_uuid 供点击弹窗查找匹配对
                 if record_bars and replay_bars:
-                    self._merge_matched_hover_info(record_bars, replay_bars, avg_delay_ms)
+                    replay_bar = replay_bars[0]
+                    for record_bar in record_bars:
+                        record_bar['replay_velocity'] = replay_bar['velocity']
+                        record_bar['replay_t_on'] = replay_bar['t_on']
+                        record_bar['replay_t_off'] = replay_bar['t_off']
                     ru = str(getattr(record_note, 'uuid', '') or '')
                     rpu = str(getattr(replay_note, 'uuid', '') or '')
                     for b in record_bars + replay_bars:
@@ -395,80 +449,6 @@ class MultiAlgorithmPlotGenerator:
         return grade_name, color_intensity, delay_ms, relative_delay_ms
 
 
-    # TODO
-    def _merge_matched_hover_info(self, record_bars: List[Dict], replay_bars: List[Dict], avg_delay_ms: float) -> None:
-        """
-        将匹配的replay信息合并到record bars的hover文本中，实现统一的悬停显示。
-
-        Args:
-            record_bars: 录制数据的条形列表
-            replay_bars: 播放数据的条形列表
-            avg_delay_ms: 平均延时（毫秒）
-        """
-        # 匹配逻辑：按键位对应（确保record和replay的相同键位数据配对）
-        for record_bar in record_bars:
-            # 查找对应的replay bar（通过original_key_id匹配）
-            replay_info = None
-            record_key_id = record_bar.get('original_key_id')
-
-            for replay_bar in replay_bars:
-                if replay_bar.get('original_key_id') == record_key_id:
-                    replay_info = replay_bar
-                    break
-
-            if replay_info:
-                # 获取record的原始文本
-                original_text = record_bar.get('text', '')
-
-                # 提取replay相关的完整信息
-                replay_velocity = replay_info.get('velocity', 'N/A')
-                replay_key_press = replay_info.get('t_on', 0) / 10
-                replay_key_release = replay_info.get('t_off', 0) / 10
-                replay_grade = replay_info.get('grade_name', '未知')
-                replay_match_index = replay_info.get('match_index', 'N/A')
-                replay_delay_ms = replay_info.get('delay_ms', 0.0)
-                replay_relative_delay_ms = replay_info.get('relative_delay_ms', 0.0)
-                replay_first_hammer = replay_info.get('first_hammer_time', 'N/A')
-
-                # 在record的hover文本中添加完整的replay信息部分
-                replay_section = '<br><b>播放数据:</b><br>' + \
-                            f'类型: replay<br>' + \
-                            f'键位: {record_key_id}<br>' + \
-                            f'锤速: {replay_velocity}<br>' + \
-                            f'等级: {replay_grade}<br>' + \
-                            f'索引: {replay_match_index}<br>' + \
-                            f'绝对延时: {replay_delay_ms:.2f}ms<br>' + \
-                            f'相对延时: {replay_relative_delay_ms:+.2f}ms<br>' + \
-                            f'平均延时: {avg_delay_ms:.2f}ms<br>' + \
-                            f'首锤时间: {replay_first_hammer} ({replay_first_hammer/10:.2f}ms)<br>' + \
-                            f'按键按下: {replay_key_press:.2f}ms<br>' + \
-                            f'按键释放: {replay_key_release:.2f}ms<br>'
-
-                merged_text = original_text + replay_section
-
-                record_bar['text'] = merged_text
-                # 为replay bar创建独立的悬停信息
-                replay_text = '<b>播放数据:</b><br>' + \
-                             f'类型: replay<br>' + \
-                             f'键位: {record_key_id}<br>' + \
-                             f'锤速: {replay_velocity}<br>' + \
-                             f'等级: {replay_grade}<br>' + \
-                             f'索引: {replay_match_index}<br>' + \
-                             f'绝对延时: {replay_delay_ms:.2f}ms<br>' + \
-                             f'相对延时: {replay_relative_delay_ms:+.2f}ms<br>' + \
-                             f'平均延时: {avg_delay_ms:.2f}ms<br>' + \
-                             f'首锤时间: {replay_first_hammer} ({replay_first_hammer/10:.2f}ms)<br>' + \
-                             f'按键按下: {replay_key_press:.2f}ms<br>' + \
-                             f'按键释放: {replay_key_release:.2f}ms<br>'
-                replay_info['text'] = replay_text
-            else:
-                logger.warning(f"键位 {record_key_id}: 未找到对应的播放数据，无法合并hover信息")
-                # 为没有匹配播放数据的record bar添加提示
-                original_text = record_bar.get('text', '')
-                no_replay_section = '<br><b>播放数据:</b><br>未找到匹配的播放数据<br>'
-                record_bar['text'] = original_text + no_replay_section
-
-
     def _extract_note_bars_for_multi(self, note, label: str, y_offset: float, color_intensity: float, algorithm_name: str, grade_name: str = "未知", match_index: str = "N/A", delay_ms: float = 0.0, relative_delay_ms: float = 0.0, data_type: str = None, record_key_id: int = None) -> List[Dict]:
         """
         为多算法模式提取音符条形数据
@@ -544,13 +524,6 @@ class MultiAlgorithmPlotGenerator:
                 source_index, delay_ms, relative_delay_ms
             )
             
-            # 生成hover文本
-            bar['text'] = self._generate_hover_text(
-                bar, label, data_type, algorithm_name, key_id,
-                hammer_velocity, grade_name, match_index,
-                delay_ms, relative_delay_ms, key_on_time, key_off_time
-            )
-
             return [bar]
             
         except (TypeError, ValueError, AttributeError) as e:
@@ -585,47 +558,6 @@ class MultiAlgorithmPlotGenerator:
         velocity = note.get_first_hammer_velocity()
         return velocity if velocity is not None else "N/A"
 
-    def _normalize_velocity_value(self, velocity: float, vmin: float, vmax: float) -> float:
-        """将锤速值归一化到[0,1]范围用于颜色映射
-
-        Args:
-            velocity: 锤速值
-            vmin: 锤速最小值
-            vmax: 锤速最大值
-
-        Returns:
-            float: 归一化后的值 (0.0-1.0)
-        """
-        if vmax > vmin:
-            # 正常情况：数据有变化范围，进行min-max归一化
-            return (velocity - vmin) / (vmax - vmin)
-        elif vmax == vmin:
-            # 特殊情况：所有锤速值都相同，所有点用相同颜色
-            return 0.5  # 中间色调
-        else:
-            # 理论上不会发生，但保持健壮性
-            return 0.5
-
-    def _calculate_velocity_color(self, velocity: float, vmin: float, vmax: float) -> str:
-        """根据锤速值计算颜色
-
-        Args:
-            velocity: 锤速值
-            vmin: 锤速最小值
-            vmax: 锤速最大值
-
-        Returns:
-            str: RGBA颜色字符串
-        """
-        import matplotlib.pyplot as plt
-        cmap = plt.colormaps['YlOrRd']  # 从浅黄到深红，越大越深
-
-        # 归一化并映射到颜色
-        normalized = self._normalize_velocity_value(velocity, vmin, vmax)
-        # 增加不透明度，确保颜色更明显（从0.9提高到0.95）
-        color = 'rgba' + str(tuple(int(255*x) for x in cmap(normalized)[:3]) + (0.95,))
-        return color
-
     def _create_bar_trace_name(self, algorithm_name: str, data_type: str, bar_label: str) -> str:
         """创建bar的trace名称
 
@@ -688,80 +620,205 @@ class MultiAlgorithmPlotGenerator:
         else:
             return 0.0, 1.0
 
-    def _add_waterfall_bar_trace(self, fig: go.Figure, bar: Dict, algorithm_name: str,
-                                vmin: float, vmax: float) -> bool:
-        """添加单个瀑布图bar的trace
+    def _build_velocity_palette(self, bins: int = WATERFALL_VELOCITY_COLOR_BINS) -> List[str]:
+        """构建锤速颜色档位（YlOrRd，从浅黄到深红，越大越深）
+
+        Plotly 的线段颜色只能按 trace 设置，锤速颜色量化为固定档位，同一档位的 bar 合并为一条 trace。
+        档位颜色由渐变锚点线性插值得到。
+
+        Returns:
+            List[str]: 每个档位的RGBA颜色字符串
+        """
+        anchors = np.array(VELOCITY_COLORSCALE_ANCHORS, dtype=np.float64)
+        positions = np.linspace(0.0, 1.0, len(anchors))
+        samples = np.linspace(0.0, 1.0, max(bins, 1))
+        rgb = np.column_stack([np.interp(samples, positions, anchors[:, c]) for c in range(3)])
+        return [f'rgba({r}, {g}, {b}, 0.95)' for r, g, b in rgb.astype(int).tolist()]
+
+    @staticmethod
+    def _map_velocity_color_bins(velocities: np.ndarray, vmin: float, vmax: float, bins: int) -> np.ndarray:
+        """将锤速数组一次性映射为颜色档位下标（NaN 表示无锤速，映射为 -1）
 
         Args:
-            fig: Plotly图表对象
-            bar: bar数据字典
-            algorithm_name: 算法名称
+            velocities: 锤速数组
             vmin: 锤速最小值
             vmax: 锤速最大值
+            bins: 颜色档位数
 
         Returns:
-            bool: 是否成功添加（False表示数据无效被跳过）
+            np.ndarray: 每个锤速对应的档位下标
         """
-        # 获取锤速数据并计算颜色
-        velocity = bar.get('velocity')
-        data_type = bar.get('data_type', '')
-        
-        # 对于丢锤/多锤错误，使用更明显的颜色
-        if data_type in ['drop_hammer', 'multi_hammer']:
-            if data_type == 'drop_hammer':
-                # 丢锤使用明显的红色
-                color = 'rgba(255, 0, 0, 0.9)'  # 红色，不透明
-            else:
-                # 多锤使用明显的橙色
-                color = 'rgba(255, 165, 0, 0.9)'  # 橙色，不透明
-        elif velocity == "N/A" or not isinstance(velocity, (int, float)):
-            # 如果没有锤速数据，使用更明显的灰色
-            color = 'rgba(100, 100, 100, 0.95)'  # 更深的灰色，更不透明
+        if vmax > vmin:
+            normalized = (velocities - vmin) / (vmax - vmin)
         else:
-            # 有锤速数据，使用基于锤速的颜色映射（增加不透明度）
-            base_color = self._calculate_velocity_color(velocity, vmin, vmax)
-            # 确保颜色足够明显（如果alpha太低，提高它）
-            if 'rgba' in base_color:
-                # 解析rgba并确保alpha至少为0.8
-                import re
-                match = re.search(r'rgba\((\d+),\s*(\d+),\s*(\d+),\s*([\d.]+)\)', base_color)
-                if match:
-                    r, g, b, a = map(float, match.groups())
-                    a = max(a, 0.85)  # 确保alpha至少为0.85
-                    color = f'rgba({int(r)},{int(g)},{int(b)},{a:.2f})'
-                else:
-                    color = base_color
-            else:
-                color = base_color
+            # 所有锤速值都相同，所有点用中间色调
+            normalized = np.full(len(velocities), 0.5)
+        valid = ~np.isnan(velocities)
+        indices = np.full(len(velocities), -1, dtype=np.int64)
+        indices[valid] = np.rint(np.clip(normalized[valid], 0.0, 1.0) * (bins - 1)).astype(np.int64)
+        return indices
+
+    def _add_waterfall_batched_traces(self, fig: go.Figure, bars: List[Dict], algorithm_name: str,
+                                      vmin: float, vmax: float, velocity_palette: List[str]) -> int:
+        """将一个算法的所有瀑布图bar批量添加为少量trace
+
+        按 (trace名称, 是否有配对播放数据, 颜色) 分组，每组一条 Scattergl：每个bar是两个端点加一个分隔点的线段。
+        颜色档位、分组与坐标数组都按整个算法一次性向量化计算；悬停内容由每条 trace 的 hovertemplate
+        在浏览器端从 customdata 数值列（以及 text=等级、hovertext=索引）生成，不再逐bar拼接字符串。
+        customdata 使用浮点矩阵而不是对象数组，Plotly 校验/复制时不需要逐元素处理，并序列化为二进制数组；
+        text/hovertext 以列表传入：NumPy 字符串数组会使 orjson 序列化失败，回退到逐元素的慢速路径。
+        点击查找匹配对所需的字符串标识（算法名、标签、record_uuid/replay_uuid）放在每条 trace 的 meta 中，
+        uuid 列表按 trace 内的bar顺序排列：点击点的bar序号为 pointNumber // 3。
 
-        # 创建trace名称
-        data_type = bar.get('data_type', '')
-        trace_name = self._create_bar_trace_name(algorithm_name, data_type, bar['label'])
+        Args:
+            fig: Plotly图表对象
+            bars: 该算法的bar数据列表
+            algorithm_name: 算法名称
+            vmin: 锤速最小值
+            vmax: 锤速最大值
+            velocity_palette: 锤速颜色档位
 
-        # 添加水平线段
-        fig.add_trace(go.Scattergl(
-            x=[bar['t_on']/10, bar['t_off']/10],
-            y=[bar['key_id'], bar['key_id']],
-            mode='lines',
-            line=dict(color=color, width=3),
-            name=trace_name,
-            showlegend=False,
-            legendgroup=algorithm_name,
-            hoverinfo='text' if bar.get('text') else 'skip',
-            text=bar.get('text', ''),
-            customdata=[[
-                bar['t_on']/10,
-                bar['t_off']/10,
-                int(bar.get('original_key_id', bar.get('key_id', 0))),
-                bar.get('velocity', 'N/A'),
-                bar.get('label', 'unknown'),
+        Returns:
+            int: 添加的bar数量
+        """
+        count = len(bars)
+        if not count:
+            return 0
+
+        customdata = self._build_waterfall_customdata(bars)
+        t_on, t_off = customdata[:, 0], customdata[:, 1]
+        y = np.fromiter((bar['key_id'] for bar in bars), dtype=np.float64, count=count)
+        grade_names = np.array([str(bar.get('grade_name', '未知')) for bar in bars])
+        match_indices = np.array([str(bar.get('match_index', 'N/A')) for bar in bars])
+        data_types = np.array([bar.get('data_type') or '' for bar in bars])
+        labels = np.array([bar.get('label', 'unknown') for bar in bars])
+        has_pair = ~np.isnan(customdata[:, 8])
+
+        # 颜色编码：0..bins-1 为锤速档位，其后依次为 无锤速 / 丢锤 / 多锤
+        colors = list(velocity_palette) + [WATERFALL_NA_COLOR, WATERFALL_DROP_HAMMER_COLOR,
+                                           WATERFALL_MULTI_HAMMER_COLOR]
+        bins = len(velocity_palette)
+        color_codes = self._map_velocity_color_bins(customdata[:, 3], vmin, vmax, bins)
+        color_codes[color_codes < 0] = bins
+        color_codes[data_types == 'drop_hammer'] = bins + 1
+        color_codes[data_types == 'multi_hammer'] = bins + 2
+
+        # 分组键：(数据类型, 标签, 是否有配对, 颜色)
+        _, category_codes = np.unique(np.char.add(np.char.add(data_types, '|'), labels), return_inverse=True)
+        group_keys = (category_codes.reshape(-1) * 2 + has_pair) * len(colors) + color_codes
+        order = np.argsort(group_keys, kind='stable')
+        sorted_keys = group_keys[order]
+        starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+        ends = np.r_[starts[1:], count]
+
+        for start, end in zip(starts, ends):
+            indices = order[start:end]
+            first = indices[0]
+            data_type, label = str(data_types[first]), str(labels[first])
+            meta = {'algorithm_name': algorithm_name, 'label': label, 'data_type': data_type}
+            record_uuids = [bars[i].get('record_uuid', '') for i in indices]
+            if any(record_uuids):
+                meta['record_uuid'] = record_uuids
+                meta['replay_uuid'] = [bars[i].get('replay_uuid', '') for i in indices]
+            fig.add_trace(go.Scattergl(
+                x=encode_array(self._segment_points(t_on[indices], t_off[indices]), FIGURE_TIME_FLOAT32_TOLERANCE),
+                y=encode_array(self._segment_points(y[indices], y[indices])),
+                mode='lines',
+                line=dict(color=colors[color_codes[first]], width=3),
+                connectgaps=False,
+                name=self._create_bar_trace_name(algorithm_name, data_type, label),
+                showlegend=False,
+                legendgroup=algorithm_name,
+                text=self._segment_points(grade_names[indices], grade_names[indices]).tolist(),
+                hovertext=self._segment_points(match_indices[indices], match_indices[indices]).tolist(),
+                hovertemplate=self._waterfall_hovertemplate(
+                    algorithm_name, label, data_type, bool(has_pair[first]), color_codes[first] != bins
+                ),
+                customdata=encode_array(self._segment_points(customdata[indices], customdata[indices]),
+                                        FIGURE_TIME_FLOAT32_TOLERANCE),
+                meta=meta
+            ))
+        return count
+
+    @staticmethod
+    def _segment_points(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        """将线段起点/终点交错为 [起点, 终点, 分隔] 序列（数值分隔点为 NaN，使线段互不相连；字符串为空串）"""
+        points = np.empty((len(starts) * 3,) + starts.shape[1:], dtype=starts.dtype)
+        points[0::3] = starts
+        points[1::3] = ends
+        points[2::3] = '' if starts.dtype.kind == 'U' else np.nan
+        return points
+
+    @staticmethod
+    def _build_waterfall_customdata(bars: List[Dict]) -> np.ndarray:
+        """构建瀑布图bar的 customdata 浮点矩阵（每行一个bar，缺失值为 NaN）
+
+        列: 0 按下ms, 1 释放ms, 2 原始按键ID, 3 锤速, 4 源索引, 5 绝对延时ms, 6 相对延时ms,
+            7 配对播放锤速, 8 配对播放按下ms, 9 配对播放释放ms
+        时间列为 0.1ms 精度，悬停显示一位小数，因此按 FIGURE_TIME_FLOAT32_TOLERANCE 降为 float32
+        标签、算法名和 record_uuid/replay_uuid 不是数值，由 trace 的 meta 提供（见 _add_waterfall_batched_traces）
+        """
+        def number(value) -> float:
+            return float(value) if isinstance(value, (int, float)) else np.nan
+
+        rows = [
+            (
+                bar['t_on'] / 10,
+                bar['t_off'] / 10,
+                bar.get('original_key_id', bar.get('key_id', 0)),
+                number(bar.get('velocity')),
                 bar.get('source_index', 0),
-                algorithm_name,
-                bar.get('record_uuid', ''),
-                bar.get('replay_uuid', '')
-            ]]
-        ))
-        return True
+                bar.get('delay_ms', 0.0),
+                bar.get('relative_delay_ms', 0.0),
+                number(bar.get('replay_velocity')),
+                number(bar.get('replay_t_on')) / 10,
+                number(bar.get('replay_t_off')) / 10,
+            )
+            for bar in bars
+        ]
+        return np.array(rows, dtype=np.float64).reshape(len(bars), 10)
+
+    @staticmethod
+    def _waterfall_hovertemplate(algorithm_name: str, label: str, data_type: str,
+                                 has_pair: bool, has_velocity: bool) -> str:
+        """生成瀑布图trace的悬停模板（引用 customdata 列，见 _build_waterfall_customdata）"""
+        bar_type_suffix = ""
+        if data_type == "drop_hammer":
+            bar_type_suffix = " (丢锤)"
+        elif data_type == "multi_hammer":
+            bar_type_suffix = " (多锤)"
+        velocity = '%{customdata[3]}' if has_velocity else 'N/A'
+
+        template = (
+            f'算法: {algorithm_name}<br>'
+            f'类型: {label}{bar_type_suffix}<br>'
+            '键位: %{customdata[2]}<br>'
+            f'锤速: {velocity}<br>'
+            '等级: %{text}<br>'
+            '索引: %{hovertext}<br>'
+        )
+        if label != 'record':
+            template += (
+                '绝对延时: %{customdata[5]:.2f}ms<br>'
+                '相对延时: %{customdata[6]:+.2f}ms<br>'
+            )
+        template += (
+            '按键按下: %{customdata[0]:.1f}ms<br>'
+            '按键释放: %{customdata[1]:.1f}ms<br>'
+        )
+        if label == 'record' and not data_type:
+            if has_pair:
+                template += (
+                    '<br><b>播放数据:</b><br>'
+                    '锤速: %{customdata[7]}<br>'
+                    '绝对延时: %{customdata[5]:.2f}ms<br>'
+                    '相对延时: %{customdata[6]:+.2f}ms<br>'
+                    '按键按下: %{customdata[8]:.1f}ms<br>'
+                    '按键释放: %{customdata[9]:.1f}ms<br>'
+                )
+            else:
+                template += '<br><b>播放数据:</b><br>未找到匹配的播放数据<br>'
+        return template + '<extra></extra>'
 
     def _handle_generation_error(self, error: Exception, plot_type: str, include_traceback: bool = True,
                                 return_dict: bool = False, return_list: bool = False) -> Any:
@@ -905,45 +962,6 @@ class MultiAlgorithmPlotGenerator:
             'first_hammer_time': key_on_time
         }
     
-    def _generate_hover_text(self, bar: Dict, label: str, data_type: str,
-                            algorithm_name: str, key_id: int, hammer_velocity,
-                            grade_name: str, match_index, delay_ms: float,
-                            relative_delay_ms: float, key_on_time: float,
-                            key_off_time: float) -> str:
-        """生成hover文本"""
-        # 生成数据类型后缀
-        bar_type_suffix = ""
-        if data_type == "drop_hammer":
-            bar_type_suffix = " (丢锤)"
-        elif data_type == "multi_hammer":
-            bar_type_suffix = " (多锤)"
-        
-        # 根据label构建不同的hover文本
-        if label == 'record':
-            return (
-                f'算法: {algorithm_name}<br>'
-                f'类型: {label}{bar_type_suffix}<br>'
-                f'键位: {key_id}<br>'
-                f'锤速: {hammer_velocity}<br>'
-                f'等级: {grade_name}<br>'
-                f'索引: {match_index}<br>'
-                f'按键按下: {key_on_time/10:.2f}ms<br>'
-                f'按键释放: {key_off_time/10:.2f}ms<br>'
-            )
-        else:
-            return (
-                f'算法: {algorithm_name}<br>'
-                f'类型: {label}{bar_type_suffix}<br>'
-                f'键位: {key_id}<br>'
-                f'锤速: {hammer_velocity}<br>'
-                f'等级: {grade_name}<br>'
-                f'索引: {match_index}<br>'
-                f'绝对延时: {delay_ms:.2f}ms<br>'
-                f'相对延时: {relative_delay_ms:+.2f}ms<br>'
-                f'按键按下: {key_on_time/10:.2f}ms<br>'
-                f'按键释放: {key_off_time/10:.2f}ms<br>'
-            )
-    
     def _apply_key_filter(self, data: List, key_filter: set) -> List:
         """应用按键过滤"""
         if not key_filter:
@@ -1307,23 +1325,17 @@ class MultiAlgorithmPlotGenerator:
             return None
         
         try:
-            # 获取偏移数据
-            offset_data = self._get_offset_data(algorithm)
-            if not offset_data:
+            # 精确匹配行（≤50ms）
+            frame = algorithm.plot_frame
+            rows = frame.rows()
+            if not len(rows):
                 logger.warning(f"⚠️ 算法 '{metadata['algorithm_name']}' 没有精确匹配数据（≤50ms），跳过")
                 return None
-            
-            # 提取绝对延时
-            absolute_delays_ms = [item.get('keyon_offset', 0.0) / 10.0 for item in offset_data]
-            if not absolute_delays_ms:
-                logger.warning(f"⚠️ 算法 '{metadata['algorithm_name']}' 筛选后没有有效延时数据，跳过")
-                return None
-            
-            # 计算平均延时
-            mean_delay_ms = self._calculate_mean_delay(algorithm.analyzer)
-            
-            # 计算相对延时和统计量
-            relative_delays_ms = [delay - mean_delay_ms for delay in absolute_delays_ms]
+
+            # 绝对延时、平均延时与相对延时
+            absolute_delays_ms = frame.delay_ms[rows].tolist()
+            mean_delay_ms = frame.mean_delay_ms
+            relative_delays_ms = frame.relative_delay_ms[rows].tolist()
             statistics = self._calculate_delay_statistics(
                 absolute_delays_ms, relative_delays_ms, mean_delay_ms
             )
@@ -1373,7 +1385,7 @@ class MultiAlgorithmPlotGenerator:
         
         # 添加直方图
         fig.add_trace(go.Histogram(
-            x=relative_delays,
+            x=encode_array(relative_delays),
             histnorm='probability density',
             name=f'{descriptive_name} - 延时分布',
             marker_color=color,
@@ -1535,42 +1547,17 @@ class MultiAlgorithmPlotGenerator:
                     continue
                 
                 try:
-                    # 获取匹配对和音符字典
-                    matched_pairs = self._get_matched_pairs(algorithm)
-                    record_note_dict, replay_note_dict = self._create_note_dicts(matched_pairs)
-
-                    # 获取偏移数据
-                    offset_data = self._get_offset_data(algorithm)
-
-                    # 提取散点图数据（Z-Score不需要过滤公共按键）
-                    scatter_data = self._extract_scatter_delay_data(
-                        offset_data, record_note_dict, replay_note_dict,
-                        None, metadata['algorithm_name']  # common_keys为None，不过滤
-                    )
-                    if not scatter_data or not scatter_data['key_ids']:
+                    # 精确匹配行按键排序（Z-Score不需要过滤公共按键）
+                    frame = algorithm.plot_frame
+                    rows = frame.sort_rows(frame.rows(), frame.key_id)
+                    if not len(rows):
                         continue
-                    
+
+                    scatter_data = self._extract_scatter_delay_data(frame, rows, metadata['algorithm_name'])
                     key_ids = scatter_data['key_ids']
-                    delays_ms = scatter_data['delays_ms']
                     customdata_list = scatter_data['customdata']
-                    
-                    # 计算Z-Score值
-                    z_scores, mu, sigma = self._calculate_zscore_values(delays_ms, algorithm)
-
-                    # 排序数据 - 先组织成字典格式
-                    scatter_dict = {
-                        'key_ids': key_ids,
-                        'delays_ms': z_scores,  # Z-Score值作为延时
-                        'relative_delays_ms': z_scores,  # 对于Z-Score，相对延时也使用Z-Score值
-                        'customdata': customdata_list
-                    }
-                    self._sort_scatter_data(scatter_dict)
-
-                    # 从排序后的字典提取数据
-                    key_ids = scatter_dict['key_ids']
-                    z_scores = scatter_dict['delays_ms']
-                    customdata_list = scatter_dict['customdata']
-                    
+                    z_scores = self._calculate_zscore_values(frame, rows)
+
                     # 添加散点图traces
                     color = self._get_algorithm_color(alg_idx)
                     self._add_zscore_scatter_traces(
@@ -1638,14 +1625,9 @@ class MultiAlgorithmPlotGenerator:
                 if not self._validate_analyzer(algorithm, descriptive_name):
                     continue
                 
-                # 获取偏移数据
-                offset_data = self._get_offset_data(algorithm)
-                if not offset_data:
-                    continue
-                
                 # 提取目标按键的延时数据
                 key_delays, customdata_list = self._extract_single_key_delays(
-                    offset_data, target_key_id, filename
+                    algorithm.plot_frame, target_key_id, filename
                 )
                 
                 if not key_delays:
@@ -1707,30 +1689,23 @@ class MultiAlgorithmPlotGenerator:
                     continue
 
                 try:
-                    # 获取匹配对
-                    matched_pairs = self._get_matched_pairs(algorithm)
-                    if not matched_pairs:
+                    frame = algorithm.plot_frame
+                    if not len(frame):
                         logger.warning(f"算法 '{descriptive_name}' 没有匹配数据，跳过")
                         continue
 
-                    # 获取偏移数据并创建映射
-                    offset_data = self._get_offset_data(algorithm)
-                    offset_map = self._create_offset_map(offset_data)
-
                     # 提取锤速和延时数据（使用algorithm_name作为唯一标识）
+                    rows = frame.rows(require_hammer=True, positive_velocity=True)
                     hammer_velocities, delays_ms, scatter_customdata = \
-                        self._extract_hammer_velocity_delay_data(matched_pairs, offset_map, algorithm_name)
+                        self._extract_hammer_velocity_delay_data(frame, rows, algorithm_name)
 
                     if not hammer_velocities:
                         logger.warning(f"算法 '{descriptive_name}' 没有有效的散点图数据，跳过")
                         continue
 
                     # 计算相对延时统计
-                    relative_delays, statistics = \
-                        self._calculate_relative_delay_statistics(delays_ms, algorithm)
-
-                    # 将锤速转换为对数形式
-                    log_velocities = [math.log10(v) for v in hammer_velocities]
+                    relative_delays, statistics = self._calculate_relative_delay_statistics(frame, rows)
+                    log_velocities = frame.log_velocity[rows].tolist()
 
                     # 获取算法颜色
                     color = self._get_algorithm_color(alg_idx)
@@ -1797,29 +1772,23 @@ class MultiAlgorithmPlotGenerator:
                     continue
 
                 try:
-                    # 获取匹配对
-                    matched_pairs = self._get_matched_pairs(algorithm)
-                    if not matched_pairs:
+                    frame = algorithm.plot_frame
+                    if not len(frame):
                         logger.warning(f"⚠️ 算法 '{descriptive_name}' 没有匹配数据，跳过")
                         continue
 
-                    # 获取偏移数据并创建映射
-                    offset_data = self._get_offset_data(algorithm)
-                    offset_map = self._create_offset_map(offset_data)
-
                     # 提取锤速和延时数据（使用algorithm_name作为唯一标识）
+                    rows = frame.rows(require_hammer=True, positive_velocity=True)
                     hammer_velocities, delays_ms, scatter_customdata = \
-                        self._extract_hammer_velocity_delay_data(matched_pairs, offset_map, algorithm_name)
+                        self._extract_hammer_velocity_delay_data(frame, rows, algorithm_name)
 
                     if not hammer_velocities:
                         logger.warning(f"⚠️ 算法 '{descriptive_name}' 没有有效的散点图数据，跳过")
                         continue
 
                     # 计算Z-Score
-                    z_scores, mu, sigma = self._calculate_zscore_values(delays_ms, algorithm)
-
-                    # 将锤速转换为对数形式
-                    log_velocities = [math.log10(v) for v in hammer_velocities]
+                    z_scores = self._calculate_zscore_values(frame, rows)
+                    log_velocities = frame.log_velocity[rows].tolist()
 
                     # 获取算法颜色
                     color = self._get_algorithm_color(alg_idx)
@@ -1883,19 +1852,13 @@ class MultiAlgorithmPlotGenerator:
                     continue
 
                 try:
-                    # 获取匹配对
-                    matched_pairs = self._get_matched_pairs(algorithm)
-                    if not matched_pairs:
+                    frame = algorithm.plot_frame
+                    if not len(frame):
                         logger.warning(f"⚠️ 算法 '{descriptive_name}' 没有匹配数据，跳过")
                         continue
 
-                    # 获取偏移数据并创建映射
-                    offset_data = self._get_offset_data(algorithm)
-                    offset_map = self._create_offset_map(offset_data)
-                    
                     # 提取按键ID、锤速和延时数据
-                    key_ids, hammer_velocities, delays_ms = \
-                        self._extract_key_hammer_velocity_data(matched_pairs, offset_map)
+                    key_ids, hammer_velocities, delays_ms = self._extract_key_hammer_velocity_data(frame)
                     
                     if not key_ids:
                         logger.warning(f"⚠️ 算法 '{descriptive_name}' 没有有效的散点图数据，跳过")
@@ -2019,92 +1982,6 @@ class MultiAlgorithmPlotGenerator:
     
     # ==================== 数据获取和转换方法（消除重复代码） ====================
     
-    def _get_offset_data(self, algorithm: AlgorithmDataset):
-        """
-        获取算法的精确偏移对齐数据
-        
-        Args:
-            algorithm: 算法数据集
-            
-        Returns:
-            偏移对齐数据列表，如果获取失败返回空列表
-        """
-        try:
-            if algorithm.analyzer:
-                return algorithm.analyzer.get_precision_offset_alignment_data() or []
-        except Exception as e:
-            logger.warning(f"获取偏移数据失败: {e}")
-        return []
-    
-    def _get_matched_pairs(self, algorithm: AlgorithmDataset):
-        """
-        获取算法的匹配对数据，转换为散点图所需的格式
-
-        Args:
-            algorithm: 算法数据集
-
-        Returns:
-            匹配对列表 [(record_idx, replay_idx, record_note, replay_note), ...]
-        """
-        try:
-            if algorithm.analyzer and algorithm.analyzer.matched_pairs:
-                # 将当前格式 (record_note, replay_note, match_type, error_ms)
-                # 转换为散点图所需的格式 (record_idx, replay_idx, record_note, replay_note)
-                result = []
-                for idx, (rec_note, rep_note, match_type, error_ms) in enumerate(algorithm.analyzer.matched_pairs):
-                    # 使用UUID作为索引，因为UUID是全局唯一的标识符
-                    record_idx = getattr(rec_note, 'uuid', f"rec_{idx}")
-                    replay_idx = getattr(rep_note, 'uuid', f"rep_{idx}")
-                    result.append((record_idx, replay_idx, rec_note, rep_note))
-                return result
-        except Exception as e:
-            logger.warning(f"获取匹配对失败: {e}")
-        return []
-    
-    def _create_note_dicts(self, matched_pairs):
-        """
-        从匹配对创建音符字典
-        
-        Args:
-            matched_pairs: 匹配对列表 [(record_idx, replay_idx, record_note, replay_note), ...]
-            
-        Returns:
-            Tuple[Dict, Dict]: (record_note_dict, replay_note_dict)
-        """
-        record_note_dict = {r_idx: r_note for r_idx, _, r_note, _ in matched_pairs}
-        replay_note_dict = {p_idx: p_note for _, p_idx, _, p_note in matched_pairs}
-        return record_note_dict, replay_note_dict
-    
-    def _create_offset_map(self, offset_data):
-        """
-        创建偏移数据索引映射
-        
-        Args:
-            offset_data: 偏移对齐数据列表
-            
-        Returns:
-            Dict: 以 (record_index, replay_index) 为键的偏移数据字典
-        """
-        offset_map = {}
-        for item in offset_data:
-            record_idx = item.get('record_index')
-            replay_idx = item.get('replay_index')
-            if record_idx is not None and replay_idx is not None:
-                offset_map[(record_idx, replay_idx)] = item
-        return offset_map
-    
-    def _convert_offset_to_ms(self, keyon_offset) -> float:
-        """
-        将偏移量从 0.1ms 单位转换为 ms
-        
-        Args:
-            keyon_offset: 偏移量（0.1ms 单位）
-            
-        Returns:
-            float: 偏移量（ms 单位）
-        """
-        return keyon_offset / 10.0
-    
     def _filter_algorithms_by_names(self, algorithms: List[AlgorithmDataset], 
                                     selected_names: List[str] = None) -> List[AlgorithmDataset]:
         """根据名称筛选算法"""
@@ -2118,15 +1995,12 @@ class MultiAlgorithmPlotGenerator:
             return algorithms
     
     def _calculate_common_keys(self, algorithms: List[AlgorithmDataset]) -> Optional[set]:
-        """计算所有算法的公共按键"""
+        """计算所有算法的公共按键（精确匹配数据中出现的按键）"""
         key_sets = []
         for alg in algorithms:
-            if alg.analyzer and alg.analyzer.note_matcher:
-                offset_data = alg.analyzer.note_matcher.get_precision_offset_alignment_data()
-                if offset_data:
-                    keys = set(item.get('key_id') for item in offset_data 
-                              if item.get('key_id') is not None)
-                    key_sets.append(keys)
+            frame = alg.plot_frame
+            if frame is not None and frame.precise.any():
+                key_sets.append(frame.precise_key_ids())
         
         if key_sets:
             common_keys = set.intersection(*key_sets)
@@ -2144,137 +2018,68 @@ class MultiAlgorithmPlotGenerator:
             return None
         
         try:
-            # 获取基础数据
-            offset_data = self._get_offset_data(algorithm)
-            if not offset_data:
+            # 精确匹配行（按键排序）
+            frame = algorithm.plot_frame
+            if not frame.precise.any():
                 logger.warning(f"⚠️ 算法 '{metadata['descriptive_name']}' 没有精确匹配数据，跳过")
                 return None
-            
-            # 获取平均延时
-            algorithm_mean_delay_ms = self._calculate_mean_delay(algorithm.analyzer)
-            
-            # 获取匹配对
-            matched_pairs = self._get_matched_pairs(algorithm)
-            record_note_dict, replay_note_dict = self._create_note_dicts(matched_pairs)
+            rows = frame.sort_rows(frame.rows(key_ids=common_keys), frame.key_id)
             
             # 提取延时数据（传递algorithm_name作为唯一标识）
-            delay_data = self._extract_scatter_delay_data(
-                offset_data, record_note_dict, replay_note_dict, 
-                common_keys, metadata['algorithm_name']
-            )
+            delay_data = self._extract_scatter_delay_data(frame, rows, metadata['algorithm_name'])
             
             if not delay_data['key_ids']:
                 logger.warning(f"⚠️ 算法 '{metadata['descriptive_name']}' 没有有效的散点图数据，跳过")
                 return None
             
             # 计算统计量和相对延时
-            stats = self._calculate_scatter_statistics(
-                delay_data['delays_ms'], algorithm.analyzer
-            )
+            stats = self._calculate_scatter_statistics(frame, rows)
             
-            # 合并数据（先合并再排序，因为排序需要relative_delays_ms）
-            result_data = {
+            return {
                 **metadata,
                 **delay_data,
                 **stats,
                 'color': self._get_algorithm_color(alg_idx),
-                'algorithm_mean_delay_ms': algorithm_mean_delay_ms
+                'algorithm_mean_delay_ms': frame.mean_delay_ms
             }
-            
-            # 排序数据
-            self._sort_scatter_data(result_data)
-            
-            return result_data
         except Exception as e:
             logger.warning(f"⚠️ 获取算法 '{metadata['descriptive_name']}' 的按键与延时数据失败: {e}")
             return None
     
-    def _extract_scatter_delay_data(self, offset_data: List[Dict], 
-                                    record_note_dict: Dict, replay_note_dict: Dict,
-                                    common_keys: Optional[set], algorithm_name: str) -> Dict:
-        """提取散点图的延时数据"""
-        key_ids = []
-        delays_ms = []
-        customdata_list = []
-        
-        for item in offset_data:
-            key_id = item.get('key_id')
-            if key_id is None or key_id == 'N/A':
-                continue
-            
-            # 过滤非公共按键
-            if common_keys is not None and key_id not in common_keys:
-                continue
-            
-            try:
-                key_id_int = int(key_id)
-                keyon_offset = item.get('keyon_offset', 0)
-                delay_ms = self._convert_offset_to_ms(keyon_offset)
-                
-                # 获取锤子时间
-                record_index = item.get('record_index')
-                replay_index = item.get('replay_index')
-                record_hammer_time = self._get_hammer_time(record_note_dict, record_index)
-                replay_hammer_time = self._get_hammer_time(replay_note_dict, replay_index)
-
-                # 获取锤速值和持续时间
-                record_velocity = self._get_velocity_from_note_dict(record_note_dict, record_index)
-                replay_velocity = self._get_velocity_from_note_dict(replay_note_dict, replay_index)
-                record_duration = self._get_duration_from_note_dict(record_note_dict, record_index)
-                replay_duration = self._get_duration_from_note_dict(replay_note_dict, replay_index)
-
-                key_ids.append(key_id_int)
-                delays_ms.append(delay_ms)
-                customdata_list.append([
-                    record_index, replay_index, key_id_int, delay_ms,
-                    algorithm_name, record_hammer_time, replay_hammer_time,
-                    record_velocity, replay_velocity, record_duration, replay_duration
-                ])
-            except (ValueError, TypeError):
-                continue
-        
+    def _extract_scatter_delay_data(self, frame: AlgorithmPlotFrame, rows: np.ndarray,
+                                    algorithm_name: str) -> Dict:
+        """
+        提取散点图的延时数据
+
+        customdata: [录制UUID, 播放UUID, 按键ID, 延时, 算法名, 录制锤击时间, 播放锤击时间,
+                     录制锤速, 播放锤速, 录制持续时间, 播放持续时间]
+        """
+        key_ids = frame.key_id[rows].tolist()
+        delays_ms = frame.delay_ms[rows].tolist()
+        # 没有锤击数据的音符锤速记为0（与 Note.first_hammer_velocity 一致）
+        record_velocities = np.nan_to_num(frame.record_velocity[rows]).astype(np.int64).tolist()
+        replay_velocities = np.nan_to_num(frame.replay_velocity[rows]).astype(np.int64).tolist()
+        customdata_list = [
+            list(values) for values in zip(
+                frame.record_uuid[rows].tolist(), frame.replay_uuid[rows].tolist(), key_ids, delays_ms,
+                [algorithm_name] * len(rows),
+                frame.record_hammer_time_ms[rows].tolist(), frame.replay_hammer_time_ms[rows].tolist(),
+                record_velocities, replay_velocities,
+                frame.record_duration_ms[rows].tolist(), frame.replay_duration_ms[rows].tolist()
+            )
+        ]
         return {
             'key_ids': key_ids,
             'delays_ms': delays_ms,
             'customdata': customdata_list
         }
     
-    def _get_hammer_time(self, note_dict: Dict, index: int) -> float:
-        """获取音符的锤子时间"""
-        if index in note_dict:
-            note = note_dict[index]
-            return note.first_hammer_time
-        return 0.0
-
-    def _get_velocity_from_note_dict(self, note_dict: Dict, index: int) -> int:
-        """从音符字典获取锤速值"""
-        if index in note_dict:
-            note = note_dict[index]
-            return note.first_hammer_velocity
-        return 0
-
-    def _get_duration_from_note_dict(self, note_dict: Dict, index: int) -> float:
-        """从音符字典获取持续时间"""
-        if index in note_dict:
-            note = note_dict[index]
-            return note.duration_ms
-        return 0.0
-    
-    def _calculate_scatter_statistics(self, delays_ms: List[float], analyzer) -> Dict:
-        """计算散点图统计量"""
-        # 获取总体统计（复用analyzer方法）
-        me_0_1ms = analyzer.get_mean_error()
-        std_0_1ms = analyzer.get_standard_deviation()
-        mu = me_0_1ms / 10.0
-        sigma = std_0_1ms / 10.0
-        
-        # 计算相对延时
-        delays_array = np.array(delays_ms)
-        relative_delays_array = delays_array - mu
-        relative_delays_ms = relative_delays_array.tolist()
+    def _calculate_scatter_statistics(self, frame: AlgorithmPlotFrame, rows: np.ndarray) -> Dict:
+        """计算散点图统计量（总体均值/标准差取自分析器，阈值按所选行的相对延时计算）"""
+        relative_delays_array = frame.relative_delay_ms[rows]
         
         # 计算相对延时的阈值
-        if len(relative_delays_ms) > 1:
+        if len(rows) > 1:
             relative_mu = np.mean(relative_delays_array)
             relative_sigma = np.std(relative_delays_array, ddof=1)
             upper_threshold = relative_mu + 3 * relative_sigma
@@ -2286,24 +2091,15 @@ class MultiAlgorithmPlotGenerator:
             lower_threshold = 0.0
         
         return {
-            'mu': mu,
-            'sigma': sigma,
-            'relative_delays_ms': relative_delays_ms,
+            'mu': frame.mean_delay_ms,
+            'sigma': frame.std_delay_ms,
+            'relative_delays_ms': relative_delays_array.tolist(),
             'relative_mu': relative_mu,
             'relative_sigma': relative_sigma,
             'upper_threshold': upper_threshold,
             'lower_threshold': lower_threshold
         }
     
-    def _sort_scatter_data(self, data: Dict):
-        """按键ID排序散点图数据"""
-        sorted_indices = sorted(range(len(data['key_ids'])), 
-                               key=lambda i: data['key_ids'][i])
-        data['key_ids'][:] = [data['key_ids'][i] for i in sorted_indices]
-        data['delays_ms'][:] = [data['delays_ms'][i] for i in sorted_indices]
-        data['relative_delays_ms'][:] = [data['relative_delays_ms'][i] for i in sorted_indices]
-        data['customdata'][:] = [data['customdata'][i] for i in sorted_indices]
-    
     def _add_scatter_plot_traces(self, fig: go.Figure, algorithm_data_list: List[Dict]):
         """添加散点图traces"""
         for alg_data in algorithm_data_list:
@@ -2323,7 +2119,7 @@ class MultiAlgorithmPlotGenerator:
             
             fig.add_trace(go.Scattergl(
                 x=key_id_strings,
-                y=alg_data['relative_delays_ms'],
+                y=encode_array(alg_data['relative_delays_ms']),
                 mode='markers',
                 name=f"{alg_data['descriptive_name']} - 匹配对",
                 marker=dict(
@@ -2421,46 +2217,34 @@ class MultiAlgorithmPlotGenerator:
             margin=dict(t=90, b=60, l=60, r=60)
         )
     
-    def _calculate_zscore_values(self, delays_ms: List[float], algorithm) -> Tuple[List[float], float, float]:
+    def _calculate_zscore_values(self, frame: AlgorithmPlotFrame, rows: np.ndarray) -> List[float]:
         """
-        计算Z-Score值
+        计算Z-Score值：z = (x_i - μ) / σ（μ、σ为该算法的总体均值和标准差）
         
         Args:
-            delays_ms: 绝对延时列表（毫秒）
-            algorithm: 算法数据集对象
+            frame: 算法的列式绘图数据
+            rows: 选中的行下标
             
         Returns:
-            Tuple[List[float], float, float]: (Z-Score列表, 均值, 标准差)
-        """
-        # 获取总体均值和标准差（0.1ms单位）
-        me_0_1ms = algorithm.analyzer.get_mean_error()
-        std_0_1ms = algorithm.analyzer.get_standard_deviation()
-        
-        # 转换为ms单位
-        mu = me_0_1ms / 10.0
-        sigma = std_0_1ms / 10.0
-        
-        # 计算Z-Score：z = (x_i - μ) / σ
-        if sigma > 0:
-            delays_array = np.array(delays_ms)
-            z_scores_array = (delays_array - mu) / sigma
-            z_scores = z_scores_array.tolist()
-            
-            logger.info(f"🔍 Z-Score计算: μ={mu:.2f}ms, σ={sigma:.2f}ms, "
-                       f"原始延时范围=[{delays_array.min():.2f}, {delays_array.max():.2f}]ms, "
-                       f"Z-Score范围=[{z_scores_array.min():.2f}, {z_scores_array.max():.2f}]")
+            List[float]: Z-Score列表（标准差为0时全部为0）
+        """
+        if frame.std_delay_ms > 0:
+            if len(rows):
+                delays_array = frame.delay_ms[rows]
+                z_scores_array = frame.zscore[rows]
+                logger.info(f"🔍 Z-Score计算: μ={frame.mean_delay_ms:.2f}ms, σ={frame.std_delay_ms:.2f}ms, "
+                           f"原始延时范围=[{delays_array.min():.2f}, {delays_array.max():.2f}]ms, "
+                           f"Z-Score范围=[{z_scores_array.min():.2f}, {z_scores_array.max():.2f}]")
         else:
-            z_scores = [0.0] * len(delays_ms)
             logger.warning(f"⚠️ 标准差为0，无法进行Z-Score标准化")
-        
-        return z_scores, mu, sigma
+        return frame.zscore[rows].tolist()
     
     def _add_zscore_scatter_traces(self, fig: go.Figure, key_ids: List[int], z_scores: List[float],
                                    customdata_list: List, descriptive_name: str, color: str):
         """添加Z-Score散点图traces"""
         fig.add_trace(go.Scattergl(
             x=[str(kid) for kid in key_ids],
-            y=z_scores,
+            y=encode_array(z_scores),
             mode='markers',
             name=f"{descriptive_name} - Z-Score",
             marker=dict(
@@ -2553,34 +2337,26 @@ class MultiAlgorithmPlotGenerator:
             margin=dict(t=90, b=60, l=60, r=60)
         )
     
-    def _extract_single_key_delays(self, offset_data: List[Dict], target_key_id: int, 
+    def _extract_single_key_delays(self, frame: AlgorithmPlotFrame, target_key_id: int,
                                    filename: str) -> Tuple[List[float], List]:
         """
-        提取单个按键的延时数据
+        提取单个按键的延时数据（精确匹配）
         
         Args:
-            offset_data: 偏移数据列表
+            frame: 算法的列式绘图数据
             target_key_id: 目标按键ID
             filename: 文件名（用于customdata）
             
         Returns:
-            Tuple[List[float], List]: (延时列表, customdata列表)
-        """
-        key_delays = []
-        customdata_list = []
-        
-        for item in offset_data:
-            key_id = item.get('key_id')
-            if key_id == target_key_id:
-                keyon_offset = item.get('keyon_offset', 0)
-                delay_ms = keyon_offset / 10.0  # 转换为ms
-                key_delays.append(delay_ms)
-                
-                # 记录详细信息，用于悬停
-                record_index = item.get('record_index')
-                replay_index = item.get('replay_index')
-                customdata_list.append([record_index, replay_index, delay_ms, filename])
-        
+            Tuple[List[float], List]: (延时列表, customdata列表 [录制UUID, 播放UUID, 延时, 文件名])
+        """
+        rows = frame.rows(key_ids=[target_key_id])
+        key_delays = frame.delay_ms[rows].tolist()
+        customdata_list = [
+            [record_index, replay_index, delay_ms, filename]
+            for record_index, replay_index, delay_ms
+            in zip(frame.record_uuid[rows].tolist(), frame.replay_uuid[rows].tolist(), key_delays)
+        ]
         return key_delays, customdata_list
     
     def _add_box_trace(self, fig: go.Figure, key_delays: List[float], display_name: str,
@@ -2597,7 +2373,7 @@ class MultiAlgorithmPlotGenerator:
             color: 颜色
         """
         fig.add_trace(go.Box(
-            y=key_delays,
+            y=encode_array(key_delays),
             x=[display_name] * len(key_delays),  # X轴为算法名称
             name=display_name,
             boxpoints='all',  # 显示所有点
@@ -2648,78 +2424,48 @@ class MultiAlgorithmPlotGenerator:
             margin=dict(l=60, r=40, t=60, b=40)
         )
     
-    def _extract_hammer_velocity_delay_data(self, matched_pairs: List[Tuple], 
-                                           offset_map: Dict, algorithm_name: str) -> Tuple[List, List, List]:
+    def _extract_hammer_velocity_delay_data(self, frame: AlgorithmPlotFrame, rows: np.ndarray,
+                                           algorithm_name: str) -> Tuple[List, List, List]:
         """
         提取锤速和延时数据
         
         Args:
-            matched_pairs: 匹配对列表
-            offset_map: 偏移数据映射
+            frame: 算法的列式绘图数据
+            rows: 选中的行下标（精确匹配且播放锤速 > 0）
             algorithm_name: 算法唯一标识符（算法名_文件名）
             
         Returns:
-            Tuple[List, List, List]: (锤速列表, 延时列表(ms), customdata列表)
-        """
-        hammer_velocities = []
-        delays_ms = []
-        scatter_customdata = []
-        
-        for record_idx, replay_idx, record_note, replay_note in matched_pairs:
-            # 获取播放音符的锤速（第一个锤速值）
-            if len(replay_note.hammers) > 0 and len(replay_note.hammers.values) > 0:
-                hammer_velocity = replay_note.hammers.values[0]
-            else:
-                continue
-            
-            # 跳过锤速为0或负数的数据点（对数无法处理）
-            if hammer_velocity <= 0:
-                continue
-            
-            # 从偏移数据中获取延时
-            if (record_idx, replay_idx) not in offset_map:
-                continue
-            
-            keyon_offset = offset_map[(record_idx, replay_idx)].get('keyon_offset', 0)
-            delay_ms = self._convert_offset_to_ms(keyon_offset)
-            
-            # 获取按键ID
-            key_id = record_note.id if hasattr(record_note, 'id') else None
-            
-            hammer_velocities.append(hammer_velocity)
-            delays_ms.append(delay_ms)
-            # 使用algorithm_name（完整的唯一标识符）而不是display_name
-            scatter_customdata.append([record_idx, replay_idx, algorithm_name, key_id])
-        
+            Tuple[List, List, List]: (锤速列表, 延时列表(ms), customdata列表 [录制UUID, 播放UUID, 算法名, 按键ID])
+        """
+        hammer_velocities = frame.replay_velocity[rows].tolist()
+        delays_ms = frame.delay_ms[rows].tolist()
+        # 使用algorithm_name（完整的唯一标识符）而不是display_name
+        scatter_customdata = [
+            [record_idx, replay_idx, algorithm_name, key_id]
+            for record_idx, replay_idx, key_id
+            in zip(frame.record_uuid[rows].tolist(), frame.replay_uuid[rows].tolist(), frame.key_id[rows].tolist())
+        ]
         return hammer_velocities, delays_ms, scatter_customdata
     
-    def _calculate_relative_delay_statistics(self, delays_ms: List[float], 
-                                            algorithm) -> Tuple[List[float], Dict]:
+    def _calculate_relative_delay_statistics(self, frame: AlgorithmPlotFrame,
+                                            rows: np.ndarray) -> Tuple[List[float], Dict]:
         """
         计算相对延时统计信息
         
         Args:
-            delays_ms: 绝对延时列表(ms)
-            algorithm: 算法数据集
+            frame: 算法的列式绘图数据
+            rows: 选中的行下标
             
         Returns:
             Tuple[List[float], Dict]: (相对延时列表, 统计信息字典)
         """
-        # 获取该算法的总体均值和标准差
-        me_0_1ms = algorithm.analyzer.get_mean_error() if hasattr(algorithm.analyzer, 'get_mean_error') else 0.0
-        std_0_1ms = algorithm.analyzer.get_standard_deviation() if hasattr(algorithm.analyzer, 'get_standard_deviation') else 0.0
-        
-        mu = me_0_1ms / 10.0  # 总体均值（ms）
-        sigma = std_0_1ms / 10.0  # 总体标准差（ms）
-        
-        # 计算相对延时：绝对延时减去平均延时
-        delays_array = np.array(delays_ms)
-        relative_delays = (delays_array - mu).tolist()
+        # 相对延时：绝对延时减去该算法的总体均值
+        relative_delays_array = frame.relative_delay_ms[rows]
         
         # 计算相对延时的统计值（用于阈值）
-        if len(relative_delays) > 1:
-            relative_mu = np.mean(relative_delays)  # 应该接近0
-            relative_sigma = np.std(relative_delays, ddof=1)  # 样本标准差
+        if len(rows) > 1:
+            relative_mu = np.mean(relative_delays_array)  # 应该接近0
+            relative_sigma = np.std(relative_delays_array, ddof=1)  # 样本标准差
             upper_threshold = relative_mu + 3 * relative_sigma
             lower_threshold = relative_mu - 3 * relative_sigma
         else:
@@ -2729,15 +2475,15 @@ class MultiAlgorithmPlotGenerator:
             lower_threshold = 0.0
         
         statistics = {
-            'mu': mu,
-            'sigma': sigma,
+            'mu': frame.mean_delay_ms,
+            'sigma': frame.std_delay_ms,
             'relative_mu': relative_mu,
             'relative_sigma': relative_sigma,
             'upper_threshold': upper_threshold,
             'lower_threshold': lower_threshold
         }
         
-        return relative_delays, statistics
+        return relative_delays_array.tolist(), statistics
     
     def _add_hammer_velocity_scatter_trace(self, fig: go.Figure, log_velocities: List[float],
                                           relative_delays: List[float], delays_ms: List[float],
@@ -2762,8 +2508,8 @@ class MultiAlgorithmPlotGenerator:
                               in zip(delays_ms, hammer_velocities, scatter_customdata)]
         
         fig.add_trace(go.Scattergl(
-            x=log_velocities,
-            y=relative_delays,
+            x=encode_array(log_velocities),
+            y=encode_array(relative_delays),
             mode='markers',
             name=f"{descriptive_name} - 相对延时",
             marker=dict(
@@ -2782,7 +2528,7 @@ class MultiAlgorithmPlotGenerator:
     
     def _calculate_log_velocity_range(self, ready_algorithms: List) -> Tuple[float, float]:
         """
-        计算所有算法的对数锤速范围
+        计算所有算法的对数锤速范围（全部匹配对中播放锤速 > 0 的数据）
         
         Args:
             ready_algorithms: 准备好的算法列表
@@ -2790,23 +2536,16 @@ class MultiAlgorithmPlotGenerator:
         Returns:
             Tuple[float, float]: (x_min, x_max)
         """
-        all_log_velocities = []
-        
+        log_velocities = []
         for alg in ready_algorithms:
-            try:
-                matched_pairs = self._get_matched_pairs(alg)
-                for record_idx, replay_idx, record_note, replay_note in matched_pairs:
-                    if len(replay_note.hammers) > 0 and len(replay_note.hammers.values) > 0:
-                        vel = replay_note.hammers.values[0]
-                        if vel > 0:
-                            all_log_velocities.append(math.log10(vel))
-            except:
-                continue
+            frame = alg.plot_frame
+            if frame is not None:
+                log_velocities.append(frame.log_velocity[frame.rows(precise_only=False, positive_velocity=True)])
+        all_log_velocities = np.concatenate(log_velocities) if log_velocities else np.empty(0)
         
-        x_min = min(all_log_velocities) if all_log_velocities else 0
-        x_max = max(all_log_velocities) if all_log_velocities else 2
-        
-        return x_min, x_max
+        if not len(all_log_velocities):
+            return 0, 2
+        return float(all_log_velocities.min()), float(all_log_velocities.max())
     
     def _add_relative_delay_threshold_lines(self, fig: go.Figure, x_min: float, x_max: float,
                                            statistics: Dict, descriptive_name: str, color: str):
@@ -2918,8 +2657,8 @@ class MultiAlgorithmPlotGenerator:
                               in zip(delays_ms, hammer_velocities, scatter_customdata)]
         
         fig.add_trace(go.Scattergl(
-            x=log_velocities,
-            y=z_scores,
+            x=encode_array(log_velocities),
+            y=encode_array(z_scores),
             mode='markers',
             name=f'{descriptive_name} - Z-Score',
             marker=dict(
@@ -3024,47 +2763,20 @@ class MultiAlgorithmPlotGenerator:
             margin=dict(t=70, b=60, l=60, r=60)
         )
     
-    def _extract_key_hammer_velocity_data(self, matched_pairs: List[Tuple], 
-                                          offset_map: Dict) -> Tuple[List[int], List[float], List[float]]:
+    def _extract_key_hammer_velocity_data(self, frame: AlgorithmPlotFrame) -> Tuple[List[int], List[float], List[float]]:
         """
-        提取按键ID、锤速和延时数据
+        提取按键ID、锤速和延时数据（精确匹配且播放音符有锤击数据）
         
         Args:
-            matched_pairs: 匹配对列表
-            offset_map: 偏移数据映射
+            frame: 算法的列式绘图数据
             
         Returns:
-            Tuple[List[int], List[float], List[float]]: (按键ID列表, 锤速列表, 延时列表)
+            Tuple[List[int], List[float], List[float]]: (按键ID列表, 锤速列表, 延时绝对值列表)
         """
-        key_ids = []
-        hammer_velocities = []
-        delays_ms = []
-        
-        for record_idx, replay_idx, record_note, replay_note in matched_pairs:
-            key_id = record_note.id
-            
-            # 获取锤速
-            if len(replay_note.hammers) > 0 and len(replay_note.hammers.values) > 0:
-                hammer_velocity = replay_note.hammers.values[0]
-            else:
-                continue
-            
-            # 获取延时
-            if (record_idx, replay_idx) not in offset_map:
-                continue
-            
-            keyon_offset = offset_map[(record_idx, replay_idx)].get('keyon_offset', 0)
-            delay_ms = abs(keyon_offset) / 10.0
-            
-            try:
-                key_id_int = int(key_id)
-                key_ids.append(key_id_int)
-                hammer_velocities.append(hammer_velocity)
-                delays_ms.append(delay_ms)
-            except (ValueError, TypeError):
-                continue
-        
-        return key_ids, hammer_velocities, delays_ms
+        rows = frame.rows(require_hammer=True)
+        return (frame.key_id[rows].tolist(),
+                frame.replay_velocity[rows].tolist(),
+                np.abs(frame.delay_ms[rows]).tolist())
     
     def _add_key_hammer_velocity_scatter_trace(self, fig: go.Figure, key_ids: List[int],
                                                hammer_velocities: List[float], delays_ms: List[float],
@@ -3091,13 +2803,13 @@ class MultiAlgorithmPlotGenerator:
         colorscale = colorscales[alg_idx % len(colorscales)]
         
         fig.add_trace(go.Scattergl(
-            x=key_ids,
-            y=hammer_velocities,
+            x=encode_array(key_ids),
+            y=encode_array(hammer_velocities),
             mode='markers',
             name=f'{descriptive_name}',
             marker=dict(
                 size=8,
-                color=delays_ms,
+                color=encode_array(delays_ms),
                 colorscale=colorscale,
                 colorbar=dict(
                     title=f'{descriptive_name}<br>延时 (ms)',
@@ -3192,12 +2904,19 @@ class MultiAlgorithmPlotGenerator:
         """
         return ALGORITHM_COLOR_PALETTE
 
-    def _process_single_algorithm_data(self, algorithm: AlgorithmDataset) -> Optional[Dict[str, Any]]:
+    @staticmethod
+    def _nan_to_none(values: np.ndarray) -> List[Optional[float]]:
+        """数组转列表，NaN（缺失值）转为None"""
+        return [None if math.isnan(v) else v for v in values.tolist()]
+
+    def _process_single_algorithm_data(self, algorithm: AlgorithmDataset,
+                                       time_range: TimeRange = None) -> Optional[Dict[str, Any]]:
         """
         处理单个算法的时间序列数据
 
         Args:
             algorithm: 算法数据集
+            time_range: 录制时间范围 (ms)
 
         Returns:
             Optional[Dict[str, Any]]: 处理后的数据，包含时间、延时等信息，如果处理失败返回None
@@ -3210,81 +2929,32 @@ class MultiAlgorithmPlotGenerator:
             return None
 
         try:
-            offset_data = algorithm.analyzer.note_matcher.get_precision_offset_alignment_data()
-
-            if not offset_data:
+            # 精确匹配行（按录制时间范围切片），按录制时间排序
+            frame = algorithm.plot_frame
+            rows = frame.sort_rows(frame.rows(time_range=time_range), frame.record_time_ms)
+            if not len(rows):
                 logger.warning(f"⚠️ 算法 '{display_name}' 没有匹配数据，跳过")
                 return None
 
-            # 提取时间和延时数据
-            data_points = []
-
-            for item in offset_data:
-                record_keyon_raw = item.get('record_keyon')  # 单位：0.1ms
-                keyon_offset_raw = item.get('keyon_offset')  # 单位：0.1ms
-                key_id = item.get('key_id')
-                record_index = item.get('record_index')
-                replay_index = item.get('replay_index')
-
-                # 检查数据类型有效性（支持 numpy 类型）
-                record_keyon_is_valid = isinstance(record_keyon_raw, (int, float, np.integer, np.floating))
-                keyon_offset_is_valid = isinstance(keyon_offset_raw, (int, float, np.integer, np.floating))
-
-
-                if not record_keyon_is_valid:
-                    continue
-                if not keyon_offset_is_valid:
-                    continue
-
-                # 使用原始数据
-                record_keyon = record_keyon_raw
-                keyon_offset = keyon_offset_raw
-
-                # 转换为ms单位
-                time_ms = record_keyon / 10.0
-                delay_ms = keyon_offset / 10.0
-
-                data_points.append({
-                    'time': time_ms,
-                    'delay': delay_ms,
-                    'key_id': key_id if key_id is not None else 'N/A',
-                    'record_index': record_index,
-                    'replay_index': replay_index
-                })
-
-            if not data_points:
-                logger.warning(f"算法 '{display_name}' 没有有效时间序列数据，跳过")
-                return None
-
-            # 按时间排序，确保按时间顺序显示
-            data_points.sort(key=lambda x: x['time'])
-
-            # 计算该算法的平均延时
-            me_0_1ms = algorithm.analyzer.get_mean_error() if hasattr(algorithm.analyzer, 'get_mean_error') else 0.0
-            mean_delay = me_0_1ms / 10.0  # 平均延时（ms，带符号）
-
-            # 计算相对延时
-            relative_delays_ms = []
-            for point in data_points:
-                delay_ms = point['delay']
-                relative_delay = delay_ms - mean_delay
-                relative_delays_ms.append(relative_delay)
-
-            # 提取排序后的数据
-            times_ms = [point['time'] for point in data_points]
-            delays_ms = [point['delay'] for point in data_points]
-            replay_times_ms = [point['time'] + point['delay'] for point in data_points]
-            replay_times_offset_ms = [replay_time - mean_delay for replay_time in replay_times_ms]
+            mean_delay = frame.mean_delay_ms  # 平均延时（ms，带符号）
+            times_ms = frame.record_time_ms[rows].tolist()
+            delays_ms = frame.delay_ms[rows].tolist()
+            relative_delays_ms = frame.relative_delay_ms[rows].tolist()
+            replay_times_array = frame.record_time_ms[rows] + frame.delay_ms[rows]
+            replay_times_ms = replay_times_array.tolist()
+            replay_times_offset_ms = (replay_times_array - mean_delay).tolist()
 
             # customdata 包含 [key_id, record_index, replay_index, algorithm_name, 原始延时, 平均延时, 播放时间, 录制时间]
-            customdata_list = [[point['key_id'], point['record_index'], point['replay_index'],
-                               algorithm_name, point['delay'], mean_delay, replay_time, point['time']]
-                              for point, replay_time in zip(data_points, replay_times_ms)]
+            customdata_list = [
+                [key_id, record_index, replay_index, algorithm_name, delay_ms, mean_delay, replay_time, time_ms]
+                for key_id, record_index, replay_index, delay_ms, replay_time, time_ms in zip(
+                    frame.key_id[rows].tolist(), frame.record_uuid[rows].tolist(),
+                    frame.replay_uuid[rows].tolist(), delays_ms, replay_times_ms, times_ms)
+            ]
 
             return {
                 'algorithm_name': algorithm_name,
                 'display_name': display_name,
-                'data_points': data_points,
                 'times_ms': times_ms,
                 'delays_ms': delays_ms,
                 'relative_delays_ms': relative_delays_ms,
@@ -3317,8 +2987,8 @@ class MultiAlgorithmPlotGenerator:
 
         # 添加偏移后的播放音轨散点图（X轴=偏移后的播放时间，Y轴=相对延时）
         fig.add_trace(go.Scattergl(
-            x=replay_times_offset_ms,  # X轴使用偏移后的播放时间（播放时间 - 平均延时）
-            y=relative_delays_ms,  # Y轴使用相对延时
+            x=encode_array(replay_times_offset_ms),  # X轴使用偏移后的播放时间（播放时间 - 平均延时）
+            y=encode_array(relative_delays_ms),  # Y轴使用相对延时
             mode='markers+lines',  # 显示数据点并按时间顺序连接
             name=f'{display_name} (偏移后，平均延时: {mean_delay:.2f}ms)',
             marker=dict(
@@ -3402,7 +3072,8 @@ class MultiAlgorithmPlotGenerator:
                 legendgroup=algorithm_name
             ))
 
-    def _collect_all_relative_delay_data(self, ready_algorithms: List[AlgorithmDataset], colors: List[str], apply_time_offset: bool = False) -> List[Tuple[float, float, List, str, str]]:
+    def _collect_all_relative_delay_data(self, ready_algorithms: List[AlgorithmDataset], colors: List[str], apply_time_offset: bool = False,
+                                         time_range: TimeRange = None) -> List[Tuple[float, float, List, str, str]]:
         """
         收集所有算法的相对延时数据
 
@@ -3410,6 +3081,7 @@ class MultiAlgorithmPlotGenerator:
             ready_algorithms: 就绪的算法列表
             colors: 颜色列表
             apply_time_offset: 是否应用时间轴偏移（减去平均延时）
+            time_range: 录制时间范围 (ms)
 
         Returns:
             List[Tuple[float, float, List, str, str]]: 相对数据列表 (time_ms, relative_delay_ms, customdata, descriptive_name, color)
@@ -3427,53 +3099,33 @@ class MultiAlgorithmPlotGenerator:
                 continue
 
             try:
-                offset_data = algorithm.analyzer.get_precision_offset_alignment_data()
-
-                if not offset_data:
+                frame = algorithm.plot_frame
+                rows = frame.sort_rows(frame.rows(time_range=time_range), frame.record_time_ms)
+                if not len(rows):
                     continue
 
-                # 计算该算法的平均延时（用于相对延时计算）
-                me_0_1ms = algorithm.analyzer.note_matcher.get_mean_error()
-                mean_delay = me_0_1ms / 10.0  # 平均延时（ms）
-
-                # 提取播放音轨数据
-                for item in offset_data:
-                    record_keyon_raw = item.get('record_keyon')
-                    replay_keyon_raw = item.get('replay_keyon')  # 播放时间
-                    key_id = item.get('key_id')
-                    record_index = item.get('record_index')
-                    replay_index = item.get('replay_index')
-                    record_velocity = item.get('record_velocity')
-                    replay_velocity = item.get('replay_velocity')
-                    velocity_diff = item.get('velocity_diff')
-                    relative_delay = item.get('relative_delay', 0)
-
-                    # 类型检查
-                    record_keyon_is_valid = isinstance(record_keyon_raw, (int, float, np.integer, np.floating))
-                    replay_keyon_is_valid = isinstance(replay_keyon_raw, (int, float, np.integer, np.floating))
-
-                    if not record_keyon_is_valid or not replay_keyon_is_valid:
-                        continue
-
-                    # 转换为ms单位
-                    time_ms = record_keyon_raw / 10.0  # X轴：录制时间
-                    replay_time_ms = replay_keyon_raw / 10.0  # 播放时间
-
-                    # 计算相对延时（绝对延时 - 平均延时）
-                    relative_delay_ms = (replay_time_ms - time_ms) - mean_delay
-
-                    # 如果需要时间轴偏移，使用偏移后的播放时间轴
-                    if apply_time_offset:
-                        time_ms = replay_time_ms - mean_delay  # 播放时间 - 平均延时
-                        y_value = relative_delay_ms  # Y轴：相对延时
-                    else:
-                        time_ms = replay_time_ms  # X轴：播放时间
-                        y_value = relative_delay_ms  # Y轴：相对延时
-
-                    # 存储原始时间值（在修改time_ms之前）
-                    original_record_time = record_keyon_raw / 10.0
-                    customdata = [key_id, record_index, replay_index, algorithm_name, replay_time_ms - original_record_time, relative_delay, mean_delay, record_velocity, replay_velocity, velocity_diff, replay_time_ms, original_record_time]
-
+                mean_delay = frame.mean_delay_ms  # 平均延时（ms）
+                record_times = frame.record_time_ms[rows]
+                replay_times = frame.replay_time_ms[rows]
+                # X轴：播放时间；需要时间轴偏移时减去平均延时。Y轴：相对延时（绝对延时 - 平均延时）
+                x_values = (replay_times - mean_delay) if apply_time_offset else replay_times
+                y_values = (replay_times - record_times) - mean_delay
+                record_velocities = frame.record_velocity[rows]
+                replay_velocities = frame.replay_velocity[rows]
+                velocity_diffs = replay_velocities - record_velocities
+
+                columns = zip(
+                    x_values.tolist(), y_values.tolist(), frame.key_id[rows].tolist(),
+                    frame.record_uuid[rows].tolist(), frame.replay_uuid[rows].tolist(),
+                    (replay_times - record_times).tolist(), frame.delay_ms[rows].tolist(),
+                    self._nan_to_none(record_velocities), self._nan_to_none(replay_velocities),
+                    self._nan_to_none(velocity_diffs), replay_times.tolist(), record_times.tolist()
+                )
+                for (time_ms, y_value, key_id, record_index, replay_index, delay_ms, relative_delay,
+                     record_velocity, replay_velocity, velocity_diff, replay_time_ms, record_time_ms) in columns:
+                    customdata = [key_id, record_index, replay_index, algorithm_name, delay_ms, relative_delay,
+                                  mean_delay, record_velocity, replay_velocity, velocity_diff,
+                                  replay_time_ms, record_time_ms]
                     all_relative_data.append((time_ms, y_value, customdata, descriptive_name, color))
 
             except Exception as e:
@@ -3516,8 +3168,8 @@ class MultiAlgorithmPlotGenerator:
                 sorted_customdata = [data['customdata'][i] for i in sorted_indices]
 
                 raw_delay_fig.add_trace(go.Scattergl(
-                    x=sorted_times,
-                    y=sorted_delays,
+                    x=encode_array(sorted_times),
+                    y=encode_array(sorted_delays),
                     mode='markers+lines',
                     name=f'{descriptive_name} (相对延时)',
                     marker=dict(
@@ -3562,13 +3214,15 @@ class MultiAlgorithmPlotGenerator:
 
         return raw_delay_fig
 
-    def _process_all_algorithms_data(self, ready_algorithms: List[AlgorithmDataset], colors: List[str]) -> Tuple[Any, List[Tuple[Dict[str, Any], str]]]:
+    def _process_all_algorithms_data(self, ready_algorithms: List[AlgorithmDataset], colors: List[str],
+                                     time_range: TimeRange = None) -> Tuple[Any, List[Tuple[Dict[str, Any], str]]]:
         """
         处理所有算法的数据并创建相对延时图的traces
 
         Args:
             ready_algorithms: 就绪的算法列表
             colors: 颜色列表
+            time_range: 录制时间范围 (ms)
 
         Returns:
             Tuple[Any, List[Tuple[Dict[str, Any], str]]]: (图表对象, 算法结果列表)
@@ -3581,7 +3235,7 @@ class MultiAlgorithmPlotGenerator:
 
         for alg_idx, algorithm in enumerate(ready_algorithms):
             logger.debug(f"[DEBUG] 处理算法 {alg_idx}: {algorithm.metadata.display_name}")
-            algorithm_data = self._process_single_algorithm_data(algorithm)
+            algorithm_data = self._process_single_algorithm_data(algorithm, time_range)
             if algorithm_data is None:
                 logger.warning(f"[warning] 算法 {algorithm.metadata.display_name} 返回None，跳过")
                 continue
@@ -3609,7 +3263,8 @@ class MultiAlgorithmPlotGenerator:
 
         return fig, algorithm_results
 
-    def _create_multi_algorithm_relative_plot(self, ready_algorithms: List[AlgorithmDataset], colors: List[str], apply_time_offset: bool = False) -> Any:
+    def _create_multi_algorithm_relative_plot(self, ready_algorithms: List[AlgorithmDataset], colors: List[str], apply_time_offset: bool = False,
+                                              time_range: TimeRange = None) -> Any:
         """
         创建多算法相对延时图
 
@@ -3617,22 +3272,25 @@ class MultiAlgorithmPlotGenerator:
             ready_algorithms: 就绪的算法列表
             colors: 颜色列表
             apply_time_offset: 是否应用时间轴偏移
+            time_range: 录制时间范围 (ms)
 
         Returns:
             Any: 相对延时图表对象
         """
-        all_relative_data = self._collect_all_relative_delay_data(ready_algorithms, colors, apply_time_offset)
+        all_relative_data = self._collect_all_relative_delay_data(ready_algorithms, colors, apply_time_offset, time_range)
         return self._create_raw_delay_plot_for_algorithms(all_relative_data)
 
     def generate_multi_algorithm_delay_time_series_plot(
         self,
-        algorithms: List[AlgorithmDataset]
+        algorithms: List[AlgorithmDataset],
+        time_range: TimeRange = None
     ) -> Any:
         """
         生成多算法延时时间序列图（两张相对延时图：播放时间轴对比）
 
         Args:
             algorithms: 激活的算法数据集列表
+            time_range: 录制时间范围 (ms)，在构建trace之前按时间区间索引切片
 
         Returns:
             Dict[str, Any]: 包含上方相对延时图和下方相对延时图的字典
@@ -3659,7 +3317,7 @@ class MultiAlgorithmPlotGenerator:
             colors = self._prepare_algorithm_colors()
 
             # 4. 处理所有算法数据并创建相对延时图
-            fig, algorithm_results = self._process_all_algorithms_data(ready_algorithms, colors)
+            fig, algorithm_results = self._process_all_algorithms_data(ready_algorithms, colors, time_range)
 
             # 检查是否有实际的数据用于绘图
             has_data = any(len(trace.y) > 0 for trace in fig.data) if fig.data else False
@@ -3693,7 +3351,8 @@ class MultiAlgorithmPlotGenerator:
             )
 
             # 6. 创建上方相对延时图（播放时间轴）
-            raw_delay_plot = self._create_multi_algorithm_relative_plot(ready_algorithms, colors, apply_time_offset=False)
+            raw_delay_plot = self._create_multi_algorithm_relative_plot(ready_algorithms, colors, apply_time_offset=False,
+                                                                        time_range=time_range)
             if raw_delay_plot:
                 raw_delay_plot.update_layout(
                     title='相对延时时间序列图（播放时间轴）',
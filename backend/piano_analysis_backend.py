@@ -17,6 +17,10 @@ from dash import html
 # SPMID相关导入
 from spmid.spmid_analyzer import SPMIDAnalyzer
 from backend.file_upload_service import FileUploadService
+from backend.job_scheduler import JobCancelledError
+from backend.memory_manager import ParquetReloadSource
+from backend.analysis_registry import ANALYSIS_CONFIG_HISTORY, make_analysis_key
+from backend.temp_file_cache import TempFileCache, get_temp_file_cache
 
 # 导入各个模块
 from .data_manager import DataManager
@@ -75,7 +79,8 @@ class PianoAnalysisBackend:
         
         # ==================== 临时文件缓存 ====================
         # 用于存储上传的文件二进制数据，减少 dcc.Store 的负载
-        self.temp_file_cache: Dict[str, bytes] = {}
+        # 进程级共享的有界缓存，按会话ID隔离（大文件溢出到磁盘）
+        self.temp_file_cache: TempFileCache = get_temp_file_cache()
         
         logger.debug(f"[DEBUG]PianoAnalysisBackend初始化完成 (Session: {session_id})")
 
@@ -91,6 +96,9 @@ class PianoAnalysisBackend:
         if self.multi_algorithm_manager:
             self.multi_algorithm_manager.clear_all()
         
+        # 清理缓存的图表
+        self.plot_service.invalidate_figures()
+
         # 清理临时文件缓存
         self.clear_temp_cache()
 
@@ -141,17 +149,15 @@ class PianoAnalysisBackend:
     # ==================== 临时文件缓存方法 ====================
     def cache_temp_file(self, file_id: str, content_bytes: bytes) -> None:
         """缓存临时上传的文件"""
-        if file_id and content_bytes:
-            self.temp_file_cache[file_id] = content_bytes
-            logger.debug(f"已缓存临时文件: {file_id}, 大小: {len(content_bytes)} 字节")
+        self.temp_file_cache.put(self.session_id, file_id, content_bytes)
     
     def get_cached_temp_file(self, file_id: str) -> Optional[bytes]:
         """获取缓存的临时文件"""
-        return self.temp_file_cache.get(file_id)
+        return self.temp_file_cache.get(self.session_id, file_id)
     
     def clear_temp_cache(self) -> None:
         """清理临时文件缓存"""
-        self.temp_file_cache.clear()
+        self.temp_file_cache.clear_namespace(self.session_id)
         logger.debug("[DEBUG] 临时文件缓存已清理")
 
     def _analyze_single_algorithm(self, algorithm) -> bool:
@@ -276,12 +282,13 @@ class PianoAnalysisBackend:
         """
         return self.history_manager.process_history_selection(history_id, self)
     
-    async def load_algorithm_from_history(self, record_id: int) -> Tuple[bool, str]:
+    async def load_algorithm_from_history(self, record_id: int, progress_callback=None) -> Tuple[bool, str]:
         """
         从历史记录加载算法到当前会话
         
         Args:
             record_id: 数据库记录 ID
+            progress_callback: 可选的进度回调 progress_callback(stage, fraction)，由 JobScheduler 注入
             
         Returns:
             Tuple[bool, str]: (成功与否, 算法名或错误信息)
@@ -292,35 +299,22 @@ class PianoAnalysisBackend:
             if not record:
                 return False, f"未找到记录 ID: {record_id}"
             
-            # 2. 从 Parquet 加载数据
-            from database.history_manager import ParquetDataLoader
-            tracks = ParquetDataLoader.load_from_record(record)
-            
-            if len(tracks) < 2:
-                return False, "历史数据音轨不足"
-            
-            # 3. 转换为 Note 列表并进行二次过滤 (Ensuring quality criteria for historical data)
-            # 注意：历史数据存储的是 OptimizedNote
-            raw_record_notes = [note.to_standard_note() for note in tracks[0]]
-            raw_replay_notes = [note.to_standard_note() for note in tracks[1]]
-            
-            # 重新应用最新的过滤规则 (User Requirement)
-            from spmid.data_filter import DataFilter
-            data_filter = DataFilter()
-            record_notes, replay_notes, _ = data_filter.filter_notes(raw_record_notes, raw_replay_notes)
-            
-            logger.debug(f"[DEBUG] 从历史加载并重新过滤: 录制({len(raw_record_notes)}->{len(record_notes)}), 播放({len(raw_replay_notes)}->{len(replay_notes)})")
+            # 2. 数据源：从 Parquet 加载，转换为 Note 列表并重新应用最新的过滤规则
+            #    (注意：历史数据存储的是 OptimizedNote；历史加载不重复展示过滤详细日志)
+            source = ParquetReloadSource(self.history_manager, record['file_md5'], apply_loader_filters=False)
 
-            # 4. 生成算法名称 (如果用户没给，用文件名+电机/算法标记)
+            # 3. 生成算法名称 (如果用户没给，用文件名+电机/算法标记)
             display_name = f"{record['filename']}_{record['motor_type']}_{record['algorithm']}"
             
-            # 5. 添加到管理器
+            # 4. 添加到管理器（其他会话已打开同一记录时直接复用分析结果，不再读取 Parquet）
             success, result = await self.multi_algorithm_manager.add_algorithm_async(
                 display_name,
                 record['filename'],
-                record_notes,
-                replay_notes,
-                filter_collector=None # 历史加载通常不重复展示过滤详细日志
+                None,
+                None,
+                progress_callback=progress_callback,
+                analysis_key=make_analysis_key(record['file_md5'], ANALYSIS_CONFIG_HISTORY),
+                data_loader=lambda: source.load(progress_callback)
             )
             
             if success:
@@ -329,10 +323,14 @@ class PianoAnalysisBackend:
                 alg = self.multi_algorithm_manager.get_algorithm(unique_name)
                 if alg:
                     alg.is_active = True
+                    # 内存回收溢出后，按历史加载流程透明重载
+                    alg.reload_source = source
                 return True, unique_name
             else:
                 return False, result
                 
+        except JobCancelledError:
+            raise
         except Exception as e:
             logger.error(f"从历史加载失败: {e}")
             logger.error(traceback.format_exc())
@@ -502,9 +500,13 @@ class PianoAnalysisBackend:
             return 0.0
         return active_algorithms[0].analyzer.get_coefficient_of_variation()
 
-    def generate_delay_time_series_plot(self) -> Any:
-        """生成延时时间序列图（委托给PlotService）"""
-        return self.plot_service.generate_delay_time_series_plot()
+    def generate_delay_time_series_plot(self, time_range: Optional[Tuple[Optional[float], Optional[float]]] = None) -> Any:
+        """生成延时时间序列图（委托给PlotService）
+
+        Args:
+            time_range: 录制时间范围 (开始ms, 结束ms)，None 表示全部
+        """
+        return self.plot_service.generate_delay_time_series_plot(time_range)
     
 
     def generate_delay_histogram_plot(self) -> Any:
@@ -539,15 +541,32 @@ class PianoAnalysisBackend:
         """生成按键与锤速的散点图（委托给PlotService）"""
         return self.plot_service.generate_key_hammer_velocity_scatter_plot()
     
-    def generate_waterfall_plot(self, data_types: List[str] = None, key_ids: List[int] = None, key_filter=None) -> Any:
+    def generate_waterfall_plot(self, data_types: List[str] = None, key_ids: List[int] = None, key_filter=None,
+                                time_range: Optional[Tuple[Optional[float], Optional[float]]] = None) -> Any:
         """生成瀑布图（委托给PlotService）
 
         Args:
             data_types: 要显示的数据类型列表，默认显示所有类型
             key_ids: 要显示的按键ID列表，默认显示所有按键
             key_filter: 按键筛选条件
+            time_range: 时间范围 (开始ms, 结束ms)，None 表示全部
+        """
+        return self.plot_service.generate_waterfall_plot(data_types, key_ids, key_filter, time_range)
+
+    def generate_waterfall_lod_plot(self, data_types: List[str] = None, key_ids: List[int] = None,
+                                    x_range: Optional[Tuple[float, float]] = None,
+                                    y_range: Optional[Tuple[float, float]] = None,
+                                    time_range: Optional[Tuple[Optional[float], Optional[float]]] = None) -> Any:
+        """生成分级显示的瀑布图（委托给PlotService）
+
+        Args:
+            data_types: 要显示的数据类型列表
+            key_ids: 要显示的按键ID列表
+            x_range: 可见时间范围 (ms)，None 表示全部
+            y_range: 可见Y轴范围，None 表示全部
+            time_range: 时间筛选范围 (开始ms, 结束ms)，None 表示全部
         """
-        return self.plot_service.generate_waterfall_plot(data_types, key_ids, key_filter)
+        return self.plot_service.generate_waterfall_lod_plot(data_types, key_ids, x_range, y_range, time_range)
 
     def get_waterfall_key_statistics(self, data_types: List[str] = None) -> Dict[str, Any]:
         """获取瀑布图按键统计信息
@@ -1110,6 +1129,7 @@ class PianoAnalysisBackend:
         if not self.multi_algorithm_manager:
             return False
 
+        self.plot_service.invalidate_figures(algorithm_name)
         return self.multi_algorithm_manager.remove_algorithm(algorithm_name)
     
     def get_all_algorithms(self) -> List[Dict[str, Any]]:
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+列式绘图数据（Plot Frame）
+
+散点图、直方图、箱线图和时间序列图都从同一批匹配对中取数据。以前每个生成器各自遍历匹配对，
+重复构建音符字典和偏移映射；现在每个算法数据集持有一份按需构建、按分析结果版本缓存的列式数据：
+- 每行一个匹配对（与 analyzer.matched_pairs 顺序一致）
+- 每列一个 NumPy 数组（按键、延时、匹配误差、相对延时、Z-Score、锤速、对数锤速、持续时间、UUID 等）
+生成器只需按行下标切片（精确匹配、按键、录制时间范围），再按需排序；评级详情表格也用它筛选和排序。
+"""
+
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+
+from spmid.note_matcher import MatchType
+from utils.logger import Logger
+
+logger = Logger.get_logger()
+
+# 精确匹配（误差 ≤ 50ms）的匹配类型，与 get_precision_offset_alignment_data 一致
+PRECISE_MATCH_TYPES = (MatchType.EXCELLENT, MatchType.GOOD, MatchType.FAIR)
+
+
+class AlgorithmPlotFrame:
+    """
+    单个算法的列式绘图数据
+
+    时间与延时列单位均为 ms；锤速列在音符没有锤击数据时为 NaN，对数锤速在锤速 ≤ 0 时为 NaN。
+    构建后只读，由 AlgorithmDataset.plot_frame 缓存并在分析结果版本变化后重建。
+    """
+
+    def __init__(self, analyzer):
+        """
+        Args:
+            analyzer: SPMIDAnalyzer 实例
+        """
+        self.data_version: int = getattr(analyzer, 'data_version', 0)
+        pairs = list(analyzer.matched_pairs or [])
+        size = len(pairs)
+
+        self.record_uuid = np.empty(size, dtype=object)
+        self.replay_uuid = np.empty(size, dtype=object)
+        self.key_id = np.zeros(size, dtype=np.int64)
+        self.precise = np.zeros(size, dtype=bool)
+        self.error_ms = np.zeros(size)
+        record_keyon = np.zeros(size)
+        replay_keyon = np.zeros(size)
+        self.record_velocity = np.full(size, np.nan)
+        self.replay_velocity = np.full(size, np.nan)
+        self.record_hammer_time_ms = np.zeros(size)
+        self.replay_hammer_time_ms = np.zeros(size)
+        self.record_duration_ms = np.zeros(size)
+        self.replay_duration_ms = np.zeros(size)
+
+        for i, (record_note, replay_note, match_type, error_ms) in enumerate(pairs):
+            self.record_uuid[i] = getattr(record_note, 'uuid', f"rec_{i}")
+            self.replay_uuid[i] = getattr(replay_note, 'uuid', f"rep_{i}")
+            self.key_id[i] = int(record_note.id)
+            self.precise[i] = match_type in PRECISE_MATCH_TYPES
+            self.error_ms[i] = error_ms
+            # 与偏移对齐数据相同：先换算为 0.1ms 再求差，保证延时数值完全一致
+            record_keyon[i] = (record_note.key_on_ms or 0.0) * 10.0
+            replay_keyon[i] = (replay_note.key_on_ms or 0.0) * 10.0
+            self.record_velocity[i] = self._first_hammer_velocity(record_note)
+            self.replay_velocity[i] = self._first_hammer_velocity(replay_note)
+            self.record_hammer_time_ms[i] = record_note.first_hammer_time
+            self.replay_hammer_time_ms[i] = replay_note.first_hammer_time
+            self.record_duration_ms[i] = record_note.duration_ms
+            self.replay_duration_ms[i] = replay_note.duration_ms
+
+        self.record_time_ms = record_keyon / 10.0
+        self.replay_time_ms = replay_keyon / 10.0
+        self.delay_ms = (replay_keyon - record_keyon) / 10.0
+
+        # 总体统计（0.1ms -> ms），与分析器的 ME / 标准差一致
+        self.mean_delay_ms: float = analyzer.get_mean_error() / 10.0
+        self.std_delay_ms: float = analyzer.get_standard_deviation() / 10.0
+        self.relative_delay_ms = self.delay_ms - self.mean_delay_ms
+        if self.std_delay_ms > 0:
+            self.zscore = self.relative_delay_ms / self.std_delay_ms
+        else:
+            self.zscore = np.zeros(size)
+
+        self.has_replay_hammer = ~np.isnan(self.replay_velocity)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.log_velocity = np.where(self.replay_velocity > 0, np.log10(self.replay_velocity), np.nan)
+
+    def __len__(self) -> int:
+        return len(self.key_id)
+
+    @staticmethod
+    def _first_hammer_velocity(note) -> float:
+        hammers = getattr(note, 'hammers', None)
+        if hammers is None or len(hammers.values) == 0:
+            return np.nan
+        return float(hammers.values[0])
+
+    # ==================== 切片 ====================
+
+    def rows(self, precise_only: bool = True, key_ids: Optional[Iterable[int]] = None,
+             time_range: Optional[Tuple[Optional[float], Optional[float]]] = None,
+             require_hammer: bool = False, positive_velocity: bool = False) -> np.ndarray:
+        """
+        选出满足条件的行下标（保持匹配对顺序）
+
+        Args:
+            precise_only: 只保留精确匹配（≤50ms）
+            key_ids: 只保留这些按键，None 表示全部按键
+            time_range: 录制按下时间范围 (ms)，两端包含，None 端点表示不限制
+            require_hammer: 只保留播放音符有锤击数据的行
+            positive_velocity: 只保留播放锤速 > 0 的行（对数坐标）
+        """
+        mask = self.precise.copy() if precise_only else np.ones(len(self), dtype=bool)
+        if key_ids is not None:
+            mask &= np.isin(self.key_id, np.fromiter((int(k) for k in key_ids), dtype=np.int64))
+        if time_range:
+            start_ms, end_ms = time_range
+            if start_ms is not None:
+                mask &= self.record_time_ms >= start_ms
+            if end_ms is not None:
+                mask &= self.record_time_ms <= end_ms
+        if require_hammer:
+            mask &= self.has_replay_hammer
+        if positive_velocity:
+            mask &= ~np.isnan(self.log_velocity)
+        return np.flatnonzero(mask)
+
+    def sort_rows(self, rows: np.ndarray, column: np.ndarray) -> np.ndarray:
+        """按列值稳定排序行下标（相同值保持匹配对顺序）"""
+        return rows[np.argsort(column[rows], kind='stable')]
+
+    def precise_key_ids(self) -> set:
+        """精确匹配涉及的按键集合"""
+        return set(np.unique(self.key_id[self.precise]).tolist())
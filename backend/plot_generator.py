@@ -4,13 +4,11 @@
 """
 绘图和图像生成模块
 负责瀑布图生成、音符对比图、错误音符图像等
+
+matplotlib 只用于少数静态图像，在使用处导入，避免拖慢应用启动。
 """
 import dash
 from dash import dcc
-import matplotlib.pyplot as plt
-import matplotlib.font_manager as fm
-import matplotlib.cm as cm
-import matplotlib.colors as mcolors
 import base64
 import io
 import math
@@ -102,6 +100,7 @@ class PlotGenerator:
         Returns:
             str: Base64编码的图像
         """
+        import matplotlib.pyplot as plt
         try:
             # 将当前图表保存到内存缓冲区
             buffer = io.BytesIO()
@@ -127,6 +126,7 @@ class PlotGenerator:
         Returns:
             str: Base64编码的错误图像
         """
+        import matplotlib.pyplot as plt
         try:
             fig, ax = plt.subplots(figsize=(8, 6))
             ax.text(0.5, 0.5, f"错误: {error_msg}", 
@@ -308,6 +308,8 @@ class PlotGenerator:
     
     def _generate_key_colors(self, n_keys):
         """为按键生成颜色"""
+        import matplotlib.cm as cm
+        import matplotlib.colors as mcolors
         if n_keys <= 20:
             colors = cm.get_cmap('tab20')(np.linspace(0, 1, n_keys))
         else:
@@ -3,9 +3,11 @@
 
 将绘图逻辑从 PianoAnalysisBackend 中分离，提供清晰的绘图服务接口
 """
-from typing import Any, Dict, List, Optional, Tuple, Union
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 import logging
 
+from backend.figure_cache import FigureCache
+
 logger = logging.getLogger(__name__)
 
 
@@ -28,6 +30,12 @@ class PlotService:
         """
         self.backend = backend
         self.logger = logger
+        # 瀑布图分级显示数据：(筛选条件键, WaterfallLOD)，缩放时复用
+        self._waterfall_lod: Optional[Tuple[Tuple, Any]] = None
+        # 图表缓存（键含激活算法集合、数据版本、按键过滤和参数，见 backend.figure_cache）
+        self.figure_cache = FigureCache()
+        # 上次看到的各算法数据版本，版本变化时丢弃依赖旧版本的缓存图表
+        self._dataset_versions: Dict[str, int] = {}
     
     # ==================== 属性代理与辅助 ====================
     
@@ -65,15 +73,85 @@ class PlotService:
     def _get_current_analyzer(self, algorithm_name: Optional[str] = None):
         """获取当前分析器"""
         return self.backend._get_current_analyzer(algorithm_name)
+
+    # ==================== 图表缓存 ====================
+
+    def _cached_figure(self, plot_type: str, algs: List[Any], factory: Callable[[], Any], *params) -> Any:
+        """
+        从图表缓存获取图表，未命中时调用 factory 生成
+
+        切换算法（激活集合变化）、应用按键过滤都会得到新的缓存键；
+        重新分析/重新匹配使算法数据版本变化，依赖旧版本的图表被丢弃。
+
+        Args:
+            plot_type: 图表类型
+            algs: 激活的算法列表
+            factory: 生成图表的无参函数
+            *params: 影响图表内容的其他参数
+        """
+        versions = tuple((alg.metadata.algorithm_name, alg.data_version) for alg in algs)
+        self._discard_stale_figures(versions)
+        key_filter = self.backend.key_filter.key_filter if self.backend.key_filter else None
+        key = (
+            plot_type,
+            tuple((alg.metadata.algorithm_name, alg.metadata.display_name, alg.color, alg.data_version)
+                  for alg in algs),
+            tuple(sorted(key_filter or ())),
+            _freeze(params),
+        )
+        figure = self.figure_cache.get(key)
+        if figure is not None:
+            self.logger.debug(f"图表缓存命中: {plot_type}")
+            return figure
+        figure = factory()
+        if figure is not None:
+            # 生成过程中可能触发溢出数据重新加载（数据版本变化），按生成后的版本缓存
+            current = tuple((alg.metadata.algorithm_name, alg.data_version) for alg in algs)
+            if current == versions:
+                self.figure_cache.put(key, figure, versions)
+            else:
+                self._discard_stale_figures(current)
+        return figure
+
+    def _discard_stale_figures(self, versions: Tuple[Tuple[str, int], ...]) -> None:
+        """丢弃依赖已过期数据版本的缓存图表（算法重新分析后调用）"""
+        stale = []
+        for name, version in versions:
+            previous = self._dataset_versions.get(name)
+            if previous is not None and previous != version:
+                stale.append((name, previous))
+            self._dataset_versions[name] = version
+        if stale:
+            dropped = self.figure_cache.discard_versions(stale)
+            self.logger.info(f"算法数据已更新，丢弃 {dropped} 个缓存图表")
+
+    def invalidate_figures(self, algorithm_name: Optional[str] = None) -> None:
+        """
+        丢弃缓存的图表与瀑布图分级显示数据（移除算法或清空数据时调用）
+
+        Args:
+            algorithm_name: 只丢弃依赖该算法的图表，None 表示全部
+        """
+        self._waterfall_lod = None
+        if algorithm_name is None:
+            self.figure_cache.clear()
+            self._dataset_versions.clear()
+            return
+        version = self._dataset_versions.pop(algorithm_name, None)
+        if version is not None:
+            self.figure_cache.discard_versions([(algorithm_name, version)])
     
     # ==================== 时间序列与分布图 ====================
     
-    def generate_delay_time_series_plot(self) -> Any:
+    def generate_delay_time_series_plot(self, time_range: Optional[Tuple[Optional[float], Optional[float]]] = None) -> Any:
         """
         生成延时时间序列图（支持单算法和多算法模式）
         x轴：时间（record_keyon，转换为ms）
         y轴：延时（keyon_offset，转换为ms）
         数据来源：所有已匹配的按键对，按时间顺序排列
+
+        Args:
+            time_range: 录制时间范围 (开始ms, 结束ms)，None 表示全部
         """
         algs = self._get_active_algs()
 
@@ -84,8 +162,10 @@ class PlotService:
             }
 
         self.logger.info(f"处理 {len(algs)} 个激活算法")
-        return self.multi_plot_gen.generate_multi_algorithm_delay_time_series_plot(
-            algs
+        return self._cached_figure(
+            'delay_time_series', algs,
+            lambda: self.multi_plot_gen.generate_multi_algorithm_delay_time_series_plot(algs, time_range),
+            time_range
         )
 
     def generate_delay_histogram_plot(self) -> Any:
@@ -98,12 +178,16 @@ class PlotService:
         - 与阈值设定（20/50ms）对应
         """
         res = self._get_active_algs_or_empty_plot()
-        return self.multi_plot_gen.generate_multi_algorithm_delay_histogram_plot(res) if isinstance(res, list) else res
+        if not isinstance(res, list): return res
+        return self._cached_figure(
+            'delay_histogram', res, lambda: self.multi_plot_gen.generate_multi_algorithm_delay_histogram_plot(res))
 
     def generate_offset_alignment_plot(self) -> Any:
         """生成偏移对齐分析柱状图 - 键位为横坐标，中位数、均值、标准差为纵坐标，分4个子图显示（支持单算法和多算法模式）"""
         res = self._get_active_algs_or_empty_plot()
-        return self.multi_plot_gen.generate_multi_algorithm_offset_alignment_plot(res) if isinstance(res, list) else {}
+        if not isinstance(res, list): return {}
+        return self._cached_figure(
+            'offset_alignment', res, lambda: self.multi_plot_gen.generate_multi_algorithm_offset_alignment_plot(res))
 
     # ==================== 散点图 ====================
     
@@ -115,7 +199,10 @@ class PlotService:
         点的颜色：根据延时大小着色（深蓝→浅蓝→绿→黄→橙→红）
         """
         res = self._get_active_algs_or_empty_plot()
-        return self.multi_plot_gen.generate_multi_algorithm_key_delay_zscore_scatter_plot(res) if isinstance(res, list) else res
+        if not isinstance(res, list): return res
+        return self._cached_figure(
+            'key_delay_zscore_scatter', res,
+            lambda: self.multi_plot_gen.generate_multi_algorithm_key_delay_zscore_scatter_plot(res))
 
     def generate_single_key_delay_comparison_plot(self, key_id: int) -> Any:
         """
@@ -125,7 +212,10 @@ class PlotService:
             key_id: 要对比的按键ID
         """
         res = self._get_active_algs_or_empty_plot()
-        return self.multi_plot_gen.generate_single_key_delay_comparison_plot(res, key_id) if isinstance(res, list) else res
+        if not isinstance(res, list): return res
+        return self._cached_figure(
+            'single_key_delay_comparison', res,
+            lambda: self.multi_plot_gen.generate_single_key_delay_comparison_plot(res, key_id), key_id)
 
     def generate_key_delay_scatter_plot(
         self, 
@@ -141,8 +231,11 @@ class PlotService:
         """
         res = self._get_active_algs_or_empty_plot()
         if not isinstance(res, list): return res
-        return self.multi_plot_gen.generate_multi_algorithm_key_delay_scatter_plot(
-            res, only_common_keys=only_common_keys, selected_algorithm_names=selected_algorithm_names)
+        return self._cached_figure(
+            'key_delay_scatter', res,
+            lambda: self.multi_plot_gen.generate_multi_algorithm_key_delay_scatter_plot(
+                res, only_common_keys=only_common_keys, selected_algorithm_names=selected_algorithm_names),
+            only_common_keys, selected_algorithm_names)
 
     def generate_hammer_velocity_delay_scatter_plot(self) -> Any:
         """
@@ -151,7 +244,10 @@ class PlotService:
         y轴：延时（keyon_offset，转换为ms）
         """
         res = self._get_active_algs_or_empty_plot()
-        return self.multi_plot_gen.generate_multi_algorithm_hammer_velocity_delay_scatter_plot(res) if isinstance(res, list) else res
+        if not isinstance(res, list): return res
+        return self._cached_figure(
+            'hammer_velocity_delay_scatter', res,
+            lambda: self.multi_plot_gen.generate_multi_algorithm_hammer_velocity_delay_scatter_plot(res))
 
     def generate_hammer_velocity_relative_delay_scatter_plot(self) -> Any:
         """
@@ -160,7 +256,10 @@ class PlotService:
         y轴：相对延时（去除平均延时后的延时）
         """
         res = self._get_active_algs_or_empty_plot()
-        return self.multi_plot_gen.generate_multi_algorithm_hammer_velocity_relative_delay_scatter_plot(res) if isinstance(res, list) else res
+        if not isinstance(res, list): return res
+        return self._cached_figure(
+            'hammer_velocity_relative_delay_scatter', res,
+            lambda: self.multi_plot_gen.generate_multi_algorithm_hammer_velocity_relative_delay_scatter_plot(res))
 
     def generate_key_hammer_velocity_scatter_plot(self) -> Any:
         """
@@ -170,7 +269,10 @@ class PlotService:
         点的颜色：根据延时大小着色
         """
         res = self._get_active_algs_or_empty_plot()
-        return self.multi_plot_gen.generate_multi_algorithm_key_hammer_velocity_scatter_plot(res) if isinstance(res, list) else res
+        if not isinstance(res, list): return res
+        return self._cached_figure(
+            'key_hammer_velocity_scatter', res,
+            lambda: self.multi_plot_gen.generate_multi_algorithm_key_hammer_velocity_scatter_plot(res))
 
     def generate_key_force_interaction_plot(self) -> Any:
         """
@@ -189,13 +291,15 @@ class PlotService:
 
     # ==================== 瀑布图 ====================
     
-    def generate_waterfall_plot(self, data_types: List[str] = None, key_ids: List[int] = None, key_filter=None) -> Any:
+    def generate_waterfall_plot(self, data_types: List[str] = None, key_ids: List[int] = None, key_filter=None,
+                                time_range: Optional[Tuple[Optional[float], Optional[float]]] = None) -> Any:
         """生成瀑布图（根据SPMID文件数量自动处理）
 
         Args:
             data_types: 要显示的数据类型列表，默认显示所有类型
             key_ids: 要显示的按键ID列表，默认显示所有按键
             key_filter: 按键筛选条件
+            time_range: 时间范围 (开始ms, 结束ms)，None 表示全部
         """
         algs = self._get_active_algs()
         if not algs: return self.plot_generator._create_empty_plot("没有激活的算法")
@@ -206,15 +310,78 @@ class PlotService:
         k_filter = key_filter or (self.backend.key_filter.key_filter if self.backend.key_filter else None)
         
         self.logger.info(f"处理 {len(algs)} 个SPMID文件，数据类型: {data_types}，按键ID: {key_ids}")
-        return self.multi_plot_gen.generate_unified_waterfall_plot(
-            self.backend,                # 后端实例
-            analyzers,                   # 分析器列表
-            names,             # 算法名称列表
-            k_filter,  # 按键过滤器
-            data_types,                 # 数据类型选择
-            key_ids                     # 按键ID选择
+        return self._cached_figure(
+            'waterfall', algs,
+            lambda: self.multi_plot_gen.generate_unified_waterfall_plot(
+                self.backend,                # 后端实例
+                analyzers,                   # 分析器列表
+                names,             # 算法名称列表
+                k_filter,  # 按键过滤器
+                data_types,                 # 数据类型选择
+                key_ids,                    # 按键ID选择
+                time_range                  # 时间范围选择
+            ),
+            data_types, key_ids, k_filter, time_range
         )
 
+    def generate_waterfall_lod_plot(self, data_types: List[str] = None, key_ids: List[int] = None,
+                                    x_range: Optional[Tuple[float, float]] = None,
+                                    y_range: Optional[Tuple[float, float]] = None,
+                                    time_range: Optional[Tuple[Optional[float], Optional[float]]] = None) -> Any:
+        """生成分级显示（LOD）的瀑布图
+
+        全局视图为按键占用密度图；x_range/y_range 为缩放后的可见窗口，窗口内bar足够少时显示精确bar。
+
+        Args:
+            data_types: 要显示的数据类型列表
+            key_ids: 要显示的按键ID列表
+            x_range: 可见时间范围 (ms)，None 表示全部
+            y_range: 可见Y轴范围，None 表示全部
+            time_range: 时间筛选范围 (开始ms, 结束ms)，只有该范围内的事件参与分级显示
+        """
+        algs = [alg for alg in self._get_active_algs() if alg.analyzer]
+        if not algs:
+            return self.plot_generator._create_empty_plot("没有激活的算法")
+
+        def build():
+            lod = self._get_waterfall_lod(data_types, key_ids, time_range)
+            if lod is None:
+                return self.plot_generator._create_empty_plot("没有激活的算法")
+            if not lod.total_bars:
+                return self.plot_generator._create_empty_plot("没有有效的数据点")
+            return lod.figure(x_range, y_range)
+
+        return self._cached_figure('waterfall_lod', algs, build, data_types, key_ids, x_range, y_range, time_range)
+
+    def _get_waterfall_lod(self, data_types: List[str] = None, key_ids: List[int] = None,
+                           time_range: Optional[Tuple[Optional[float], Optional[float]]] = None):
+        """获取（或构建并缓存）当前筛选条件的瀑布图分级显示数据"""
+        from backend.waterfall_lod import WaterfallLOD
+
+        algs = [alg for alg in self._get_active_algs() if alg.analyzer]
+        if not algs:
+            return None
+
+        # 数据版本变化（重新分析/切换算法）或筛选条件变化时重建
+        cache_key = (
+            tuple((alg.metadata.algorithm_name, alg.data_version) for alg in algs),
+            tuple(data_types or ()),
+            tuple(key_ids or ()),
+            tuple(time_range or ()),
+        )
+        if self._waterfall_lod is not None and self._waterfall_lod[0] == cache_key:
+            return self._waterfall_lod[1]
+
+        analyzers = [alg.analyzer for alg in algs]
+        names = [alg.metadata.algorithm_name for alg in algs]
+        all_bars_by_algorithm, is_multi_file = self.multi_plot_gen.collect_waterfall_bars(
+            self.backend, analyzers, names, data_types, key_ids, time_range
+        )
+        lod = WaterfallLOD(self.multi_plot_gen, all_bars_by_algorithm, is_multi_file)
+        self._waterfall_lod = (cache_key, lod)
+        self.logger.info(f"瀑布图分级显示数据已构建: {lod.total_bars} 个bars")
+        return lod
+
     def get_waterfall_key_statistics(self, data_types: List[str] = None) -> Dict[str, Any]:
         """获取瀑布图按键统计信息
         
@@ -395,4 +562,18 @@ class PlotService:
             plotly Figure对象
         """
         res = self._get_active_algs_or_empty_plot()
-        return self.multi_plot_gen.generate_relative_delay_distribution_plot(res) if isinstance(res, list) else res
+        if not isinstance(res, list): return res
+        return self._cached_figure(
+            'relative_delay_distribution', res,
+            lambda: self.multi_plot_gen.generate_relative_delay_distribution_plot(res))
+
+
+def _freeze(value: Any) -> Any:
+    """将参数转换为可哈希的缓存键（list/set/dict 转为 tuple）"""
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted(_freeze(v) for v in value))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+历史记录摘要指标
+
+为每条历史记录预先计算一份摘要（音符数、评级分布、ME/MAE/标准差、错误数、时长），
+写入历史数据库的摘要表，历史列表无需重新分析即可显示和排序质量指标：
+- 上传分析完成后，由历史写入队列保存摘要（排在记录保存之后，保证记录已存在）
+- 后台回填线程为尚无摘要的旧记录补算（独立于 JobScheduler，有用户任务时暂停）
+"""
+
+import threading
+import time
+from typing import Any, Callable, List, Optional
+
+from database.history_manager import RecordSummary
+from utils.logger import Logger
+
+logger = Logger.get_logger()
+
+# 回填任务每批处理的记录数
+BACKFILL_BATCH_SIZE = 50
+# 后台回填线程在有用户任务时的等待轮询间隔（秒）
+BACKFILL_IDLE_POLL_S = 1.0
+
+
+def compute_record_summary(analyzer: Any, record_data: List[Any]) -> RecordSummary:
+    """
+    根据分析结果计算记录摘要
+
+    Args:
+        analyzer: 已完成分析的 SPMIDAnalyzer
+        record_data: 录制音符列表（用于计算时长）
+
+    Returns:
+        RecordSummary: 摘要指标（时间类指标单位为 ms）
+    """
+    stats = analyzer.get_analysis_stats()
+    graded = analyzer.note_matcher.get_graded_error_stats() if analyzer.note_matcher else {}
+    record_notes = stats.get('total_record_notes', 0)
+    matched = stats.get('matched_pairs', 0)
+
+    key_ons = [note.key_on_ms for note in record_data if note.key_on_ms]
+    key_offs = [note.key_off_ms for note in record_data if note.key_off_ms]
+    duration_ms = (max(key_offs) - min(key_ons)) if key_ons and key_offs else 0.0
+
+    def _grade(level: str) -> int:
+        return int(graded.get(level, {}).get('count', 0))
+
+    # 分析器的误差指标单位为 0.1ms
+    return RecordSummary(
+        record_note_count=record_notes,
+        replay_note_count=stats.get('total_replay_notes', 0),
+        matched_pairs=matched,
+        match_rate=(matched / record_notes * 100) if record_notes else 0.0,
+        drop_hammers=stats.get('drop_hammers', 0),
+        multi_hammers=stats.get('multi_hammers', 0),
+        abnormal_matches=len(getattr(analyzer, 'abnormal_matches', None) or []),
+        record_invalid_notes=stats.get('record_invalid_notes', 0),
+        replay_invalid_notes=stats.get('replay_invalid_notes', 0),
+        grade_excellent=_grade('excellent'),
+        grade_good=_grade('good'),
+        grade_fair=_grade('fair'),
+        grade_poor=_grade('poor'),
+        grade_severe=_grade('severe'),
+        mean_error_ms=analyzer.get_mean_error() / 10.0,
+        mae_ms=analyzer.get_mean_absolute_error() / 10.0,
+        std_ms=analyzer.get_standard_deviation() / 10.0,
+        rmse_ms=analyzer.get_root_mean_squared_error() / 10.0,
+        duration_ms=max(0.0, duration_ms),
+    )
+
+
+def save_summary_for_md5(history_manager, file_md5: str, summary: RecordSummary) -> Optional[int]:
+    """
+    按文件 MD5 保存摘要（记录不存在时跳过）
+
+    Returns:
+        Optional[int]: 记录 ID，记录不存在时返回 None
+    """
+    record = history_manager.get_record_by_md5(file_md5)
+    if not record:
+        logger.warning(f"⚠️ 保存摘要失败：历史记录不存在 (MD5={file_md5})")
+        return None
+    history_manager.save_summary(record['id'], summary)
+    logger.debug(f"📊 记录摘要已保存: ID={record['id']}")
+    return record['id']
+
+
+def backfill_record_summaries(history_manager, limit: Optional[int] = None,
+                              progress_callback=None, wait_for_idle: Optional[Callable[[], None]] = None):
+    """
+    为尚无摘要的历史记录补算摘要（由 start_summary_backfill 在后台线程中调用）
+
+    使用与上传相同的过滤流程重新分析，保证与保存时计算的摘要一致。
+    单条记录失败只记录日志，不影响其他记录。
+
+    Args:
+        history_manager: 历史记录管理器
+        limit: 最多处理的记录数（None 表示全部）
+        progress_callback: 可选的进度回调 progress_callback(stage, fraction)，同时作为取消检查点
+        wait_for_idle: 可选，每条记录开始前调用，阻塞到可以继续（用于给用户任务让出资源）
+
+    Returns:
+        Tuple[bool, int]: (是否成功, 成功回填的记录数)
+    """
+    from backend.memory_manager import ParquetReloadSource
+    from spmid.spmid_analyzer import SPMIDAnalyzer
+
+    pending = history_manager.get_records_without_summary(limit=limit or BACKFILL_BATCH_SIZE)
+    failed_ids = set()
+    filled = 0
+    while pending:
+        for record in pending:
+            if wait_for_idle:
+                wait_for_idle()
+            if progress_callback:
+                progress_callback('stats', filled / max(filled + len(pending), 1))
+            try:
+                source = ParquetReloadSource(history_manager, record['file_md5'], apply_loader_filters=True)
+                record_data, replay_data, filter_collector = source.load()
+                analyzer = SPMIDAnalyzer()
+                analyzer.analyze(record_data, replay_data, filter_collector)
+                history_manager.save_summary(record['id'], compute_record_summary(analyzer, record_data))
+                filled += 1
+            except Exception as e:
+                failed_ids.add(record['id'])
+                logger.warning(f"⚠️ 记录摘要回填失败 (ID={record['id']}): {e}")
+
+        if limit is not None and filled + len(failed_ids) >= limit:
+            break
+        # 下一批（跳过本次已失败的记录，避免重复尝试）
+        pending = [r for r in history_manager.get_records_without_summary(
+            limit=BACKFILL_BATCH_SIZE + len(failed_ids)) if r['id'] not in failed_ids][:BACKFILL_BATCH_SIZE]
+
+    if filled or failed_ids:
+        logger.info(f"📊 记录摘要回填完成: 成功 {filled} 条, 失败 {len(failed_ids)} 条")
+    return True, filled
+
+
+def start_summary_backfill(history_manager, job_scheduler) -> threading.Thread:
+    """
+    在独立的低优先级线程中回填摘要
+
+    回填会重新解析并分析每条缺少摘要的记录，升级后归档较大时可能持续很久；
+    不占用 JobScheduler 的分析工作线程，并且每条记录开始前等待所有用户任务（上传、历史加载）结束。
+
+    Args:
+        history_manager: 历史记录管理器
+        job_scheduler: 用户任务调度器（用于判断是否空闲）
+
+    Returns:
+        threading.Thread: 已启动的回填线程（守护线程）
+    """
+    def wait_for_idle() -> None:
+        while job_scheduler.has_unfinished_jobs():
+            time.sleep(BACKFILL_IDLE_POLL_S)
+
+    def run() -> None:
+        try:
+            backfill_record_summaries(history_manager, wait_for_idle=wait_for_idle)
+        except Exception as e:
+            logger.error(f"❌ 记录摘要回填失败: {e}")
+
+    thread = threading.Thread(target=run, name="summary-backfill", daemon=True)
+    thread.start()
+    return thread
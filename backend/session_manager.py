@@ -11,9 +11,9 @@ import uuid
 import time
 import threading
 import os
-from typing import Dict, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 from backend.piano_analysis_backend import PianoAnalysisBackend
-import os
+from backend.memory_manager import estimate_backend_bytes
 from utils.logger import Logger
 
 logger = Logger.get_logger()
@@ -27,17 +27,19 @@ class SessionManager:
     每个会话都有独立的backend实例，确保数据隔离。
     """
     
-    def __init__(self, history_manager):
+    def __init__(self, history_manager, job_scheduler=None):
         """
         初始化会话管理器
         
         Args:
             history_manager: 全局历史管理器实例
+            job_scheduler: 后台任务调度器（移除会话时取消该会话未结束的任务）
         """
         self.history_manager = history_manager
+        self.job_scheduler = job_scheduler
         self.backends: Dict[str, PianoAnalysisBackend] = {}  # session_id -> backend
         self.session_activity: Dict[str, float] = {}  # session_id -> last_activity_time
-        self.lock = threading.Lock()  # 线程锁，确保线程安全
+        self.lock = threading.RLock()  # 可重入锁：cleanup_inactive_sessions 内部会调用 remove_session
         # 只在主进程中记录初始化日志（避免Flask debug模式下的重复日志）
         if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
             logger.info("SessionManager初始化完成")
@@ -79,7 +81,11 @@ class SessionManager:
             Optional[PianoAnalysisBackend]: 后端实例，如果不存在则返回None
         """
         with self.lock:
-            return self.backends.get(session_id)
+            backend = self.backends.get(session_id)
+            if backend is not None:
+                # 记录活动时间（内存回收按会话最近活动时间做 LRU）
+                self.session_activity[session_id] = time.time()
+            return backend
     
     def remove_session(self, session_id: str) -> bool:
         """
@@ -93,7 +99,14 @@ class SessionManager:
         """
         with self.lock:
             if session_id in self.backends:
-                del self.backends[session_id]
+                # 共享分析结果与临时上传缓存为进程级共享，需显式释放该会话持有的引用
+                backend = self.backends.pop(session_id)
+                if self.job_scheduler is not None:
+                    cancelled = self.job_scheduler.cancel_session_jobs(session_id)
+                    if cancelled:
+                        logger.info(f"🛑 会话 {session_id} 已移除，取消了 {cancelled} 个后台任务")
+                backend.multi_algorithm_manager.clear_all()
+                backend.clear_temp_cache()
                 if session_id in self.session_activity:
                     del self.session_activity[session_id]
                 logger.info(f"🗑️ 移除会话: {session_id}")
@@ -131,6 +144,26 @@ class SessionManager:
         with self.lock:
             return len(self.backends)
     
+    def get_sessions_snapshot(self) -> List[Tuple[str, float, PianoAnalysisBackend]]:
+        """
+        获取当前所有会话的快照（供内存回收使用）
+
+        Returns:
+            List[Tuple[str, float, PianoAnalysisBackend]]: (session_id, 最近活动时间, backend)
+        """
+        with self.lock:
+            return [
+                (session_id, self.session_activity.get(session_id, 0.0), backend)
+                for session_id, backend in self.backends.items()
+            ]
+
+    def get_memory_report(self) -> Dict[str, int]:
+        """获取各会话的估算内存占用（字节）"""
+        return {
+            session_id: estimate_backend_bytes(backend)
+            for session_id, _, backend in self.get_sessions_snapshot()
+        }
+
     def update_activity(self, session_id: str) -> None:
         """更新会话活动时间"""
         with self.lock:
@@ -70,6 +70,65 @@ class SPMIDLoader:
             self.logger.error(traceback.format_exc())
             return False
     
+    def load_from_reader(self, reader: OptimizedSPMidReader) -> bool:
+        """
+        从已解析的 Reader 加载SPMID数据（避免重复解析同一份字节）
+
+        Args:
+            reader: 已完成解析的 OptimizedSPMidReader
+
+        Returns:
+            bool: 是否加载成功
+        """
+        return self.load_from_tracks(reader.tracks)
+
+    def load_from_tracks(self, tracks: List[List[OptimizedNote]]) -> bool:
+        """
+        从已解析的音轨加载SPMID数据（Reader 或历史 Parquet 的 OptimizedNote 音轨）
+
+        与 load_spmid_data 使用完全相同的过滤与转换流程。
+
+        Args:
+            tracks: 音轨列表，至少包含录制(0)和播放(1)两个音轨
+
+        Returns:
+            bool: 是否加载成功
+        """
+        try:
+            perf_loader_start = time.time()
+            success, error_msg = self._load_track_data_from_tracks(tracks)
+
+            if success:
+                total_time_ms = (time.time() - perf_loader_start) * 1000
+                self.logger.info(f"        🏁 [SPMID-Loader] 加载完成（复用已解析音轨），总耗时: {total_time_ms:.2f}ms")
+                return True
+            else:
+                self.logger.error(f"❌ SPMID数据加载失败: {error_msg}")
+                return False
+
+        except Exception as e:
+            self.logger.error(f"❌ SPMID数据加载异常: {e}")
+            self.logger.error(traceback.format_exc())
+            return False
+
+    def load_single_track(self, optimized_notes: List[OptimizedNote], data_type: str) -> List[Note]:
+        """
+        对单个音轨执行与 load_from_tracks 相同的过滤并转换为原版 Note
+
+        过滤条件都按单个音符判断，因此对部分加载的音符（例如只含某个按键）过滤的结果
+        与完整加载后再筛选一致。
+
+        Args:
+            optimized_notes: 优化版Note列表
+            data_type: 数据类型（'record' 或 'replay'）
+
+        Returns:
+            List[Note]: 过滤后的原版 Note 列表
+        """
+        self.filter_collector.set_data_type(data_type)
+        valid_key_notes = [note for note in optimized_notes if 1 <= note.id <= 88]
+        return self._convert_track_to_legacy(self._filter_abnormal_record_notes(valid_key_notes, data_type))
+
     def get_record_data(self) -> List[Note]:
         """获取录制数据"""
         return self.record_data
@@ -100,15 +159,33 @@ class SPMIDLoader:
             reader = OptimizedSPMidReader(spmid_bytes)
             perf_read_end = time.time()
             self.logger.info(f"        ⏱️  [性能] 优化版Reader读取: {(perf_read_end - perf_read_start)*1000:.2f}ms")
-            
+        except Exception as e:
+            error_msg = f"音轨数据加载失败: {str(e)}"
+            self.logger.error(f"❌ {error_msg}")
+            self.logger.error(traceback.format_exc())
+            return False, error_msg
+
+        return self._load_track_data_from_tracks(reader.tracks)
+
+    def _load_track_data_from_tracks(self, tracks: List[List[OptimizedNote]]) -> Tuple[bool, Optional[str]]:
+        """
+        从已解析的音轨中提取、过滤并转换数据
+
+        Args:
+            tracks: 已解析的 OptimizedNote 音轨列表
+
+        Returns:
+            tuple: (是否成功, 错误信息)
+        """
+        try:
             # 检查音轨数量
-            track_count = reader.track_count
+            track_count = len(tracks)
             if track_count < 2:
                 return False, f"SPMID文件音轨数量不足，需要至少2个音轨，当前只有{track_count}个"
             
             # 获取优化版的音轨数据
-            optimized_record_data = reader.get_track(0)
-            optimized_replay_data = reader.get_track(1)
+            optimized_record_data = tracks[0]
+            optimized_replay_data = tracks[1]
 
             if not optimized_record_data or not optimized_replay_data:
                 return False, "音轨数据为空"
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+临时上传文件缓存
+
+进程级共享的有界缓存，替代每个会话独立的无界 Dict[str, bytes]：
+- 小文件保存在内存中；大文件（或内存超出预算时最久未使用的文件）溢出到临时目录
+- 读取磁盘条目时返回文件内容（bytes），调用方无需管理文件句柄或映射的生命周期
+- TTL 过期与 LRU 淘汰
+- 跨会话的全局内存/磁盘用量统计（按会话命名空间隔离）
+"""
+
+import atexit
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from utils.logger import Logger
+from utils.constants import (
+    TEMP_CACHE_MEMORY_BUDGET_MB,
+    TEMP_CACHE_DISK_BUDGET_MB,
+    TEMP_CACHE_SPILL_THRESHOLD_MB,
+    TEMP_CACHE_TTL_SECONDS,
+)
+
+logger = Logger.get_logger()
+
+@dataclass
+class _CacheEntry:
+    """缓存条目"""
+    size: int
+    last_access: float
+    data: Optional[bytes] = None  # 内存中的内容
+    path: Optional[str] = None    # 溢出到磁盘的文件路径
+
+    @property
+    def in_memory(self) -> bool:
+        return self.data is not None
+
+
+class TempFileCache:
+    """
+    有界临时文件缓存类
+
+    键为 (namespace, file_id)，namespace 通常为会话ID。
+    """
+
+    def __init__(self, memory_budget_bytes: int, disk_budget_bytes: int,
+                 spill_threshold_bytes: int, ttl_seconds: float, temp_dir: Optional[str] = None):
+        """
+        Args:
+            memory_budget_bytes: 所有会话共享的内存预算
+            disk_budget_bytes: 所有会话共享的磁盘预算
+            spill_threshold_bytes: 单文件超过该大小直接写入磁盘
+            ttl_seconds: 条目自最后一次访问起的存活时间
+            temp_dir: 临时目录（默认自动创建，进程退出时删除）
+        """
+        self.memory_budget_bytes = memory_budget_bytes
+        self.disk_budget_bytes = disk_budget_bytes
+        self.spill_threshold_bytes = spill_threshold_bytes
+        self.ttl_seconds = ttl_seconds
+        self.temp_dir = temp_dir or tempfile.mkdtemp(prefix="spmid_upload_cache_")
+        os.makedirs(self.temp_dir, exist_ok=True)
+
+        self._entries: "OrderedDict[Tuple[str, str], _CacheEntry]" = OrderedDict()  # LRU 顺序：最久未使用在前
+        self._memory_bytes = 0
+        self._disk_bytes = 0
+        self._lock = threading.RLock()
+
+    # ==================== 公共 API ====================
+
+    def put(self, namespace: str, file_id: str, content: bytes) -> None:
+        """缓存文件内容（超过阈值的文件直接溢出到磁盘）"""
+        if not file_id or not content:
+            return
+        key = (namespace or '', file_id)
+        with self._lock:
+            self._remove_entry(key)
+            entry = _CacheEntry(size=len(content), last_access=time.time())
+            if entry.size >= self.spill_threshold_bytes:
+                entry.path = self._write_to_disk(key, content)
+                self._disk_bytes += entry.size
+            else:
+                entry.data = bytes(content)
+                self._memory_bytes += entry.size
+            self._entries[key] = entry
+            self._expire()
+            self._enforce_budgets()
+        logger.debug(f"已缓存临时文件: {file_id}, 大小: {len(content)} 字节 ({'内存' if entry.in_memory else '磁盘'})")
+
+    def get(self, namespace: str, file_id: str) -> Optional[bytes]:
+        """
+        读取缓存内容
+
+        内容会被后台任务异步使用（解析与 MD5 并行），磁盘条目读出为 bytes 交给调用方，
+        不返回需要显式关闭的文件映射。
+
+        Returns:
+            Optional[bytes]: 文件内容；不存在、已过期或读取失败返回 None
+        """
+        key = (namespace or '', file_id)
+        with self._lock:
+            self._expire()
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            entry.last_access = time.time()
+            self._entries.move_to_end(key)
+            if entry.in_memory:
+                return entry.data
+            path = entry.path
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except OSError as e:
+            logger.warning(f"读取磁盘缓存失败 ({file_id}): {e}")
+            return None
+
+    def remove(self, namespace: str, file_id: str) -> None:
+        """删除单个条目"""
+        with self._lock:
+            self._remove_entry((namespace or '', file_id))
+
+    def clear_namespace(self, namespace: str) -> None:
+        """删除某个会话的所有条目"""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == (namespace or '')]:
+                self._remove_entry(key)
+
+    def memory_bytes(self, namespace: Optional[str] = None) -> int:
+        """内存用量（指定 namespace 时只统计该会话）"""
+        with self._lock:
+            if namespace is None:
+                return self._memory_bytes
+            return sum(e.size for k, e in self._entries.items() if k[0] == namespace and e.in_memory)
+
+    def disk_bytes(self) -> int:
+        """磁盘用量"""
+        with self._lock:
+            return self._disk_bytes
+
+    def close(self) -> None:
+        """清空缓存并删除临时目录"""
+        with self._lock:
+            for key in list(self._entries):
+                self._remove_entry(key)
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    # ==================== 私有方法（调用方持有锁） ====================
+
+    def _write_to_disk(self, key: Tuple[str, str], content: bytes) -> str:
+        fd, path = tempfile.mkstemp(dir=self.temp_dir, suffix='.spmid')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        return path
+
+    def _remove_entry(self, key: Tuple[str, str]) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        if entry.in_memory:
+            self._memory_bytes -= entry.size
+        else:
+            self._disk_bytes -= entry.size
+            try:
+                os.remove(entry.path)
+            except OSError as e:
+                # 删除失败的文件由 close() 统一清理
+                logger.warning(f"删除磁盘缓存文件失败: {e}")
+
+    def _expire(self) -> None:
+        """删除超过 TTL 的条目"""
+        deadline = time.time() - self.ttl_seconds
+        for key in [k for k, e in self._entries.items() if e.last_access < deadline]:
+            logger.debug(f"临时文件缓存过期: {key[1]}")
+            self._remove_entry(key)
+
+    def _enforce_budgets(self) -> None:
+        """内存超预算时溢出最久未使用的条目到磁盘；磁盘超预算时淘汰最久未使用的条目"""
+        if self._memory_bytes > self.memory_budget_bytes:
+            for key, entry in list(self._entries.items()):
+                if self._memory_bytes <= self.memory_budget_bytes:
+                    break
+                if entry.in_memory:
+                    entry.path = self._write_to_disk(key, entry.data)
+                    entry.data = None
+                    self._memory_bytes -= entry.size
+                    self._disk_bytes += entry.size
+
+        if self._disk_bytes > self.disk_budget_bytes:
+            for key, entry in list(self._entries.items()):
+                if self._disk_bytes <= self.disk_budget_bytes:
+                    break
+                if not entry.in_memory:
+                    logger.warning(f"临时文件磁盘缓存超出预算，淘汰: {key[1]}")
+                    self._remove_entry(key)
+
+
+_shared_cache: Optional[TempFileCache] = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_temp_file_cache() -> TempFileCache:
+    """获取进程级共享的临时文件缓存（所有会话共用同一内存/磁盘预算）"""
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = TempFileCache(
+                memory_budget_bytes=TEMP_CACHE_MEMORY_BUDGET_MB * 1024 * 1024,
+                disk_budget_bytes=TEMP_CACHE_DISK_BUDGET_MB * 1024 * 1024,
+                spill_threshold_bytes=TEMP_CACHE_SPILL_THRESHOLD_MB * 1024 * 1024,
+                ttl_seconds=TEMP_CACHE_TTL_SECONDS,
+            )
+            atexit.register(_shared_cache.close)
+        return _shared_cache
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+跨记录趋势分析
+
+在整个历史归档上执行分组聚合，无需把记录逐条加载为音符对象：
+- 记录级指标（MAE、匹配率等）：读取预计算的摘要表，用 Arrow group_by 聚合
+  例如"最近 500 条记录按电机类型 × 算法统计 MAE"
+- 按键级趋势（延时漂移）：用 pyarrow dataset 扫描历史 Parquet，只读取
+  track/note_id/key_on_ms 三列；文件在线程池中并行处理，每个文件归约为
+  按键的部分和后立即丢弃（流式），内存占用与记录总数无关
+- 结果按 (查询, 参数) 缓存；历史数据版本指纹变化（新记录保存、删除、摘要回填）时失效
+"""
+
+import datetime
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from database.history_manager import HistoryQuery, SUMMARY_COLUMNS
+from database.parquet_utility import ParquetUtility, SCHEMA_VERSION
+from database.track_store import TrackStore, is_manifest
+from utils.constants import DEFAULT_MAX_DELAY_THRESHOLD_MS, TREND_CACHE_MAX_ENTRIES, TREND_SCAN_WORKERS
+from utils.logger import Logger
+
+logger = Logger.get_logger()
+
+# 可用于分组的记录元数据列
+GROUP_COLUMNS: Tuple[str, ...] = ('motor_type', 'algorithm', 'piano_type', 'period')
+# 时间分桶粒度
+PERIODS: Tuple[str, ...] = ('day', 'week', 'month')
+# 分页读取记录列表时的页大小
+_RECORD_PAGE_SIZE = 500
+# 按键级扫描只需要的列
+_SCAN_COLUMNS = ['track', 'note_id', 'key_on_ms']
+# 组合键 按键ID * _KEY_STRIDE + key_on_ms：不同按键的起始时间相距远大于匹配窗口
+_KEY_STRIDE = 1e9
+
+# 单个文件的部分聚合：按键ID -> [配对数, 延时和, 延时平方和]
+_PartialStats = Dict[int, np.ndarray]
+
+
+def _period_label(timestamp: Any, period: str) -> str:
+    """将记录时间归入时间桶（day: YYYY-MM-DD, week: YYYY-Www, month: YYYY-MM）"""
+    text = str(timestamp or '')[:10]
+    if period == 'month':
+        return text[:7]
+    if period == 'week':
+        try:
+            year, week, _ = datetime.date.fromisoformat(text).isocalendar()
+            return f"{year}-W{week:02d}"
+        except ValueError:
+            return text
+    return text
+
+
+def _key_delay_partials(table: pa.Table, window_ms: float) -> _PartialStats:
+    """
+    归约单个文件：按键近邻配对录制/播放按键起始时间，累计每个按键的延时统计
+
+    与 NoteMatcher 的完整匹配不同，这里按同一按键上最近的播放音符配对（窗口内），
+    用于趋势统计的近似延时（播放 - 录制，ms）。
+    """
+    track = table.column('track').to_numpy()
+    key = table.column('note_id').to_numpy().astype(np.int64)
+    key_on = table.column('key_on_ms').to_numpy()
+    valid = key_on > 0  # 无触后数据的音符 key_on_ms 为 0
+
+    def composite(track_index: int) -> Tuple[np.ndarray, np.ndarray]:
+        mask = valid & (track == track_index)
+        values = key[mask] * _KEY_STRIDE + key_on[mask]
+        order = np.argsort(values, kind='stable')
+        return values[order], key[mask][order]
+
+    record_values, record_keys = composite(0)
+    replay_values, _ = composite(1)
+    if len(record_values) == 0 or len(replay_values) == 0:
+        return {}
+
+    right = np.searchsorted(replay_values, record_values)
+    left = np.clip(right - 1, 0, len(replay_values) - 1)
+    right = np.clip(right, 0, len(replay_values) - 1)
+    delay_left = replay_values[left] - record_values
+    delay_right = replay_values[right] - record_values
+    delays = np.where(np.abs(delay_left) <= np.abs(delay_right), delay_left, delay_right)
+    matched = np.abs(delays) <= window_ms
+    delays, keys = delays[matched], record_keys[matched]
+    if len(keys) == 0:
+        return {}
+
+    minlength = int(keys.max()) + 1
+    counts = np.bincount(keys, minlength=minlength)
+    sums = np.bincount(keys, weights=delays, minlength=minlength)
+    squares = np.bincount(keys, weights=delays * delays, minlength=minlength)
+    return {int(k): np.array([counts[k], sums[k], squares[k]], dtype=np.float64) for k in np.nonzero(counts)[0]}
+
+
+class TrendAnalytics:
+    """跨记录趋势分析类（进程内共享，线程安全）"""
+
+    def __init__(self, history_manager, max_workers: int = TREND_SCAN_WORKERS,
+                 cache_entries: int = TREND_CACHE_MAX_ENTRIES):
+        """
+        Args:
+            history_manager: 历史记录管理器
+            max_workers: 并行扫描 Parquet 文件的线程数
+            cache_entries: 缓存的分析结果数量上限
+        """
+        self.history_manager = history_manager
+        self.max_workers = max_workers
+        self.cache_entries = cache_entries
+        # (查询名, 参数) -> (数据版本, 结果)，LRU 顺序
+        self._cache: "OrderedDict[Tuple, Tuple[Tuple, List[dict]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    # ==================== 公共 API ====================
+
+    def metric_by_group(self, metric: str = 'mae_ms',
+                        group_by: Sequence[str] = ('motor_type', 'algorithm'),
+                        last_n: Optional[int] = 500, period: str = 'month') -> List[dict]:
+        """
+        按记录元数据分组聚合摘要指标
+
+        Args:
+            metric: 摘要指标列（见 RecordSummary）
+            group_by: 分组列（GROUP_COLUMNS 的子集；'period' 表示按上传时间分桶）
+            last_n: 只统计最近 N 条记录（None 表示全部）
+            period: 'period' 分组的时间粒度
+
+        Returns:
+            List[dict]: 每组一行：分组列 + record_count / mean / min / max / std
+        """
+        if metric not in SUMMARY_COLUMNS:
+            raise ValueError(f"不支持的指标: {metric}")
+        group_by = tuple(group_by)
+        unknown = [column for column in group_by if column not in GROUP_COLUMNS]
+        if unknown:
+            raise ValueError(f"不支持的分组列: {unknown}")
+        if period not in PERIODS:
+            raise ValueError(f"不支持的时间粒度: {period}")
+
+        def compute() -> List[dict]:
+            records = [r for r in self._iter_records(last_n) if r.get(metric) is not None]
+            if not records:
+                return []
+            columns = {column: [str(r.get(column) or '') for r in records]
+                       for column in group_by if column != 'period'}
+            if 'period' in group_by:
+                columns['period'] = [_period_label(r.get('created_at'), period) for r in records]
+            columns['value'] = [float(r[metric]) for r in records]
+            table = pa.table(columns).group_by(list(group_by)).aggregate([
+                ('value', 'count'), ('value', 'mean'), ('value', 'min'), ('value', 'max'),
+                ('value', 'stddev', pc.VarianceOptions(ddof=0)),
+            ])
+            rows = table.rename_columns([
+                {'value_count': 'record_count', 'value_mean': 'mean', 'value_min': 'min',
+                 'value_max': 'max', 'value_stddev': 'std'}.get(name, name) for name in table.column_names
+            ]).to_pylist()
+            return sorted(rows, key=lambda row: tuple(row[c] for c in group_by))
+
+        return self._cached(('metric_by_group', metric, group_by, last_n, period), compute)
+
+    def key_delay_drift(self, period: str = 'month', last_n: Optional[int] = None,
+                        key_ids: Optional[Iterable[int]] = None,
+                        window_ms: float = DEFAULT_MAX_DELAY_THRESHOLD_MS) -> List[dict]:
+        """
+        按时间桶统计每个按键的平均延时（延时漂移趋势）
+
+        Args:
+            period: 时间粒度（day / week / month，按记录上传时间）
+            last_n: 只统计最近 N 条记录（None 表示全部）
+            key_ids: 只统计指定按键（谓词下推，只读取相关行组）
+            window_ms: 录制/播放按键配对的最大时间差（ms）
+
+        Returns:
+            List[dict]: 每个 (时间桶, 按键) 一行：period / key_id / pair_count / record_count /
+                        mean_delay_ms / std_delay_ms，按时间桶、按键排序
+        """
+        if period not in PERIODS:
+            raise ValueError(f"不支持的时间粒度: {period}")
+        key_list = sorted({int(k) for k in key_ids}) if key_ids is not None else None
+
+        def compute() -> List[dict]:
+            labels = {}
+            for record in self._iter_records(last_n):
+                path = record.get('track_data_path')
+                if path and os.path.exists(path):
+                    labels[path] = _period_label(record.get('created_at'), period)
+            totals: Dict[Tuple[str, int], np.ndarray] = {}
+            record_counts: Dict[Tuple[str, int], int] = {}
+            for path, partials in self._scan_files(list(labels), key_list, window_ms):
+                for key_id, stats in partials.items():
+                    bucket = (labels[path], key_id)
+                    if bucket in totals:
+                        totals[bucket] += stats
+                    else:
+                        totals[bucket] = stats.copy()
+                    record_counts[bucket] = record_counts.get(bucket, 0) + 1
+
+            rows = []
+            for (label, key_id), (count, total, squares) in sorted(totals.items()):
+                mean = total / count
+                rows.append({
+                    'period': label,
+                    'key_id': key_id,
+                    'pair_count': int(count),
+                    'record_count': record_counts[(label, key_id)],
+                    'mean_delay_ms': float(mean),
+                    'std_delay_ms': float(np.sqrt(max(squares / count - mean * mean, 0.0))),
+                })
+            return rows
+
+        return self._cached(('key_delay_drift', period, last_n, tuple(key_list or ()), window_ms), compute)
+
+    def invalidate(self) -> None:
+        """清空结果缓存"""
+        with self._lock:
+            self._cache.clear()
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'cached_results': len(self._cache)}
+
+    # ==================== 私有方法 ====================
+
+    def _cached(self, cache_key: Tuple, compute: Callable[[], List[dict]]) -> List[dict]:
+        """按数据版本缓存结果（版本变化时重新计算）；返回的结果应视为只读"""
+        version = self.history_manager.get_data_version()
+        with self._lock:
+            entry = self._cache.get(cache_key)
+            if entry is not None and entry[0] == version:
+                self._cache.move_to_end(cache_key)
+                return entry[1]
+
+        result = compute()
+        with self._lock:
+            self._cache[cache_key] = (version, result)
+            self._cache.move_to_end(cache_key)
+            while len(self._cache) > self.cache_entries:
+                self._cache.popitem(last=False)
+        return result
+
+    def _iter_records(self, last_n: Optional[int]) -> Iterable[dict]:
+        """按 id 倒序分页读取记录（含摘要列），只取最近 last_n 条"""
+        remaining = last_n
+        cursor = None
+        while remaining is None or remaining > 0:
+            page_size = _RECORD_PAGE_SIZE if remaining is None else min(_RECORD_PAGE_SIZE, remaining)
+            page = self.history_manager.query_records(HistoryQuery(), page_size=page_size, cursor=cursor)
+            yield from page.records
+            if remaining is not None:
+                remaining -= len(page.records)
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+
+    def _scan_files(self, paths: List[str], key_ids: Optional[List[int]],
+                    window_ms: float) -> Iterable[Tuple[str, _PartialStats]]:
+        """
+        并行、流式扫描 Parquet 文件，逐个产出 (文件路径, 部分聚合)
+
+        当前格式的单文件记录组成一个 pyarrow dataset，按片段（文件）并行读取投影列并下推过滤条件；
+        音轨清单记录只读取录制/播放两个音轨文件；旧格式文件先转换为当前布局。
+        每个工作线程同一时刻只持有一个记录的三列数据。
+        """
+        current, legacy, manifests = [], [], []
+        for path in paths:
+            try:
+                if is_manifest(path):
+                    manifests.append(path)
+                elif ParquetUtility.get_schema_version(path) >= SCHEMA_VERSION:
+                    current.append(path)
+                else:
+                    legacy.append(path)
+            except Exception as e:
+                logger.warning(f"⚠️ 趋势分析跳过无法读取的文件: {path}: {e}")
+
+        key_expression = ds.field('note_id').isin(key_ids) if key_ids is not None else None
+        expression = ds.field('track').isin([0, 1])
+        if key_expression is not None:
+            expression = expression & key_expression
+
+        tasks: List[Tuple[str, Callable[[], pa.Table]]] = []
+        if current:
+            dataset = ds.dataset(current, format='parquet')
+            for fragment in dataset.get_fragments():
+                tasks.append((fragment.path, lambda f=fragment: f.to_table(columns=_SCAN_COLUMNS, filter=expression)))
+        for path in manifests:
+            tasks.append((path, lambda p=path: TrackStore.from_manifest(p).read_record_table(
+                p, tracks=[0, 1], columns=_SCAN_COLUMNS, filter=key_expression)))
+        for path in legacy:
+            tasks.append((path, lambda p=path: ParquetUtility.read_track_table(p).select(_SCAN_COLUMNS).filter(expression)))
+
+        def run(path: str, read: Callable[[], pa.Table]) -> Tuple[str, _PartialStats]:
+            return path, _key_delay_partials(read(), window_ms)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="trend-scan") as executor:
+            futures = [executor.submit(run, path, read) for path, read in tasks]
+            for future in as_completed(futures):
+                try:
+                    yield future.result()
+                except Exception as e:
+                    logger.warning(f"⚠️ 趋势分析扫描文件失败: {e}")
+
+
+_trend_analytics: Optional[TrendAnalytics] = None
+_trend_analytics_lock = threading.Lock()
+
+
+def get_trend_analytics(history_manager) -> TrendAnalytics:
+    """获取进程级趋势分析实例（结果缓存在所有会话间共享）"""
+    global _trend_analytics
+    with _trend_analytics_lock:
+        if _trend_analytics is None or _trend_analytics.history_manager is not history_manager:
+            _trend_analytics = TrendAnalytics(history_manager)
+        return _trend_analytics
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+瀑布图分级显示（LOD）
+
+完整录制的瀑布图包含所有按键事件，全部发送到浏览器时数据量随录制时长线性增长。
+分级显示时：
+- 全局视图：每个按键在每个时间桶内的占用率（密度图），桶数固定
+- 缩放视图：根据 relayoutData 的可见时间/按键窗口，从每个算法的区间索引中取出精确的bar；
+  窗口内的bar仍然过多时，显示该窗口的密度图
+发送到浏览器的数据量与录制时长无关。
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import plotly.graph_objects as go
+
+from backend.figure_encoding import encode_array
+from utils.constants import WATERFALL_LOD_MAX_BARS, WATERFALL_LOD_TIME_BUCKETS
+from utils.logger import Logger
+
+logger = Logger.get_logger()
+
+# 视图范围：(起点, 终点)，None 表示不限制
+ViewRange = Optional[Tuple[float, float]]
+
+
+class WaterfallIntervalIndex:
+    """单个算法的bar区间索引（按按下时间排序，支持时间窗口与按键范围查询）"""
+
+    def __init__(self, bars: List[Dict]):
+        """
+        Args:
+            bars: 瀑布图bar列表（t_on/t_off 为原始时间戳单位，key_id 为Y轴位置）
+        """
+        t_on = np.array([bar['t_on'] for bar in bars], dtype=np.float64) / 10.0
+        order = np.argsort(t_on, kind='stable')
+        self.bars = [bars[i] for i in order]
+        self.t_on = t_on[order]
+        self.t_off = np.array([bar['t_off'] for bar in self.bars], dtype=np.float64) / 10.0
+        self.y = np.array([bar['key_id'] for bar in self.bars], dtype=np.float64)
+        # 最长的bar决定向前查找的范围：按下时间早于窗口起点 max_duration 以上的bar不可能与窗口重叠
+        self.max_duration = float(np.max(self.t_off - self.t_on)) if len(self.bars) else 0.0
+
+    def __len__(self) -> int:
+        return len(self.bars)
+
+    def time_extent(self) -> Optional[Tuple[float, float]]:
+        """所有bar覆盖的时间范围 (ms)"""
+        if not len(self.bars):
+            return None
+        return float(self.t_on[0]), float(np.max(self.t_off))
+
+    def query_indices(self, x_range: ViewRange = None, y_range: ViewRange = None) -> np.ndarray:
+        """与时间窗口重叠且在按键范围内的bar下标（按按下时间排序）"""
+        lo, hi = 0, len(self.bars)
+        if x_range is not None:
+            x0, x1 = x_range
+            lo = int(np.searchsorted(self.t_on, x0 - self.max_duration, side='left'))
+            hi = int(np.searchsorted(self.t_on, x1, side='right'))
+        indices = np.arange(lo, hi)
+        mask = np.ones(len(indices), dtype=bool)
+        if x_range is not None:
+            mask &= self.t_off[lo:hi] >= x_range[0]
+        if y_range is not None:
+            mask &= (self.y[lo:hi] >= y_range[0]) & (self.y[lo:hi] <= y_range[1])
+        return indices[mask]
+
+    def query(self, x_range: ViewRange = None, y_range: ViewRange = None) -> List[Dict]:
+        """与时间窗口重叠且在按键范围内的bar"""
+        return [self.bars[i] for i in self.query_indices(x_range, y_range)]
+
+    def occupancy(self, edges: np.ndarray, y_range: ViewRange = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        每个按键行在每个时间桶内的占用率
+
+        占用时间按覆盖函数的积分计算：C(t) = Σ max(t - t_on, 0) - Σ max(t - t_off, 0)，
+        每行只需两次排序 + 二分查找，与bar数量和桶数都是线性关系。
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (按键行Y值, 占用率矩阵 [行, 桶])
+        """
+        rows = np.round(self.y)
+        if y_range is not None:
+            in_range = (self.y >= y_range[0]) & (self.y <= y_range[1])
+        else:
+            in_range = np.ones(len(self.y), dtype=bool)
+        row_values = np.unique(rows[in_range])
+        widths = np.diff(edges)
+        matrix = np.zeros((len(row_values), len(widths)))
+        for i, row in enumerate(row_values):
+            selected = in_range & (rows == row)
+            covered = self._ramp_sum(self.t_on[selected], edges) - self._ramp_sum(self.t_off[selected], edges)
+            matrix[i] = np.diff(covered) / widths
+        return row_values, matrix
+
+    @staticmethod
+    def _ramp_sum(points: np.ndarray, edges: np.ndarray) -> np.ndarray:
+        """Σ max(edge - point, 0)，对每个边界求值"""
+        points = np.sort(points)
+        prefix = np.concatenate(([0.0], np.cumsum(points)))
+        counts = np.searchsorted(points, edges, side='right')
+        return counts * edges - prefix[counts]
+
+
+class WaterfallLOD:
+    """
+    瀑布图分级显示数据（按算法的区间索引 + 全局颜色范围）
+
+    由 PlotService 按筛选条件构建并缓存，缩放时只做区间查询，不重新收集数据。
+    """
+
+    def __init__(self, plot_generator, all_bars_by_algorithm: List[Dict], is_multi_file: bool,
+                 max_bars: int = WATERFALL_LOD_MAX_BARS, time_buckets: int = WATERFALL_LOD_TIME_BUCKETS):
+        """
+        Args:
+            plot_generator: MultiAlgorithmPlotGenerator（精确视图复用其bar绘制和布局）
+            all_bars_by_algorithm: collect_waterfall_bars 返回的按算法分组数据
+            is_multi_file: 是否多文件模式
+            max_bars: 可见窗口内显示精确bar的数量上限
+            time_buckets: 密度图的时间分桶数
+        """
+        self.plot_generator = plot_generator
+        self.is_multi_file = is_multi_file
+        self.max_bars = max_bars
+        self.time_buckets = max(1, time_buckets)
+        # 颜色范围按全部数据计算，缩放前后同一锤速颜色一致
+        self.velocity_range = plot_generator.get_velocity_range(all_bars_by_algorithm)
+        self.indexes: List[Tuple[Dict, WaterfallIntervalIndex]] = [
+            (alg_data, WaterfallIntervalIndex(alg_data['bars'])) for alg_data in all_bars_by_algorithm
+        ]
+
+    @property
+    def total_bars(self) -> int:
+        return sum(len(index) for _, index in self.indexes)
+
+    def time_extent(self) -> Optional[Tuple[float, float]]:
+        extents = [index.time_extent() for _, index in self.indexes if len(index)]
+        if not extents:
+            return None
+        return min(e[0] for e in extents), max(e[1] for e in extents)
+
+    def count(self, x_range: ViewRange = None, y_range: ViewRange = None) -> int:
+        return sum(len(index.query_indices(x_range, y_range)) for _, index in self.indexes)
+
+    def figure(self, x_range: ViewRange = None, y_range: ViewRange = None) -> go.Figure:
+        """
+        生成指定视图的瀑布图：窗口内bar不超过上限时显示精确bar，否则显示占用密度图
+
+        Args:
+            x_range: 可见时间范围 (ms)，None 表示全部
+            y_range: 可见Y轴范围，None 表示全部
+        """
+        visible = self.count(x_range, y_range)
+        if visible <= self.max_bars:
+            fig = self._detail_figure(x_range, y_range)
+            mode = f"精确 {visible} 个bars"
+        else:
+            fig = self._overview_figure(x_range, y_range)
+            mode = f"密度图 ({visible} 个bars)"
+
+        if x_range is not None:
+            fig.update_xaxes(range=list(x_range), autorange=False)
+        if y_range is not None:
+            fig.update_yaxes(range=list(y_range), autorange=False)
+        # 替换图表时保持用户的缩放状态
+        fig.update_layout(uirevision='waterfall-lod')
+        logger.info(f"[瀑布图LOD] 视图 x={x_range}, y={y_range}: {mode}")
+        return fig
+
+    # ==================== 私有方法 ====================
+
+    def _detail_figure(self, x_range: ViewRange, y_range: ViewRange) -> go.Figure:
+        visible_by_algorithm = [
+            {**alg_data, 'bars': index.query(x_range, y_range)} for alg_data, index in self.indexes
+        ]
+        return self.plot_generator.build_waterfall_figure(
+            visible_by_algorithm, self.is_multi_file, velocity_range=self.velocity_range
+        )
+
+    def _overview_figure(self, x_range: ViewRange, y_range: ViewRange) -> go.Figure:
+        extent = x_range or self.time_extent() or (0.0, 1.0)
+        start, end = float(extent[0]), float(extent[1])
+        if end <= start:
+            end = start + 1.0
+        edges = np.linspace(start, end, self.time_buckets + 1)
+        centers = np.round((edges[:-1] + edges[1:]) / 2, 1)
+
+        fig = go.Figure()
+        for alg_idx, (alg_data, index) in enumerate(self.indexes):
+            row_values, matrix = index.occupancy(edges, y_range)
+            if not len(row_values):
+                continue
+            # 空桶不着色，保持背景；占用率保留3位小数以减小图表数据量
+            z = np.where(matrix > 0, np.round(matrix, 3), np.nan)
+            fig.add_trace(go.Heatmap(
+                x=encode_array(centers),
+                y=encode_array(row_values),
+                z=encode_array(z),
+                zmin=0,
+                colorscale='YlOrRd',
+                showscale=alg_idx == 0,
+                colorbar=dict(title='占用率'),
+                name=alg_data['algorithm_name'],
+                hovertemplate=(f"算法: {alg_data['algorithm_name']}<br>"
+                               "时间: %{x:.0f}ms<br>行: %{y}<br>占用率: %{z:.2f}<extra></extra>"),
+            ))
+
+        bucket_ms = (end - start) / self.time_buckets
+        self.plot_generator._configure_unified_waterfall_layout(
+            fig, [alg_data for alg_data, _ in self.indexes], self.is_multi_file
+        )
+        fig.update_layout(
+            title=f'瀑布图 - 按键占用密度（每格 {bucket_ms:.0f}ms，放大查看单个事件）'
+        )
+        return fig
+
+
+def parse_relayout_range(relayout_data: Optional[Dict[str, Any]], axis: str) -> Tuple[bool, ViewRange]:
+    """
+    从 relayoutData 中解析坐标轴范围
+
+    Args:
+        relayout_data: dcc.Graph 的 relayoutData
+        axis: 'xaxis' 或 'yaxis'
+
+    Returns:
+        Tuple[bool, ViewRange]: (是否包含该坐标轴的变化, 新范围；自动范围/重置时为 None)
+    """
+    if not relayout_data:
+        return False, None
+    if relayout_data.get(f'{axis}.autorange'):
+        return True, None
+    if f'{axis}.range[0]' in relayout_data and f'{axis}.range[1]' in relayout_data:
+        low, high = relayout_data[f'{axis}.range[0]'], relayout_data[f'{axis}.range[1]']
+    elif isinstance(relayout_data.get(f'{axis}.range'), (list, tuple)):
+        low, high = relayout_data[f'{axis}.range'][:2]
+    else:
+        return False, None
+    try:
+        low, high = float(low), float(high)
+    except (TypeError, ValueError):
+        return False, None
+    return True, (min(low, high), max(low, high))
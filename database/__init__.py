@@ -1,2 +1,5 @@
-from .history_manager import SQLiteHistoryManager, ParquetRecord, ParquetDataLoader
+from .history_manager import (
+    SQLiteHistoryManager, ParquetRecord, ParquetDataLoader, HistoryQuery, HistoryPage, RecordSummary,
+    HistorySaveRequest,
+)
 from .parquet_utility import ParquetUtility
@@ -2,10 +2,13 @@ import sqlite3
 import mysql.connector
 import os
 import threading
-from dataclasses import dataclass, asdict
-from typing import Optional, List
+import datetime
+from dataclasses import dataclass, asdict, field
+from typing import Optional, List, Tuple, Any, Dict
 from pathlib import Path
 from spmid.spmid_reader import OptimizedNote
+from .sqlite_pool import SQLiteConnectionPool, Migration
+from .track_store import TrackStore, is_manifest
 
 from abc import ABC, abstractmethod
 
@@ -18,9 +21,69 @@ class ParquetRecord:
     algorithm: str            # 算法类型 (PID/SMC)
     piano_type: str           # 琴类型
     file_date: str            # 文件创建日期
-    track_data_path: str      # 单个 Parquet 文件路径
+    track_data_path: str      # 音轨清单路径（旧记录为单个 Parquet 文件路径）
     id: Optional[int] = None
 
+@dataclass
+class HistorySaveRequest:
+    """历史记录保存请求（save_record 的参数，供批量保存使用）"""
+    filename: str
+    file_md5: str
+    motor_type: str
+    algorithm: str
+    piano_type: str
+    file_date: str
+    track_data: List[List[OptimizedNote]]
+
+@dataclass
+class RecordSummary:
+    """记录摘要指标（保存时计算或后台回填，存储在摘要表中，以记录 ID 为主键）"""
+    record_note_count: int = 0        # 录制有效音符数
+    replay_note_count: int = 0        # 播放有效音符数
+    matched_pairs: int = 0            # 精确匹配对数
+    match_rate: float = 0.0           # 匹配率（%，匹配对数 / 录制有效音符数）
+    drop_hammers: int = 0             # 丢锤数
+    multi_hammers: int = 0            # 多锤数
+    abnormal_matches: int = 0         # 异常匹配数
+    record_invalid_notes: int = 0     # 录制无效音符数
+    replay_invalid_notes: int = 0     # 播放无效音符数
+    grade_excellent: int = 0          # 评级分布：优秀 (≤20ms)
+    grade_good: int = 0               # 良好 (20-30ms)
+    grade_fair: int = 0               # 一般 (30-50ms)
+    grade_poor: int = 0               # 较差 (50-100ms)
+    grade_severe: int = 0             # 严重 (100-200ms)
+    mean_error_ms: float = 0.0        # 平均误差 ME（ms）
+    mae_ms: float = 0.0               # 平均绝对误差 MAE（ms）
+    std_ms: float = 0.0               # 标准差（ms）
+    rmse_ms: float = 0.0              # 均方根误差（ms）
+    duration_ms: float = 0.0          # 录制时长（ms）
+
+# 摘要表列（与 RecordSummary 字段顺序一致）
+SUMMARY_COLUMNS: List[str] = list(RecordSummary.__dataclass_fields__)
+# 可排序的摘要指标（每列建有 (指标, record_id) 索引）
+SUMMARY_SORT_COLUMNS: Tuple[str, ...] = ('mae_ms', 'match_rate', 'drop_hammers', 'std_ms', 'mean_error_ms', 'duration_ms')
+
+@dataclass
+class HistoryQuery:
+    """历史记录查询条件（None / 空字符串表示不过滤）"""
+    search: Optional[str] = None          # 文件名搜索（SQLite 使用 FTS5 全文索引）
+    motor_type: Optional[str] = None      # 电机类型
+    algorithm: Optional[str] = None       # 算法类型
+    piano_type: Optional[str] = None      # 琴类型
+    created_from: Optional[str] = None    # 上传日期起（YYYY-MM-DD，含）
+    created_to: Optional[str] = None      # 上传日期止（YYYY-MM-DD，含）
+    file_date_from: Optional[str] = None  # 文件日期起（YYYY-MM-DD，含）
+    file_date_to: Optional[str] = None    # 文件日期止（YYYY-MM-DD，含）
+    sort_by: Optional[str] = None         # 按摘要指标排序（SUMMARY_SORT_COLUMNS 之一；只返回已有摘要的记录）
+    sort_desc: bool = False               # 指标降序
+
+@dataclass
+class HistoryPage:
+    """历史记录分页结果（键集分页：默认按 id 倒序，指定 sort_by 时按 (指标, id)）"""
+    records: List[dict] = field(default_factory=list)
+    next_cursor: Optional[Any] = None     # 下一页游标：id，或按指标排序时的 [指标值, id]；无下一页时为 None
+    total: int = 0                        # 符合条件的记录总数
+
 class BaseHistoryManager(ABC):
     """历史记录管理器抽象基类，支持多种数据库后端"""
 
@@ -36,6 +99,16 @@ class BaseHistoryManager(ABC):
         """根据音轨数据和元数据保存记录"""
         pass
 
+    def save_records(self, requests: List[HistorySaveRequest]) -> List[Optional[int]]:
+        """
+        批量保存记录（默认逐条保存；支持事务的后端可在一个事务中写入整批记录）
+
+        Returns:
+            List[Optional[int]]: 与 requests 一一对应的记录 ID
+        """
+        return [self.save_record(r.filename, r.file_md5, r.motor_type, r.algorithm,
+                                 r.piano_type, r.file_date, r.track_data) for r in requests]
+
     @abstractmethod
     def get_all_records(self, limit: int = 20) -> List[dict]:
         """获取最近的历史记录列表"""
@@ -56,35 +129,218 @@ class BaseHistoryManager(ABC):
         """通过 ID 删除记录"""
         pass
 
+    @abstractmethod
+    def query_records(self, query: HistoryQuery, page_size: int = 50,
+                      cursor: Optional[Any] = None) -> HistoryPage:
+        """
+        按条件分页查询历史记录（键集分页，记录附带摘要指标列，无摘要时为 None）
+
+        Args:
+            query: 查询条件
+            page_size: 每页记录数
+            cursor: 上一页返回的 next_cursor，None 表示第一页
+        """
+        pass
+
+    @abstractmethod
+    def save_summary(self, record_id: int, summary: RecordSummary) -> None:
+        """保存（覆盖）记录的摘要指标"""
+        pass
+
+    @abstractmethod
+    def get_summary(self, record_id: int) -> Optional[dict]:
+        """获取记录的摘要指标"""
+        pass
+
+    @abstractmethod
+    def get_records_without_summary(self, limit: int = 100) -> List[dict]:
+        """获取尚未计算摘要的记录（供后台回填）"""
+        pass
+
+    @abstractmethod
+    def get_data_version(self) -> Tuple[Any, ...]:
+        """
+        获取历史数据版本指纹（记录或摘要增删改后变化）
+
+        供依赖历史数据的缓存（如趋势分析结果）判断是否失效。
+        """
+        pass
+
+    @staticmethod
+    def _delete_record_files(file_path: Optional[str], orphan_tracks: List[str]) -> None:
+        """删除记录的物理文件：清单或旧版 Parquet、热层副本、引用计数归零的音轨"""
+        if not file_path:
+            return
+        from .hot_tier import get_hot_tier
+        get_hot_tier(file_path).discard(file_path)
+        if orphan_tracks:
+            TrackStore.from_manifest(file_path).remove_tracks(orphan_tracks)
+        if os.path.exists(file_path):
+            try:
+                os.remove(file_path)
+            except Exception as e:
+                print(f"警告: 数据库记录已删除，但无法删除 Parquet 文件: {e}")
+
+    @staticmethod
+    def _build_sort_clause(query: HistoryQuery, cursor: Optional[Any],
+                           placeholder: str) -> Tuple[str, Optional[str], List[Any]]:
+        """
+        构建排序与键集游标条件（两种数据库通用）
+
+        按指标排序时以 record_id 反向作为次序键，使 (指标, record_id DESC) 索引可正向或反向扫描。
+
+        Returns:
+            Tuple[str, Optional[str], List[Any]]: (ORDER BY 子句, 游标条件, 游标参数)
+        """
+        if not query.sort_by:
+            if cursor is None:
+                return "t.id DESC", None, []
+            return "t.id DESC", f"t.id < {placeholder}", [cursor]
+
+        if query.sort_by not in SUMMARY_SORT_COLUMNS:
+            raise ValueError(f"不支持的排序指标: {query.sort_by}")
+        column = f"s.{query.sort_by}"
+        if query.sort_desc:
+            order, compare, id_compare = f"{column} DESC, s.record_id ASC", '<', '>'
+        else:
+            order, compare, id_compare = f"{column} ASC, s.record_id DESC", '>', '<'
+        if cursor is None:
+            return order, None, []
+        value, last_id = cursor
+        condition = (f"({column} {compare} {placeholder} OR "
+                     f"({column} = {placeholder} AND s.record_id {id_compare} {placeholder}))")
+        return order, condition, [value, value, last_id]
+
+    @staticmethod
+    def _next_cursor(query: HistoryQuery, records: List[dict]) -> Any:
+        """本页最后一条记录对应的游标"""
+        last = records[-1]
+        return [last[query.sort_by], last['id']] if query.sort_by else last['id']
+
+    @staticmethod
+    def _build_filter_conditions(query: HistoryQuery, placeholder: str) -> Tuple[List[str], List[Any]]:
+        """构建除文件名搜索外的过滤条件（两种数据库通用，placeholder 为 '?' 或 '%s'）"""
+        clauses: List[str] = []
+        params: List[Any] = []
+        for column in ('motor_type', 'algorithm', 'piano_type'):
+            value = getattr(query, column)
+            if value:
+                clauses.append(f"{column} = {placeholder}")
+                params.append(value)
+        for column, date_from, date_to in (('created_at', query.created_from, query.created_to),
+                                           ('file_date', query.file_date_from, query.file_date_to)):
+            if date_from:
+                clauses.append(f"{column} >= {placeholder}")
+                params.append(date_from[:10])
+            if date_to:
+                # 截止日期包含当天：< 次日
+                next_day = datetime.date.fromisoformat(date_to[:10]) + datetime.timedelta(days=1)
+                clauses.append(f"{column} < {placeholder}")
+                params.append(next_day.isoformat())
+        return clauses, params
+
 class SQLiteHistoryManager(BaseHistoryManager):
     """基于 SQLite 的历史记录管理器实现"""
     
     def __init__(self, db_path: str = "track_data.db"):
         self.db_path = db_path
         self.table_name = "track_data"
-        self._lock = threading.RLock()
+        self.fts_table_name = f"{self.table_name}_fts"
+        self.summary_table_name = f"{self.table_name}_summary"
+        self.track_refs_table_name = f"{self.table_name}_track_refs"
+        # 连接池：每个连接同一时刻只被一个线程使用，读写不再共用全局锁
+        self._pool = SQLiteConnectionPool(db_path)
+        # 仅用于串行化 save_record 的"查重 + 写 Parquet"，不阻塞查询
+        self._save_lock = threading.Lock()
         self.init_storage()
 
+    def _migrations(self) -> List[Migration]:
+        """数据库迁移（按 PRAGMA user_version 增量执行）"""
+        return [
+            (1, [
+                f"CREATE INDEX IF NOT EXISTS idx_{self.table_name}_filename ON {self.table_name}(filename)",
+                f"CREATE INDEX IF NOT EXISTS idx_{self.table_name}_created_at ON {self.table_name}(created_at)",
+                f"CREATE INDEX IF NOT EXISTS idx_{self.table_name}_motor_type ON {self.table_name}(motor_type)",
+                f"CREATE INDEX IF NOT EXISTS idx_{self.table_name}_algorithm ON {self.table_name}(algorithm)",
+            ]),
+            (2, self._fts_migration_statements()),
+            (3, self._summary_migration_statements()),
+            (4, [
+                # 内容寻址音轨的引用计数（音轨哈希 -> 引用该音轨的记录数）
+                f"CREATE TABLE IF NOT EXISTS {self.track_refs_table_name} ("
+                f"track_hash TEXT PRIMARY KEY, ref_count INTEGER NOT NULL DEFAULT 0)",
+            ]),
+        ]
+
+    def _summary_migration_statements(self) -> List[str]:
+        """摘要指标表（以记录 ID 为主键）及排序索引"""
+        int_fields = {name for name, f in RecordSummary.__dataclass_fields__.items() if f.type is int}
+        columns = ",\n".join(
+            f"{name} {'INTEGER' if name in int_fields else 'REAL'} NOT NULL DEFAULT 0" for name in SUMMARY_COLUMNS
+        )
+        statements = [
+            f"CREATE TABLE IF NOT EXISTS {self.summary_table_name} ("
+            f"record_id INTEGER PRIMARY KEY REFERENCES {self.table_name}(id) ON DELETE CASCADE,\n"
+            f"{columns},\ncomputed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)",
+        ]
+        statements += [
+            f"CREATE INDEX IF NOT EXISTS idx_{self.summary_table_name}_{name} "
+            f"ON {self.summary_table_name}({name}, record_id DESC)"
+            for name in SUMMARY_SORT_COLUMNS
+        ]
+        return statements
+
+    def _fts_migration_statements(self) -> List[str]:
+        """文件名全文索引（FTS5 trigram 分词，支持任意子串匹配；SQLite 不支持时跳过，搜索回退为 LIKE）"""
+        if not self._supports_fts_trigram():
+            print("警告: SQLite 不支持 FTS5 trigram 分词（需要 3.34+），文件名搜索使用 LIKE")
+            return []
+        fts = self.fts_table_name
+        return [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+            f"filename, content='{self.table_name}', content_rowid='id', tokenize='trigram')",
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {self.table_name} BEGIN "
+            f"INSERT INTO {fts}(rowid, filename) VALUES (new.id, new.filename); END",
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {self.table_name} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, filename) VALUES ('delete', old.id, old.filename); END",
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF filename ON {self.table_name} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, filename) VALUES ('delete', old.id, old.filename); "
+            f"INSERT INTO {fts}(rowid, filename) VALUES (new.id, new.filename); END",
+            f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+        ]
+
+    def _supports_fts_trigram(self) -> bool:
+        """探测 FTS5 及 trigram 分词器是否可用（旧版 SQLite 可能编译了 FTS5 但没有 trigram）"""
+        with self._pool.connection() as conn:
+            try:
+                conn.execute("CREATE VIRTUAL TABLE temp.fts_trigram_probe USING fts5(x, tokenize='trigram')")
+            except sqlite3.OperationalError:
+                return False
+            conn.execute("DROP TABLE temp.fts_trigram_probe")
+        return True
+
     def init_storage(self) -> None:
-        """初始化数据库表结构"""
-        with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute(f'''
-                CREATE TABLE IF NOT EXISTS {self.table_name} (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    filename TEXT,
-                    file_md5 TEXT UNIQUE,
-                    motor_type TEXT,
-                    algorithm TEXT,
-                    piano_type TEXT,
-                    file_date TEXT,
-                    track_data_path TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            conn.commit()
-            conn.close()
+        """初始化数据库表结构并执行迁移"""
+        with self._pool.connection() as conn:
+            with conn:
+                conn.execute(f'''
+                    CREATE TABLE IF NOT EXISTS {self.table_name} (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        filename TEXT,
+                        file_md5 TEXT UNIQUE,
+                        motor_type TEXT,
+                        algorithm TEXT,
+                        piano_type TEXT,
+                        file_date TEXT,
+                        track_data_path TEXT,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                ''')
+        self._pool.migrate(self._migrations())
+        with self._pool.connection() as conn:
+            self._has_fts = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = ?", (self.fts_table_name,)
+            ).fetchone() is not None
 
     def save_record(self, filename: str, file_md5: str, motor_type: str, 
                    algorithm: str, piano_type: str, file_date: str, 
@@ -94,135 +350,232 @@ class SQLiteHistoryManager(BaseHistoryManager):
         
         此方法会自动：
         1. 检查 MD5 是否已存在
-        2. 如果不存在，保存 track_data 到 Parquet 文件
-        3. 将 元数据 + Parquet 路径 写入数据库
+        2. 如果不存在，按音轨内容寻址保存 track_data（已存在的相同音轨不重复写入）并写入清单
+        3. 将 元数据 + 清单路径 写入数据库，同时增加音轨引用计数
         """
-        with self._lock:
-            # 1. 查重
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute(f"SELECT id, track_data_path FROM {self.table_name} WHERE file_md5 = ?", (file_md5,))
-            row = cursor.fetchone()
-            
-            if row:
-                conn.close()
-                return row[0]  # 已存在，直接返回 ID
+        return self.save_records([HistorySaveRequest(
+            filename, file_md5, motor_type, algorithm, piano_type, file_date, track_data
+        )])[0]
 
-            # 2. 准备 Parquet 存储路径
-            # 存储在 track_data 文件夹下，以 MD5 命名
-            storage_dir = Path("track_data_storage")
-            storage_dir.mkdir(exist_ok=True)
-            parquet_path = storage_dir / f"{file_md5}.parquet"
-            
-            # 3. 保存 Parquet 文件
-            from .parquet_utility import ParquetUtility
+    def save_records(self, requests: List[HistorySaveRequest]) -> List[Optional[int]]:
+        """
+        批量保存记录：先写入全部文件（临时文件 + 原子重命名），再在一个事务中插入全部记录行
+
+        任一步骤失败时整批回滚，本批新写入且未被引用的音轨与清单一并清理。
+        """
+        with self._save_lock:
+            # 1. 查重（数据库中已存在的 MD5，以及同一批次内重复的 MD5）
+            results: List[Optional[int]] = [None] * len(requests)
+            pending: Dict[str, int] = {}
+            for index, request in enumerate(requests):
+                existing_id = self._get_id_by_md5(request.file_md5)
+                if existing_id is not None:
+                    results[index] = existing_id  # 已存在，直接返回 ID
+                elif request.file_md5 not in pending:
+                    pending[request.file_md5] = index
+            if not pending:
+                return results
+
+            # 2. 按音轨内容寻址保存（相同音轨只存一份）并写入清单（不占用数据库连接）
+            # 存储在 track_data_storage 文件夹下，清单以 MD5 命名
+            track_store = TrackStore("track_data_storage")
+            written: List[Tuple[int, str, List[str]]] = []
+            created: List[str] = []
             try:
-                ParquetUtility.save_parquet(track_data, str(parquet_path))
+                for index in pending.values():
+                    request = requests[index]
+                    manifest_path, track_hashes, new_hashes = track_store.save_record_tracks(
+                        request.file_md5, request.track_data)
+                    written.append((index, manifest_path, track_hashes))
+                    created.extend(new_hashes)
+
+                # 3. 在一个事务中插入全部记录，并增加音轨引用计数
+                with self._pool.connection() as conn:
+                    with conn:
+                        for index, manifest_path, track_hashes in written:
+                            request = requests[index]
+                            cursor = conn.execute(f'''
+                                INSERT INTO {self.table_name} 
+                                (filename, file_md5, motor_type, algorithm, piano_type, file_date, track_data_path, created_at)
+                                VALUES (?, ?, ?, ?, ?, ?, ?, datetime('now', 'localtime'))
+                            ''', (
+                                request.filename, request.file_md5, request.motor_type, request.algorithm,
+                                request.piano_type, request.file_date, manifest_path
+                            ))
+                            results[index] = cursor.lastrowid
+                            conn.executemany(
+                                f"INSERT INTO {self.track_refs_table_name} (track_hash, ref_count) VALUES (?, 1) "
+                                f"ON CONFLICT(track_hash) DO UPDATE SET ref_count = ref_count + 1",
+                                [(track_hash,) for track_hash in track_hashes]
+                            )
             except Exception as e:
-                conn.close()
+                # 未被任何记录引用的新音轨与清单一并清理
+                track_store.remove_tracks(created)
+                for _, manifest_path, _ in written:
+                    if os.path.exists(manifest_path):
+                        os.remove(manifest_path)
+                if isinstance(e, sqlite3.Error):
+                    raise
                 raise IOError(f"Failed to save Parquet file: {e}")
 
-            # 4. 插入数据库
-            try:
-                cursor.execute(f'''
-                    INSERT INTO {self.table_name} 
-                    (filename, file_md5, motor_type, algorithm, piano_type, file_date, track_data_path, created_at)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, datetime('now', 'localtime'))
-                ''', (
-                    filename, file_md5, motor_type, algorithm, piano_type, file_date, str(parquet_path.absolute())
-                ))
-                record_id = cursor.lastrowid
-                conn.commit()
-                return record_id
-            except Exception as e:
-                conn.rollback()
-                raise e
-            finally:
-                conn.close()
+            # 同一批次内重复的 MD5 指向首次保存的记录
+            for index, request in enumerate(requests):
+                if results[index] is None:
+                    results[index] = results[pending[request.file_md5]]
+            return results
+
+    def _release_tracks(self, conn: sqlite3.Connection, manifest_path: str) -> List[str]:
+        """减少清单所引用音轨的计数，返回计数归零（可删除文件）的音轨哈希（调用方持有事务）"""
+        if not os.path.exists(manifest_path):
+            return []
+        track_hashes = TrackStore.read_manifest(manifest_path)
+        conn.executemany(
+            f"UPDATE {self.track_refs_table_name} SET ref_count = ref_count - 1 WHERE track_hash = ?",
+            [(track_hash,) for track_hash in track_hashes]
+        )
+        placeholders = ", ".join("?" for _ in track_hashes)
+        orphans = [row[0] for row in conn.execute(
+            f"SELECT track_hash FROM {self.track_refs_table_name} "
+            f"WHERE ref_count <= 0 AND track_hash IN ({placeholders})", track_hashes
+        )]
+        conn.execute(f"DELETE FROM {self.track_refs_table_name} WHERE ref_count <= 0")
+        return orphans
+
+    def _get_id_by_md5(self, file_md5: str) -> Optional[int]:
+        with self._pool.connection() as conn:
+            row = conn.execute(f"SELECT id FROM {self.table_name} WHERE file_md5 = ?", (file_md5,)).fetchone()
+            return row[0] if row else None
 
     def get_all_records(self, limit: int = 20) -> List[dict]:
         """获取最近的历史记录"""
-        with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            cursor.execute(f"SELECT * FROM {self.table_name} ORDER BY id DESC LIMIT ?", (limit,))
-            rows = cursor.fetchall()
-            conn.close()
+        with self._pool.connection() as conn:
+            rows = conn.execute(f"SELECT * FROM {self.table_name} ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
             return [dict(row) for row in rows]
 
     def get_record_by_id(self, record_id: int) -> Optional[dict]:
         """通过 ID 获取记录"""
-        with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            cursor.execute(f"SELECT * FROM {self.table_name} WHERE id = ?", (record_id,))
-            row = cursor.fetchone()
-            conn.close()
+        with self._pool.connection() as conn:
+            row = conn.execute(f"SELECT * FROM {self.table_name} WHERE id = ?", (record_id,)).fetchone()
             return dict(row) if row else None
 
     def get_record_by_md5(self, file_md5: str) -> Optional[dict]:
         """通过 MD5 获取单条记录"""
-        with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            cursor.execute(f"SELECT * FROM {self.table_name} WHERE file_md5 = ?", (file_md5,))
-            row = cursor.fetchone()
-            conn.close()
+        with self._pool.connection() as conn:
+            row = conn.execute(f"SELECT * FROM {self.table_name} WHERE file_md5 = ?", (file_md5,)).fetchone()
             return dict(row) if row else None
 
     def get_records_by_filename(self, filename: str) -> List[dict]:
         """通过文件名筛选记录"""
-        with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+        with self._pool.connection() as conn:
             # 支持模糊查询或精确查询，这里默认精确
-            cursor.execute(f"SELECT * FROM {self.table_name} WHERE filename = ? ORDER BY created_at DESC", (filename,))
-            rows = cursor.fetchall()
-            conn.close()
+            rows = conn.execute(
+                f"SELECT * FROM {self.table_name} WHERE filename = ? ORDER BY created_at DESC", (filename,)
+            ).fetchall()
             return [dict(row) for row in rows]
 
+    def query_records(self, query: HistoryQuery, page_size: int = 50,
+                      cursor: Optional[Any] = None) -> HistoryPage:
+        """按条件分页查询历史记录（文件名搜索使用 FTS5，少于 3 个字符时回退为 LIKE）"""
+        clauses, params = self._build_filter_conditions(query, '?')
+        search = (query.search or '').strip()
+        if search:
+            if self._has_fts and len(search) >= 3:
+                # 短语查询：trigram 分词下等价于不区分大小写的子串匹配
+                clauses.append(f"t.id IN (SELECT rowid FROM {self.fts_table_name} WHERE {self.fts_table_name} MATCH ?)")
+                params.append('"' + search.replace('"', '""') + '"')
+            else:
+                clauses.append("filename LIKE ? ESCAPE '\\'")
+                params.append('%' + search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%')
+
+        order, cursor_clause, cursor_params = self._build_sort_clause(query, cursor, '?')
+        # 按指标排序时只包含已有摘要的记录（内连接，可直接走指标索引）
+        join = "JOIN" if query.sort_by else "LEFT JOIN"
+        source = f"{self.table_name} t {join} {self.summary_table_name} s ON s.record_id = t.id"
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        page_clauses = clauses + [cursor_clause] if cursor_clause else clauses
+        page_where = f"WHERE {' AND '.join(page_clauses)}" if page_clauses else ""
+        summary_columns = ", ".join(f"s.{name}" for name in SUMMARY_COLUMNS)
+
+        with self._pool.connection() as conn:
+            total = conn.execute(f"SELECT COUNT(*) FROM {source} {where}", params).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT t.*, {summary_columns} FROM {source} {page_where} ORDER BY {order} LIMIT ?",
+                params + cursor_params + [page_size + 1]
+            ).fetchall()
+
+        records = [dict(row) for row in rows[:page_size]]
+        next_cursor = self._next_cursor(query, records) if len(rows) > page_size else None
+        return HistoryPage(records=records, next_cursor=next_cursor, total=total)
+
+    def save_summary(self, record_id: int, summary: RecordSummary) -> None:
+        """保存（覆盖）记录的摘要指标"""
+        values = asdict(summary)
+        columns = ", ".join(SUMMARY_COLUMNS)
+        placeholders = ", ".join("?" for _ in SUMMARY_COLUMNS)
+        with self._pool.connection() as conn:
+            with conn:
+                conn.execute(
+                    f"INSERT OR REPLACE INTO {self.summary_table_name} (record_id, {columns}, computed_at) "
+                    f"VALUES (?, {placeholders}, datetime('now', 'localtime'))",
+                    [record_id] + [values[name] for name in SUMMARY_COLUMNS]
+                )
+
+    def get_summary(self, record_id: int) -> Optional[dict]:
+        """获取记录的摘要指标"""
+        with self._pool.connection() as conn:
+            row = conn.execute(
+                f"SELECT * FROM {self.summary_table_name} WHERE record_id = ?", (record_id,)
+            ).fetchone()
+            return dict(row) if row else None
+
+    def get_records_without_summary(self, limit: int = 100) -> List[dict]:
+        """获取尚未计算摘要的记录（最新的优先）"""
+        with self._pool.connection() as conn:
+            rows = conn.execute(
+                f"SELECT t.* FROM {self.table_name} t LEFT JOIN {self.summary_table_name} s ON s.record_id = t.id "
+                f"WHERE s.record_id IS NULL ORDER BY t.id DESC LIMIT ?", (limit,)
+            ).fetchall()
+            return [dict(row) for row in rows]
+
+    def get_data_version(self) -> Tuple[Any, ...]:
+        """历史数据版本指纹：(记录数, 最大记录ID, 摘要数, 最近摘要时间)"""
+        with self._pool.connection() as conn:
+            row = conn.execute(
+                f"SELECT (SELECT COUNT(*) FROM {self.table_name}), (SELECT MAX(id) FROM {self.table_name}), "
+                f"(SELECT COUNT(*) FROM {self.summary_table_name}), (SELECT MAX(computed_at) FROM {self.summary_table_name})"
+            ).fetchone()
+            return tuple(row)
+
     def delete_record_by_id(self, record_id: int, delete_file: bool = True) -> bool:
         """
         通过 ID 删除记录
         
         Args:
             record_id: 数据库记录 ID
-            delete_file: 是否同时从磁盘删除关联的 Parquet 文件
+            delete_file: 是否同时从磁盘删除关联的 Parquet 文件（音轨只在引用计数归零时删除）
         """
-        with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
-            # 1. 查找文件路径（以便删除文件）
-            cursor.execute(f"SELECT track_data_path FROM {self.table_name} WHERE id = ?", (record_id,))
-            row = cursor.fetchone()
-            
-            if not row:
-                conn.close()
-                return False
-                
-            file_path = row['track_data_path']
-            
-            # 2. 从数据库删除记录
-            cursor.execute(f"DELETE FROM {self.table_name} WHERE id = ?", (record_id,))
-            deleted = cursor.rowcount > 0
-            
-            conn.commit()
-            conn.close()
-            
-            # 3. 删除物理文件
-            if deleted and delete_file and file_path and os.path.exists(file_path):
-                try:
-                    os.remove(file_path)
-                except Exception as e:
-                    print(f"警告: 数据库记录已删除，但无法删除 Parquet 文件: {e}")
-            
-            return deleted
+        # 与 save_record 串行：避免音轨计数归零后、文件删除前被并发保存重新引用
+        with self._save_lock:
+            with self._pool.connection() as conn:
+                with conn:
+                    # 1. 查找文件路径（以便删除文件）
+                    row = conn.execute(
+                        f"SELECT track_data_path FROM {self.table_name} WHERE id = ?", (record_id,)
+                    ).fetchone()
+                    if not row:
+                        return False
+                    file_path = row['track_data_path']
+
+                    # 2. 从数据库删除记录及其摘要（连接未启用外键约束，显式删除），释放音轨引用
+                    conn.execute(f"DELETE FROM {self.summary_table_name} WHERE record_id = ?", (record_id,))
+                    deleted = conn.execute(f"DELETE FROM {self.table_name} WHERE id = ?", (record_id,)).rowcount > 0
+                    orphan_tracks = self._release_tracks(conn, file_path) if deleted and is_manifest(file_path) else []
+
+            # 3. 删除物理文件（清单或旧版 Parquet、热层副本、不再被引用的音轨）
+            if deleted and delete_file:
+                self._delete_record_files(file_path, orphan_tracks)
+
+        return deleted
 
 class MySQLHistoryManager(BaseHistoryManager):
     """基于 MySQL 的历史记录管理器实现"""
@@ -238,6 +591,8 @@ class MySQLHistoryManager(BaseHistoryManager):
             'charset': 'utf8mb4'
         }
         self.table_name = "track_data"
+        self.summary_table_name = f"{self.table_name}_summary"
+        self.track_refs_table_name = f"{self.table_name}_track_refs"
         self._lock = threading.RLock()
         self.init_storage()
 
@@ -281,10 +636,31 @@ class MySQLHistoryManager(BaseHistoryManager):
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
             ''')
+            cursor.execute(self._summary_table_statement())
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.track_refs_table_name} ("
+                f"track_hash CHAR(64) PRIMARY KEY, ref_count INT NOT NULL DEFAULT 0"
+                f") ENGINE=InnoDB DEFAULT CHARSET=utf8mb4"
+            )
             conn.commit()
             cursor.close()
             conn.close()
 
+    def _summary_table_statement(self) -> str:
+        """摘要指标表（以记录 ID 为主键，删除记录时级联删除）及排序索引"""
+        int_fields = {name for name, f in RecordSummary.__dataclass_fields__.items() if f.type is int}
+        columns = ",\n".join(
+            f"{name} {'INT' if name in int_fields else 'DOUBLE'} NOT NULL DEFAULT 0" for name in SUMMARY_COLUMNS
+        )
+        indexes = ",\n".join(f"INDEX idx_{name} ({name}, record_id)" for name in SUMMARY_SORT_COLUMNS)
+        return (
+            f"CREATE TABLE IF NOT EXISTS {self.summary_table_name} (\n"
+            f"record_id INT PRIMARY KEY,\n{columns},\n"
+            f"computed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,\n{indexes},\n"
+            f"FOREIGN KEY (record_id) REFERENCES {self.table_name}(id) ON DELETE CASCADE"
+            f") ENGINE=InnoDB DEFAULT CHARSET=utf8mb4"
+        )
+
     def save_record(self, filename: str, file_md5: str, motor_type: str, 
                    algorithm: str, piano_type: str, file_date: str, 
                    track_data: List[List['OptimizedNote']]) -> Optional[int]:
@@ -302,34 +678,36 @@ class MySQLHistoryManager(BaseHistoryManager):
                 conn.close()
                 return row[0]
 
-            # 2. 准备 Parquet 存储路径
-            storage_dir = Path("track_data_storage")
-            storage_dir.mkdir(exist_ok=True)
-            parquet_path = storage_dir / f"{file_md5}.parquet"
-            
-            # 3. 保存 Parquet 文件
-            from .parquet_utility import ParquetUtility
+            # 2. 按音轨内容寻址保存（相同音轨只存一份）并写入清单
+            track_store = TrackStore("track_data_storage")
             try:
-                ParquetUtility.save_parquet(track_data, str(parquet_path))
+                manifest_path, track_hashes, created = track_store.save_record_tracks(file_md5, track_data)
             except Exception as e:
                 cursor.close()
                 conn.close()
                 raise IOError(f"Failed to save Parquet file: {e}")
 
-            # 4. 插入数据库
+            # 3. 插入数据库，并在同一事务中增加音轨引用计数
             try:
                 cursor.execute(f'''
                     INSERT INTO {self.table_name} 
                     (filename, file_md5, motor_type, algorithm, piano_type, file_date, track_data_path)
                     VALUES (%s, %s, %s, %s, %s, %s, %s)
                 ''', (
-                    filename, file_md5, motor_type, algorithm, piano_type, file_date, str(parquet_path.absolute())
+                    filename, file_md5, motor_type, algorithm, piano_type, file_date, manifest_path
                 ))
                 record_id = cursor.lastrowid
+                cursor.executemany(
+                    f"INSERT INTO {self.track_refs_table_name} (track_hash, ref_count) VALUES (%s, 1) "
+                    f"ON DUPLICATE KEY UPDATE ref_count = ref_count + 1",
+                    [(track_hash,) for track_hash in track_hashes]
+                )
                 conn.commit()
                 return record_id
             except Exception as e:
                 conn.rollback()
+                track_store.remove_tracks(created)
+                os.remove(manifest_path)
                 raise e
             finally:
                 cursor.close()
@@ -379,6 +757,97 @@ class MySQLHistoryManager(BaseHistoryManager):
             conn.close()
             return rows
 
+    def query_records(self, query: HistoryQuery, page_size: int = 50,
+                      cursor: Optional[Any] = None) -> HistoryPage:
+        """按条件分页查询历史记录（文件名搜索使用 LIKE 子串匹配）"""
+        clauses, params = self._build_filter_conditions(query, '%s')
+        search = (query.search or '').strip()
+        if search:
+            clauses.append("filename LIKE %s")
+            params.append('%' + search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%')
+
+        order, cursor_clause, cursor_params = self._build_sort_clause(query, cursor, '%s')
+        join = "JOIN" if query.sort_by else "LEFT JOIN"
+        source = f"{self.table_name} t {join} {self.summary_table_name} s ON s.record_id = t.id"
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        page_clauses = clauses + [cursor_clause] if cursor_clause else clauses
+        page_where = f"WHERE {' AND '.join(page_clauses)}" if page_clauses else ""
+        summary_columns = ", ".join(f"s.{name}" for name in SUMMARY_COLUMNS)
+
+        with self._lock:
+            conn = self._get_connection()
+            db_cursor = conn.cursor(dictionary=True)
+            db_cursor.execute(f"SELECT COUNT(*) AS total FROM {source} {where}", params)
+            total = db_cursor.fetchone()['total']
+            db_cursor.execute(
+                f"SELECT t.*, {summary_columns} FROM {source} {page_where} ORDER BY {order} LIMIT %s",
+                params + cursor_params + [page_size + 1]
+            )
+            rows = db_cursor.fetchall()
+            db_cursor.close()
+            conn.close()
+
+        records = rows[:page_size]
+        next_cursor = self._next_cursor(query, records) if len(rows) > page_size else None
+        return HistoryPage(records=records, next_cursor=next_cursor, total=total)
+
+    def save_summary(self, record_id: int, summary: RecordSummary) -> None:
+        """保存（覆盖）记录的摘要指标"""
+        values = asdict(summary)
+        columns = ", ".join(SUMMARY_COLUMNS)
+        placeholders = ", ".join("%s" for _ in SUMMARY_COLUMNS)
+        with self._lock:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            try:
+                cursor.execute(
+                    f"REPLACE INTO {self.summary_table_name} (record_id, {columns}) VALUES (%s, {placeholders})",
+                    [record_id] + [values[name] for name in SUMMARY_COLUMNS]
+                )
+                conn.commit()
+            finally:
+                cursor.close()
+                conn.close()
+
+    def get_summary(self, record_id: int) -> Optional[dict]:
+        """获取记录的摘要指标"""
+        with self._lock:
+            conn = self._get_connection()
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute(f"SELECT * FROM {self.summary_table_name} WHERE record_id = %s", (record_id,))
+            row = cursor.fetchone()
+            cursor.close()
+            conn.close()
+            return row
+
+    def get_records_without_summary(self, limit: int = 100) -> List[dict]:
+        """获取尚未计算摘要的记录（最新的优先）"""
+        with self._lock:
+            conn = self._get_connection()
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute(
+                f"SELECT t.* FROM {self.table_name} t LEFT JOIN {self.summary_table_name} s ON s.record_id = t.id "
+                f"WHERE s.record_id IS NULL ORDER BY t.id DESC LIMIT %s", (limit,)
+            )
+            rows = cursor.fetchall()
+            cursor.close()
+            conn.close()
+            return rows
+
+    def get_data_version(self) -> Tuple[Any, ...]:
+        """历史数据版本指纹：(记录数, 最大记录ID, 摘要数, 最近摘要时间)"""
+        with self._lock:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            cursor.execute(
+                f"SELECT (SELECT COUNT(*) FROM {self.table_name}), (SELECT MAX(id) FROM {self.table_name}), "
+                f"(SELECT COUNT(*) FROM {self.summary_table_name}), (SELECT MAX(computed_at) FROM {self.summary_table_name})"
+            )
+            row = cursor.fetchone()
+            cursor.close()
+            conn.close()
+            return tuple(row)
+
     def delete_record_by_id(self, record_id: int, delete_file: bool = True) -> bool:
         """通过 ID 删除记录"""
         with self._lock:
@@ -396,20 +865,31 @@ class MySQLHistoryManager(BaseHistoryManager):
                 
             file_path = row['track_data_path']
             
-            # 2. 从数据库删除记录
+            # 2. 从数据库删除记录（摘要级联删除），释放音轨引用
             cursor.execute(f"DELETE FROM {self.table_name} WHERE id = %s", (record_id,))
             deleted = cursor.rowcount > 0
+            orphan_tracks: List[str] = []
+            if deleted and is_manifest(file_path) and os.path.exists(file_path):
+                track_hashes = TrackStore.read_manifest(file_path)
+                cursor.executemany(
+                    f"UPDATE {self.track_refs_table_name} SET ref_count = ref_count - 1 WHERE track_hash = %s",
+                    [(track_hash,) for track_hash in track_hashes]
+                )
+                placeholders = ", ".join("%s" for _ in track_hashes)
+                cursor.execute(
+                    f"SELECT track_hash FROM {self.track_refs_table_name} "
+                    f"WHERE ref_count <= 0 AND track_hash IN ({placeholders})", track_hashes
+                )
+                orphan_tracks = [r['track_hash'] for r in cursor.fetchall()]
+                cursor.execute(f"DELETE FROM {self.track_refs_table_name} WHERE ref_count <= 0")
             
             conn.commit()
             cursor.close()
             conn.close()
             
-            # 3. 删除物理文件
-            if deleted and delete_file and file_path and os.path.exists(file_path):
-                try:
-                    os.remove(file_path)
-                except Exception as e:
-                    print(f"警告: 数据库记录已删除，但无法删除 Parquet 文件: {e}")
+            # 3. 删除物理文件（清单或旧版 Parquet、热层副本、不再被引用的音轨）
+            if deleted and delete_file:
+                self._delete_record_files(file_path, orphan_tracks)
             
             return deleted
 
@@ -424,10 +904,30 @@ class ParquetDataLoader:
         Args:
             record: 包含 track_data_path 的数据库记录字典
         """
+        return ParquetDataLoader.load(record)
+
+    @staticmethod
+    def load(record: dict, tracks=None, key_ids=None, time_range=None):
+        """
+        从数据库记录部分加载音轨数据（谓词下推，只解码需要的行组）
+        
+        Args:
+            record: 包含 track_data_path 的数据库记录字典
+            tracks: 只加载指定音轨索引（例如 [0] 只加载录制音轨），返回列表保留全部音轨位置
+            key_ids: 只加载指定按键ID
+            time_range: 只加载与 (start_ms, end_ms) 时间窗口重叠的音符
+        """
         from .parquet_utility import ParquetUtility
+        from .hot_tier import get_hot_tier
         path = record.get("track_data_path")
         if not path or not os.path.exists(path):
             raise FileNotFoundError(f"Parquet file does not exist: {path}")
         
-        tracks = ParquetUtility.load_parquet(path)
-        return tracks
+        # 优先从热层（内存映射的 Arrow IPC）加载；未命中时读取 Parquet 并在后台提升到热层
+        hot_tier = get_hot_tier(path)
+        result = hot_tier.load(path, tracks=tracks, key_ids=key_ids, time_range=time_range)
+        if result is not None:
+            return result
+        result = ParquetUtility.load_parquet(path, tracks=tracks, key_ids=key_ids, time_range=time_range)
+        hot_tier.promote_async(path)
+        return result
@@ -0,0 +1,157 @@
+"""
+历史记录后台写入队列
+上传分析完成后，历史记录（音轨文件 + 数据库行）与摘要由单个后台线程按提交顺序写入：
+- 有界队列：排队任务达到上限时提交方阻塞，避免批量上传时内存中堆积大量待写音轨
+- 批量写入：队列中连续的记录保存请求合并为一次 save_records（一个数据库事务）
+- 原子写入：音轨与清单先写临时文件再重命名，全部落盘后才插入数据库行
+- flush()：等待已提交的任务全部完成（测试与退出时使用）
+"""
+import atexit
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional, Tuple
+
+from utils.constants import HISTORY_WRITER_BATCH_SIZE, HISTORY_WRITER_MAX_PENDING
+from .history_manager import HistorySaveRequest
+
+# 进程退出时等待未完成写入的最长时间（秒）
+EXIT_FLUSH_TIMEOUT_S = 30.0
+
+# 队列元素：(Future, 保存请求) 或 (Future, (函数, 位置参数, 关键字参数))
+_Task = Tuple[Future, Any]
+
+
+class HistoryWriter:
+    """历史记录后台写入器（单线程，保证写入顺序）"""
+
+    def __init__(self, history_manager, max_pending: int = HISTORY_WRITER_MAX_PENDING,
+                 batch_size: int = HISTORY_WRITER_BATCH_SIZE):
+        """
+        Args:
+            history_manager: 历史记录管理器
+            max_pending: 排队任务上限（达到上限时 submit 阻塞）
+            batch_size: 单次批量保存的最大记录数
+        """
+        self.history_manager = history_manager
+        self.batch_size = max(1, batch_size)
+        self._queue: "queue.Queue[_Task]" = queue.Queue(maxsize=max(1, max_pending))
+        self._unfinished = 0
+        self._idle = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+        self._thread.start()
+
+    # ==================== 提交 ====================
+
+    def submit_save(self, request: HistorySaveRequest) -> Future:
+        """
+        提交记录保存（队列满时阻塞）
+
+        Returns:
+            Future: 结果为记录 ID（已存在时为已有记录的 ID）
+        """
+        return self._put(request)
+
+    def submit(self, func: Callable, *args, **kwargs) -> Future:
+        """
+        提交任意写入任务（例如摘要保存），在之前提交的记录保存完成后执行
+
+        Returns:
+            Future: 结果为 func 的返回值
+        """
+        return self._put((func, args, kwargs))
+
+    def _put(self, item: Any) -> Future:
+        future: Future = Future()
+        with self._idle:
+            self._unfinished += 1
+        self._queue.put((future, item))
+        return future
+
+    # ==================== 等待 ====================
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待已提交的任务全部完成
+
+        Returns:
+            bool: 是否在超时前全部完成
+        """
+        with self._idle:
+            return self._idle.wait_for(lambda: self._unfinished == 0, timeout=timeout)
+
+    def pending_count(self) -> int:
+        """尚未完成的任务数（含正在执行的任务）"""
+        with self._idle:
+            return self._unfinished
+
+    # ==================== 写入线程 ====================
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._process(batch)
+            with self._idle:
+                self._unfinished -= len(batch)
+                self._idle.notify_all()
+
+    def _process(self, batch: List[_Task]) -> None:
+        """按提交顺序执行：连续的保存请求合并为一次批量保存，其余任务逐个执行"""
+        saves: List[_Task] = []
+        for future, item in batch:
+            if isinstance(item, HistorySaveRequest):
+                saves.append((future, item))
+                continue
+            self._save_batch(saves)
+            saves = []
+            func, args, kwargs = item
+            self._run_task(future, func, *args, **kwargs)
+        self._save_batch(saves)
+
+    def _save_batch(self, saves: List[_Task]) -> None:
+        if not saves:
+            return
+        if len(saves) == 1:
+            future, request = saves[0]
+            self._run_task(future, lambda: self.history_manager.save_records([request])[0])
+            return
+        try:
+            record_ids = self.history_manager.save_records([request for _, request in saves])
+        except Exception as e:
+            # 整批回滚后逐条重试，单条失败不影响同批其他记录
+            print(f"警告: 批量保存历史记录失败，改为逐条保存: {e}")
+            for future, request in saves:
+                self._run_task(future, lambda r=request: self.history_manager.save_records([r])[0])
+            return
+        for (future, _), record_id in zip(saves, record_ids):
+            if future.set_running_or_notify_cancel():
+                future.set_result(record_id)
+
+    @staticmethod
+    def _run_task(future: Future, func: Callable, *args, **kwargs) -> None:
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(func(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+
+
+_writers: dict = {}
+_writers_lock = threading.Lock()
+
+
+def get_history_writer(history_manager) -> HistoryWriter:
+    """获取历史管理器对应的进程级写入器（首次调用时创建，退出时等待未完成的写入）"""
+    with _writers_lock:
+        writer = _writers.get(id(history_manager))
+        if writer is None or writer.history_manager is not history_manager:
+            writer = HistoryWriter(history_manager)
+            _writers[id(history_manager)] = writer
+            atexit.register(writer.flush, EXIT_FLUSH_TIMEOUT_S)
+        return writer
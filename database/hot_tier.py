@@ -0,0 +1,186 @@
+"""
+历史数据热层存储
+冷层：压缩的 Parquet 归档（track_data_storage/{md5}.parquet，长期保存）
+热层：最近打开记录的未压缩 Arrow IPC 文件（track_data_storage/hot/{md5}.arrow），
+      通过内存映射读取，几乎无解码开销
+记录首次打开后在后台提升到热层；热层按磁盘预算以 LRU 顺序淘汰（仅删除热层副本）
+"""
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import pyarrow as pa
+
+from spmid.spmid_reader import OptimizedNote
+from utils.constants import HOT_TIER_DISK_BUDGET_MB
+from utils.logger import Logger
+
+logger = Logger.get_logger()
+
+HOT_DIR_NAME = "hot"
+HOT_FILE_SUFFIX = ".arrow"
+
+# 后台提升线程（单线程，避免与前台加载争抢磁盘）
+_promotion_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="hot-tier-promote")
+
+
+class ArrowHotTier:
+    """Arrow IPC 热层（每个存储目录一个实例）"""
+
+    def __init__(self, hot_dir: str, budget_bytes: int):
+        """
+        Args:
+            hot_dir: 热层目录
+            budget_bytes: 热层磁盘预算（字节）
+        """
+        self.hot_dir = Path(hot_dir)
+        self.budget_bytes = budget_bytes
+        self._lock = threading.Lock()
+        self._pending: set = set()
+        # 记录名(md5) -> 文件大小，按最近访问排序（最久未访问在前）
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._scan()
+
+    def hot_path(self, parquet_path: str) -> Path:
+        """冷层 Parquet 路径对应的热层文件路径"""
+        return self.hot_dir / f"{Path(parquet_path).stem}{HOT_FILE_SUFFIX}"
+
+    def contains(self, parquet_path: str) -> bool:
+        with self._lock:
+            return Path(parquet_path).stem in self._index
+
+    def load(self, parquet_path: str,
+             tracks: Optional[Iterable[int]] = None,
+             key_ids: Optional[Iterable[int]] = None,
+             time_range=None) -> Optional[List[List[OptimizedNote]]]:
+        """
+        从热层加载（内存映射，不解压）
+
+        Returns:
+            Optional[List[List[OptimizedNote]]]: 未命中时返回 None
+        """
+        from .parquet_utility import ParquetUtility
+
+        name = Path(parquet_path).stem
+        with self._lock:
+            if name not in self._index:
+                return None
+            self._index.move_to_end(name)
+        path = self.hot_path(parquet_path)
+        try:
+            # 记录访问时间，重启后仍能恢复 LRU 顺序
+            os.utime(path)
+            with pa.memory_map(str(path), 'r') as source:
+                table = pa.ipc.open_file(source).read_all()
+            return ParquetUtility.table_to_tracks(table, tracks=tracks, key_ids=key_ids, time_range=time_range)
+        except (OSError, pa.ArrowInvalid) as e:
+            logger.warning(f"热层文件读取失败，回退到 Parquet: {path}: {e}")
+            self.discard(parquet_path)
+            return None
+
+    def promote_async(self, parquet_path: str) -> None:
+        """在后台将记录提升到热层（已在热层或正在提升时忽略）"""
+        name = Path(parquet_path).stem
+        with self._lock:
+            if name in self._index or name in self._pending:
+                return
+            self._pending.add(name)
+        _promotion_executor.submit(self._promote_task, parquet_path)
+
+    def promote(self, parquet_path: str) -> bool:
+        """将冷层 Parquet 转写为未压缩的 Arrow IPC 文件（先写临时文件再原子替换）"""
+        from .parquet_utility import ParquetUtility
+
+        table = ParquetUtility.read_track_table(parquet_path)
+        self.hot_dir.mkdir(parents=True, exist_ok=True)
+        path = self.hot_path(parquet_path)
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        with pa.OSFile(str(tmp_path), 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._index[path.stem] = path.stat().st_size
+            self._index.move_to_end(path.stem)
+        self._enforce_budget()
+        return True
+
+    def discard(self, parquet_path: str) -> None:
+        """删除记录的热层副本（删除历史记录时调用）"""
+        name = Path(parquet_path).stem
+        with self._lock:
+            self._index.pop(name, None)
+        self._remove_file(self.hot_path(parquet_path))
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'record_count': len(self._index), 'total_bytes': sum(self._index.values())}
+
+    # ==================== 私有方法 ====================
+
+    def _promote_task(self, parquet_path: str) -> None:
+        name = Path(parquet_path).stem
+        try:
+            if os.path.exists(parquet_path):
+                self.promote(parquet_path)
+                logger.info(f"🔥 记录已提升到热层: {name}")
+        except Exception as e:
+            logger.warning(f"热层提升失败 ({name}): {e}")
+        finally:
+            with self._lock:
+                self._pending.discard(name)
+
+    def _scan(self) -> None:
+        """启动时扫描热层目录，按文件修改时间恢复 LRU 顺序"""
+        if not self.hot_dir.exists():
+            return
+        entries = []
+        for path in self.hot_dir.glob(f"*{HOT_FILE_SUFFIX}"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, path.stem, stat.st_size))
+        for _, name, size in sorted(entries):
+            self._index[name] = size
+
+    def _enforce_budget(self) -> None:
+        """超出磁盘预算时按 LRU 顺序淘汰（保留最近访问的一条）"""
+        evicted = []
+        with self._lock:
+            total = sum(self._index.values())
+            while total > self.budget_bytes and len(self._index) > 1:
+                name, size = self._index.popitem(last=False)
+                total -= size
+                evicted.append(name)
+        for name in evicted:
+            self._remove_file(self.hot_dir / f"{name}{HOT_FILE_SUFFIX}")
+            logger.info(f"🧊 热层超出预算，已降级到冷层: {name}")
+
+    @staticmethod
+    def _remove_file(path: Path) -> None:
+        try:
+            if path.exists():
+                os.remove(path)
+        except OSError as e:
+            # Windows 下文件仍被映射时无法删除，下次淘汰时重试
+            logger.warning(f"热层文件删除失败: {path}: {e}")
+
+
+_hot_tiers: Dict[str, ArrowHotTier] = {}
+_hot_tiers_lock = threading.Lock()
+
+
+def get_hot_tier(parquet_path: str) -> ArrowHotTier:
+    """获取 Parquet 所在存储目录对应的热层实例"""
+    hot_dir = str(Path(parquet_path).resolve().parent / HOT_DIR_NAME)
+    with _hot_tiers_lock:
+        tier = _hot_tiers.get(hot_dir)
+        if tier is None:
+            tier = ArrowHotTier(hot_dir, HOT_TIER_DISK_BUDGET_MB * 1024 * 1024)
+            _hot_tiers[hot_dir] = tier
+        return tier
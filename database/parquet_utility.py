@@ -2,12 +2,117 @@
 Parquet 转换与存储工具
 专门负责 OptimizedNote 列表与 Parquet 文件之间的转换
 不包含任何 SPMID 解析逻辑，仅处理结构化数据持久化
+
+存储格式：
+- v1（旧版）：每个音符一行，采样数组序列化为 tobytes() 二进制块
+- v2：采样数组使用 Arrow 原生 list<uint32>/list<uint16> 列，
+  按列批量写入；读取时直接将 Arrow 缓冲区切分为 NumPy 视图
+- v3（当前）：在 v2 基础上增加 key_on_ms/key_off_ms/seq 列，按 (track, seq)（音轨内原始顺序）
+  分行组写入，行组统计信息支持按音轨/时间窗口的谓词下推，按键条件在扫描时过滤
+读取时根据文件元数据自动识别版本，v1/v2 文件保持可读（过滤条件在内存中应用）
+
+写入选项（StorageOptions）：压缩编码与级别、时间戳列 DELTA_BINARY_PACKED 编码、
+数值列 BYTE_STREAM_SPLIT 编码；编码只影响文件体积与读写速度，读取时由 Parquet 元数据自动识别。
+各选项的实测对比见 test_script/benchmark_storage_codecs.py
 """
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterable, Optional, Tuple
 from spmid.spmid_reader import OptimizedNote
+from utils.constants import (
+    PARQUET_COMPRESSION,
+    PARQUET_COMPRESSION_LEVEL,
+    PARQUET_DELTA_TIMESTAMPS,
+    PARQUET_BYTE_STREAM_SPLIT,
+)
+
+# Parquet 文件元数据中的格式版本键
+SCHEMA_VERSION_KEY = b'spmid_track_schema'
+TRACK_COUNT_KEY = b'spmid_track_count'
+SCHEMA_VERSION = 3
+
+# 行组大小（行数）：行按音轨内原始顺序（即时间顺序）写入，每个行组覆盖一段连续的时间窗口
+ROW_GROUP_SIZE = 1024
+
+# 采样数组列 -> NumPy 类型
+_SAMPLE_COLUMNS = {
+    'hammers_ts': np.uint32,
+    'hammers_val': np.uint16,
+    'after_ts': np.uint32,
+    'after_val': np.uint16,
+}
+
+_TRACK_SCHEMA = pa.schema([
+    ('track', pa.int32()),
+    ('seq', pa.int32()),             # 音符在音轨中的原始顺序
+    ('note_offset', pa.int64()),
+    ('note_id', pa.int32()),
+    ('finger', pa.int32()),
+    ('velocity', pa.int32()),
+    ('uuid', pa.string()),
+    ('key_on_ms', pa.float64()),     # 与 Note.key_on_ms 相同的定义
+    ('key_off_ms', pa.float64()),    # 与 Note.key_off_ms 相同的定义
+    ('hammers_ts', pa.list_(pa.uint32())),
+    ('hammers_val', pa.list_(pa.uint16())),
+    ('after_ts', pa.list_(pa.uint32())),
+    ('after_val', pa.list_(pa.uint16())),
+])
+
+# 时间窗口 (start_ms, end_ms)
+TimeRange = Tuple[float, float]
+
+# Parquet 叶子列路径（list 列的叶子为 "<列名>.list.element"）
+_LEAF_COLUMNS = [
+    f"{field.name}.list.element" if pa.types.is_list(field.type) else field.name for field in _TRACK_SCHEMA
+]
+# 单调递增的时间戳列（音符内采样时间戳；音轨内按顺序排列的音符偏移）
+_TIMESTAMP_LEAF_COLUMNS = ['hammers_ts.list.element', 'after_ts.list.element', 'note_offset']
+# 数值列（采样值与按键时间）：字节流拆分后同一字节位置的数据相邻，压缩率更高
+_VALUE_LEAF_COLUMNS = ['hammers_val.list.element', 'after_val.list.element', 'key_on_ms', 'key_off_ms']
+
+
+@dataclass(frozen=True)
+class StorageOptions:
+    """Parquet 写入选项（默认值见 utils/constants.py）"""
+    compression: str = PARQUET_COMPRESSION                      # snappy / zstd / lz4 / gzip / none
+    compression_level: Optional[int] = PARQUET_COMPRESSION_LEVEL  # 压缩级别（zstd 1-22，None 为编码器默认）
+    delta_timestamps: bool = PARQUET_DELTA_TIMESTAMPS           # 时间戳列使用 DELTA_BINARY_PACKED 编码
+    byte_stream_split: bool = PARQUET_BYTE_STREAM_SPLIT         # 数值列使用 BYTE_STREAM_SPLIT 编码
+    row_group_size: int = ROW_GROUP_SIZE
+
+    @property
+    def label(self) -> str:
+        """简短描述（用于日志与基准测试输出）"""
+        parts = [self.compression if self.compression_level is None else f"{self.compression}-{self.compression_level}"]
+        if self.delta_timestamps:
+            parts.append("delta")
+        if self.byte_stream_split:
+            parts.append("bss")
+        return "+".join(parts)
+
+    def write_kwargs(self) -> Dict[str, Any]:
+        """转换为 pq.write_table 参数（指定编码的列不能使用字典编码）"""
+        column_encoding = {}
+        if self.delta_timestamps:
+            column_encoding.update({column: 'DELTA_BINARY_PACKED' for column in _TIMESTAMP_LEAF_COLUMNS})
+        if self.byte_stream_split:
+            column_encoding.update({column: 'BYTE_STREAM_SPLIT' for column in _VALUE_LEAF_COLUMNS})
+        kwargs: Dict[str, Any] = {
+            'compression': self.compression,
+            'row_group_size': self.row_group_size,
+        }
+        if self.compression_level is not None:
+            kwargs['compression_level'] = self.compression_level
+        if column_encoding:
+            kwargs['column_encoding'] = column_encoding
+            kwargs['use_dictionary'] = [column for column in _LEAF_COLUMNS if column not in column_encoding]
+        return kwargs
+
 
 class ParquetUtility:
     """Parquet 持久化工具类"""
@@ -15,7 +120,9 @@ class ParquetUtility:
     @staticmethod
     def notes_to_dataframe(tracks: List[List[OptimizedNote]]) -> pd.DataFrame:
         """
-        将 OptimizedNote 列表转换为适合 Parquet 存储的 DataFrame
+        将 OptimizedNote 列表转换为 v1 格式的 DataFrame（采样数组为二进制块）
+
+        仅用于兼容旧格式，新文件请使用 notes_to_table。
         """
         records = []
         for track_idx, track in enumerate(tracks):
@@ -37,28 +144,262 @@ class ParquetUtility:
         return pd.DataFrame(records)
 
     @staticmethod
-    def save_parquet(tracks: List[List[OptimizedNote]], output_path: str, compression: str = 'snappy') -> str:
+    def notes_to_table(tracks: List[List[OptimizedNote]]) -> pa.Table:
         """
-        保存音轨数据到 Parquet
+        将 OptimizedNote 列表转换为 v3 格式的 Arrow Table
+
+        采样数组按列拼接为一个连续缓冲区 + 偏移量，构成 Arrow ListArray；
+        行保持 (track, seq) 顺序，读取时无需重排即可按列切分为 NumPy 视图。
+        """
+        notes = [note for track in tracks for note in track]
+        track_lengths = [len(track) for track in tracks]
+        track_ids = np.repeat(np.arange(len(tracks), dtype=np.int32), track_lengths)
+        seq = np.concatenate([np.arange(n, dtype=np.int32) for n in track_lengths]) if notes else np.empty(0, dtype=np.int32)
+        note_offsets = np.array([note.offset for note in notes], dtype=np.int64)
+
+        columns = {
+            'track': pa.array(track_ids, type=pa.int32()),
+            'seq': pa.array(seq, type=pa.int32()),
+            'note_offset': pa.array(note_offsets, type=pa.int64()),
+            'note_id': pa.array([note.id for note in notes], type=pa.int32()),
+            'finger': pa.array([note.finger for note in notes], type=pa.int32()),
+            'velocity': pa.array([note.velocity for note in notes], type=pa.int32()),
+            'uuid': pa.array([note.uuid for note in notes], type=pa.string()),
+        }
+        for name, dtype in _SAMPLE_COLUMNS.items():
+            columns[name] = ParquetUtility._to_list_array([getattr(note, name) for note in notes], dtype)
+
+        key_on_ms, key_off_ms = ParquetUtility._compute_key_times(columns['after_ts'], note_offsets)
+        columns['key_on_ms'] = pa.array(key_on_ms, type=pa.float64())
+        columns['key_off_ms'] = pa.array(key_off_ms, type=pa.float64())
+
+        metadata = {
+            SCHEMA_VERSION_KEY: str(SCHEMA_VERSION).encode(),
+            TRACK_COUNT_KEY: str(len(tracks)).encode(),
+        }
+        return pa.Table.from_pydict(columns, schema=_TRACK_SCHEMA.with_metadata(metadata))
+
+    @staticmethod
+    def save_parquet(tracks: List[List[OptimizedNote]], output_path: str,
+                     compression: Optional[str] = None,
+                     options: Optional[StorageOptions] = None) -> str:
+        """
+        保存音轨数据到 Parquet（v3 格式）
+
+        Args:
+            tracks: 音轨列表
+            output_path: 输出路径
+            compression: 覆盖 options 中的压缩编码（兼容旧调用）
+            options: 写入选项，默认使用 StorageOptions()
         """
         path = Path(output_path)
         path.parent.mkdir(parents=True, exist_ok=True)
-        
-        df = ParquetUtility.notes_to_dataframe(tracks)
-        df.to_parquet(path, index=False, compression=compression)
+
+        options = options or StorageOptions()
+        if compression is not None:
+            options = StorageOptions(compression, None, options.delta_timestamps,
+                                     options.byte_stream_split, options.row_group_size)
+        ParquetUtility.write_table(ParquetUtility.notes_to_table(tracks), str(path), options)
         return str(path)
 
     @staticmethod
-    def load_parquet(file_path: str) -> List[List[OptimizedNote]]:
+    def write_table(table: pa.Table, output_path: str, options: Optional[StorageOptions] = None) -> None:
+        """按写入选项将 v3 布局的 Arrow Table 写入 Parquet"""
+        pq.write_table(table, output_path, **(options or StorageOptions()).write_kwargs())
+
+    @staticmethod
+    def get_schema_version(file_path: str) -> int:
+        """读取 Parquet 文件的格式版本（无版本元数据的旧文件为 1）"""
+        metadata = pq.read_schema(file_path).metadata or {}
+        return int(metadata.get(SCHEMA_VERSION_KEY, b'1'))
+
+    @staticmethod
+    def load_parquet(file_path: str,
+                     tracks: Optional[Iterable[int]] = None,
+                     key_ids: Optional[Iterable[int]] = None,
+                     time_range: Optional[TimeRange] = None) -> List[List[OptimizedNote]]:
         """
-        从 Parquet 加载数据并还原为项目标准的 OptimizedNote 列表
+        从 Parquet 加载数据并还原为项目标准的 OptimizedNote 列表（自动识别 v1/v2/v3 格式）
+
+        Args:
+            file_path: Parquet 文件路径
+            tracks: 只加载指定音轨（返回列表仍保留全部音轨位置，未加载的音轨为空列表）
+            key_ids: 只加载指定按键
+            time_range: 只加载与时间窗口 (start_ms, end_ms) 重叠的音符（按 key_on_ms/key_off_ms 判断）
+
+        Returns:
+            List[List[OptimizedNote]]: 音轨列表，音轨内保持原始顺序
         """
         if not Path(file_path).exists():
             raise FileNotFoundError(f"Parquet file not found: {file_path}")
-            
-        df = pd.read_parquet(file_path)
+
+        from .track_store import TrackStore, is_manifest
+        if is_manifest(file_path):
+            # 音轨清单：每个音轨文件单独下推过滤条件后组装
+            store = TrackStore.from_manifest(file_path)
+            table = store.read_record_table(file_path, tracks=tracks,
+                                            filter=ParquetUtility._build_filter(None, key_ids, time_range))
+            return ParquetUtility._table_to_tracks(table, int(table.schema.metadata[TRACK_COUNT_KEY]))
+
+        schema = pq.read_schema(file_path)
+        metadata = schema.metadata or {}
+        version = int(metadata.get(SCHEMA_VERSION_KEY, b'1'))
+
+        if version >= 3:
+            # 谓词下推：只解码统计信息与条件相交的行组
+            expression = ParquetUtility._build_filter(tracks, key_ids, time_range)
+            table = pq.read_table(file_path, filters=expression)
+            return ParquetUtility._table_to_tracks(table, int(metadata.get(TRACK_COUNT_KEY, b'0')))
+
+        if version == 2:
+            table = pq.read_table(file_path)
+            result = ParquetUtility._table_to_tracks(table, int(metadata.get(TRACK_COUNT_KEY, b'0')))
+        else:
+            result = ParquetUtility._dataframe_to_tracks_v1(pq.read_table(file_path).to_pandas())
+        return ParquetUtility._filter_tracks(result, tracks, key_ids, time_range)
+
+    @staticmethod
+    def read_track_table(file_path: str) -> pa.Table:
+        """读取任意版本的 Parquet 文件（或音轨清单）并返回 v3 布局的 Arrow Table（旧版本文件先转换）"""
+        from .track_store import TrackStore, is_manifest
+        if is_manifest(file_path):
+            return TrackStore.from_manifest(file_path).read_record_table(file_path)
+        if ParquetUtility.get_schema_version(file_path) >= 3:
+            return pq.read_table(file_path)
+        return ParquetUtility.notes_to_table(ParquetUtility.load_parquet(file_path))
+
+    @staticmethod
+    def table_to_tracks(table: pa.Table,
+                        tracks: Optional[Iterable[int]] = None,
+                        key_ids: Optional[Iterable[int]] = None,
+                        time_range: Optional[TimeRange] = None) -> List[List[OptimizedNote]]:
+        """将 v3 布局的 Arrow Table（例如内存映射的 IPC 文件）过滤并还原为 OptimizedNote 列表"""
+        metadata = table.schema.metadata or {}
+        expression = ParquetUtility._build_filter(tracks, key_ids, time_range)
+        if expression is not None:
+            table = table.filter(expression)
+        return ParquetUtility._table_to_tracks(table, int(metadata.get(TRACK_COUNT_KEY, b'0')))
+
+    # ==================== 私有方法 ====================
+
+    @staticmethod
+    def _to_list_array(arrays: List[np.ndarray], dtype) -> pa.ListArray:
+        """将多个一维数组拼接为 Arrow ListArray（一次拷贝）"""
+        lengths = np.fromiter((a.size for a in arrays), dtype=np.int64, count=len(arrays))
+        offsets = np.zeros(len(arrays) + 1, dtype=np.int32)
+        np.cumsum(lengths, out=offsets[1:])
+        values = np.concatenate(arrays).astype(dtype, copy=False) if arrays else np.empty(0, dtype=dtype)
+        return pa.ListArray.from_arrays(pa.array(offsets), pa.array(values))
+
+    @staticmethod
+    def _compute_key_times(after_ts: pa.ListArray, note_offsets: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """按列计算 key_on_ms / key_off_ms（无触后数据的音符为 0，与 Note 一致）"""
+        offsets = after_ts.offsets.to_numpy()
+        values = after_ts.values.to_numpy().astype(np.float64)
+        has_data = offsets[1:] > offsets[:-1]
+        key_on_ms = np.zeros(len(note_offsets), dtype=np.float64)
+        key_off_ms = np.zeros(len(note_offsets), dtype=np.float64)
+        key_on_ms[has_data] = (values[offsets[:-1][has_data]] + note_offsets[has_data]) / 10.0
+        key_off_ms[has_data] = (values[offsets[1:][has_data] - 1] + note_offsets[has_data]) / 10.0
+        return key_on_ms, key_off_ms
+
+    @staticmethod
+    def _build_filter(tracks: Optional[Iterable[int]], key_ids: Optional[Iterable[int]],
+                      time_range: Optional[TimeRange]) -> Optional[ds.Expression]:
+        """构建 pyarrow 过滤表达式（无条件时返回 None）"""
+        conditions = []
+        if tracks is not None:
+            conditions.append(ds.field('track').isin([int(t) for t in tracks]))
+        if key_ids is not None:
+            conditions.append(ds.field('note_id').isin([int(k) for k in key_ids]))
+        if time_range is not None:
+            start_ms, end_ms = time_range
+            conditions.append((ds.field('key_on_ms') <= float(end_ms)) & (ds.field('key_off_ms') >= float(start_ms)))
+        if not conditions:
+            return None
+        expression = conditions[0]
+        for condition in conditions[1:]:
+            expression = expression & condition
+        return expression
+
+    @staticmethod
+    def _filter_tracks(result: List[List[OptimizedNote]], tracks: Optional[Iterable[int]],
+                       key_ids: Optional[Iterable[int]], time_range: Optional[TimeRange]) -> List[List[OptimizedNote]]:
+        """在内存中应用过滤条件（用于不支持谓词下推的旧格式文件）"""
+        if tracks is None and key_ids is None and time_range is None:
+            return result
+        track_set = set(int(t) for t in tracks) if tracks is not None else None
+        key_set = set(int(k) for k in key_ids) if key_ids is not None else None
+
+        def keep(note: OptimizedNote) -> bool:
+            if key_set is not None and note.id not in key_set:
+                return False
+            if time_range is not None:
+                if note.after_ts.size:
+                    key_on_ms = (int(note.after_ts[0]) + note.offset) / 10.0
+                    key_off_ms = (int(note.after_ts[-1]) + note.offset) / 10.0
+                else:
+                    key_on_ms = key_off_ms = 0.0
+                if key_on_ms > time_range[1] or key_off_ms < time_range[0]:
+                    return False
+            return True
+
+        return [
+            [note for note in track if keep(note)] if track_set is None or idx in track_set else []
+            for idx, track in enumerate(result)
+        ]
+
+    @staticmethod
+    def _split_list_column(column: pa.ChunkedArray, dtype) -> List[np.ndarray]:
+        """将 Arrow list 列切分为每行一个 NumPy 视图（共享 Arrow 缓冲区，只读）"""
+        array = column.combine_chunks()
+        offsets = array.offsets.to_numpy()
+        values = array.values.to_numpy(zero_copy_only=False)
+        if values.dtype != dtype:
+            values = values.astype(dtype)
+        bounds = offsets.tolist()
+        return [values[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+
+    @staticmethod
+    def _table_to_tracks(table: pa.Table, track_count: int) -> List[List[OptimizedNote]]:
+        """
+        v2/v3：按列还原 OptimizedNote
+
+        新写入的文件已按 (track, seq) 排列，直接切分缓冲区；只有顺序不符时（例如早期按按键排序的 v3 文件）
+        才用 take() 重排（会复制所有列）。
+        """
+        track_ids = table.column('track').to_numpy()
+        track_steps = np.diff(track_ids)
+        out_of_order = track_steps < 0
+        if 'seq' in table.column_names:
+            out_of_order |= (track_steps == 0) & (np.diff(table.column('seq').to_numpy()) < 0)
+        if out_of_order.any():
+            if 'seq' in table.column_names:
+                order = np.lexsort((table.column('seq').to_numpy(), track_ids))
+            else:
+                order = np.argsort(track_ids, kind='stable')
+            table = table.take(pa.array(order))
+            track_ids = track_ids[order]
+
+        notes = list(map(
+            OptimizedNote,
+            table.column('note_offset').to_numpy().tolist(),
+            table.column('note_id').to_numpy().tolist(),
+            table.column('finger').to_numpy().tolist(),
+            table.column('velocity').to_numpy().tolist(),
+            table.column('uuid').to_numpy(zero_copy_only=False).tolist(),
+            *(ParquetUtility._split_list_column(table.column(name), dtype) for name, dtype in _SAMPLE_COLUMNS.items())
+        ))
+
+        track_count = max(track_count, int(track_ids.max()) + 1 if track_ids.size else 0)
+        bounds = np.searchsorted(track_ids, np.arange(track_count + 1))
+        return [notes[bounds[i]:bounds[i + 1]] for i in range(track_count)]
+
+    @staticmethod
+    def _dataframe_to_tracks_v1(df: pd.DataFrame) -> List[List[OptimizedNote]]:
+        """v1：从二进制块还原 OptimizedNote"""
         tracks: List[List[OptimizedNote]] = []
-        
+
         # 按 track 索引分组恢复
         for track_idx in sorted(df['track'].unique()):
             track_df = df[df['track'] == track_idx]
@@ -79,5 +420,5 @@ class ParquetUtility:
                 )
                 track_notes.append(note)
             tracks.append(track_notes)
-            
+
         return tracks
@@ -0,0 +1,121 @@
+"""
+SQLite 连接池
+- 空闲连接复用，避免每次查询都重新打开数据库文件
+- 线程内可重入：同一线程嵌套获取时复用同一连接
+- 每个连接同一时刻只被一个线程使用（按连接串行化，不再需要全局锁）
+- WAL 日志模式：读操作不阻塞写操作
+- 语句缓存：相同 SQL 文本复用已编译的预处理语句
+- 基于 PRAGMA user_version 的增量迁移
+"""
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+# 每个连接缓存的预处理语句数量
+STATEMENT_CACHE_SIZE = 128
+# 写锁等待超时（毫秒）
+BUSY_TIMEOUT_MS = 5000
+
+# 迁移：(目标版本, SQL 语句列表)，按版本递增执行，每个迁移在单独的事务中完成
+Migration = Tuple[int, Sequence[str]]
+
+
+class SQLiteConnectionPool:
+    """SQLite 连接池"""
+
+    def __init__(self, db_path: str, max_idle: int = 8):
+        """
+        Args:
+            db_path: 数据库文件路径
+            max_idle: 最多保留的空闲连接数
+        """
+        self.db_path = db_path
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue(maxsize=max_idle)
+        self._local = threading.local()
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        获取连接（上下文管理器）
+
+        同一线程嵌套调用时返回同一连接；最外层退出时归还到空闲队列。
+        未提交的事务在归还前回滚。
+        """
+        conn: Optional[sqlite3.Connection] = getattr(self._local, 'conn', None)
+        if conn is not None:
+            self._local.depth += 1
+            try:
+                yield conn
+            finally:
+                self._local.depth -= 1
+            return
+
+        conn = self._acquire()
+        self._local.conn = conn
+        self._local.depth = 1
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            self._local.depth = 0
+            self._release(conn)
+
+    def migrate(self, migrations: List[Migration]) -> int:
+        """
+        执行尚未应用的迁移
+
+        Returns:
+            int: 迁移后的数据库版本
+        """
+        with self.connection() as conn:
+            current = conn.execute("PRAGMA user_version").fetchone()[0]
+            for version, statements in sorted(migrations, key=lambda m: m[0]):
+                if version <= current:
+                    continue
+                # sqlite3 模块不会在 DDL 前隐式开启事务，显式 BEGIN 使迁移失败时整体回滚
+                conn.execute("BEGIN")
+                with conn:
+                    for statement in statements:
+                        conn.execute(statement)
+                    conn.execute(f"PRAGMA user_version = {int(version)}")
+                current = version
+            return current
+
+    def close(self) -> None:
+        """关闭所有空闲连接"""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+    # ==================== 私有方法 ====================
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self._connect()
+
+    def _release(self, conn: sqlite3.Connection) -> None:
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=BUSY_TIMEOUT_MS / 1000,
+            check_same_thread=False,  # 连接可在线程间传递，但由连接池保证同一时刻只有一个线程使用
+            cached_statements=STATEMENT_CACHE_SIZE,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        return conn
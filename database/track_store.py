@@ -0,0 +1,209 @@
+"""
+音轨级内容寻址存储
+同一曲目的多个播放文件通常包含完全相同的录制音轨（track 0），按文件整体保存会重复存储。
+- 每个音轨单独计算内容哈希（SHA-256），以 tracks/{hash[:2]}/{hash}.parquet 保存一次
+- 历史记录保存为清单文件 {md5}.manifest.json，按音轨顺序引用音轨哈希
+- 音轨引用计数保存在历史数据库中（与记录行在同一事务内增减），删除记录时只删除计数归零的音轨
+读取清单时按音轨文件组装为与单文件 v3 相同布局的 Arrow Table，过滤条件下推到每个音轨文件；
+完整读取的音轨按哈希缓存在进程内，引用同一音轨的记录共享同一个 Arrow Table
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from spmid.spmid_reader import OptimizedNote
+from utils.constants import TRACK_TABLE_CACHE_MB
+
+TRACKS_DIR_NAME = "tracks"
+MANIFEST_SUFFIX = ".manifest.json"
+MANIFEST_VERSION = 1
+
+# 进程级音轨表缓存：音轨哈希 -> 完整的 Arrow Table（不可变，所有记录/会话共用同一对象），LRU 顺序
+_table_cache: "OrderedDict[str, pa.Table]" = OrderedDict()
+_table_cache_bytes = 0
+_table_cache_lock = threading.Lock()
+
+
+def _get_cached_table(track_hash: str) -> Optional[pa.Table]:
+    with _table_cache_lock:
+        table = _table_cache.get(track_hash)
+        if table is not None:
+            _table_cache.move_to_end(track_hash)
+        return table
+
+
+def _put_cached_table(track_hash: str, table: pa.Table) -> None:
+    global _table_cache_bytes
+    budget = TRACK_TABLE_CACHE_MB * 1024 * 1024
+    with _table_cache_lock:
+        if track_hash in _table_cache or table.nbytes > budget:
+            return
+        _table_cache[track_hash] = table
+        _table_cache_bytes += table.nbytes
+        while _table_cache_bytes > budget:
+            _, evicted = _table_cache.popitem(last=False)
+            _table_cache_bytes -= evicted.nbytes
+
+
+def _drop_cached_table(track_hash: str) -> None:
+    global _table_cache_bytes
+    with _table_cache_lock:
+        table = _table_cache.pop(track_hash, None)
+        if table is not None:
+            _table_cache_bytes -= table.nbytes
+
+
+def is_manifest(path: Optional[str]) -> bool:
+    """路径是否为音轨清单（否则为旧版的单文件 Parquet）"""
+    return bool(path) and str(path).endswith(MANIFEST_SUFFIX)
+
+
+class TrackStore:
+    """内容寻址的音轨存储（文件层；引用计数由历史管理器在数据库中维护）"""
+
+    def __init__(self, storage_dir: str):
+        """
+        Args:
+            storage_dir: 历史数据存储目录（清单文件所在目录，音轨保存在其 tracks/ 子目录）
+        """
+        self.storage_dir = Path(storage_dir)
+        self.tracks_dir = self.storage_dir / TRACKS_DIR_NAME
+
+    # ==================== 写入 ====================
+
+    @staticmethod
+    def hash_track(table: pa.Table) -> str:
+        """计算单音轨 Arrow Table 的内容哈希（逐列哈希 Arrow 缓冲区，不经过序列化）"""
+        digest = hashlib.sha256()
+        for name in table.column_names:
+            digest.update(name.encode())
+            for chunk in table.column(name).chunks:
+                for buffer in chunk.buffers():
+                    if buffer is not None:
+                        digest.update(buffer)
+        return digest.hexdigest()
+
+    def track_path(self, track_hash: str) -> Path:
+        return self.tracks_dir / track_hash[:2] / f"{track_hash}.parquet"
+
+    def manifest_path(self, file_md5: str) -> Path:
+        return self.storage_dir / f"{file_md5}{MANIFEST_SUFFIX}"
+
+    def save_record_tracks(self, file_md5: str,
+                           tracks: List[List[OptimizedNote]]) -> Tuple[str, List[str], List[str]]:
+        """
+        按音轨写入内容寻址文件（已存在的音轨跳过）并写入清单
+
+        Returns:
+            Tuple[str, List[str], List[str]]: (清单路径, 按顺序的音轨哈希, 本次新写入的音轨哈希)
+        """
+        from .parquet_utility import ParquetUtility
+
+        hashes: List[str] = []
+        created: List[str] = []
+        for track in tracks:
+            table = ParquetUtility.notes_to_table([track])
+            track_hash = self.hash_track(table)
+            hashes.append(track_hash)
+            path = self.track_path(track_hash)
+            if path.exists() or track_hash in created:
+                continue
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(path.suffix + ".tmp")
+            ParquetUtility.write_table(table, str(tmp_path))
+            os.replace(tmp_path, path)
+            created.append(track_hash)
+
+        manifest = self.manifest_path(file_md5)
+        manifest.parent.mkdir(parents=True, exist_ok=True)
+        tmp_manifest = manifest.with_suffix(manifest.suffix + ".tmp")
+        tmp_manifest.write_text(json.dumps({'version': MANIFEST_VERSION, 'tracks': hashes}), encoding='utf-8')
+        os.replace(tmp_manifest, manifest)
+        return str(manifest.absolute()), hashes, created
+
+    def remove_tracks(self, track_hashes: Iterable[str]) -> None:
+        """删除引用计数已归零的音轨文件"""
+        for track_hash in track_hashes:
+            _drop_cached_table(track_hash)
+            path = self.track_path(track_hash)
+            try:
+                if path.exists():
+                    os.remove(path)
+            except OSError as e:
+                print(f"警告: 无法删除音轨文件 {path}: {e}")
+
+    # ==================== 读取 ====================
+
+    @staticmethod
+    def read_manifest(manifest_path: str) -> List[str]:
+        """读取清单中的音轨哈希列表（按音轨顺序）"""
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return list(json.load(f)['tracks'])
+
+    @classmethod
+    def from_manifest(cls, manifest_path: str) -> 'TrackStore':
+        return cls(str(Path(manifest_path).parent))
+
+    def read_record_table(self, manifest_path: str,
+                          tracks: Optional[Iterable[int]] = None,
+                          columns: Optional[List[str]] = None,
+                          filter: Optional[ds.Expression] = None) -> pa.Table:
+        """
+        将清单引用的音轨组装为单文件 v3 布局的 Arrow Table（track 列为音轨在记录中的位置）
+
+        Args:
+            manifest_path: 清单路径
+            tracks: 只读取指定音轨
+            columns: 只读取指定列（必须包含 track 时才会改写音轨位置）
+            filter: 下推到每个音轨文件的过滤条件（不应包含 track 条件）
+        """
+        from .parquet_utility import SCHEMA_VERSION_KEY, SCHEMA_VERSION, TRACK_COUNT_KEY
+
+        hashes = self.read_manifest(manifest_path)
+        wanted = set(int(t) for t in tracks) if tracks is not None else None
+        tables = []
+        for index, track_hash in enumerate(hashes):
+            if wanted is not None and index not in wanted:
+                continue
+            table = self._read_track(track_hash, columns, filter)
+            if 'track' in table.column_names:
+                position = table.column_names.index('track')
+                table = table.set_column(position, 'track', pa.array([index] * table.num_rows, type=pa.int32()))
+            tables.append(table.replace_schema_metadata(None))
+
+        if tables:
+            table = pa.concat_tables(tables)
+        else:
+            from .parquet_utility import _TRACK_SCHEMA
+            schema = _TRACK_SCHEMA if columns is None else pa.schema([_TRACK_SCHEMA.field(c) for c in columns])
+            table = schema.empty_table()
+        return table.replace_schema_metadata({
+            SCHEMA_VERSION_KEY: str(SCHEMA_VERSION).encode(),
+            TRACK_COUNT_KEY: str(len(hashes)).encode(),
+        })
+
+    def _read_track(self, track_hash: str, columns: Optional[List[str]],
+                    filter: Optional[ds.Expression]) -> pa.Table:
+        """
+        读取单个音轨：缓存命中时在内存中投影/过滤；完整读取的音轨放入缓存，
+        多个记录（例如同一曲目的多个播放文件）共享同一份录制音轨对象
+        """
+        table = _get_cached_table(track_hash)
+        if table is None:
+            if columns is not None or filter is not None:
+                return pq.read_table(self.track_path(track_hash), columns=columns, filters=filter)
+            table = pq.read_table(self.track_path(track_hash))
+            _put_cached_table(track_hash, table)
+        if columns is not None:
+            table = table.select(columns)
+        if filter is not None:
+            table = table.filter(filter)
+        return table
@@ -12,7 +12,7 @@ from utils.logger import Logger
     
 
 # 导入评级详情相关函数
-from ui.grade_detail_callbacks import get_grade_detail_data
+from ui.grade_detail_callbacks import get_grade_detail_data, get_grade_detail_page, grade_detail_page_count
 
 logger = Logger.get_logger()
 
@@ -310,17 +310,17 @@ def _get_grade_detail_data(backend, grade_key: str, algorithm_name: str):
         list: 表格行数据列表
     """
     try:
-        data, _ = _get_grade_detail_data_paginated(backend, grade_key, algorithm_name, 0, float('inf'))
-        return data
+        return get_grade_detail_data(backend, grade_key, algorithm_name)
     except Exception as e:
         logger.error(f"获取评级详细数据失败: {e}")
         traceback.print_exc()
         return []
 
 
-def _get_grade_detail_data_paginated(backend, grade_key: str, algorithm_name: str, page: int, page_size: int):
+def _get_grade_detail_data_paginated(backend, grade_key: str, algorithm_name: str, page: int, page_size: int,
+                                     key_filter=None, sort_by=None):
     """
-    获取评级统计的详细数据（支持分页）
+    获取评级统计的详细数据（服务端分页，只格式化当前页）
     
     Args:
         backend: 后端实例
@@ -328,23 +328,14 @@ def _get_grade_detail_data_paginated(backend, grade_key: str, algorithm_name: st
         algorithm_name: 算法名称
         page: 页码（从0开始）
         page_size: 每页大小
+        key_filter: 按键筛选值（None / 'all' 表示全部按键）
+        sort_by: DataTable 的 sort_by
         
     Returns:
         tuple: (表格行数据列表, 总记录数)
     """
     try:
-        # 获取所有数据
-        all_data = get_grade_detail_data(backend, grade_key, algorithm_name)
-        total_count = len(all_data)
-        
-        # 计算分页
-        start_idx = page * page_size
-        end_idx = min(start_idx + page_size, total_count)
-        
-        # 返回分页数据
-        paginated_data = all_data[start_idx:end_idx] if start_idx < total_count else []
-        
-        return paginated_data, total_count
+        return get_grade_detail_page(backend, grade_key, algorithm_name, page, page_size, key_filter, sort_by)
     except Exception as e:
         logger.error(f"获取分页评级详细数据失败: {e}")
         traceback.print_exc()
@@ -436,8 +427,8 @@ def _create_grade_detail_table_content(detail_data, grade_key: str, algorithm_na
         html.Div: 表格容器
     """
 
-    # 计算总页数
-    page_count = (total_count + page_size - 1) // page_size if page_size > 0 else 0
+    # 计算总页数（匹配对的两行不跨页）
+    page_count = grade_detail_page_count(total_count, page_size, grade_key) if page_size > 0 else 0
 
     # 创建表格列定义
     if grade_key == 'failed':
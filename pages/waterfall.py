@@ -4,6 +4,7 @@
 from dash import html, dcc, callback, Input, Output, State, no_update
 import dash_bootstrap_components as dbc
 from utils.logger import Logger
+from backend.waterfall_lod import parse_relayout_range
 from typing import List, Dict, Any
 
 logger = Logger.get_logger()
@@ -246,6 +247,18 @@ def layout():
                         ], md=12, className="mt-3")
                     ]),
 
+                    # 分级显示（长录制时先显示密度图，放大后显示单个事件）
+                    dbc.Row([
+                        dbc.Col([
+                            dbc.Switch(
+                                id='waterfall-lod-mode',
+                                label="分级显示（先显示按键占用密度图，放大后显示单个事件，适合长录制）",
+                                value=True,
+                                className="mt-2"
+                            ),
+                        ], md=12)
+                    ]),
+
                     html.Hr(style={'borderTop': '1px dashed #e0e0e0', 'margin': '15px 0'}),
 
                     # 应用筛选按钮
@@ -293,7 +306,8 @@ def layout():
     ], fluid=True, className="mt-3")
 
 
-def load_waterfall_plot(session_id, session_manager, data_types, selected_keys, time_start, time_end, key_start, key_end):
+def load_waterfall_plot(session_id, session_manager, data_types, selected_keys, time_start, time_end, key_start, key_end,
+                        lod_mode=False):
     """
     加载瀑布图
 
@@ -306,6 +320,7 @@ def load_waterfall_plot(session_id, session_manager, data_types, selected_keys,
         time_end: 结束时间 (ms)
         key_start: 最低按键号
         key_end: 最高按键号
+        lod_mode: 是否分级显示（全局为密度图，缩放时由 refine_waterfall_lod 回调获取精确bar）
 
     Returns:
         瀑布图组件或提示信息
@@ -347,11 +362,17 @@ def load_waterfall_plot(session_id, session_manager, data_types, selected_keys,
         
         # 构建筛选条件
         time_filter = None
+        time_range = None
         if time_start is not None or time_end is not None:
             time_filter = {
                 'start': time_start,
                 'end': time_end
             }
+            # 传给后端的时间范围：在构建bar之前按时间区间索引切片
+            time_range = (
+                float(time_start) if time_start is not None else None,
+                float(time_end) if time_end is not None else None
+            )
         
         key_filter = None
         if key_start is not None or key_end is not None:
@@ -371,26 +392,41 @@ def load_waterfall_plot(session_id, session_manager, data_types, selected_keys,
         logger.info(f"  按键ID: {key_ids}")
         logger.info(f"  时间筛选: {time_filter}, 按键筛选: {key_filter}")
 
-        waterfall_fig = backend.generate_waterfall_plot(
-            data_types=data_types,
-            key_ids=key_ids,
-            key_filter=key_filter
-        )
+        # 分级显示参数：缩放回调按这些筛选条件查询可见窗口（非分级模式为 None）
+        lod_params = None
+        if lod_mode:
+            waterfall_fig = backend.generate_waterfall_lod_plot(
+                data_types=data_types,
+                key_ids=key_ids,
+                time_range=time_range
+            )
+            lod_params = {'data_types': data_types, 'key_ids': key_ids, 'time_range': time_range,
+                          'x_range': None, 'y_range': None}
+        else:
+            waterfall_fig = backend.generate_waterfall_plot(
+                data_types=data_types,
+                key_ids=key_ids,
+                key_filter=key_filter,
+                time_range=time_range
+            )
 
         if waterfall_fig:
             logger.info(f"[OK] 瀑布图生成成功 (session={session_id})")
-            return dcc.Graph(
-                id='waterfall-graph',
-                figure=waterfall_fig,
-                config={
-                    'displayModeBar': True, 
-                    'displaylogo': False,
-                    'scrollZoom': True,  # 启用滚轮缩放
-                    'doubleClick': 'reset',  # 双击重置缩放
-                    'modeBarButtonsToAdd': ['zoomIn2d', 'zoomOut2d', 'autoScale2d', 'resetScale2d']  # 添加缩放按钮
-                },
-                style={'height': '800px'}
-            )
+            return html.Div([
+                dcc.Store(id='waterfall-lod-params', data=lod_params),
+                dcc.Graph(
+                    id='waterfall-graph',
+                    figure=waterfall_fig,
+                    config={
+                        'displayModeBar': True, 
+                        'displaylogo': False,
+                        'scrollZoom': True,  # 启用滚轮缩放
+                        'doubleClick': 'reset',  # 双击重置缩放
+                        'modeBarButtonsToAdd': ['zoomIn2d', 'zoomOut2d', 'autoScale2d', 'resetScale2d']  # 添加缩放按钮
+                    },
+                    style={'height': '800px'}
+                )
+            ])
         else:
             logger.warning(f"[WARN] 瀑布图生成失败，返回None (session={session_id})")
             return _create_generation_failed_alert()
@@ -860,10 +896,12 @@ def register_callbacks(app, session_manager):
             State('waterfall-time-end', 'value'),
             State('waterfall-key-start', 'value'),
             State('waterfall-key-end', 'value'),
+            State('waterfall-lod-mode', 'value'),
         ],
         prevent_initial_call=True  # 防止页面加载时自动触发
     )
-    def update_waterfall_plot(apply_clicks, session_id, data_types, selected_keys, time_start, time_end, key_start, key_end):
+    def update_waterfall_plot(apply_clicks, session_id, data_types, selected_keys, time_start, time_end, key_start, key_end,
+                              lod_mode):
         """
         更新瀑布图 - 只有当用户点击应用筛选时才触发
 
@@ -876,6 +914,7 @@ def register_callbacks(app, session_manager):
             time_end: 结束时间
             key_start: 最低按键号
             key_end: 最高按键号
+            lod_mode: 是否分级显示
 
         Returns:
             更新后的瀑布图组件
@@ -883,7 +922,66 @@ def register_callbacks(app, session_manager):
         # 将按键ID列表转换为字符串格式传递给后端
         selected_keys_str = ','.join(map(str, selected_keys)) if selected_keys else None
 
-        return load_waterfall_plot(session_id, session_manager, data_types, selected_keys_str, time_start, time_end, key_start, key_end)
+        return load_waterfall_plot(session_id, session_manager, data_types, selected_keys_str, time_start, time_end, key_start, key_end,
+                                   lod_mode=bool(lod_mode))
+
+    @app.callback(
+        [
+            Output('waterfall-graph', 'figure'),
+            Output('waterfall-lod-params', 'data'),
+        ],
+        Input('waterfall-graph', 'relayoutData'),
+        [
+            State('session-id', 'data'),
+            State('waterfall-lod-params', 'data'),
+        ],
+        prevent_initial_call=True
+    )
+    def refine_waterfall_lod(relayout_data, session_id, lod_params):
+        """
+        分级显示：缩放/平移后按可见窗口重新获取瀑布图
+
+        可见窗口内bar足够少时显示精确bar，否则显示该窗口的占用密度图；
+        双击重置时回到全局密度图。非分级模式（lod_params 为 None）不处理。
+
+        Args:
+            relayout_data: 图表的 relayoutData
+            session_id: 会话ID
+            lod_params: 当前瀑布图的筛选条件和可见窗口
+
+        Returns:
+            (新图表, 更新后的可见窗口)
+        """
+        if not lod_params or not session_id:
+            return no_update, no_update
+
+        x_changed, x_range = parse_relayout_range(relayout_data, 'xaxis')
+        y_changed, y_range = parse_relayout_range(relayout_data, 'yaxis')
+        if not x_changed and not y_changed:
+            return no_update, no_update
+
+        params = dict(lod_params)
+        if x_changed:
+            params['x_range'] = list(x_range) if x_range else None
+        if y_changed:
+            params['y_range'] = list(y_range) if y_range else None
+
+        backend = session_manager.get_backend(session_id)
+        if not backend:
+            return no_update, no_update
+
+        try:
+            fig = backend.generate_waterfall_lod_plot(
+                data_types=params.get('data_types'),
+                key_ids=params.get('key_ids'),
+                x_range=tuple(params['x_range']) if params.get('x_range') else None,
+                y_range=tuple(params['y_range']) if params.get('y_range') else None,
+                time_range=tuple(params['time_range']) if params.get('time_range') else None
+            )
+            return fig, params
+        except Exception as e:
+            logger.error(f"[ERROR] 瀑布图分级显示更新失败: {e}")
+            return no_update, no_update
     
     @app.callback(
         [
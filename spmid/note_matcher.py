@@ -186,6 +186,8 @@ class NoteMatcher:
         self.abnormal_matches: List[Tuple[Note, Note]] = []  # 异常匹配对 (record_note, replay_note)
         self.duration_diff_pairs: List[Tuple[Note, Note, float]] = []  # 持续时间差异对 (rec_note, rep_note, ratio)
         self.failure_reasons: Dict[Tuple[str, int], str] = {} # {(data_type, index): reason}
+        # 评级分桶：每个匹配等级在 matched_pairs 中的下标（匹配完成时构建，见 get_grade_indices）
+        self.grade_buckets: Dict[MatchType, np.ndarray] = {}
 
         # 原始数据引用（用于查找邻居）
         self._record_data: List[Note] = []
@@ -254,6 +256,8 @@ class NoteMatcher:
         logger.info(f"      - fair (30-50ms): {self.match_statistics.fair_matches}")
         logger.info(f"      - poor (50-100ms): {self.match_statistics.poor_matches}")
         logger.info(f"      - severe (100-200ms): {self.match_statistics.severe_matches}")
+
+        self._build_grade_buckets()
         
         return all_matched_pairs
     
@@ -1207,6 +1211,29 @@ class NoteMatcher:
         """
         return [(rec_note, rep_note) for rec_note, rep_note, _, _ in self.matched_pairs]
     
+    def _build_grade_buckets(self) -> None:
+        """按匹配等级对 matched_pairs 分桶（每个等级一个下标数组，保持匹配顺序）"""
+        buckets = defaultdict(list)
+        for index, (_, _, match_type, _) in enumerate(self.matched_pairs):
+            buckets[match_type].append(index)
+        self.grade_buckets = {match_type: np.asarray(buckets.get(match_type, []), dtype=np.int64)
+                              for match_type in MatchType}
+
+    def get_grade_indices(self, match_type: MatchType) -> np.ndarray:
+        """
+        获取指定匹配等级的匹配对下标
+
+        Args:
+            match_type: 匹配等级
+
+        Returns:
+            np.ndarray: 该等级在 matched_pairs 中的下标（升序）
+        """
+        # matched_pairs 在分桶之后被修改时（数量不一致）重新分桶
+        if sum(len(indices) for indices in self.grade_buckets.values()) != len(self.matched_pairs):
+            self._build_grade_buckets()
+        return self.grade_buckets.get(match_type, np.empty(0, dtype=np.int64))
+
     def get_matched_pairs_with_grade(self) -> List[Tuple[Note, Note, MatchType, float]]:
         """
         获取精确匹配对列表（包含评级信息）
@@ -11,7 +11,6 @@ SPMID数据分析器
 - ErrorDetector: 异常检测
 """
 
-from matplotlib import figure
 from .spmid_reader import Note
 from .types import ErrorNote
 from .data_filter import DataFilter
@@ -19,16 +18,23 @@ from .invalid_notes_statistics import InvalidNotesStatistics
 from .note_matcher import NoteMatcher, MatchType
 from .filter_collector import FilterCollector
 from .filter_integrator import FilterIntegrator
-from typing import List, Tuple, Optional, Dict, Any, Union, TYPE_CHECKING
+from .time_range_index import TimeRangeIndex, note_interval, match_result_interval, offset_item_interval
+from typing import List, Tuple, Optional, Dict, Any, Union, Callable, TYPE_CHECKING
 from utils.logger import Logger
 
 import pandas as pd
-import matplotlib.pyplot as plt
+import itertools
 import os
 import numpy as np
 
+if TYPE_CHECKING:
+    from matplotlib.figure import Figure
+
 logger = Logger.get_logger()
 
+# 分析结果版本号（进程内唯一，每次分析/重新匹配递增）
+_data_versions = itertools.count(1)
+
 
 class SPMIDAnalyzer:
     """
@@ -54,12 +60,19 @@ class SPMIDAnalyzer:
         
         # 统计信息
         self.analysis_stats: Dict[str, Any] = {}
+
+        # 按时间区间查询的索引（按数据类别首次查询时构建，重新分析时清空）
+        self._time_range_indexes: Dict[str, TimeRangeIndex] = {}
+
+        # 分析结果版本：重新分析时变化，图表缓存据此判断结果是否过期
+        self.data_version: int = 0
     
     def analyze(
         self, 
         record_data: List[Note], 
         replay_data: List[Note],
-        filter_collector: FilterCollector = None
+        filter_collector: FilterCollector = None,
+        progress_callback: Optional[Callable[[str, float], None]] = None
     ) -> Tuple[List[ErrorNote], List[ErrorNote], List[ErrorNote], List[Note], List[Note], InvalidNotesStatistics, List[Tuple[int, int, Note, Note]]]:
         """
         执行完整的SPMID数据分析
@@ -79,6 +92,7 @@ class SPMIDAnalyzer:
             record_data: 录制数据（已经过滤的有效数据）
             replay_data: 播放数据（已经过滤的有效数据）
             filter_collector: 可选的过滤信息收集器（包含在加载阶段被过滤的音符信息）
+            progress_callback: 可选的进度回调 progress_callback(stage, fraction)
 
         Returns:
             tuple: (multi_hammers, drop_hammers, matched_record_data, matched_replay_data, invalid_statistics, matched_pairs)
@@ -110,6 +124,8 @@ class SPMIDAnalyzer:
         self.initial_valid_replay_data = replay_data
 
         # 步骤3：执行按键匹配 (使用初次过滤后的数据)
+        if progress_callback:
+            progress_callback('match', 0.0)
         matching_start_time = time.time()
         
         # NoteMatcher现在在匹配过程中直接进行错误检测和分类
@@ -146,10 +162,14 @@ class SPMIDAnalyzer:
             self.valid_replay_data = []
 
         # 步骤6：记录统计信息
+        if progress_callback:
+            progress_callback('stats', 0.0)
         self._log_invalid_notes_statistics(record_data, replay_data)
         
         # 步骤8：生成分析统计
         self._generate_analysis_stats()
+        if progress_callback:
+            progress_callback('stats', 1.0)
 
         # 计算总耗时并输出性能统计
         total_end_time = time.time()
@@ -167,6 +187,8 @@ class SPMIDAnalyzer:
         # 初始化各个组件
         self.data_filter = DataFilter()
         self.note_matcher = NoteMatcher()
+        self._time_range_indexes = {}
+        self.data_version = next(_data_versions)
         
         logger.debug("所有分析组件初始化完成")
     
@@ -289,6 +311,56 @@ class SPMIDAnalyzer:
             return self.note_matcher.get_precision_offset_alignment_data()
         return []
     
+    # 可按时间区间查询的数据类别
+    TIME_RANGE_CATEGORIES = ('matched_pairs', 'drop_hammers', 'multi_hammers', 'abnormal_matches',
+                             'record', 'replay', 'precision_offsets')
+
+    def query_time_range(self, category: str, start_ms: Optional[float] = None,
+                         end_ms: Optional[float] = None,
+                         key_ids: Optional[List[int]] = None) -> List[Any]:
+        """
+        按时间区间（和按键）查询分析结果
+
+        Args:
+            category: 数据类别
+                - matched_pairs / drop_hammers / multi_hammers / abnormal_matches: MatchResult（同 get_all_display_data）
+                - record / replay: 初始有效音符
+                - precision_offsets: 精确匹配的偏移对齐数据（同 get_precision_offset_alignment_data）
+            start_ms: 窗口起点 (ms)，None 表示不限制
+            end_ms: 窗口终点 (ms)，None 表示不限制
+            key_ids: 只返回这些按键的数据，None 表示全部按键
+
+        Returns:
+            List[Any]: 与窗口重叠的数据（按起始时间排序）
+        """
+        index = self._get_time_range_index(category)
+        return index.query(start_ms, end_ms, key_ids) if index is not None else []
+
+    def _get_time_range_index(self, category: str) -> Optional[TimeRangeIndex]:
+        """获取（首次使用时构建）数据类别的时间区间索引"""
+        if category not in self.TIME_RANGE_CATEGORIES:
+            raise ValueError(f"不支持按时间查询的数据类别: {category}")
+        if not hasattr(self, '_time_range_indexes'):
+            self._time_range_indexes = {}
+        index = self._time_range_indexes.get(category)
+        if index is not None:
+            return index
+
+        if category == 'record':
+            index = TimeRangeIndex(self.get_initial_valid_record_data() or [], note_interval)
+        elif category == 'replay':
+            index = TimeRangeIndex(self.get_initial_valid_replay_data() or [], note_interval)
+        elif category == 'precision_offsets':
+            index = TimeRangeIndex(self.get_precision_offset_alignment_data(), offset_item_interval)
+        else:
+            note_matcher = getattr(self, 'note_matcher', None)
+            if not note_matcher or not hasattr(note_matcher, 'get_all_display_data'):
+                return None
+            index = TimeRangeIndex(note_matcher.get_all_display_data().get(category, []), match_result_interval)
+
+        self._time_range_indexes[category] = index
+        return index
+
     def get_grouped_precision_match_data(self) -> Dict[int, List[float]]:
         """
         获取按按键ID分组的精确匹配延时数据（误差 ≤ 50ms）
@@ -425,8 +497,9 @@ class SPMIDAnalyzer:
 
 
 
-def get_figure_by_index(record_data: List[Note], replay_data: List[Note], record_index: int, replay_index: int) -> figure:
-    """按索引获取对比图"""
+def get_figure_by_index(record_data: List[Note], replay_data: List[Note], record_index: int, replay_index: int) -> "Figure":
+    """按索引获取对比图（matplotlib 仅在调用时导入，分析器本身不依赖绘图库）"""
+    import matplotlib.pyplot as plt
     # 确保index是有效的非负索引
     if record_index < 0 or record_index >= len(record_data):
         raise IndexError(f"record_index {record_index} 超出范围 [0, {len(record_data)-1}]")
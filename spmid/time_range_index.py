@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+时间区间索引
+
+分析结果（音符、匹配对、偏移数据）按时间区间查询时，不再逐个遍历全部对象：
+- 按区间起点排序的 NumPy 数组 + 最长区间回看，二分查找定位候选范围
+- 按按键分组的子索引（首次按按键查询时构建），单按键查询只访问该按键的数据
+区间与查询窗口有重叠即命中（start ≤ 窗口终点 且 end ≥ 窗口起点），点数据的 start 与 end 相同。
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# 区间提取函数：对象 -> (按键ID, 起点ms, 终点ms)，返回 None 表示该对象没有时间信息
+IntervalFn = Callable[[Any], Optional[Tuple[int, float, float]]]
+
+
+class TimeRangeIndex:
+    """按时间区间查询的只读索引"""
+
+    def __init__(self, items: Iterable[Any], interval_fn: IntervalFn):
+        """
+        Args:
+            items: 被索引的对象
+            interval_fn: 区间提取函数
+        """
+        entries = []
+        for item in items:
+            interval = interval_fn(item)
+            if interval is not None:
+                entries.append((item, interval))
+
+        starts = np.array([iv[1] for _, iv in entries], dtype=np.float64)
+        order = np.argsort(starts, kind='stable')
+        self.items: List[Any] = [entries[i][0] for i in order]
+        self.starts = starts[order]
+        self.ends = np.array([entries[i][1][2] for i in order], dtype=np.float64)
+        self.key_ids = np.array([entries[i][1][0] for i in order], dtype=np.int64)
+        # 向前回看的范围：起点早于窗口起点 max_duration 以上的区间不可能与窗口重叠
+        self.max_duration = float(np.max(self.ends - self.starts)) if len(self.items) else 0.0
+        self._by_key: Optional[Dict[int, 'TimeRangeIndex']] = None
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def query(self, start_ms: Optional[float] = None, end_ms: Optional[float] = None,
+              key_ids: Optional[Iterable[int]] = None) -> List[Any]:
+        """
+        查询与时间窗口重叠的对象（按区间起点排序）
+
+        Args:
+            start_ms: 窗口起点，None 表示不限制
+            end_ms: 窗口终点，None 表示不限制
+            key_ids: 只返回这些按键的对象，None 表示全部按键
+        """
+        if key_ids is not None:
+            by_key = self._key_indexes()
+            wanted = sorted(set(int(k) for k in key_ids))
+            if len(wanted) == 1:
+                sub_index = by_key.get(wanted[0])
+                return sub_index.query(start_ms, end_ms) if sub_index else []
+            indices = self._window_indices(start_ms, end_ms)
+            indices = indices[np.isin(self.key_ids[indices], wanted)]
+        else:
+            indices = self._window_indices(start_ms, end_ms)
+        return [self.items[i] for i in indices]
+
+    # ==================== 私有方法 ====================
+
+    def _window_indices(self, start_ms: Optional[float], end_ms: Optional[float]) -> np.ndarray:
+        lo, hi = 0, len(self.items)
+        if start_ms is not None:
+            lo = int(np.searchsorted(self.starts, start_ms - self.max_duration, side='left'))
+        if end_ms is not None:
+            hi = int(np.searchsorted(self.starts, end_ms, side='right'))
+        indices = np.arange(lo, max(lo, hi))
+        if start_ms is not None:
+            indices = indices[self.ends[indices] >= start_ms]
+        return indices
+
+    def _key_indexes(self) -> Dict[int, 'TimeRangeIndex']:
+        """按按键分组的子索引（首次使用时构建）"""
+        if self._by_key is None:
+            groups: Dict[int, List[int]] = {}
+            for position, key_id in enumerate(self.key_ids.tolist()):
+                groups.setdefault(key_id, []).append(position)
+            by_key = {}
+            for key_id, positions in groups.items():
+                sub_index = TimeRangeIndex.__new__(TimeRangeIndex)
+                sub_index.items = [self.items[p] for p in positions]
+                sub_index.starts = self.starts[positions]
+                sub_index.ends = self.ends[positions]
+                sub_index.key_ids = self.key_ids[positions]
+                sub_index.max_duration = float(np.max(sub_index.ends - sub_index.starts))
+                sub_index._by_key = {key_id: sub_index}
+                by_key[key_id] = sub_index
+            self._by_key = by_key
+        return self._by_key
+
+
+def note_interval_ms(note) -> Optional[Tuple[float, float]]:
+    """
+    音符的时间区间 (ms)：有触后数据时为按下/释放时间，否则为锤击时间范围
+
+    与瀑布图bar的时间范围一致。
+    """
+    if note is None:
+        return None
+    key_on, key_off = getattr(note, 'key_on_ms', None), getattr(note, 'key_off_ms', None)
+    if key_on and key_off:
+        return float(key_on), float(key_off)
+    hammers = getattr(note, 'hammers', None)
+    if hammers is not None and not hammers.empty:
+        return (float(hammers.index.min()) + note.offset) / 10.0, (float(hammers.index.max()) + note.offset) / 10.0
+    return None
+
+
+def note_interval(note) -> Optional[Tuple[int, float, float]]:
+    """音符的 (按键ID, 起点ms, 终点ms)"""
+    interval = note_interval_ms(note)
+    return (note.id, interval[0], interval[1]) if interval else None
+
+
+def match_result_interval(result) -> Optional[Tuple[int, float, float]]:
+    """
+    匹配结果的 (按键ID, 起点ms, 终点ms)：录制与播放音符区间的并集，按键以录制音符为准
+    """
+    if not result.pair:
+        return None
+    record_note, replay_note = result.pair
+    target_note = record_note or replay_note
+    if target_note is None:
+        return None
+    intervals = [iv for iv in (note_interval_ms(record_note), note_interval_ms(replay_note)) if iv]
+    if not intervals:
+        return None
+    return target_note.id, min(iv[0] for iv in intervals), max(iv[1] for iv in intervals)
+
+
+def offset_item_interval(item: Dict[str, Any]) -> Optional[Tuple[int, float, float]]:
+    """偏移对齐数据项的 (按键ID, 录制按下时间ms, 录制按下时间ms)"""
+    record_keyon = item.get('record_keyon')
+    if not isinstance(record_keyon, (int, float, np.integer, np.floating)):
+        return None
+    time_ms = float(record_keyon) / 10.0
+    return int(item.get('key_id') or 0), time_ms, time_ms
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+图表数据量基准测试
+
+对每个主要图表比较两种方式的图表生成耗时、响应大小与序列化耗时：
+- 列表：关闭 encode_array 重新生成图表（以前的绘图路径），所有数组按原始 float64 值的 JSON 列表序列化
+- 编码：当前绘图层的输出，Plotly ≥ 6 把 NumPy 数组序列化为 base64 二进制数组（float32 精度足够时降精度），
+  JSON 列表更短的数组以舍入后的列表发送
+同时给出 gzip 压缩后的大小（开启 HTTP 压缩时的实际传输量）。
+
+用法：
+    python test_script/benchmark_figure_payloads.py                         # 仅合成数据
+    python test_script/benchmark_figure_payloads.py a.spmid b.spmid         # 每个真实文件作为一个算法
+    python test_script/benchmark_figure_payloads.py --notes 8000 --algorithms 3
+"""
+
+import sys
+import gzip
+import base64
+import time
+import asyncio
+import argparse
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+import plotly.io as pio
+
+_project_root = Path(__file__).resolve().parent.parent
+if str(_project_root) not in sys.path:
+    sys.path.insert(0, str(_project_root))
+
+from spmid.spmid_reader import OptimizedNote
+from backend.spmid_loader import SPMIDLoader
+from backend.piano_analysis_backend import PianoAnalysisBackend
+from backend import figure_encoding
+from backend.figure_encoding import TYPED_ARRAYS_SUPPORTED
+from test_script.benchmark_storage_codecs import synthetic_tracks
+
+
+def synthetic_loader(note_count: int, seed: int) -> SPMIDLoader:
+    """合成录制音轨，播放音轨为录制音轨加 0~30ms 随机延时"""
+    record, _ = synthetic_tracks(note_count, seed)
+    rng = np.random.default_rng(seed + 1)
+    replay = [OptimizedNote(note.offset + int(rng.integers(0, 300)), note.id, 0, note.velocity, f"p{i}",
+                            note.hammers_ts, note.hammers_val, note.after_ts, note.after_val)
+              for i, note in enumerate(record)]
+    loader = SPMIDLoader()
+    loader.load_from_tracks([record, replay])
+    return loader
+
+
+def file_loader(spmid_path: str) -> SPMIDLoader:
+    loader = SPMIDLoader()
+    if not loader.load_spmid_data(Path(spmid_path).read_bytes()):
+        raise ValueError("SPMID 解析失败")
+    return loader
+
+
+def build_backend(loaders: Dict[str, SPMIDLoader]) -> PianoAnalysisBackend:
+    backend = PianoAnalysisBackend("figure-payload-benchmark")
+    for index, (filename, loader) in enumerate(loaders.items()):
+        success, message = asyncio.run(backend.multi_algorithm_manager.add_algorithm_async(
+            f"alg{index}", filename, loader.get_record_data(), loader.get_replay_data(),
+            loader.get_filter_collector()))
+        if not success:
+            raise RuntimeError(f"{filename}: {message}")
+    return backend
+
+
+def figure_cases(backend: PianoAnalysisBackend) -> List[Tuple[str, Callable[[], Any]]]:
+    service = backend.plot_service
+    first_key = None
+    for algorithm in backend.get_active_algorithms():
+        frame = algorithm.plot_frame
+        if frame is not None and frame.precise.any():
+            first_key = int(frame.key_id[frame.precise][0])
+            break
+    cases = [
+        ("瀑布图", lambda: service.generate_waterfall_plot()),
+        ("瀑布图LOD概览", lambda: service.generate_waterfall_lod_plot()),
+        ("延时时间序列", lambda: service.generate_delay_time_series_plot()),
+        ("延时直方图", lambda: service.generate_delay_histogram_plot()),
+        ("按键-延时散点", lambda: service.generate_key_delay_scatter_plot()),
+        ("按键-延时Z-Score", lambda: service.generate_key_delay_zscore_scatter_plot()),
+        ("锤速-延时", lambda: service.generate_hammer_velocity_delay_scatter_plot()),
+        ("锤速-相对延时", lambda: service.generate_hammer_velocity_relative_delay_scatter_plot()),
+        ("按键-锤速", lambda: service.generate_key_hammer_velocity_scatter_plot()),
+    ]
+    if first_key is not None:
+        cases.append((f"单键对比({first_key})", lambda: service.generate_single_key_delay_comparison_plot(first_key)))
+    return cases
+
+
+def as_plain_json(value: Any) -> Any:
+    """图表（或包含图表的字典）转为纯 JSON 结构，两种方式都只计入序列化本身的耗时"""
+    if hasattr(value, 'to_plotly_json'):
+        return value.to_plotly_json()
+    if isinstance(value, dict):
+        return {k: as_plain_json(v) for k, v in value.items()}
+    return value
+
+
+@contextmanager
+def encoding_disabled(backend: PianoAnalysisBackend):
+    """临时关闭 encode_array（数组原样交给 Plotly，即以前的绘图路径），进入和退出时都丢弃缓存的图表"""
+    supported = figure_encoding.TYPED_ARRAYS_SUPPORTED
+    figure_encoding.TYPED_ARRAYS_SUPPORTED = False
+    backend.plot_service.invalidate_figures()
+    try:
+        yield
+    finally:
+        figure_encoding.TYPED_ARRAYS_SUPPORTED = supported
+        backend.plot_service.invalidate_figures()
+
+
+def build(factory: Callable[[], Any]) -> Tuple[Any, float]:
+    """
+    Returns:
+        Tuple[Any, float]: (纯 JSON 结构的图表, 图表生成耗时 ms)
+    """
+    start = time.perf_counter()
+    figure = factory()
+    elapsed = (time.perf_counter() - start) * 1000
+    return as_plain_json(figure), elapsed
+
+
+def as_lists(value: Any) -> Any:
+    """将图表中的数组（NumPy 数组或 Plotly 生成的二进制数组）全部展开为列表（以前的序列化方式）
+
+    只用于未经 encode_array 的图表：数组保持原始 float64 值，展开后与以前发送的列表一致。
+    """
+    if hasattr(value, 'to_plotly_json'):
+        value = value.to_plotly_json()
+    if isinstance(value, dict) and 'bdata' in value and 'dtype' in value:
+        array = np.frombuffer(base64.b64decode(value['bdata']), dtype=np.dtype(value['dtype']))
+        if 'shape' in value:
+            array = array.reshape([int(n) for n in str(value['shape']).split(',')])
+        value = array
+    if isinstance(value, np.ndarray):
+        return value.astype(np.float64).tolist() if value.dtype.kind == 'f' else value.tolist()
+    if isinstance(value, dict):
+        return {k: as_lists(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [as_lists(v) for v in value]
+    return value
+
+
+def measure(payload: Any, repeat: int) -> Tuple[int, int, float]:
+    """
+    Returns:
+        Tuple[int, int, float]: (JSON 字节数, gzip 字节数, 序列化耗时 ms 中位数)
+    """
+    times = []
+    text = ""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        text = pio.json.to_json_plotly(payload)
+        times.append((time.perf_counter() - start) * 1000)
+    raw = text.encode("utf-8")
+    return len(raw), len(gzip.compress(raw, compresslevel=6)), float(np.median(times))
+
+
+def run(backend: PianoAnalysisBackend, repeat: int) -> None:
+    cases = figure_cases(backend)
+    # 预热（首次调用的模块导入、按键帧构建等不计入生成耗时），两种方式的图表都在清空缓存后重新生成
+    for _, factory in cases:
+        factory()
+    # 以前的绘图路径：关闭 encode_array 生成图表，数组保持原始 float64 值
+    with encoding_disabled(backend):
+        baselines = {name: build(factory) for name, factory in cases}
+
+    print(f"\n{'图表':<18}{'列表(KB)':>11}{'编码(KB)':>11}{'比例':>8}"
+          f"{'列表gz(KB)':>12}{'编码gz(KB)':>12}{'生成列表(ms)':>14}{'生成编码(ms)':>14}"
+          f"{'序列化列表(ms)':>16}{'序列化编码(ms)':>16}")
+    print("-" * 132)
+    total_lists = total_encoded = total_lists_gz = total_encoded_gz = 0
+    for name, factory in cases:
+        baseline, list_build_ms = baselines[name]
+        payload, encoded_build_ms = build(factory)
+        list_bytes, list_gz, list_ms = measure(as_lists(baseline), repeat)
+        encoded_bytes, encoded_gz, encoded_ms = measure(payload, repeat)
+        total_lists += list_bytes
+        total_encoded += encoded_bytes
+        total_lists_gz += list_gz
+        total_encoded_gz += encoded_gz
+        print(f"{name:<18}{list_bytes / 1024:>11.1f}{encoded_bytes / 1024:>11.1f}{encoded_bytes / list_bytes:>8.1%}"
+              f"{list_gz / 1024:>12.1f}{encoded_gz / 1024:>12.1f}{list_build_ms:>14.1f}{encoded_build_ms:>14.1f}"
+              f"{list_ms:>16.1f}{encoded_ms:>16.1f}")
+    print("-" * 132)
+    print(f"{'合计':<18}{total_lists / 1024:>11.1f}{total_encoded / 1024:>11.1f}"
+          f"{total_encoded / max(1, total_lists):>8.1%}"
+          f"{total_lists_gz / 1024:>12.1f}{total_encoded_gz / 1024:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="图表数据量基准测试（列表 vs 编码后的数组）")
+    parser.add_argument("spmid_files", nargs="*", help="真实 SPMID 文件路径（每个文件作为一个算法）")
+    parser.add_argument("--notes", type=int, default=5000, help="合成数据每个算法的音符数（有真实文件时忽略）")
+    parser.add_argument("--algorithms", type=int, default=2, help="合成算法数量（有真实文件时忽略）")
+    parser.add_argument("--repeat", type=int, default=3, help="序列化重复次数（取中位数）")
+    args = parser.parse_args()
+
+    if not TYPED_ARRAYS_SUPPORTED:
+        print("⚠️ 已安装的 Plotly 不支持二进制数组（需要 Plotly ≥ 6），两种方式的结果相同")
+
+    loaders: Dict[str, SPMIDLoader] = {}
+    for spmid_path in args.spmid_files:
+        try:
+            loaders[Path(spmid_path).name] = file_loader(spmid_path)
+        except Exception as e:
+            print(f"❌ 读取失败 {spmid_path}: {e}")
+    if not loaders:
+        loaders = {f"synthetic_{i}.spmid": synthetic_loader(args.notes, i) for i in range(max(1, args.algorithms))}
+
+    print(f"📦 {len(loaders)} 个算法: {', '.join(loaders)}")
+    run(build_backend(loaders), max(1, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+导入耗时基准测试（python -X importtime 预算检查）
+
+在独立子进程中用 `python -X importtime -c "import <模块>"` 测量：
+- app：Web 应用入口（每个 worker 启动时的导入开销）
+- spmid：无界面使用 spmid 包（脚本工具、离线分析）
+每个目标取多次运行的中位数，与预算比较，并列出自身耗时最高的模块。
+无界面的 spmid 不允许加载绘图/曲线分析等重量级依赖（matplotlib、scipy、dtw、plotly、dash），
+这些依赖只应在首次使用时导入。超出预算或加载了禁止的依赖时以非零状态退出，可用于 CI。
+
+用法：
+    python test_script/benchmark_import_time.py
+    python test_script/benchmark_import_time.py --targets spmid --spmid-budget-ms 800
+    python test_script/benchmark_import_time.py --repeat 5 --top 20
+"""
+
+import sys
+import subprocess
+import argparse
+import statistics
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+_project_root = Path(__file__).resolve().parent.parent
+
+# 目标 -> (导入语句, 不允许加载的顶层包)
+TARGETS: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    'app': ("import app", ('matplotlib', 'scipy', 'dtw')),
+    'spmid': ("import spmid", ('matplotlib', 'scipy', 'dtw', 'plotly', 'dash')),
+}
+
+
+def measure_import(statement: str) -> Tuple[float, Dict[str, Tuple[float, float]]]:
+    """
+    在子进程中执行一次导入
+
+    Returns:
+        Tuple: (总耗时 ms, {模块名: (自身耗时 ms, 累计耗时 ms)})
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=_project_root, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"'{statement}' 执行失败:\n{result.stderr[-2000:]}")
+
+    modules: Dict[str, Tuple[float, float]] = {}
+    total_us = 0
+    for line in result.stderr.splitlines():
+        # 格式: "import time:   self [us] |  cumulative | imported package"
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        modules[name.strip()] = (int(self_us) / 1000, int(cumulative_us) / 1000)
+        if not name.startswith("  "):
+            # 顶层导入（缩进为单个空格）的累计耗时之和即总耗时
+            total_us += int(cumulative_us)
+    return total_us / 1000, modules
+
+
+def run_target(name: str, repeat: int, budget_ms: float, top: int) -> bool:
+    statement, forbidden = TARGETS[name]
+    measure_import(statement)  # 预热：生成 .pyc，排除首次编译的耗时
+    runs = [measure_import(statement) for _ in range(repeat)]
+    total_ms = statistics.median(total for total, _ in runs)
+    modules = runs[-1][1]
+
+    print(f"\n📦 {name}: `{statement}`  中位数 {total_ms:.0f}ms（预算 {budget_ms:.0f}ms，{repeat} 次）")
+    print(f"{'模块':<48}{'自身(ms)':>10}{'累计(ms)':>10}")
+    print("-" * 68)
+    for module, (self_ms, cumulative_ms) in sorted(modules.items(), key=lambda item: -item[1][0])[:top]:
+        print(f"{module:<48}{self_ms:>10.1f}{cumulative_ms:>10.1f}")
+
+    ok = True
+    loaded = sorted({module.split('.')[0] for module in modules} & set(forbidden))
+    if loaded:
+        print(f"❌ 导入时加载了应延迟导入的依赖: {', '.join(loaded)}")
+        ok = False
+    if total_ms > budget_ms:
+        print(f"❌ 导入耗时 {total_ms:.0f}ms 超出预算 {budget_ms:.0f}ms")
+        ok = False
+    if ok:
+        print("✅ 通过")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="导入耗时基准测试（python -X importtime 预算检查）")
+    parser.add_argument("--targets", nargs="+", choices=list(TARGETS), default=list(TARGETS), help="测量的目标")
+    parser.add_argument("--app-budget-ms", type=float, default=3500, help="app 导入耗时预算 (ms)")
+    parser.add_argument("--spmid-budget-ms", type=float, default=1200, help="spmid 导入耗时预算 (ms)")
+    parser.add_argument("--repeat", type=int, default=3, help="每个目标的测量次数（取中位数）")
+    parser.add_argument("--top", type=int, default=15, help="列出自身耗时最高的模块数量")
+    args = parser.parse_args()
+
+    budgets = {'app': args.app_budget_ms, 'spmid': args.spmid_budget_ms}
+    results: List[bool] = [run_target(name, max(1, args.repeat), budgets[name], args.top) for name in args.targets]
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
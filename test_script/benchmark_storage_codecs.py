@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+历史数据 Parquet 存储编码基准测试
+
+对比不同压缩编码 / 压缩级别 / 列编码（时间戳 DELTA_BINARY_PACKED、数值 BYTE_STREAM_SPLIT）
+在真实 SPMID 文件与合成音轨上的写入耗时、读取耗时（还原为 OptimizedNote）和文件大小，
+用于为归档选择 utils/constants.py 中的 PARQUET_* 配置。
+
+用法：
+    python test_script/benchmark_storage_codecs.py                     # 仅合成数据
+    python test_script/benchmark_storage_codecs.py a.spmid b.spmid     # 真实文件 + 合成数据
+    python test_script/benchmark_storage_codecs.py --notes 20000 --repeat 5
+"""
+
+import sys
+import time
+import argparse
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+_project_root = Path(__file__).resolve().parent.parent
+if str(_project_root) not in sys.path:
+    sys.path.insert(0, str(_project_root))
+
+from spmid.spmid_reader import OptimizedNote, OptimizedSPMidReader
+from database.parquet_utility import ParquetUtility, StorageOptions
+
+# 参与对比的写入选项
+CANDIDATES: List[StorageOptions] = [
+    StorageOptions('snappy', None, False, False),
+    StorageOptions('lz4', None, False, False),
+    StorageOptions('zstd', 1, False, False),
+    StorageOptions('zstd', 3, False, False),
+    StorageOptions('zstd', 9, False, False),
+    StorageOptions('zstd', 19, False, False),
+    StorageOptions('zstd', 3, True, False),
+    StorageOptions('zstd', 3, False, True),
+    StorageOptions('zstd', 3, True, True),
+    StorageOptions('snappy', None, True, True),
+]
+
+
+def synthetic_tracks(note_count: int, seed: int = 0) -> List[List[OptimizedNote]]:
+    """
+    生成两条合成音轨（录制 + 播放）
+
+    触后采样为 10 个单位间隔的单调时间戳与随机游走的压力值，锤击为 1~3 个采样点，
+    播放音轨相对录制音轨带有随机延时。
+    """
+    rng = np.random.default_rng(seed)
+    tracks = []
+    for track_index in range(2):
+        notes = []
+        offset = 0
+        for i in range(note_count):
+            offset += int(rng.integers(500, 3000))
+            length = int(rng.integers(20, 200))
+            after_ts = (np.arange(length, dtype=np.uint32) * 10 + int(rng.integers(0, 10)))
+            after_val = np.clip(np.cumsum(rng.integers(-20, 21, length)) + 400, 0, 1023).astype(np.uint16)
+            hammer_count = int(rng.integers(1, 4))
+            hammers_ts = np.sort(rng.integers(0, length * 10, hammer_count)).astype(np.uint32)
+            hammers_val = rng.integers(100, 4000, hammer_count).astype(np.uint16)
+            delay = int(rng.integers(0, 300)) if track_index else 0
+            notes.append(OptimizedNote(offset + delay, int(rng.integers(1, 89)), 0, int(rng.integers(1, 128)),
+                                       f"{track_index}-{i}", hammers_ts, hammers_val, after_ts, after_val))
+        tracks.append(notes)
+    return tracks
+
+
+def real_tracks(spmid_path: str) -> List[List[OptimizedNote]]:
+    """读取真实 SPMID 文件的全部音轨"""
+    reader = OptimizedSPMidReader(spmid_path)
+    return [list(reader.get_track(i)) for i in range(reader.track_count)]
+
+
+def benchmark(tracks: List[List[OptimizedNote]], options: StorageOptions,
+              workdir: Path, repeat: int) -> Tuple[float, float, int]:
+    """
+    Returns:
+        Tuple[float, float, int]: (写入耗时 ms 中位数, 读取耗时 ms 中位数, 文件字节数)
+    """
+    table = ParquetUtility.notes_to_table(tracks)
+    path = workdir / f"{options.label}.parquet"
+    write_times, read_times = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        ParquetUtility.write_table(table, str(path), options)
+        write_times.append((time.perf_counter() - start) * 1000)
+    for _ in range(repeat):
+        start = time.perf_counter()
+        ParquetUtility.load_parquet(str(path))
+        read_times.append((time.perf_counter() - start) * 1000)
+    return float(np.median(write_times)), float(np.median(read_times)), path.stat().st_size
+
+
+def run(datasets: Dict[str, List[List[OptimizedNote]]], repeat: int) -> None:
+    with tempfile.TemporaryDirectory(prefix="spmid_codec_bench_") as tmp:
+        workdir = Path(tmp)
+        for name, tracks in datasets.items():
+            note_count = sum(len(track) for track in tracks)
+            print(f"\n📦 {name}  ({len(tracks)} 音轨, {note_count} 音符)")
+            print(f"{'编码':<24}{'写入(ms)':>12}{'读取(ms)':>12}{'大小(KB)':>12}{'相对snappy':>12}")
+            print("-" * 72)
+            baseline = None
+            for options in CANDIDATES:
+                write_ms, read_ms, size = benchmark(tracks, options, workdir, repeat)
+                baseline = baseline or size
+                print(f"{options.label:<24}{write_ms:>12.1f}{read_ms:>12.1f}{size / 1024:>12.1f}{size / baseline:>11.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="历史数据 Parquet 存储编码基准测试")
+    parser.add_argument("spmid_files", nargs="*", help="真实 SPMID 文件路径（可选）")
+    parser.add_argument("--notes", type=int, default=5000, help="合成数据每条音轨的音符数（0 表示不测合成数据）")
+    parser.add_argument("--repeat", type=int, default=3, help="每项测量重复次数（取中位数）")
+    args = parser.parse_args()
+
+    datasets: Dict[str, List[List[OptimizedNote]]] = {}
+    for spmid_path in args.spmid_files:
+        try:
+            datasets[Path(spmid_path).name] = real_tracks(spmid_path)
+        except Exception as e:
+            print(f"❌ 读取失败 {spmid_path}: {e}")
+    if args.notes > 0:
+        datasets[f"合成数据 x{args.notes}"] = synthetic_tracks(args.notes)
+    if not datasets:
+        print("没有可测试的数据")
+        return
+    run(datasets, max(1, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -54,7 +54,7 @@ class AlgorithmMetadata:
     display_name: str
     filename: str
 
-def register_callbacks(app, session_manager: SessionManager, history_manager):
+def register_callbacks(app, session_manager: SessionManager, history_manager, job_scheduler=None):
     """
     注册所有回调函数
     
@@ -69,6 +69,7 @@ def register_callbacks(app, session_manager: SessionManager, history_manager):
     # 导入回调模块
     from ui.session_callbacks import register_session_callbacks
     from ui.file_upload_callbacks import register_file_upload_callbacks
+    from ui.job_callbacks import register_job_callbacks
     from ui.algorithm_callbacks import register_algorithm_callbacks
     from ui.track_comparison_callbacks import register_callbacks as register_track_comparison_callbacks
     # from ui.scatter_callbacks import register_scatter_callbacks  # 暂时禁用，将在散点图页面重新实现
@@ -80,7 +81,10 @@ def register_callbacks(app, session_manager: SessionManager, history_manager):
     register_track_comparison_callbacks(app, session_manager)
 
     # 注册文件上传回调
-    register_file_upload_callbacks(app, session_manager)
+    register_file_upload_callbacks(app, session_manager, job_scheduler)
+
+    # 注册后台任务取消回调
+    register_job_callbacks(app, job_scheduler)
 
     # 注册算法管理回调
     register_algorithm_callbacks(app, session_manager)
@@ -156,9 +156,12 @@ def create_grade_detail_table_placeholder(table_id='single'):
                 id={'type': 'grade-detail-datatable', 'index': table_id},
                 columns=[],
                 data=[],
-                page_action='native',  # 启用客户端分页
+                page_action='custom',  # 服务端分页：只传输当前页（见 grade_detail_callbacks.get_grade_detail_page）
+                sort_action='custom',  # 服务端排序（在列式数据上排序后再分页）
+                sort_mode='single',
                 page_current=0,
-                page_size=50,  # 每页显示50条数据
+                page_size=50,  # 每页显示50条数据（25个匹配对）
+                page_count=1,
                 fixed_rows={'headers': True},
                 style_table={
                     'maxHeight': '400px',
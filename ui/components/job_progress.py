@@ -0,0 +1,82 @@
+"""
+后台任务进度组件
+用于显示 JobScheduler 中任务的状态与分阶段进度
+"""
+from typing import Any, Dict, Optional
+
+from dash import html
+import dash_bootstrap_components as dbc
+
+from backend.job_scheduler import JOB_STAGES
+
+# 取消按钮的 pattern-matching ID 类型（index 为 job_id，回调见 ui/job_callbacks.py）
+CANCEL_JOB_BUTTON_TYPE = 'cancel-job-btn'
+
+# 任务状态 -> (Bootstrap颜色, 显示文本)
+_JOB_STATUS_DISPLAY = {
+    'pending': ('secondary', '排队中'),
+    'running': ('info', '处理中'),
+    'succeeded': ('success', '完成'),
+    'failed': ('danger', '失败'),
+    'cancelled': ('warning', '已取消'),
+}
+
+
+def create_job_progress(job_info: Optional[Dict[str, Any]], show_description: bool = False) -> html.Div:
+    """
+    创建任务进度显示
+
+    Args:
+        job_info: Job.to_dict() 返回的任务信息
+        show_description: 是否显示任务描述（用于任务列表）
+
+    Returns:
+        html.Div: 进度条 + 阶段说明
+    """
+    if not job_info:
+        return html.Div("任务不存在或已过期", style={'fontSize': '11px', 'color': '#6c757d'})
+
+    status = job_info.get('status', 'pending')
+    color, status_text = _JOB_STATUS_DISPLAY.get(status, ('secondary', status))
+    percent = int(round(job_info.get('progress', 0.0) * 100))
+
+    if status == 'running' and job_info.get('stage_name'):
+        stage_index = JOB_STAGES.index(job_info['current_stage']) + 1
+        detail = f"{status_text}: {job_info['stage_name']} ({stage_index}/{len(JOB_STAGES)})"
+    elif status in ('failed', 'cancelled') and job_info.get('error_message'):
+        detail = f"{status_text}: {job_info['error_message']}"
+    else:
+        detail = status_text
+
+    children = []
+    if show_description:
+        children.append(html.Div(job_info.get('description', ''), style={'fontSize': '11px', 'fontWeight': 'bold'}))
+    progress_bar = dbc.Progress(
+        value=percent,
+        label=f"{percent}%" if percent >= 10 else "",
+        color=color,
+        striped=status == 'running',
+        animated=status == 'running',
+        style={'height': '12px', 'fontSize': '9px', 'flex': '1'}
+    )
+    if job_info.get('is_finished', False):
+        children.append(progress_bar)
+    else:
+        # 未结束的任务显示取消按钮（已请求取消时禁用，运行中的任务在下一个阶段边界停止）
+        cancel_requested = job_info.get('cancel_requested', False)
+        children.append(html.Div([
+            progress_bar,
+            dbc.Button(
+                "取消中..." if cancel_requested else "取消",
+                id={'type': CANCEL_JOB_BUTTON_TYPE, 'index': job_info['job_id']},
+                color='link',
+                size='sm',
+                disabled=cancel_requested,
+                style={'fontSize': '11px', 'padding': '0 0 0 8px', 'lineHeight': '12px'}
+            )
+        ], style={'display': 'flex', 'alignItems': 'center'}))
+    children.append(html.Div(
+        detail,
+        style={'fontSize': '11px', 'color': '#6c757d', 'marginTop': '2px'}
+    ))
+    return html.Div(children, className='mb-1')
@@ -2,6 +2,7 @@ from dash import Input, Output, State, callback_context, no_update
 import dash_bootstrap_components as dbc
 from utils.logger import Logger
 from backend.consistency_plotter import ConsistencyPlotter
+import numpy as np
 import json
 
 logger = Logger.get_logger()
@@ -63,17 +64,11 @@ def _handle_update_key_options(session_id, active_algorithm_name, session_manage
     if not active_algorithms:
         return []
         
+    # 收集 Record 和 Replay 的 Key ID（数据集已溢出时使用缓存的按键列表，不触发重载）
     keys = set()
     for alg in active_algorithms:
-        analyzer = alg.analyzer
-        if not analyzer: continue
-        
-        # 收集 Record 和 Replay 的 Key ID
-        rec_data = analyzer.get_initial_valid_record_data() or []
-        rep_data = analyzer.get_initial_valid_replay_data() or []
-        for note in rec_data: keys.add(note.id)
-        for note in rep_data: keys.add(note.id)
-            
+        keys.update(alg.get_valid_key_ids())
+
     # 排序并生成选项
     sorted_keys = sorted(list(keys))
     options = [{'label': f"Key {k}", 'value': k} for k in sorted_keys]
@@ -103,14 +98,12 @@ def _get_base_consistency_data(key_id, session_id, session_manager, active_algor
         if found:
             target_alg = found
             
-    base_analyzer = target_alg.analyzer
-    if not base_analyzer:
+    # 该按键的录制音符（按 offset 排序，随按键波形一起缓存）
+    record_waveforms = target_alg.get_key_waveforms('record', key_id)
+    if record_waveforms is None:
         return None, None
-        
-    record_data = base_analyzer.get_initial_valid_record_data() or []
-    key_record_notes = sorted([n for n in record_data if n.id == key_id], key=lambda x: x.offset)
     
-    return active_algorithms, key_record_notes
+    return active_algorithms, record_waveforms.notes
 
 def _handle_update_slider_range(key_id, session_id, active_algorithm_name, session_manager):
     active_algorithms, key_record_notes = _get_base_consistency_data(key_id, session_id, session_manager, active_algorithm_name)
@@ -150,7 +143,15 @@ def _handle_update_slider_range(key_id, session_id, active_algorithm_name, sessi
     
     return max_val, [0, max_val], marks, label_text
 
+def _index_rows(count, start_idx, end_idx):
+    """索引范围 [start_idx, end_idx]（end_idx 为 None 表示到末尾）内的行号"""
+    stop = count if end_idx is None else min(count, end_idx + 1)
+    return np.arange(min(start_idx, stop), stop)
+
 def _handle_update_consistency_graph(slider_value, key_id, session_id, active_algorithm_name, session_manager):
+    if key_id is None:
+        return no_update, no_update
+
     # 获取后端
     backend = session_manager.get_backend(session_id)
     if not backend:
@@ -165,60 +166,43 @@ def _handle_update_consistency_graph(slider_value, key_id, session_id, active_al
     # 收集所有数据源
     data_sources = []
     
-    # 解析范围（基于索引）
+    # 解析范围（基于索引，两端包含）
     start_idx = 0
-    end_idx = float('inf')
+    end_idx = None
     
     if isinstance(slider_value, list) and len(slider_value) == 2:
-        start_idx = max(0, slider_value[0])
+        start_idx = max(0, int(slider_value[0]))
         # slider 的值就是索引
-        end_idx = slider_value[1]
+        end_idx = int(slider_value[1])
     
     # [DEBUG] 打印索引范围
-    logger.info(f"ConsistencyPlot: 选中索引范围: {start_idx} - {end_idx}")
+    logger.info(f"ConsistencyPlot: 选中索引范围: {start_idx} - {end_idx if end_idx is not None else '末尾'}")
 
-    # 遍历提取所有算法的数据
+    # 遍历提取所有算法的数据（按键波形按算法缓存，这里只按索引切片）
     for alg in active_algorithms:
         alg_name = alg.metadata.algorithm_name
         display_name = alg.metadata.display_name or alg_name
         
-        analyzer = alg.analyzer
-        
-        # 1. 提取 Record (Ground Truth)
-        # 注意：这里我们使用 get_initial_valid_record_data 获取所有有效数据
-        full_rec = analyzer.get_initial_valid_record_data() or []
-        key_rec = [n for n in full_rec if n.id == key_id]
-        key_rec.sort(key=lambda x: x.offset)
-        
-        # 2. 提取 Replay
-        full_rep = analyzer.get_initial_valid_replay_data() or []
-        key_rep = [n for n in full_rep if n.id == key_id]
-        key_rep.sort(key=lambda x: x.offset)
+        # 1. Record (Ground Truth，初始有效数据) 与 2. Replay
+        key_rec = alg.get_key_waveforms('record', key_id)
+        key_rep = alg.get_key_waveforms('replay', key_id)
+        if key_rec is None or key_rep is None:
+            continue
         
         # 3. 按索引切片 (独立切片，确保每个算法的对应索引数据都能显示)
         # 无论时间是否对齐，我们都展示该段索引的数据
-        curr_rec_len = len(key_rec)
-        curr_rep_len = len(key_rep)
-        
-        rec_end_actual = min(curr_rec_len - 1, int(end_idx))
-        rep_end_actual = min(curr_rep_len - 1, int(end_idx))
-        
-        sliced_rec = []
-        if start_idx < curr_rec_len:
-             sliced_rec = key_rec[int(start_idx) : rec_end_actual + 1]
-             
-        sliced_rep = []
-        if start_idx < curr_rep_len:
-             sliced_rep = key_rep[int(start_idx) : rep_end_actual + 1]
+        rec_rows = _index_rows(len(key_rec), start_idx, end_idx)
+        rep_rows = _index_rows(len(key_rep), start_idx, end_idx)
         
         # [DEBUG] 打印该算法的数据统计
-        rec_range = f"{sliced_rec[0].key_on_ms:.1f}-{sliced_rec[-1].key_on_ms:.1f}" if sliced_rec else "None"
-        logger.info(f"ConsistencyPlot: 算法 {display_name}: Rec总数={len(key_rec)}, 切片后Rec={len(sliced_rec)} (Range:{rec_range}), Rep={len(sliced_rep)}")
+        rec_on = key_rec.key_on_ms[rec_rows]
+        rec_range = f"{rec_on[0]:.1f}-{rec_on[-1]:.1f}" if rec_on.size else "None"
+        logger.info(f"ConsistencyPlot: 算法 {display_name}: Rec总数={len(key_rec)}, 切片后Rec={rec_rows.size} (Range:{rec_range}), Rep={rep_rows.size}")
         
         data_sources.append({
             'name': display_name,
-            'record_notes': sliced_rec,
-            'replay_notes': sliced_rep
+            'record': (key_rec, rec_rows),
+            'replay': (key_rep, rep_rows)
         })
 
     # 生成图表
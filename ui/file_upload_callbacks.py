@@ -8,7 +8,6 @@
 4. 上传状态管理
 """
 
-import asyncio
 import traceback
 import time
 from typing import Tuple, Optional
@@ -19,6 +18,8 @@ import dash_bootstrap_components as dbc
 
 from backend.session_manager import SessionManager
 from backend.file_upload_service import FileUploadService
+from backend.job_scheduler import JobScheduler
+from ui.components.job_progress import create_job_progress
 from ui.multi_file_upload_handler import MultiFileUploadHandler
 from utils.logger import Logger
 
@@ -58,7 +59,7 @@ def _validate_backend_and_data(session_manager, session_id: str, store_data: dic
 
 # ==================== 回调函数 ====================
 
-def register_file_upload_callbacks(app, session_manager: SessionManager):
+def register_file_upload_callbacks(app, session_manager: SessionManager, job_scheduler: JobScheduler):
     """注册文件上传相关的所有回调函数"""
 
     @app.callback(
@@ -113,7 +114,8 @@ def register_file_upload_callbacks(app, session_manager: SessionManager):
 
     @app.callback(
         [Output({'type': 'algorithm-status', 'index': dash.dependencies.MATCH}, 'children'),
-         Output({'type': 'algorithm-upload-success', 'index': dash.dependencies.MATCH}, 'data')],
+         Output({'type': 'algorithm-job-id', 'index': dash.dependencies.MATCH}, 'data'),
+         Output({'type': 'algorithm-job-poll', 'index': dash.dependencies.MATCH}, 'disabled')],
         [Input({'type': 'confirm-algorithm-btn', 'index': dash.dependencies.MATCH}, 'n_clicks')],
         [State({'type': 'algorithm-name-input', 'index': dash.dependencies.MATCH}, 'value'),
          State({'type': 'motor-type-select', 'index': dash.dependencies.MATCH}, 'value'),
@@ -129,16 +131,17 @@ def register_file_upload_callbacks(app, session_manager: SessionManager):
         确认添加算法（文件上传流程的最后一步）
         
         用户上传文件并输入算法名后，点击确认按钮触发此回调。
+        解析与分析作为后台任务提交到 JobScheduler，回调立即返回并启用进度轮询。
         """
         
         # 验证输入参数
         if not n_clicks or not algorithm_name or not algorithm_name.strip():
-            return _create_error_span("请输入算法名称", '#ffc107'), no_update
+            return _create_error_span("请输入算法名称", '#ffc107'), no_update, no_update
 
         # 验证后端和数据
         is_valid, error_span = _validate_backend_and_data(session_manager, session_id, store_data)
         if not is_valid:
-            return error_span, no_update
+            return error_span, no_update, no_update
     
         backend = session_manager.get_backend(session_id)
         
@@ -149,7 +152,7 @@ def register_file_upload_callbacks(app, session_manager: SessionManager):
             
             file_data = upload_handler.get_file_data_by_id(file_id, store_data)
             if not file_data:
-                return _create_error_span("找不到文件信息"), no_update
+                return _create_error_span("找不到文件信息"), no_update, no_update
             
             _, filename = file_data # 注意：store 中的 content 现在可能是 None
             
@@ -170,34 +173,52 @@ def register_file_upload_callbacks(app, session_manager: SessionManager):
                 logger.warning(f"[WARN] 后端缓存未命中 (ID: {file_id})，尝试从 Store 获取")
                 content, _ = file_data
                 if not content:
-                    return _create_error_span("缓存已失效且 Store 中无内容，请重新上传"), no_update
+                    return _create_error_span("缓存已失效且 Store 中无内容，请重新上传"), no_update, no_update
                 
                 decoded_bytes = FileUploadService.decode_base64_file_content(content)
                 if decoded_bytes is None:
-                    return _create_error_span("文件解码失败"), no_update
-
-            # ============ 步骤3: 添加算法（后端处理：SPMID 解析 + 分析） ============
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            success, error_msg = loop.run_until_complete(
-                backend.file_upload_service.add_file_as_algorithm(
-                    decoded_bytes, filename, algorithm_name,
-                    motor_type=motor_type,
-                    algorithm_type=algorithm_type,
-                    piano_type=piano_type,
-                    creation_time=last_modified
-                )
+                    return _create_error_span("文件解码失败"), no_update, no_update
+
+            # ============ 步骤3: 提交后台任务（SPMID 解析 + 分析） ============
+            job = job_scheduler.submit(
+                session_id,
+                f"{algorithm_name} ({filename})",
+                backend.file_upload_service.add_file_as_algorithm,
+                decoded_bytes, filename, algorithm_name,
+                motor_type=motor_type,
+                algorithm_type=algorithm_type,
+                piano_type=piano_type,
+                creation_time=last_modified
             )
-            loop.close()
-            if success:
-                logger.info(f"[OK] 算法 '{algorithm_name}' 添加成功")
-                return _create_success_span("[OK] 添加成功"), time.time()
-            else:
-                return _create_error_span(f"[ERROR] {error_msg}"), no_update
+            return create_job_progress(job.to_dict()), job.job_id, False
 
         except Exception as e:
             logger.error(f"[ERROR] 添加算法失败: {e}")
             logger.error(traceback.format_exc())
-            return _create_error_span(f"添加失败: {str(e)}"), no_update
-    
+            return _create_error_span(f"添加失败: {str(e)}"), no_update, no_update
 
+    @app.callback(
+        [Output({'type': 'algorithm-status', 'index': dash.dependencies.MATCH}, 'children', allow_duplicate=True),
+         Output({'type': 'algorithm-upload-success', 'index': dash.dependencies.MATCH}, 'data'),
+         Output({'type': 'algorithm-job-poll', 'index': dash.dependencies.MATCH}, 'disabled', allow_duplicate=True)],
+        [Input({'type': 'algorithm-job-poll', 'index': dash.dependencies.MATCH}, 'n_intervals')],
+        [State({'type': 'algorithm-job-id', 'index': dash.dependencies.MATCH}, 'data')],
+        prevent_initial_call=True
+    )
+    def poll_algorithm_job(n_intervals, job_id):
+        """轮询后台任务进度，结束后停止轮询并通知算法列表刷新"""
+        if not job_id:
+            return no_update, no_update, True
+
+        job = job_scheduler.get_job(job_id)
+        if not job:
+            return _create_error_span("任务已过期，请重新提交"), no_update, True
+
+        job_info = job.to_dict()
+        if not job.is_finished:
+            return create_job_progress(job_info), no_update, False
+
+        if job_info['status'] == 'succeeded':
+            logger.info(f"[OK] 任务完成: {job.description}")
+            return _create_success_span("[OK] 添加成功"), time.time(), True
+        return _create_error_span(f"[ERROR] {job_info['error_message']}"), no_update, True
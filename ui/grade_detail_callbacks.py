@@ -3,9 +3,10 @@
 """
 import json
 import traceback
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 
 import dash
+import numpy as np
 import plotly.graph_objects as go
 from dash import Input, Output, State, html, no_update, dcc
 
@@ -26,13 +27,19 @@ plotter = DurationDiffCurvePlotter()
 # 1. 数据工具函数 (Utilities)
 # ==========================================
 
-def get_note_matcher_from_backend(backend, algorithm_name: Optional[str] = None) -> Optional[Any]:
-    """获取指定算法的 NoteMatcher 实例"""
+def _get_algorithm_dataset(backend, algorithm_name: Optional[str] = None):
+    """获取指定算法的数据集（未指定时为第一个激活算法）"""
+    active_algorithms = backend.get_active_algorithms() if backend else []
+    if not active_algorithms:
+        return None
     if algorithm_name:
-        active_algorithms = backend.get_active_algorithms()
-        target = next((alg for alg in active_algorithms if alg.metadata.algorithm_name == algorithm_name), None)
-        return target.analyzer.note_matcher if target and target.analyzer else None
-    return backend.analyzer.note_matcher if backend and backend.analyzer else None
+        return next((alg for alg in active_algorithms if alg.metadata.algorithm_name == algorithm_name), None)
+    return active_algorithms[0]
+
+def get_note_matcher_from_backend(backend, algorithm_name: Optional[str] = None) -> Optional[Any]:
+    """获取指定算法（未指定时为第一个激活算法）的 NoteMatcher 实例"""
+    target = _get_algorithm_dataset(backend, algorithm_name)
+    return target.analyzer.note_matcher if target and target.analyzer else None
 
 def format_hammer_time(note: Note) -> str:
     """格式化锤击时间点（首个锤头时间 + Offset）"""
@@ -50,106 +57,254 @@ def format_hammer_velocity(note: Note) -> str:
 # 2. 核心数据获取层 (Data Layer)
 # ==========================================
 
+def _format_pair_rows(rec_note: Note, rep_note: Note, err_ms: float,
+                      algorithm_name: Optional[str] = None) -> List[Dict[str, Any]]:
+    """格式化一个匹配对的表格行（录制行 + 播放行）"""
+    # 计算差异指标 (播放相对于录制)
+    k_diff = rep_note.key_on_ms - rec_note.key_on_ms
+    d_diff = rep_note.duration_ms - rec_note.duration_ms
+
+    # 计算锤击时间差和锤速差
+    rec_hammer_time = rec_note.get_first_hammer_time() 
+    rep_hammer_time = rep_note.get_first_hammer_time()
+    hammer_time_diff = rep_hammer_time - rec_hammer_time if rec_hammer_time and rep_hammer_time else 0
+
+    rec_hammer_velocity = rec_note.get_first_hammer_velocity()
+    rep_hammer_velocity = rep_note.get_first_hammer_velocity()
+    hammer_velocity_diff = rep_hammer_velocity - rec_hammer_velocity if rec_hammer_velocity and rep_hammer_velocity else 0
+    
+    # 基础行 (录制) - 添加配对信息以便查找
+    record_row = {
+        'data_type': '录制', 'global_index': rec_note.uuid, 'keyId': rec_note.id,
+        'keyOn': f"{rec_note.key_on_ms:.2f}", 'keyOff': f"{rec_note.key_off_ms:.2f}",
+        'hammer_times': format_hammer_time(rec_note), 'hammer_velocities': format_hammer_velocity(rec_note),
+        'duration': f"{rec_note.duration_ms:.2f}", 'row_type': 'record',
+        'match_status': f"误差: {err_ms:.2f}ms", 'keyon_diff': '', 'duration_diff': '', 'hammer_time_diff': '', 'hammer_velocity_diff': '',
+        'record_uuid': rec_note.uuid, 'replay_uuid': rep_note.uuid  # 添加配对信息
+    }
+    # 对比行 (播放) - 添加配对信息以便查找
+    replay_row = {
+        'data_type': '播放', 'global_index': rep_note.uuid, 'keyId': rep_note.id,
+        'keyOn': f"{rep_note.key_on_ms:.2f}", 'keyOff': f"{rep_note.key_off_ms:.2f}",
+        'hammer_times': format_hammer_time(rep_note), 'hammer_velocities': format_hammer_velocity(rep_note),
+        'duration': f"{rep_note.duration_ms:.2f}", 'row_type': 'replay',
+        'keyon_diff': f"{k_diff:+.2f}ms", 'duration_diff': f"{d_diff:+.2f}ms",
+        'hammer_time_diff': f"{hammer_time_diff:+.2f}ms" if hammer_time_diff else '',
+        'hammer_velocity_diff': f"{hammer_velocity_diff:+.2f}" if hammer_velocity_diff else '',
+        'match_status': f"误差: {err_ms:.2f}ms",
+        'record_uuid': rec_note.uuid, 'replay_uuid': rep_note.uuid  # 添加配对信息
+    }
+    
+    if algorithm_name:
+        record_row['algorithm_name'] = algorithm_name
+        replay_row['algorithm_name'] = algorithm_name
+    return [record_row, replay_row]
+
+def _get_grade_indices(matcher, grade_key: str) -> Optional[np.ndarray]:
+    """评级对应的匹配对下标（匹配时预计算的评级分桶）；未知评级返回 None"""
+    try:
+        target_type = MatchType(grade_key)
+    except ValueError:
+        logger.warning(f"未知评级 Key: {grade_key}")
+        return None
+    return matcher.get_grade_indices(target_type)
+
+def _grade_sort_column(frame, column_id: str) -> Optional[np.ndarray]:
+    """
+    评级详情表格列对应的排序值（列式绘图数据的一列，每个匹配对一个值，按录制行/差值排序）
+
+    Returns:
+        Optional[np.ndarray]: 不支持排序的列返回 None
+    """
+    columns = {
+        'keyId': lambda: frame.key_id,
+        'keyOn': lambda: frame.record_time_ms,
+        'keyOff': lambda: frame.record_time_ms + frame.record_duration_ms,
+        'hammer_times': lambda: frame.record_hammer_time_ms,
+        'hammer_velocities': lambda: frame.record_velocity,
+        'duration': lambda: frame.record_duration_ms,
+        'keyon_diff': lambda: frame.delay_ms,
+        'duration_diff': lambda: frame.replay_duration_ms - frame.record_duration_ms,
+        'hammer_time_diff': lambda: frame.replay_hammer_time_ms - frame.record_hammer_time_ms,
+        'hammer_velocity_diff': lambda: frame.replay_velocity - frame.record_velocity,
+        'match_status': lambda: frame.error_ms,
+    }
+    column = columns.get(column_id)
+    return column() if column else None
+
+def _sort_rows(rows: np.ndarray, values: Optional[np.ndarray], sort_by: Optional[List[Dict]]) -> np.ndarray:
+    """按 DataTable 的 sort_by 稳定排序行下标（缺失值排在最后；不支持的列保持原顺序）"""
+    if values is None or not sort_by:
+        return rows
+    keys = values[rows].astype(np.float64)
+    if sort_by[0].get('direction') == 'desc':
+        keys = -keys
+    return rows[np.argsort(keys, kind='stable')]
+
+def _key_filter_value(key_filter) -> Optional[int]:
+    """按键筛选下拉框的值转为按键ID（'' / 'all' / None 表示全部按键）"""
+    if key_filter in (None, '', 'all'):
+        return None
+    try:
+        return int(key_filter)
+    except (TypeError, ValueError):
+        return None
+
+def grade_detail_page_count(total_count: int, page_size: int, grade_key: str) -> int:
+    """评级详情表格的总页数（匹配对的两行不跨页）"""
+    rows_per_page = page_size if grade_key == 'failed' else max(1, page_size // 2) * 2
+    return max(1, -(-total_count // rows_per_page))
+
 def get_grade_detail_data(backend, grade_key: str, algorithm_name: Optional[str] = None) -> List[Dict[str, Any]]:
     """
-    流式获取指定匹配等级的行数据
-    包含：录制/播放对比对、关键时间差计算
+    获取指定匹配等级的全部行数据（每个匹配对两行：录制 + 播放）
+    包含：录制/播放对比对、关键时间差计算；表格显示请使用分页接口 get_grade_detail_page
     """
     try:
         matcher = get_note_matcher_from_backend(backend, algorithm_name)
         if not matcher: return []
         
-        matched_pairs = matcher.get_matched_pairs_with_grade()
-        if not matched_pairs: return []
-        
-        # 建立评级映射 (已统一为 excellent, good, fair, poor, severe, failed)
-        try:
-            target_type = MatchType(grade_key)
-        except ValueError:
-            logger.warning(f"未知评级 Key: {grade_key}")
-            return []
+        indices = _get_grade_indices(matcher, grade_key)
+        if indices is None: return []
         
+        pairs = matcher.matched_pairs
         detail_data = []
-        for rec_note, rep_note, m_type, err_ms in matched_pairs:
-            if m_type != target_type: continue
-            
-            # 计算差异指标 (播放相对于录制)
-            k_diff = rep_note.key_on_ms - rec_note.key_on_ms
-            d_diff = rep_note.duration_ms - rec_note.duration_ms
-
-            # 计算锤击时间差和锤速差
-            rec_hammer_time = rec_note.get_first_hammer_time() 
-            rep_hammer_time = rep_note.get_first_hammer_time()
-            hammer_time_diff = rep_hammer_time - rec_hammer_time if rec_hammer_time and rep_hammer_time else 0
-
-            rec_hammer_velocity = rec_note.get_first_hammer_velocity()
-            rep_hammer_velocity = rep_note.get_first_hammer_velocity()
-            hammer_velocity_diff = rep_hammer_velocity - rec_hammer_velocity if rec_hammer_velocity and rep_hammer_velocity else 0
-            
-            # 基础行 (录制) - 添加配对信息以便查找
-            record_row = {
-                'data_type': '录制', 'global_index': rec_note.uuid, 'keyId': rec_note.id,
-                'keyOn': f"{rec_note.key_on_ms:.2f}", 'keyOff': f"{rec_note.key_off_ms:.2f}",
-                'hammer_times': format_hammer_time(rec_note), 'hammer_velocities': format_hammer_velocity(rec_note),
-                'duration': f"{rec_note.duration_ms:.2f}", 'row_type': 'record',
-                'match_status': f"误差: {err_ms:.2f}ms", 'keyon_diff': '', 'duration_diff': '', 'hammer_time_diff': '', 'hammer_velocity_diff': '',
-                'record_uuid': rec_note.uuid, 'replay_uuid': rep_note.uuid  # 添加配对信息
-            }
-            # 对比行 (播放) - 添加配对信息以便查找
-            replay_row = {
-                'data_type': '播放', 'global_index': rep_note.uuid, 'keyId': rep_note.id,
-                'keyOn': f"{rep_note.key_on_ms:.2f}", 'keyOff': f"{rep_note.key_off_ms:.2f}",
-                'hammer_times': format_hammer_time(rep_note), 'hammer_velocities': format_hammer_velocity(rep_note),
-                'duration': f"{rep_note.duration_ms:.2f}", 'row_type': 'replay',
-                'keyon_diff': f"{k_diff:+.2f}ms", 'duration_diff': f"{d_diff:+.2f}ms",
-                'hammer_time_diff': f"{hammer_time_diff:+.2f}ms" if hammer_time_diff else '',
-                'hammer_velocity_diff': f"{hammer_velocity_diff:+.2f}" if hammer_velocity_diff else '',
-                'match_status': f"误差: {err_ms:.2f}ms",
-                'record_uuid': rec_note.uuid, 'replay_uuid': rep_note.uuid  # 添加配对信息
-            }
-            
-            if algorithm_name:
-                record_row['algorithm_name'] = algorithm_name
-                replay_row['algorithm_name'] = algorithm_name
-                
-            detail_data.extend([record_row, replay_row])
+        for index in indices.tolist():
+            rec_note, rep_note, _, err_ms = pairs[index]
+            detail_data.extend(_format_pair_rows(rec_note, rep_note, err_ms, algorithm_name))
         return detail_data
     except Exception as e:
         logger.error(f"Error fetching grade detail: {e}")
         return []
 
+def get_grade_detail_page(backend, grade_key: str, algorithm_name: Optional[str] = None,
+                          page: int = 0, page_size: int = 50, key_filter=None,
+                          sort_by: Optional[List[Dict]] = None) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    服务端分页获取评级详情
+
+    按键筛选与排序在匹配时预计算的评级分桶和列式绘图数据上完成，只格式化请求页的行。
+    匹配对的录制行与播放行始终在同一页（每页 page_size // 2 个匹配对）。
+
+    Args:
+        backend: 后端实例
+        grade_key: 评级键（excellent / good / fair / poor / severe / failed）
+        algorithm_name: 算法名称（None 表示第一个激活算法）
+        page: 页码（从0开始）
+        page_size: 每页表格行数
+        key_filter: 按键筛选值（'' / 'all' / None 表示全部按键）
+        sort_by: DataTable 的 sort_by（[{'column_id': ..., 'direction': 'asc' | 'desc'}]）
+
+    Returns:
+        Tuple[List[Dict], int]: (当前页的表格行, 筛选后的总行数)
+    """
+    try:
+        if grade_key == 'failed':
+            matcher = get_note_matcher_from_backend(backend, algorithm_name)
+            return _get_failed_matches_page(matcher, algorithm_name, page, page_size, key_filter, sort_by)
+
+        algorithm = _get_algorithm_dataset(backend, algorithm_name)
+        analyzer = algorithm.analyzer if algorithm else None
+        matcher = getattr(analyzer, 'note_matcher', None)
+        if not matcher: return [], 0
+
+        rows = _get_grade_indices(matcher, grade_key)
+        if rows is None or not rows.size: return [], 0
+
+        frame = algorithm.plot_frame
+        key_id = _key_filter_value(key_filter)
+        if key_id is not None:
+            rows = rows[frame.key_id[rows] == key_id]
+        if sort_by:
+            rows = _sort_rows(rows, _grade_sort_column(frame, sort_by[0].get('column_id')), sort_by)
+
+        pairs_per_page = max(1, page_size // 2)
+        start = max(0, page) * pairs_per_page
+        pairs = matcher.matched_pairs
+        page_data = []
+        for index in rows[start:start + pairs_per_page].tolist():
+            rec_note, rep_note, _, err_ms = pairs[index]
+            page_data.extend(_format_pair_rows(rec_note, rep_note, err_ms, algorithm_name))
+        return page_data, len(rows) * 2
+    except Exception as e:
+        logger.error(f"Error fetching grade detail page: {e}")
+        return [], 0
+
+def get_grade_key_ids(backend, grade_key: str, algorithm_name: Optional[str] = None) -> List[int]:
+    """指定评级涉及的按键ID（升序，用于按键筛选下拉框）"""
+    try:
+        if grade_key == 'failed':
+            matcher = get_note_matcher_from_backend(backend, algorithm_name)
+            return sorted({note.id for _, _, _, note in _failed_match_entries(matcher)})
+
+        algorithm = _get_algorithm_dataset(backend, algorithm_name)
+        analyzer = algorithm.analyzer if algorithm else None
+        matcher = getattr(analyzer, 'note_matcher', None)
+        if not matcher: return []
+        rows = _get_grade_indices(matcher, grade_key)
+        if rows is None: return []
+        return np.unique(algorithm.plot_frame.key_id[rows]).tolist()
+    except Exception as e:
+        logger.error(f"Error fetching grade key ids: {e}")
+        return []
+
+def _failed_match_entries(matcher) -> List[Tuple[str, int, str, Note]]:
+    """无法匹配的音符：(数据类型, 索引, 失败原因, 音符)"""
+    failure_reasons = getattr(matcher, 'failure_reasons', {}) if matcher else {}
+    entries = []
+    for (data_type, index), reason in failure_reasons.items():
+        notes = getattr(matcher, '_record_data' if data_type == 'record' else '_replay_data', [])
+        if index < len(notes):
+            entries.append((data_type, index, reason, notes[index]))
+    return entries
+
+def _format_failed_row(data_type: str, index: int, reason: str, note: Note,
+                       algorithm_name: Optional[str] = None) -> Dict[str, Any]:
+    """格式化无法匹配音符的表格行"""
+    row = {
+        'row_type': '录制' if data_type == 'record' else '播放',
+        'index': index, 'key_id': note.id, 'reason': reason,
+        'keyon': f"{note.key_on_ms:.2f}", 'keyoff': f"{note.key_off_ms:.2f}",
+        'duration': f"{note.duration_ms:.2f}", 'hammer_time': format_hammer_time(note),
+        'hammer_velocity': format_hammer_velocity(note),
+        'record_uuid': note.uuid if data_type == 'record' else None,
+        'replay_uuid': note.uuid if data_type == 'replay' else None,
+        'global_index': note.uuid
+    }
+    if algorithm_name: row['algorithm_name'] = algorithm_name
+    return row
+
 def get_failed_matches_detail_data(matcher, algorithm_name: Optional[str] = None) -> List[Dict[str, Any]]:
     """获取无法匹配（Major 异常）的音符详情"""
     try:
-        failure_reasons = getattr(matcher, 'failure_reasons', {})
-        if not failure_reasons: return []
-        
-        detail_data = []
-        for (data_type, index), reason in failure_reasons.items():
-            attr = '_record_data' if data_type == 'record' else '_replay_data'
-            notes = getattr(matcher, attr, [])
-            
-            if index < len(notes):
-                note = notes[index]
-                row = {
-                    'row_type': '录制' if data_type == 'record' else '播放',
-                    'index': index, 'key_id': note.id, 'reason': reason,
-                    'keyon': f"{note.key_on_ms:.2f}", 'keyoff': f"{note.key_off_ms:.2f}",
-                    'duration': f"{note.duration_ms:.2f}", 'hammer_time': format_hammer_time(note),
-                    'hammer_velocity': format_hammer_velocity(note),
-                    'record_uuid': note.uuid if data_type == 'record' else None,
-                    'replay_uuid': note.uuid if data_type == 'replay' else None,
-                    'global_index': note.uuid
-                }
-                if algorithm_name: row['algorithm_name'] = algorithm_name
-                detail_data.append(row)
-        return detail_data
+        return [_format_failed_row(*entry, algorithm_name) for entry in _failed_match_entries(matcher)]
     except Exception as e:
         logger.error(f"Error in get_failed_matches_detail_data: {e}")
         return []
 
+def _get_failed_matches_page(matcher, algorithm_name: Optional[str], page: int, page_size: int,
+                             key_filter=None, sort_by: Optional[List[Dict]] = None) -> Tuple[List[Dict[str, Any]], int]:
+    """无法匹配音符的分页数据（每个音符一行，只格式化当前页）"""
+    entries = _failed_match_entries(matcher)
+    key_id = _key_filter_value(key_filter)
+    if key_id is not None:
+        entries = [entry for entry in entries if entry[3].id == key_id]
+    if sort_by:
+        sort_values = {
+            'index': lambda entry: entry[1],
+            'key_id': lambda entry: entry[3].id,
+            'keyon': lambda entry: entry[3].key_on_ms,
+            'keyoff': lambda entry: entry[3].key_off_ms,
+            'duration': lambda entry: entry[3].duration_ms,
+        }.get(sort_by[0].get('column_id'))
+        if sort_values:
+            entries = sorted(entries, key=sort_values, reverse=sort_by[0].get('direction') == 'desc')
+    start = max(0, page) * page_size
+    page_data = [_format_failed_row(*entry, algorithm_name) for entry in entries[start:start + page_size]]
+    return page_data, len(entries)
+
 def show_single_grade_detail(button_index, session_id, session_manager):
-    """根据点击属性派发具体数据及列定义"""
+    """根据点击属性派发列定义及按键筛选选项（表格数据由分页回调按页获取）"""
     backend = session_manager.get_backend(session_id)
     if not backend: return None
     
@@ -160,17 +315,14 @@ def show_single_grade_detail(button_index, session_id, session_manager):
         else:
             alg_name, grade_key = None, button_index
             
-        # 根据评级类型抓取数据
+        # 根据评级类型确定列定义
         if grade_key == 'failed':
-            matcher = get_note_matcher_from_backend(backend, alg_name)
-            data = get_failed_matches_detail_data(matcher, alg_name)
             cols = [{"name": n, "id": i} for n, i in [
                 ("类型", "row_type"), ("索引", "index"), ("按键ID", "key_id"), 
                 ("按键时间(ms)", "keyon"), ("释放时间(ms)", "keyoff"), 
                 ("按键时长(ms)", "duration"), ("失败原因", "reason")
             ]]
         else:
-            data = get_grade_detail_data(backend, grade_key, alg_name)
             cols = [
                 {"name": "类型", "id": "data_type"},
                 {"name": "按键ID", "id": "keyId"},
@@ -186,7 +338,7 @@ def show_single_grade_detail(button_index, session_id, session_manager):
             ]
             
         if alg_name: cols.insert(0, {"name": "算法名称", "id": "algorithm_name"})
-        return {'display': 'block', 'marginTop': '20px'}, cols, data
+        return {'display': 'block', 'marginTop': '20px'}, cols, get_grade_key_ids(backend, grade_key, alg_name)
     except Exception as e:
         logger.error(f"Detailed view dispatch error: {e}")
         return None
@@ -499,15 +651,13 @@ def register_grade_detail_callbacks(app, session_manager: SessionManager):
          Input({'type': 'delay-metric-btn', 'algorithm': dash.ALL, 'metric': dash.ALL}, 'n_clicks'),
          Input('close-grade-detail-curves-modal', 'n_clicks')],
         [State({'type': 'grade-detail-datatable', 'index': dash.ALL}, 'data'),
-         State({'type': 'grade-detail-datatable', 'index': dash.ALL}, 'page_current'),
-         State({'type': 'grade-detail-datatable', 'index': dash.ALL}, 'page_size'),
          State({'type': 'delay-metric-btn', 'algorithm': dash.ALL, 'metric': dash.ALL}, 'id'),
          State('grade-detail-datatable-indices', 'data'),
          State('session-id', 'data'),
          State('grade-detail-curves-modal', 'style')],
         prevent_initial_call=True
     )
-    def handle_click(cells, metric_clicks, n_clicks, table_data_list, page_current_list, page_size_list, metric_ids, indices, session_id, current_style):
+    def handle_click(cells, metric_clicks, n_clicks, table_data_list, metric_ids, indices, session_id, current_style):
         ctx = dash.callback_context
         if not ctx.triggered:
             return current_style, [], no_update
@@ -604,18 +754,15 @@ def register_grade_detail_callbacks(app, session_manager: SessionManager):
                 if not table_data_list or pos >= len(table_data_list):
                     return _create_modal_style(True), [html.Div("数据未就绪")], no_update
                 
-                # E. 获取当前页数据并计算全局索引
+                # E. 获取当前页数据（服务端分页，表格 data 只包含当前页）
                 data = table_data_list[pos] or []
-                page_current = (page_current_list[pos] if page_current_list and pos < len(page_current_list) else 0) or 0
-                page_size = (page_size_list[pos] if page_size_list and pos < len(page_size_list) else 50) or 50
                 
                 if not data: return _create_modal_style(True), [html.Div("暂无数据")], no_update
 
-                global_row_idx = page_current * page_size + page_row
-                if global_row_idx < 0 or global_row_idx >= len(data):
+                if page_row < 0 or page_row >= len(data):
                     return _create_modal_style(True), [html.Div("行索引越界")], no_update
                 
-                row = data[global_row_idx]
+                row = data[page_row]
                 return _process_note_data(session_manager, session_id, row, target_idx, active_cell)
                 
             except Exception as e:
@@ -666,9 +813,8 @@ def register_grade_detail_callbacks(app, session_manager: SessionManager):
         result = show_single_grade_detail(btn_index, session_id, session_manager)
         if not result:
             return _no_update_all()
-        style, cols, all_data = result
+        style, cols, key_ids = result
         
-        key_ids = sorted(list(set(r.get('keyId') or r.get('key_id') for r in all_data if (r.get('keyId') or r.get('key_id')) is not None)))
         opts = [{'label': '请选择按键...', 'value': ''}, {'label': '全部按键', 'value': 'all'}] + \
                [{'label': f"按键 {k}", 'value': str(k)} for k in key_ids]
         
@@ -695,17 +841,23 @@ def register_all_callbacks(app, session_manager: SessionManager):
     """聚合注册所有评级详情相关的交互"""
     register_grade_detail_callbacks(app, session_manager)
     
-    # 【核心：数据渲染与过滤逻辑】
-    # 使用 MATCH 模式，监听下拉框 value 和 状态 Store，输出到对应的表格 data
+    # 【核心：数据渲染、过滤与分页逻辑】
+    # 使用 MATCH 模式，监听下拉框 value、状态 Store、页码和排序，输出对应表格的当前页 data
+    # 切换评级或按键时回到第一页；筛选、排序和分页都在服务端完成，只格式化当前页
     @app.callback(
-        Output({'type': 'grade-detail-datatable', 'index': dash.MATCH}, 'data'),
+        [Output({'type': 'grade-detail-datatable', 'index': dash.MATCH}, 'data'),
+         Output({'type': 'grade-detail-datatable', 'index': dash.MATCH}, 'page_count'),
+         Output({'type': 'grade-detail-datatable', 'index': dash.MATCH}, 'page_current')],
         [Input({'type': 'grade-detail-key-filter', 'index': dash.MATCH}, 'value'),
-         Input({'type': 'grade-detail-state-store', 'index': dash.MATCH}, 'data')],
-        State('session-id', 'data'),
+         Input({'type': 'grade-detail-state-store', 'index': dash.MATCH}, 'data'),
+         Input({'type': 'grade-detail-datatable', 'index': dash.MATCH}, 'page_current'),
+         Input({'type': 'grade-detail-datatable', 'index': dash.MATCH}, 'sort_by')],
+        [State({'type': 'grade-detail-datatable', 'index': dash.MATCH}, 'page_size'),
+         State('session-id', 'data')],
         prevent_initial_call=True
     )
-    def filter_by_key(key_filter, state, sid):
-        if not state or not state.get('grade_key'): return no_update
+    def filter_by_key(key_filter, state, page_current, sort_by, page_size, sid):
+        if not state or not state.get('grade_key'): return no_update, no_update, no_update
         
         grade_key = state['grade_key']
         # 确定索引 (多算法 vs 单算法)
@@ -714,18 +866,11 @@ def register_all_callbacks(app, session_manager: SessionManager):
         alg = None if target_idx == 'single' else target_idx
         
         backend = session_manager.get_backend(sid)
-        if not backend: return no_update
+        if not backend: return no_update, no_update, no_update
 
-        # 获取完整结果数据
-        if grade_key == 'failed':
-            matcher = get_note_matcher_from_backend(backend, alg)
-            all_data = get_failed_matches_detail_data(matcher, alg)
-            filter_field = 'key_id'
-        else:
-            all_data = get_grade_detail_data(backend, grade_key, alg)
-            filter_field = 'keyId'
-        
-        # 执行过滤
-        if key_filter and key_filter != 'all' and key_filter != '':
-            return [r for r in all_data if str(r.get(filter_field)) == str(key_filter)]
-        return all_data
\ No newline at end of file
+        # 切换评级/按键筛选或改变排序时回到第一页，翻页时使用请求的页码
+        page = (page_current or 0) if trigger_id.endswith('.page_current') else 0
+        page_size = page_size or 50
+
+        page_data, total_count = get_grade_detail_page(backend, grade_key, alg, page, page_size, key_filter, sort_by)
+        return page_data, grade_detail_page_count(total_count, page_size, grade_key), page
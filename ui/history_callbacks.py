@@ -1,7 +1,6 @@
 """
 历史记录浏览器回调函数
 """
-import asyncio
 import time
 import json
 import traceback
@@ -9,6 +8,10 @@ import dash
 import dash_bootstrap_components as dbc
 from dash import html, dcc, Input, Output, State, no_update
 from backend.session_manager import SessionManager
+from backend.job_scheduler import JobScheduler
+from ui.components.job_progress import create_job_progress
+from database.history_manager import HistoryQuery
+from utils.constants import DEFAULT_PAGE_SIZE
 from utils.logger import Logger
 
 logger = Logger.get_logger()
@@ -16,41 +19,99 @@ logger = Logger.get_logger()
 
 # ==================== 内部处理器 (Handlers) ====================
 
-def _handle_update_history_table(n_clicks, search_term, active_tab, trigger_data, session_id, session_manager: SessionManager):
-    """刷新并显示历史记录表格的业务逻辑"""
-    logger.debug(f"🔄 [History] update_history_table 触发: active_tab={active_tab}, session_id={session_id}")
+# 只保留当前页的触发源（其他输入变化时回到第一页）
+_HISTORY_KEEP_PAGE_TRIGGERS = ('refresh-history-btn', 'algorithm-list-trigger')
+
+
+def _next_page_state(triggered_id, page_state):
+    """根据触发源计算新的分页状态 {'cursors': [...], 'page': int, 'next_cursor': Optional[Any]}"""
+    page_state = page_state or {}
+    cursors = page_state.get('cursors') or [None]
+    page = min(page_state.get('page', 0), len(cursors) - 1)
+
+    if triggered_id == 'history-next-page-btn' and page_state.get('next_cursor') is not None:
+        cursors = cursors[:page + 1] + [page_state['next_cursor']]
+        page += 1
+    elif triggered_id == 'history-prev-page-btn' and page > 0:
+        page -= 1
+        cursors = cursors[:page + 1]
+    elif triggered_id not in _HISTORY_KEEP_PAGE_TRIGGERS:
+        cursors, page = [None], 0
+    return {'cursors': cursors, 'page': page}
+
+
+def _parse_sort_value(sort_value):
+    """解析排序选项 "指标:asc|desc"，返回 (sort_by, sort_desc)"""
+    if not sort_value:
+        return None, False
+    column, _, direction = sort_value.partition(':')
+    return column, direction == 'desc'
+
+
+def _format_summary_cell(record):
+    """格式化记录的摘要指标（MAE / 匹配率 / 丢锤），尚无摘要时显示占位符"""
+    if record.get('mae_ms') is None:
+        return html.Span("待计算", className='text-muted')
+    return f"{record['mae_ms']:.2f}ms / {record['match_rate']:.1f}% / {record['drop_hammers']}"
+
+
+def _handle_update_history_table(triggered_id, search_term, motor_type, algorithm, piano_type,
+                                 date_from, date_to, sort_value, active_tab, page_state, session_id,
+                                 session_manager: SessionManager):
+    """
+    刷新并显示历史记录表格的业务逻辑（服务端过滤 + 键集分页，只获取当前页）
+
+    Returns:
+        Tuple: (表格, 分页状态, 分页信息, 上一页禁用, 下一页禁用)
+    """
+    logger.debug(f"🔄 [History] update_history_table 触发: trigger={triggered_id}, active_tab={active_tab}, session_id={session_id}")
     
     # 兼容 tab-history 和可能的索引 tab-1
     if active_tab not in ['tab-history', 'tab-1']:
-        return no_update
-        
-    logger.debug(f"🔄 [History] update_history_table 正在执行... n_clicks={n_clicks}, search={search_term}")
+        return no_update, no_update, no_update, no_update, no_update
         
     backend = session_manager.get_backend(session_id)
     if not backend:
         logger.warning(f"⚠️ [History] Backend 尚未就绪 (session={session_id})")
-        return html.Div("正在连接数据库...", className='text-muted small text-center p-3')
+        return html.Div("正在连接数据库...", className='text-muted small text-center p-3'), no_update, "", True, True
         
     if not backend.history_manager:
         logger.warning(f"⚠️ [History] HistoryManager 尚未就绪")
-        return html.Div("数据库管理器未就绪", className='text-danger text-center p-3')
+        return html.Div("数据库管理器未就绪", className='text-danger text-center p-3'), no_update, "", True, True
 
     try:
-        # 获取所有记录
-        records = backend.history_manager.get_all_records(limit=100)
-        
-        # 搜索过滤
-        if search_term:
-            search_term = search_term.lower()
-            records = [r for r in records if search_term in r['filename'].lower()]
+        state = _next_page_state(triggered_id, page_state)
+        sort_by, sort_desc = _parse_sort_value(sort_value)
+        query = HistoryQuery(
+            search=search_term,
+            motor_type=motor_type or None,
+            algorithm=algorithm or None,
+            piano_type=piano_type or None,
+            created_from=date_from,
+            created_to=date_to,
+            sort_by=sort_by,
+            sort_desc=sort_desc,
+        )
+        result = backend.history_manager.query_records(
+            query, page_size=DEFAULT_PAGE_SIZE, cursor=state['cursors'][state['page']]
+        )
+        state['next_cursor'] = result.next_cursor
 
+        page_count = max(1, -(-result.total // DEFAULT_PAGE_SIZE))
+        page_info = f"第 {state['page'] + 1}/{page_count} 页，共 {result.total} 条"
+        prev_disabled = state['page'] == 0
+        next_disabled = result.next_cursor is None
+
+        records = result.records
         if not records:
-            return html.Div("暂无符合条件的历史记录", className='text-muted text-center p-3')
+            return (html.Div("暂无符合条件的历史记录", className='text-muted text-center p-3'),
+                    state, page_info, prev_disabled, next_disabled)
 
         # 转换为表格数据
         table_header = html.Thead(html.Tr([
             html.Th("文件名", style={'fontSize': '12px'}),
             html.Th("配置 (电机/算法/琴)", style={'fontSize': '12px'}),
+            html.Th("MAE / 匹配率 / 丢锤", style={'fontSize': '12px'}),
             html.Th("文件日期", style={'fontSize': '12px'}),
             html.Th("上传日期", style={'fontSize': '12px'}),
             html.Th("操作", style={'fontSize': '12px', 'textAlign': 'center'})
@@ -62,8 +123,9 @@ def _handle_update_history_table(n_clicks, search_term, active_tab, trigger_data
             rows.append(html.Tr([
                 html.Td(r['filename'], style={'fontSize': '11px', 'maxWidth': '150px', 'overflow': 'hidden', 'textOverflow': 'ellipsis'}),
                 html.Td(config_str, style={'fontSize': '11px'}),
-                html.Td(r['file_date'], style={'fontSize': '11px'}),
-                html.Td(r['created_at'], style={'fontSize': '11px'}),
+                html.Td(_format_summary_cell(r), style={'fontSize': '11px'}),
+                html.Td(str(r['file_date']), style={'fontSize': '11px'}),
+                html.Td(str(r['created_at']), style={'fontSize': '11px'}),
                 html.Td(
                     html.Button(
                         "加载",
@@ -75,7 +137,7 @@ def _handle_update_history_table(n_clicks, search_term, active_tab, trigger_data
                 )
             ]))
 
-        return dbc.Table(
+        table = dbc.Table(
             [table_header, html.Tbody(rows)],
             bordered=True,
             hover=True,
@@ -83,13 +145,14 @@ def _handle_update_history_table(n_clicks, search_term, active_tab, trigger_data
             striped=True,
             size='sm'
         )
+        return table, state, page_info, prev_disabled, next_disabled
     except Exception as e:
         logger.error(f"渲染历史表格失败: {e}")
-        return html.Div(f"加载失败: {str(e)}", className='text-danger small')
+        return html.Div(f"加载失败: {str(e)}", className='text-danger small'), no_update, "", True, True
 
 
-def _handle_load_from_history(n_clicks_list, session_id, session_manager: SessionManager):
-    """处理从历史记录加载算法的业务逻辑"""
+def _handle_load_from_history(n_clicks_list, session_id, job_ids, session_manager: SessionManager, job_scheduler: JobScheduler):
+    """处理从历史记录加载算法的业务逻辑（提交后台任务，立即返回）"""
     ctx = dash.callback_context
     # 1. 基础状态检查
     if not ctx.triggered or not any(v for v in n_clicks_list if v):
@@ -107,51 +170,103 @@ def _handle_load_from_history(n_clicks_list, session_id, session_manager: Sessio
         if not backend:
             return no_update, no_update
 
-        # 处理异步加载
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        success, result = loop.run_until_complete(backend.load_algorithm_from_history(record_id))
-        loop.close()
-        
-        # 根据结果输出日志并返回
-        if success:
-            logger.info(f"✅ 从历史记录 ID={record_id} 成功加载算法")
-            # 触发 algorithm-list-trigger 更新，让 UI 列表刷新
-            return time.time(), no_update
-        
-        logger.error(f"❌ 加载历史记录失败: {result}")
-        return no_update, no_update
+        # 提交后台任务，由 history-job-poll 轮询进度
+        job = job_scheduler.submit(
+            session_id,
+            f"历史记录 #{record_id}",
+            backend.load_algorithm_from_history,
+            record_id
+        )
+        logger.info(f"📥 已提交历史记录加载任务: ID={record_id}")
+        return (job_ids or []) + [job.job_id], False
 
     except Exception as e:
-        # 捕获包括 ID 解析、后端调用在内的所有未预料到的异常
+        # 捕获包括 ID 解析、任务提交在内的所有未预料到的异常
         logger.error(f"加载历史记录时发生意外错误: {e}")
         logger.error(traceback.format_exc())
         return no_update, no_update
 
 
+def _handle_poll_history_jobs(n_intervals, job_ids, job_scheduler: JobScheduler):
+    """轮询历史记录加载任务：渲染进度，任务成功后触发算法列表刷新"""
+    if not job_ids:
+        return [], no_update, [], True
+
+    progress_items = []
+    remaining_ids = []
+    any_succeeded = False
+    for job_id in job_ids:
+        job = job_scheduler.get_job(job_id)
+        if not job:
+            continue
+        job_info = job.to_dict()
+        progress_items.append(create_job_progress(job_info, show_description=True))
+        if not job.is_finished:
+            remaining_ids.append(job_id)
+        elif job_info['status'] == 'succeeded':
+            logger.info(f"✅ {job.description} 加载成功")
+            any_succeeded = True
+        else:
+            logger.error(f"❌ {job.description} 加载失败: {job_info['error_message']}")
+
+    # 已结束的任务在本次渲染后移出队列；队列为空时停止轮询
+    list_trigger = time.time() if any_succeeded else no_update
+    return progress_items, list_trigger, remaining_ids, not remaining_ids
+
+
 # ==================== 回调注册 (Registration) ====================
 
-def register_history_callbacks(app, session_manager: SessionManager):
+def register_history_callbacks(app, session_manager: SessionManager, job_scheduler: JobScheduler):
     """注册历史记录相关的回调"""
 
     @app.callback(
-        Output('history-table-container', 'children'),
+        [Output('history-table-container', 'children'),
+         Output('history-page-state', 'data'),
+         Output('history-page-info', 'children'),
+         Output('history-prev-page-btn', 'disabled'),
+         Output('history-next-page-btn', 'disabled')],
         [Input('refresh-history-btn', 'n_clicks'),
          Input('history-search-input', 'value'),
+         Input('history-filter-motor', 'value'),
+         Input('history-filter-algorithm', 'value'),
+         Input('history-filter-piano', 'value'),
+         Input('history-filter-date', 'start_date'),
+         Input('history-filter-date', 'end_date'),
+         Input('history-sort', 'value'),
+         Input('history-prev-page-btn', 'n_clicks'),
+         Input('history-next-page-btn', 'n_clicks'),
          Input('file-management-tabs', 'active_tab'),
          Input('algorithm-list-trigger', 'data')],
-        [State('session-id', 'data')],
+        [State('history-page-state', 'data'),
+         State('session-id', 'data')],
         prevent_initial_call=False
     )
-    def update_history_table(n_clicks, search_term, active_tab, trigger_data, session_id):
-        return _handle_update_history_table(n_clicks, search_term, active_tab, trigger_data, session_id, session_manager)
+    def update_history_table(n_clicks, search_term, motor_type, algorithm, piano_type, date_from, date_to,
+                             sort_value, prev_clicks, next_clicks, active_tab, trigger_data, page_state, session_id):
+        triggered_id = dash.callback_context.triggered_id
+        return _handle_update_history_table(triggered_id, search_term, motor_type, algorithm, piano_type,
+                                            date_from, date_to, sort_value, active_tab, page_state, session_id,
+                                            session_manager)
 
     @app.callback(
-        [Output('algorithm-list-trigger', 'data', allow_duplicate=True),
-         Output('history-browser-container', 'style')], # 借用 style 做辅助反馈
+        [Output('history-load-jobs', 'data'),
+         Output('history-job-poll', 'disabled')],
         [Input({'type': 'load-history-btn', 'index': dash.ALL}, 'n_clicks')],
-        [State('session-id', 'data')],
+        [State('session-id', 'data'),
+         State('history-load-jobs', 'data')],
+        prevent_initial_call=True
+    )
+    def load_from_history(n_clicks_list, session_id, job_ids):
+        return _handle_load_from_history(n_clicks_list, session_id, job_ids, session_manager, job_scheduler)
+
+    @app.callback(
+        [Output('history-job-status', 'children'),
+         Output('algorithm-list-trigger', 'data', allow_duplicate=True),
+         Output('history-load-jobs', 'data', allow_duplicate=True),
+         Output('history-job-poll', 'disabled', allow_duplicate=True)],
+        [Input('history-job-poll', 'n_intervals')],
+        [State('history-load-jobs', 'data')],
         prevent_initial_call=True
     )
-    def load_from_history(n_clicks_list, session_id):
-        return _handle_load_from_history(n_clicks_list, session_id, session_manager)
+    def poll_history_jobs(n_intervals, job_ids):
+        return _handle_poll_history_jobs(n_intervals, job_ids, job_scheduler)
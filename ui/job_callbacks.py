@@ -0,0 +1,30 @@
+"""
+后台任务回调模块
+处理任务进度组件中的取消按钮（上传与历史记录加载共用）
+"""
+import dash
+from dash import Input, Output
+
+from backend.job_scheduler import JobScheduler
+from ui.components.job_progress import CANCEL_JOB_BUTTON_TYPE
+from utils.logger import Logger
+
+logger = Logger.get_logger()
+
+
+def register_job_callbacks(app, job_scheduler: JobScheduler):
+    """注册后台任务相关的回调"""
+
+    @app.callback(
+        Output({'type': CANCEL_JOB_BUTTON_TYPE, 'index': dash.MATCH}, 'disabled'),
+        Input({'type': CANCEL_JOB_BUTTON_TYPE, 'index': dash.MATCH}, 'n_clicks'),
+        prevent_initial_call=True
+    )
+    def cancel_job(n_clicks):
+        """请求取消任务；状态变化由各自的进度轮询回调渲染"""
+        if not n_clicks:
+            return dash.no_update
+        job_id = dash.callback_context.triggered_id['index']
+        if not job_scheduler.cancel(job_id):
+            logger.warning(f"⚠️ 任务已结束或不存在，无法取消: {job_id}")
+        return True
@@ -5,7 +5,6 @@ UI布局模块 - 定义Dash应用的界面布局
 import traceback
 import dash_bootstrap_components as dbc
 from dash import dcc, html, dash_table
-import plotly.graph_objects as go
 
 from utils.logger import Logger
 from utils.constants import GRADE_DISPLAY_CONFIG, GRADE_LEVELS
@@ -13,35 +12,10 @@ from utils.constants import GRADE_DISPLAY_CONFIG, GRADE_LEVELS
 logger = Logger.get_logger()
 
 
-# 创建空白图形
-empty_figure = go.Figure()
-empty_figure.add_annotation(
-    text="请上传数据文件并点击加载数据按钮",
-    xref="paper", yref="paper",
-    x=0.5, y=0.5, showarrow=False,
-    font=dict(size=20, color='gray')
-)
-
 # 兼容性别名 - 使用统一的全局配置
 GRADE_CONFIGS = GRADE_DISPLAY_CONFIG
 
 
-empty_figure.update_layout(
-    title='钢琴数据分析工具 - 等待数据加载',
-    xaxis_title='Time (ms)',
-    yaxis_title='Key ID (1-88: keys, 89-90: pedals)',
-    height=None,
-    width=None,
-    template='simple_white',
-    autosize=True,
-    margin=dict(l=60, r=60, t=100, b=60),
-    showlegend=False,
-    paper_bgcolor='rgba(0,0,0,0)',
-    plot_bgcolor='rgba(0,0,0,0)',
-    font=dict(size=12)
-)
-
-
 def create_multi_algorithm_upload_area():
     """创建多算法上传区域 (现代精致卡片风格 - 回归原生结构)"""
     
@@ -125,25 +99,151 @@ def create_multi_algorithm_upload_area():
                     ])
                 ]
             ),
+
+            # --- 标签页 3: 趋势分析 ---
+            dbc.Tab(
+                label="📈 趋势分析",
+                tab_id="tab-trends",
+                label_style=tab_style,
+                active_label_style=active_tab_style,
+                children=[
+                    dbc.CardBody([
+                        html.Div(id='trend-analysis-container', children=create_trend_analysis_area())
+                    ])
+                ]
+            ),
         ], id="file-management-tabs", active_tab="tab-upload", className="px-3 pt-2 bg-light border-bottom")
     ], className="shadow-sm mb-4 border-light", style={'borderRadius': '12px', 'overflow': 'hidden'})
 
 
 def create_history_browser_area():
     """创建并刷新历史记录浏览器"""
+    filter_style = {'fontSize': '11px'}
     return html.Div([
         dbc.Row([
             dbc.Col([
-                dbc.Input(id='history-search-input', placeholder='搜索文件名...', size='sm', className='mb-2')
-            ], width=8),
+                # debounce: 输入完成（回车/失焦）后才查询，避免每次按键都重建表格
+                dbc.Input(id='history-search-input', placeholder='搜索文件名...', size='sm', className='mb-2', debounce=True)
+            ], width=5),
+            dbc.Col([
+                # 按预计算的摘要指标排序（值为 "指标:asc|desc"，空表示按上传顺序）
+                dbc.Select(
+                    id='history-sort',
+                    options=[{"label": "排序: 最新上传", "value": ""},
+                             {"label": "MAE 最低", "value": "mae_ms:asc"},
+                             {"label": "匹配率最高", "value": "match_rate:desc"},
+                             {"label": "丢锤最少", "value": "drop_hammers:asc"},
+                             {"label": "标准差最小", "value": "std_ms:asc"},
+                             {"label": "时长最长", "value": "duration_ms:desc"}],
+                    value="", size='sm', style=filter_style
+                )
+            ], width=4),
             dbc.Col([
                 dbc.Button("刷新", id='refresh-history-btn', color='info', size='sm', className='w-100')
-            ], width=4)
+            ], width=3)
         ]),
+        # 服务端过滤条件
+        dbc.Row([
+            dbc.Col(dbc.Select(
+                id='history-filter-motor',
+                options=[{"label": "电机: 全部", "value": ""},
+                         {"label": "电机: D3", "value": "D3"},
+                         {"label": "电机: D4", "value": "D4"}],
+                value="", size='sm', style=filter_style
+            ), width=3),
+            dbc.Col(dbc.Select(
+                id='history-filter-algorithm',
+                options=[{"label": "算法: 全部", "value": ""},
+                         {"label": "算法: PID", "value": "PID"},
+                         {"label": "算法: SMC", "value": "SMC"}],
+                value="", size='sm', style=filter_style
+            ), width=3),
+            dbc.Col(dbc.Select(
+                id='history-filter-piano',
+                options=[{"label": "琴: 全部", "value": ""},
+                         {"label": "三角琴", "value": "Grand"},
+                         {"label": "立式琴", "value": "Upright"}],
+                value="", size='sm', style=filter_style
+            ), width=3),
+            dbc.Col(dcc.DatePickerRange(
+                id='history-filter-date',
+                display_format='YYYY-MM-DD',
+                start_date_placeholder_text='上传起',
+                end_date_placeholder_text='上传止',
+                clearable=True,
+                style={'fontSize': '11px'}
+            ), width=3),
+        ], className='mb-2 g-1'),
+        # 历史记录加载任务进度（后台任务 + 轮询）
+        html.Div(id='history-job-status'),
+        dcc.Store(id='history-load-jobs', data=[]),
+        dcc.Interval(id='history-job-poll', interval=500, disabled=True),
         html.Div(id='history-table-container', children=[
             # 这里将来由回调填充 DataTable
             html.Div("正在连接数据库...", className='text-muted small text-center p-3')
-        ], style={'maxHeight': '400px', 'overflowY': 'auto'})
+        ], style={'maxHeight': '400px', 'overflowY': 'auto'}),
+        # 键集分页：cursors[i] 为第 i 页的起始游标（第一页为 None）
+        dcc.Store(id='history-page-state', data={'cursors': [None], 'page': 0}),
+        dbc.Row([
+            dbc.Col(dbc.Button("上一页", id='history-prev-page-btn', color='secondary', outline=True,
+                               size='sm', disabled=True, className='w-100'), width=3),
+            dbc.Col(html.Div(id='history-page-info', className='text-muted text-center',
+                             style={'fontSize': '11px', 'paddingTop': '4px'}), width=6),
+            dbc.Col(dbc.Button("下一页", id='history-next-page-btn', color='secondary', outline=True,
+                               size='sm', disabled=True, className='w-100'), width=3),
+        ], className='mt-2 g-1')
+    ])
+
+
+def create_trend_analysis_area():
+    """创建跨记录趋势分析区域（记录级指标分组聚合 + 按键延时漂移）"""
+    filter_style = {'fontSize': '11px'}
+    return html.Div([
+        # 记录级指标：按元数据分组聚合预计算的摘要
+        html.Div("记录指标分组统计", className='fw-bold small mb-1'),
+        dbc.Row([
+            dbc.Col(dbc.Select(
+                id='trend-metric',
+                options=[{"label": "MAE", "value": "mae_ms"},
+                         {"label": "匹配率", "value": "match_rate"},
+                         {"label": "丢锤数", "value": "drop_hammers"},
+                         {"label": "标准差", "value": "std_ms"},
+                         {"label": "平均误差", "value": "mean_error_ms"}],
+                value="mae_ms", size='sm', style=filter_style
+            ), width=3),
+            dbc.Col(dcc.Dropdown(
+                id='trend-group-by',
+                options=[{"label": "电机", "value": "motor_type"},
+                         {"label": "算法", "value": "algorithm"},
+                         {"label": "琴型", "value": "piano_type"},
+                         {"label": "时间", "value": "period"}],
+                value=['motor_type', 'algorithm'], multi=True, clearable=False,
+                placeholder="分组", style=filter_style
+            ), width=5),
+            dbc.Col(dbc.Input(id='trend-last-n', type='number', min=1, value=500, size='sm',
+                              placeholder='最近N条', style=filter_style), width=2),
+            dbc.Col(dbc.Button("统计", id='trend-metric-btn', color='info', size='sm', className='w-100'), width=2),
+        ], className='mb-2 g-1'),
+        dcc.Loading(html.Div(id='trend-metric-table-container'), type='dot'),
+        html.Hr(className='my-2'),
+        # 按键级趋势：扫描历史 Parquet 的按键延时漂移
+        html.Div("按键延时漂移", className='fw-bold small mb-1'),
+        dbc.Row([
+            dbc.Col(dbc.Select(
+                id='trend-period',
+                options=[{"label": "按日", "value": "day"},
+                         {"label": "按周", "value": "week"},
+                         {"label": "按月", "value": "month"}],
+                value="month", size='sm', style=filter_style
+            ), width=3),
+            dbc.Col(dcc.Dropdown(
+                id='trend-drift-keys',
+                options=[{"label": f"Key {key_id}", "value": key_id} for key_id in range(1, 89)],
+                multi=True, placeholder="按键（默认全部）", style=filter_style
+            ), width=7),
+            dbc.Col(dbc.Button("分析", id='trend-drift-btn', color='info', size='sm', className='w-100'), width=2),
+        ], className='mb-2 g-1'),
+        dcc.Loading(html.Div(id='trend-drift-container'), type='dot'),
     ])
 
 
@@ -208,7 +208,11 @@ class MultiFileUploadHandler:
                         id={'type': 'algorithm-status', 'index': file_id},
                         style={'fontSize': '11px', 'marginTop': '5px', 'color': '#6c757d'}
                     ),
-                    dcc.Store(id={'type': 'algorithm-upload-success', 'index': file_id})
+                    dcc.Store(id={'type': 'algorithm-upload-success', 'index': file_id}),
+                    # 后台任务ID与进度轮询（提交任务后启用）
+                    dcc.Store(id={'type': 'algorithm-job-id', 'index': file_id}),
+                    dcc.Interval(id={'type': 'algorithm-job-poll', 'index': file_id},
+                                 interval=500, disabled=True)
                 ])
             ])
         ], className='mb-2', style={'border': '1px solid #dee2e6', 'borderRadius': '5px', 'backgroundColor': bg_color})
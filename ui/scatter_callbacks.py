@@ -188,6 +188,58 @@ def register_scatter_callbacks(app, session_mgr: SessionManager):
         return velocity_comparison_handler.handle_generate_hammer_velocity_comparison_plot(report_content, session_id)
     
     
+    # ==================== 延时时间序列图缩放回调 ====================
+
+    @app.callback(
+        [Output({'type': 'scatter-plot', 'id': 'raw-delay-time-series-plot'}, 'figure'),
+         Output({'type': 'scatter-plot', 'id': 'relative-delay-time-series-plot'}, 'figure')],
+        [Input({'type': 'scatter-plot', 'id': 'raw-delay-time-series-plot'}, 'relayoutData'),
+         Input({'type': 'scatter-plot', 'id': 'relative-delay-time-series-plot'}, 'relayoutData')],
+        [State('session-id', 'data')],
+        prevent_initial_call=True
+    )
+    def refine_delay_time_series_window(raw_relayout, relative_relayout, session_id):
+        """
+        缩放/平移延时时间序列图后，只按可见时间窗口重新生成两张图（两图横轴同步）
+
+        横轴为播放时间，时间窗口按录制时间切片，两端各扩展最大延时阈值以覆盖边缘的点；
+        双击重置时恢复全部数据。
+        """
+        from backend.waterfall_lod import parse_relayout_range
+        from utils.constants import DEFAULT_MAX_DELAY_THRESHOLD_MS
+
+        triggered_id = callback_context.triggered_id
+        if not session_id or not isinstance(triggered_id, dict):
+            return no_update, no_update
+        relayout_data = raw_relayout if triggered_id['id'] == 'raw-delay-time-series-plot' else relative_relayout
+        x_changed, x_range = parse_relayout_range(relayout_data, 'xaxis')
+        if not x_changed:
+            return no_update, no_update
+
+        backend = session_mgr.get_backend(session_id)
+        if not backend:
+            return no_update, no_update
+
+        time_range = None
+        if x_range:
+            time_range = (x_range[0] - DEFAULT_MAX_DELAY_THRESHOLD_MS, x_range[1] + DEFAULT_MAX_DELAY_THRESHOLD_MS)
+        try:
+            result = backend.generate_delay_time_series_plot(time_range=time_range)
+            if not isinstance(result, dict) or 'raw_delay_plot' not in result or 'relative_delay_plot' not in result:
+                return no_update, no_update
+            figures = []
+            for figure in (result['raw_delay_plot'], result['relative_delay_plot']):
+                # 复制后再设置可见范围，避免修改缓存中的图表
+                figure = go.Figure(figure)
+                if x_range:
+                    figure.update_xaxes(range=list(x_range))
+                figures.append(figure)
+            return figures[0], figures[1]
+        except Exception as e:
+            logger.error(f"[ERROR] 延时时间序列图窗口更新失败: {e}")
+            logger.error(traceback.format_exc())
+            return no_update, no_update
+
     # 注册按键-力度交互效应图回调
     register_key_force_interaction_callbacks(app, session_mgr)
     
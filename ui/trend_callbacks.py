@@ -0,0 +1,131 @@
+"""
+趋势分析回调函数
+在历史归档上执行跨记录分组统计（记录级摘要指标、按键延时漂移），结果由 TrendAnalytics 缓存
+"""
+import traceback
+import numpy as np
+import plotly.graph_objects as go
+from dash import html, dcc, dash_table, Input, Output, State
+
+from backend.trend_analytics import get_trend_analytics
+from utils.logger import Logger
+
+logger = Logger.get_logger()
+
+# 分组列显示名称
+_GROUP_COLUMN_NAMES = {
+    'motor_type': '电机',
+    'algorithm': '算法',
+    'piano_type': '琴型',
+    'period': '时间',
+}
+
+# 时间粒度显示名称
+_PERIOD_NAMES = {'day': '按日', 'week': '按周', 'month': '按月'}
+
+
+# ==================== 内部处理器 (Handlers) ====================
+
+def _handle_metric_by_group(history_manager, metric, group_by, last_n):
+    """按记录元数据分组统计摘要指标，渲染为表格"""
+    if not group_by:
+        return html.Div("请至少选择一个分组列", className='text-muted small')
+    try:
+        rows = get_trend_analytics(history_manager).metric_by_group(
+            metric=metric, group_by=group_by, last_n=int(last_n) if last_n else None
+        )
+    except Exception as e:
+        logger.error(f"趋势统计失败: {e}")
+        logger.error(traceback.format_exc())
+        return html.Div(f"统计失败: {str(e)}", className='text-danger small')
+    if not rows:
+        return html.Div("没有已计算摘要的历史记录", className='text-muted small')
+
+    columns = [{'name': _GROUP_COLUMN_NAMES.get(column, column), 'id': column} for column in group_by]
+    columns.append({'name': '记录数', 'id': 'record_count'})
+    columns.extend({'name': name, 'id': column, 'type': 'numeric', 'format': {'specifier': '.2f'}}
+                   for column, name in (('mean', '均值'), ('min', '最小'), ('max', '最大'), ('std', '标准差')))
+    return dash_table.DataTable(
+        data=rows,
+        columns=columns,
+        sort_action='native',
+        page_size=15,
+        style_table={'overflowX': 'auto'},
+        style_cell={'fontSize': '11px', 'padding': '4px', 'textAlign': 'center'},
+        style_header={'fontWeight': 'bold', 'backgroundColor': '#f8f9fa'},
+    )
+
+
+def _create_key_drift_figure(rows, period):
+    """按键延时漂移热力图：横轴为时间桶，纵轴为按键，颜色为平均延时"""
+    periods = sorted({row['period'] for row in rows})
+    key_ids = sorted({row['key_id'] for row in rows})
+    period_index = {label: i for i, label in enumerate(periods)}
+    key_index = {key_id: i for i, key_id in enumerate(key_ids)}
+
+    mean_delay = np.full((len(key_ids), len(periods)), np.nan)
+    pair_count = np.zeros((len(key_ids), len(periods)), dtype=np.int64)
+    for row in rows:
+        i, j = key_index[row['key_id']], period_index[row['period']]
+        mean_delay[i, j] = row['mean_delay_ms']
+        pair_count[i, j] = row['pair_count']
+
+    fig = go.Figure(go.Heatmap(
+        x=periods,
+        y=key_ids,
+        z=mean_delay,
+        customdata=pair_count,
+        colorscale='RdBu_r',
+        zmid=0,
+        colorbar={'title': '平均延时 (ms)'},
+        hovertemplate="时间: %{x}<br>按键: %{y}<br>平均延时: %{z:.2f} ms<br>配对数: %{customdata}<extra></extra>",
+    ))
+    fig.update_layout(
+        title=f"按键延时漂移（{_PERIOD_NAMES.get(period, period)}）",
+        xaxis={'title': '时间', 'type': 'category'},
+        yaxis={'title': '按键ID', 'dtick': 4},
+        template='simple_white',
+        height=max(400, 12 * len(key_ids) + 120),
+        margin={'l': 60, 'r': 20, 't': 50, 'b': 60},
+    )
+    return fig
+
+
+def _handle_key_delay_drift(history_manager, period, key_ids):
+    """扫描历史 Parquet 统计每个按键的延时漂移，渲染为热力图"""
+    try:
+        rows = get_trend_analytics(history_manager).key_delay_drift(period=period, key_ids=key_ids or None)
+    except Exception as e:
+        logger.error(f"按键延时漂移分析失败: {e}")
+        logger.error(traceback.format_exc())
+        return html.Div(f"分析失败: {str(e)}", className='text-danger small')
+    if not rows:
+        return html.Div("历史记录中没有可配对的按键数据", className='text-muted small')
+    return dcc.Graph(figure=_create_key_drift_figure(rows, period), config={'displaylogo': False})
+
+
+# ==================== 回调注册 (Registration) ====================
+
+def register_trend_callbacks(app, history_manager):
+    """注册趋势分析相关的回调"""
+
+    @app.callback(
+        Output('trend-metric-table-container', 'children'),
+        Input('trend-metric-btn', 'n_clicks'),
+        [State('trend-metric', 'value'),
+         State('trend-group-by', 'value'),
+         State('trend-last-n', 'value')],
+        prevent_initial_call=True
+    )
+    def update_metric_by_group(n_clicks, metric, group_by, last_n):
+        return _handle_metric_by_group(history_manager, metric, group_by, last_n)
+
+    @app.callback(
+        Output('trend-drift-container', 'children'),
+        Input('trend-drift-btn', 'n_clicks'),
+        [State('trend-period', 'value'),
+         State('trend-drift-keys', 'value')],
+        prevent_initial_call=True
+    )
+    def update_key_delay_drift(n_clicks, period, key_ids):
+        return _handle_key_delay_drift(history_manager, period, key_ids)
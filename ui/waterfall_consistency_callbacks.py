@@ -91,13 +91,11 @@ def _handle_update_slider_range(key_id, session_id, active_algorithm_name, sessi
         return 0, [0, 0], None, ""
         
     # 取第一个算法作为基准进行范围切片
-    base_analyzer = active_algorithms[0].analyzer
-    if not base_analyzer:
+    # 注意：瀑布图界面以播放音轨 (Replay) 为准；该按键的播放音符按 offset 排序，随按键波形一起缓存
+    base_waveforms = active_algorithms[0].get_key_waveforms('replay', key_id)
+    if base_waveforms is None:
         return 0, [0, 0], None, ""
-        
-    # 注意：瀑布图界面以播放音轨 (Replay) 为准
-    replay_data = base_analyzer.get_initial_valid_replay_data() or []
-    key_replay_notes = sorted([n for n in replay_data if n.id == key_id], key=lambda x: x.offset)
+    key_replay_notes = base_waveforms.notes
     count = len(key_replay_notes)
     
     if count == 0:
@@ -143,12 +141,9 @@ def _handle_update_consistency_graph(slider_value, key_id, session_id, active_al
     if not active_algorithms:
         return no_update, no_update
         
-    # 1. 提取基准 Replay 数据用于范围切片
-    base_analyzer = active_algorithms[0].analyzer
-    full_replay_data = base_analyzer.get_initial_valid_replay_data() or []
-    full_key_replay_notes = sorted([n for n in full_replay_data if n.id == key_id], key=lambda x: x.offset)
-    
-    total_count = len(full_key_replay_notes)
+    # 1. 提取基准 Replay 数据用于范围切片（按键波形按算法缓存，这里只按索引/时间切片）
+    base_waveforms = active_algorithms[0].get_key_waveforms('replay', key_id)
+    total_count = len(base_waveforms) if base_waveforms is not None else 0
     if total_count == 0:
         return no_update, "无播放数据"
         
@@ -159,7 +154,7 @@ def _handle_update_consistency_graph(slider_value, key_id, session_id, active_al
         start_idx = max(0, slider_value[0])
         end_idx = min(total_count - 1, slider_value[1])
     
-    sliced_base_notes = full_key_replay_notes[start_idx : end_idx + 1]
+    sliced_base_notes = base_waveforms.notes[start_idx : end_idx + 1]
     
     # 2. 提取所有算法的 Replay 数据并统计
     data_sources = []
@@ -172,24 +167,20 @@ def _handle_update_consistency_graph(slider_value, key_id, session_id, active_al
     for alg in active_algorithms:
         alg_name = alg.metadata.algorithm_name
         display_name = alg.metadata.display_name or alg_name
-        analyzer = alg.analyzer
-        
-        alg_replay_data = analyzer.get_initial_valid_replay_data() or []
-        alg_key_replay = sorted([n for n in alg_replay_data if n.id == key_id], key=lambda x: x.offset)
+        waveforms = alg.get_key_waveforms('replay', key_id)
+        if waveforms is None:
+            continue
         
         # 统计该按键的总播放数
-        total_alg_key_count = len(alg_key_replay)
+        total_alg_key_count = len(waveforms)
         
-        # 按时间范围切片 Replay
-        sliced_replay_notes = [
-             n for n in alg_key_replay 
-             if n.key_on_ms is not None and (min_ts - 500 <= n.key_on_ms <= max_ts + 500)
-        ]
+        # 按按下时间切片 Replay
+        rows = waveforms.rows_in_key_on_range(min_ts - 500, max_ts + 500)
         
         data_sources.append({
             'name': display_name,
-            'record_notes': [], # 不显示录制音轨
-            'replay_notes': sliced_replay_notes
+            'record': None, # 不显示录制音轨
+            'replay': (waveforms, rows)
         })
         
         stats_list.append(f"{alg_name}: {total_alg_key_count}")
@@ -57,3 +57,18 @@ EXCEPTION_COLORS = {
     'multi_hammer': '#FF4500',   # 橙红 - 多锤
     'silent': '#708090',         # 暗灰 - 不发声
 }
+
+# ==================== 锤速颜色方案 ====================
+
+# 锤速颜色渐变锚点（YlOrRd，ColorBrewer 9级，从浅黄到深红），与 Plotly / matplotlib 的 YlOrRd 一致
+VELOCITY_COLORSCALE_ANCHORS = [
+    (255, 255, 204),
+    (255, 237, 160),
+    (254, 217, 118),
+    (254, 178, 76),
+    (253, 141, 60),
+    (252, 78, 42),
+    (227, 26, 28),
+    (189, 0, 38),
+    (128, 0, 38),
+]
@@ -95,6 +95,46 @@ DEFAULT_PAGE_SIZE = 50   # 默认分页大小
 ALLOWED_FILE_EXTENSIONS = ['.spmid']  # 允许上传的文件扩展名
 MAX_FILE_SIZE_MB = 100  # 最大文件大小（MB）
 
+# 内存管理相关常量（可通过环境变量覆盖，见 application_manager）
+DEFAULT_MEMORY_BUDGET_MB = 2048          # 全局内存预算（MB）
+MEMORY_REAPER_INTERVAL_SECONDS = 60      # 内存回收周期（秒）
+SESSION_INACTIVE_THRESHOLD_SECONDS = 30 * 60  # 会话未活动阈值（秒）
+
+# 临时上传文件缓存（所有会话共享）
+TEMP_CACHE_MEMORY_BUDGET_MB = 256    # 内存预算（MB），超出后最久未使用的文件溢出到磁盘
+TEMP_CACHE_DISK_BUDGET_MB = 4096     # 磁盘预算（MB），超出后淘汰最久未使用的文件
+TEMP_CACHE_SPILL_THRESHOLD_MB = 8    # 单文件超过该大小直接写入磁盘（MB）
+TEMP_CACHE_TTL_SECONDS = 60 * 60     # 缓存文件自最后访问起的存活时间（秒）
+
+# 历史数据 Parquet 写入选项（对比结果见 test_script/benchmark_storage_codecs.py）
+PARQUET_COMPRESSION = 'snappy'       # 压缩编码：snappy / zstd / lz4 / gzip / none
+PARQUET_COMPRESSION_LEVEL = None     # 压缩级别（zstd 1-22；None 使用编码器默认级别）
+PARQUET_DELTA_TIMESTAMPS = False     # 时间戳列使用 DELTA_BINARY_PACKED 编码
+PARQUET_BYTE_STREAM_SPLIT = False    # 采样值/按键时间列使用 BYTE_STREAM_SPLIT 编码
+
+# 历史数据热层（未压缩的 Arrow IPC 文件，内存映射读取）
+HOT_TIER_DISK_BUDGET_MB = 2048       # 热层磁盘预算（MB），超出后淘汰最久未访问的记录
+TRACK_TABLE_CACHE_MB = 256           # 内容寻址音轨的进程级 Arrow 表缓存（MB），相同音轨在记录间共享
+
+# 图表缓存（按会话，键为 图表类型 + 激活算法集合及其数据版本 + 按键过滤 + 参数）
+FIGURE_CACHE_MB = 64                 # 单个会话缓存的图表内存上限（MB），超出后淘汰最久未使用的图表
+
+# 图表数据编码（Plotly ≥ 6 将 NumPy 数组序列化为 base64 二进制数组）
+FIGURE_FLOAT32_TOLERANCE = 0.005     # 坐标降为 float32 的最大允许误差（低于悬停显示的两位小数精度），超出时保留 float64
+FIGURE_TIME_FLOAT32_TOLERANCE = 0.05 # 毫秒时间戳（0.1ms 精度，悬停显示一位小数）降为 float32 的最大允许误差，约14分钟以内的录音可降精度
+
+# 历史记录后台写入队列
+HISTORY_WRITER_MAX_PENDING = 16      # 排队中的写入任务上限，队列满时提交方阻塞（背压）
+HISTORY_WRITER_BATCH_SIZE = 8        # 单个事务最多合并的记录保存数
+
+# 跨记录趋势分析
+TREND_SCAN_WORKERS = 4               # 并行扫描 Parquet 文件的线程数
+TREND_CACHE_MAX_ENTRIES = 32         # 缓存的分析结果数量上限（LRU）
+
+# 瀑布图分级显示（LOD）：全局视图为按键占用密度图，缩放到足够小的窗口后显示精确的bar
+WATERFALL_LOD_TIME_BUCKETS = 400     # 密度图的时间分桶数（与录制时长无关）
+WATERFALL_LOD_MAX_BARS = 3000        # 可见窗口内不超过该数量的bar时显示精确bar
+
 # 算法相关常量
 DEFAULT_ALGORITHM_NAME = 'SPMID分析'  # 默认算法名称
 MAX_ALGORITHMS = 10  # 最多支持的算法数量